@@ -0,0 +1,118 @@
+"""
+Benchmark del algoritmo de matching: scoring escalar (Decimal par a par)
+vs scoring en lote con NumPy, y motor de similitud rápido vs
+difflib.SequenceMatcher, sobre un periodo sintético.
+
+Uso (desde Backend/):
+    python scripts/benchmark_matching.py            # 5000 x 5000
+    python scripts/benchmark_matching.py 2000 2000  # tamaño personalizado
+"""
+import os
+import sys
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.append(os.getcwd())
+
+from src.domain.models.movimiento import Movimiento
+from src.domain.models.movimiento_extracto import MovimientoExtracto
+from src.domain.models.configuracion_matching import ConfiguracionMatching
+from src.domain.services.matching_service import MatchingService
+from src.domain.services.similitud_texto import MotorSequenceMatcher
+
+DESCRIPCIONES = [
+    "PAGO PSE EMPRESA DE SERVICIOS PUBLICOS",
+    "TRANSFERENCIA CTA SUC VIRTUAL",
+    "COMPRA EN SUPERMERCADO EXITO",
+    "ABONO INTERESES AHORROS",
+    "CUOTA MANEJO TARJETA DEBITO",
+    "RETIRO CAJERO AUTOMATICO",
+    "PAGO INTERBANC NOMINA",
+    "IMPTO GOBIERNO 4X1000",
+]
+
+
+def generar_periodo(n_extracto: int, n_sistema: int, semilla: int = 42):
+    """Genera un periodo de un mes con ~80% de filas con contraparte exacta"""
+    rnd = random.Random(semilla)
+    inicio = date(2025, 1, 1)
+
+    sistema = []
+    for i in range(n_sistema):
+        sistema.append(Movimiento(
+            id=i + 1,
+            moneda_id=1,
+            cuenta_id=1,
+            fecha=inicio + timedelta(days=rnd.randint(0, 30)),
+            valor=Decimal(rnd.choice([-1, 1]) * rnd.randint(1, 2000) * 100),
+            descripcion=rnd.choice(DESCRIPCIONES),
+        ))
+
+    extracto = []
+    for i in range(n_extracto):
+        if i < len(sistema) and rnd.random() < 0.8:
+            base = sistema[i]
+            fecha = base.fecha + timedelta(days=rnd.choice([0, 0, 0, 1]))
+            valor = base.valor + Decimal(rnd.choice([0, 0, 0, 30]))
+            descripcion = base.descripcion if rnd.random() < 0.7 else rnd.choice(DESCRIPCIONES)
+        else:
+            fecha = inicio + timedelta(days=rnd.randint(0, 30))
+            valor = Decimal(rnd.choice([-1, 1]) * rnd.randint(1, 2000) * 100)
+            descripcion = rnd.choice(DESCRIPCIONES)
+        extracto.append(MovimientoExtracto(
+            id=i + 1, cuenta_id=1, year=2025, month=1, fecha=fecha,
+            descripcion=descripcion, referencia=None, valor=valor
+        ))
+
+    rnd.shuffle(extracto)
+    return extracto, sistema
+
+
+def medir(service: MatchingService, extracto, sistema, config):
+    inicio = time.perf_counter()
+    resultado = service.ejecutar_matching(extracto, sistema, config)
+    return resultado, time.perf_counter() - inicio
+
+
+def firma(matches):
+    return [
+        (m.mov_extracto.id, m.mov_sistema.id if m.mov_sistema else None, m.estado,
+         m.score_total, m.score_fecha, m.score_valor, m.score_descripcion)
+        for m in matches
+    ]
+
+
+def main():
+    n_extracto = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    n_sistema = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    config = ConfiguracionMatching.crear_configuracion_default()
+    extracto, sistema = generar_periodo(n_extracto, n_sistema)
+
+    print(f"Periodo sintético: {n_extracto} extracto x {n_sistema} sistema")
+
+    vectorizado, t_vectorizado = medir(MatchingService(usar_vectorizado=True), extracto, sistema, config)
+    print(f"  Vectorizado (NumPy):             {t_vectorizado:8.2f} s")
+
+    escalar, t_escalar = medir(MatchingService(usar_vectorizado=False), extracto, sistema, config)
+    print(f"  Escalar (Decimal):               {t_escalar:8.2f} s")
+
+    referencia, t_referencia = medir(
+        MatchingService(usar_vectorizado=True, motor_similitud=MotorSequenceMatcher()),
+        extracto, sistema, config
+    )
+    print(f"  Vectorizado con SequenceMatcher: {t_referencia:8.2f} s")
+
+    iguales = firma(vectorizado) == firma(escalar) == firma(referencia)
+    print(f"  Speedup escalar/vectorizado:     {t_escalar / t_vectorizado:8.1f} x")
+    print(f"  Speedup motor de similitud:      {t_referencia / t_vectorizado:8.1f} x")
+    print(f"  Resultados idénticos: {'SI' if iguales else 'NO'}")
+
+    if not iguales:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
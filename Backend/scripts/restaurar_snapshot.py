@@ -0,0 +1,43 @@
+"""
+Lista o restaura los snapshots incrementales de seguridad (base + deltas)
+que se crean antes de desvincular movimientos.
+
+    python Backend/scripts/restaurar_snapshot.py            # listar
+    python Backend/scripts/restaurar_snapshot.py <nombre>   # restaurar
+"""
+import sys
+import os
+
+# Adjust path to include backend root
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+sys.path.append(backend_dir)
+
+from src.infrastructure.database.connection import get_db_connection
+from src.application.services.mantenimiento_service import MantenimientoService
+
+
+def main():
+    conn_gen = get_db_connection()
+    conn = next(conn_gen)
+    try:
+        service = MantenimientoService(None, None, conn)
+        if len(sys.argv) < 2:
+            for s in service.listar_snapshots():
+                print(f"{s['nombre']:<50} {s['tipo']:<6} {s['creado']}  {s['bytes']:>12,} bytes")
+            return
+
+        nombre = sys.argv[1]
+        respuesta = input(f"Se reemplazarán las tablas con el snapshot {nombre}. ¿Continuar? (s/n): ")
+        if respuesta.strip().lower() != "s":
+            print("Cancelado.")
+            return
+        for tabla, metricas in service.restaurar_snapshot(nombre).items():
+            print(f"{tabla}: {metricas['filas']} filas ({metricas['segundos']} s)")
+        print("Restauración completada. Reinicie la API para descartar sus cachés.")
+    finally:
+        conn_gen.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import asyncio
 from datetime import date, datetime
 import calendar
 from decimal import Decimal
@@ -9,6 +10,7 @@ from src.domain.ports.movimiento_extracto_repository import MovimientoExtractoRe
 from src.domain.ports.cuenta_extractor_repository import CuentaExtractorRepository
 from src.infrastructure.logging.config import logger
 import importlib
+from src.infrastructure.extractors.pdf_texto import documento_para_extractores, ejecutar_extractor
 from src.infrastructure.extractors.utils import extraer_periodo_de_nombre_archivo, obtener_nombre_mes, extraer_periodo_de_movimientos
 
 class CargarExtractoBancarioService:
@@ -54,13 +56,17 @@ class CargarExtractoBancarioService:
                 logger.error(f"Error importando extractor {nombre}: {e}")
         return loaded_modules
 
-    def analizar_extracto(self, file_obj: Any, filename: str, tipo_cuenta: str, cuenta_id: Optional[int] = None) -> Dict[str, Any]:
+    def analizar_extracto(self, file_obj: Any, filename: str, tipo_cuenta: str, cuenta_id: Optional[int] = None, incluir_movimientos: bool = True) -> Dict[str, Any]:
         """
         Analiza un PDF y extrae el resumen (Saldos) y movimientos para validación cruzada.
         FIX: Usa lógica de signos para sumatorias (Positivo=Entrada, Negativo=Salida).
+        Con incluir_movimientos=False solo se extrae el resumen (sin movimientos ni conteo de duplicados).
         """
         datos = {}
         
+        # El PDF se parsea una sola vez para todos los extractores
+        file_obj = documento_para_extractores(file_obj)
+        
         # 1. Extraer Resumen (Encabezado del PDF)
         # -------------------------------------------------------------------------
         # Intenta usar la configuración de DB para el extractor de RESUMEN
@@ -71,7 +77,7 @@ class CargarExtractoBancarioService:
                 try:
                     if hasattr(file_obj, 'seek'): file_obj.seek(0)
                     module = importlib.import_module(f"src.infrastructure.extractors.bancolombia.{nombre_modulo}")
-                    datos = module.extraer_resumen(file_obj)
+                    datos = ejecutar_extractor(module, 'extraer_resumen', file_obj)
                     if datos:
                         extracted_summary = True
                         break
@@ -84,36 +90,36 @@ class CargarExtractoBancarioService:
             if hasattr(file_obj, 'seek'): file_obj.seek(0)
             if tipo_cuenta == 'Ahorros':
                 from src.infrastructure.extractors.bancolombia import ahorros_extracto
-                datos = ahorros_extracto.extraer_resumen(file_obj)
+                datos = ejecutar_extractor(ahorros_extracto, 'extraer_resumen', file_obj)
             elif tipo_cuenta == 'FondoRenta':
                 from src.infrastructure.extractors.bancolombia import fondorenta_extracto
-                datos = fondorenta_extracto.extraer_resumen(file_obj)
+                datos = ejecutar_extractor(fondorenta_extracto, 'extraer_resumen', file_obj)
             elif tipo_cuenta == 'MasterCardPesos':
                  periodo = self._extraer_periodo_nombre_archivo(filename)
                  usar_anterior = (periodo and (periodo[0] < 2025 or (periodo[0] == 2025 and periodo[1] <= 8)))
                  if usar_anterior:
                      from src.infrastructure.extractors.bancolombia import mastercard_pesos_extracto_anterior
-                     datos = mastercard_pesos_extracto_anterior.extraer_resumen(file_obj)
+                     datos = ejecutar_extractor(mastercard_pesos_extracto_anterior, 'extraer_resumen', file_obj)
                  else:
                      from src.infrastructure.extractors.bancolombia import mastercard_pesos_extracto
-                     datos = mastercard_pesos_extracto.extraer_resumen(file_obj)
+                     datos = ejecutar_extractor(mastercard_pesos_extracto, 'extraer_resumen', file_obj)
             elif tipo_cuenta == 'MasterCardUSD':
                  from src.infrastructure.extractors.bancolombia import mastercard_usd_extracto
-                 datos = mastercard_usd_extracto.extraer_resumen(file_obj)
+                 datos = ejecutar_extractor(mastercard_usd_extracto, 'extraer_resumen', file_obj)
 
         if not datos:
             raise ValueError("No se pudo extraer el resumen del archivo. Verifique el formato.")
 
         # 2. Contar Movimientos y Validación Cruzada
         # -------------------------------------------------------------------------
-        if cuenta_id:
+        if cuenta_id and incluir_movimientos:
             try:
                 extractores = self._obtener_modulos_extractor_movimientos(cuenta_id)
                 movs = []
                 for extractor_module in extractores:
                     try:
                         if hasattr(file_obj, 'seek'): file_obj.seek(0)
-                        movs_temp = extractor_module.extraer_movimientos(file_obj)
+                        movs_temp = ejecutar_extractor(extractor_module, 'extraer_movimientos', file_obj)
                         if movs_temp:
                             movs = movs_temp
                             datos['movimientos'] = movs
@@ -272,7 +278,16 @@ class CargarExtractoBancarioService:
     async def procesar_extracto(self, file_obj: Any, filename: str, tipo_cuenta: str, cuenta_id: int, year: Optional[int] = None, month: Optional[int] = None, overrides: Optional[Dict[str, Decimal]] = None, movimientos_confirmados: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Procesa un extracto PDF y guarda resumen + movimientos.
+
+        La extracción del PDF y las escrituras (psycopg2) bloquean: corren en
+        un hilo para no detener el event loop mientras tanto.
         """
+        return await asyncio.to_thread(
+            self._procesar_extracto, file_obj, filename, tipo_cuenta, cuenta_id,
+            year, month, overrides, movimientos_confirmados
+        )
+
+    def _procesar_extracto(self, file_obj: Any, filename: str, tipo_cuenta: str, cuenta_id: int, year: Optional[int] = None, month: Optional[int] = None, overrides: Optional[Dict[str, Decimal]] = None, movimientos_confirmados: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         import calendar
         
         # 1. Analizar para obtener datos base o usar confirmados
@@ -282,10 +297,10 @@ class CargarExtractoBancarioService:
              # Recalcular totales basados en confirmados
              total_entradas = sum(Decimal(str(m['valor'])) for m in movimientos_confirmados if Decimal(str(m['valor'])) > 0)
              total_salidas = sum(abs(Decimal(str(m['valor']))) for m in movimientos_confirmados if Decimal(str(m['valor'])) < 0)
-             # Buscar resumen original para saldos (o overrides) -> Idealmente deberíamos re-leer headers si no viniera en overrides
-             # Por simplicidad asumimos que el frontend manda overrides o re-analizamos:
+             # Buscar resumen original para saldos (o overrides): solo se relee el resumen,
+             # que viene del caché de extracción si el archivo ya se analizó
              try:
-                 temp_analisis = self.analizar_extracto(file_obj, filename, tipo_cuenta, cuenta_id)
+                 temp_analisis = self.analizar_extracto(file_obj, filename, tipo_cuenta, cuenta_id, incluir_movimientos=False)
                  resumen.update(temp_analisis) # Rellenar saldo_anterior, etc
              except:
                  pass
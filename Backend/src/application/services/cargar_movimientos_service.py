@@ -3,9 +3,11 @@ from src.domain.models.movimiento import Movimiento
 from src.domain.ports.movimiento_repository import MovimientoRepository
 from src.domain.ports.moneda_repository import MonedaRepository
 from src.domain.ports.cuenta_extractor_repository import CuentaExtractorRepository
+from src.domain.services.indice_movimientos_existentes import IndiceMovimientosExistentes
 import importlib
 import traceback
 from datetime import date
+from src.infrastructure.extractors.pdf_texto import documento_para_extractores, ejecutar_extractor
 from src.infrastructure.extractors.utils import extraer_periodo_de_movimientos
 from src.infrastructure.logging.config import logger
 
@@ -13,6 +15,9 @@ class CargarMovimientosService:
     """
     Servicio especializado en la carga mecánica de movimientos diarios (PDFs diarios, CSV, Excel).
     """
+    # Base de los IDs provisionales de movimientos pendientes de insertar
+    ID_PROVISIONAL = 1 << 62
+
     def __init__(self, 
                  movimiento_repo: MovimientoRepository, 
                  moneda_repo: MonedaRepository,
@@ -68,10 +73,12 @@ class CargarMovimientosService:
         modulos = self._obtener_modulos_extractor_movimientos(cuenta_id)
         
         if modulos:
+            # El PDF se parsea una sola vez para todos los extractores
+            file_obj = documento_para_extractores(file_obj)
             for module in modulos:
                 try:
                     if hasattr(file_obj, 'seek'): file_obj.seek(0)
-                    raw_movs = module.extraer_movimientos(file_obj)
+                    raw_movs = ejecutar_extractor(module, 'extraer_movimientos', file_obj)
                     if raw_movs:
                         for m in raw_movs:
                             if m.get('description'):
@@ -89,20 +96,95 @@ class CargarMovimientosService:
                     continue
         return []
 
+    def _cargar_indice_existentes(self, raw_movs: List[Dict[str, Any]], cuenta_id: Optional[int]) -> Optional[IndiceMovimientosExistentes]:
+        """
+        Carga una sola vez los movimientos existentes de la cuenta en el rango de
+        fechas del archivo, para clasificar todas las filas sin una consulta por fila.
+        """
+        fechas = [IndiceMovimientosExistentes.parsear_fecha(raw.get('fecha')) for raw in raw_movs]
+        fechas = [f for f in fechas if f]
+        if not fechas:
+            return None
+        if not cuenta_id:
+            # Sin cuenta ningún movimiento puede coincidir (CuentaID = NULL)
+            return IndiceMovimientosExistentes(cuenta_id, min(fechas), max(fechas))
+        return self.movimiento_repo.obtener_indice_existentes(cuenta_id, min(fechas), max(fechas))
+
+    def _existe_movimiento(self, indice: Optional[IndiceMovimientosExistentes], fecha, valor, referencia, cuenta_id, descripcion, usd) -> bool:
+        """existe_movimiento contra el índice; consulta la BD solo si el índice no cubre la fecha"""
+        fecha_indice = indice.cubre(fecha) if indice else None
+        if fecha_indice is None:
+            return self.movimiento_repo.existe_movimiento(
+                fecha=fecha, valor=valor, referencia=referencia, cuenta_id=cuenta_id,
+                descripcion=descripcion, usd=usd
+            )
+        return indice.existe_movimiento(
+            fecha=fecha_indice, valor=valor, referencia=referencia,
+            descripcion=descripcion, usd=usd
+        )
+
+    def _obtener_exacto(self, indice: Optional[IndiceMovimientosExistentes], cuenta_id: int, fecha, valor):
+        """
+        Soft match por cuenta, fecha y valor (obtener_exacto sin referencia ni descripción).
+        Retorna el MovimientoExistente del índice, o el Movimiento de la BD si el índice no cubre la fecha.
+        """
+        fecha_indice = indice.cubre(fecha) if indice else None
+        if fecha_indice is None:
+            return self.movimiento_repo.obtener_exacto(
+                cuenta_id=cuenta_id, fecha=fecha, valor=valor, referencia=None, descripcion=None
+            )
+        return indice.obtener_exacto(fecha_indice, valor)
+
+    def _registrar_en_indice(self, indice: Optional[IndiceMovimientosExistentes], mov: Movimiento, id: Optional[int] = None) -> None:
+        """
+        Las filas siguientes del archivo deben ver lo que ya se guardó (como en la BD).
+        `id` permite registrar con un ID provisional un movimiento aún no insertado.
+        """
+        id = id or mov.id
+        if indice and id and mov.cuenta_id == indice.cuenta_id and indice.cubre(mov.fecha):
+            indice.registrar(id, mov.fecha, mov.descripcion, mov.referencia, mov.valor, mov.usd)
+
+    def _insertar_pendientes(self, pendientes: List[Movimiento]) -> int:
+        """
+        Inserta los movimientos nuevos del archivo con guardar_lote.
+        Si el lote falla (ej. un periodo conciliado), se reintenta fila por fila
+        para insertar las válidas y contar los errores como antes.
+        Retorna la cantidad de errores.
+        """
+        if not pendientes:
+            return 0
+        try:
+            self.movimiento_repo.guardar_lote(pendientes)
+            return 0
+        except Exception as e:
+            logger.warning(f"Inserción en lote fallida, reintentando fila por fila: {e}")
+
+        errores = 0
+        for mov in pendientes:
+            try:
+                self.movimiento_repo.guardar_lote([mov])
+            except Exception as e:
+                logger.error(f"ERROR procesando movimiento: {e}")
+                errores += 1
+        return errores
+
     def analizar_archivo(self, file_obj: Any, filename: str, tipo_cuenta: str, cuenta_id: Optional[int] = None) -> Dict[str, Any]:
         """Analiza el archivo previo a la carga (Previsualización)."""
         raw_movs = self._extraer_movimientos(file_obj, tipo_cuenta, cuenta_id)
         resultado_detalle = []
         stats = {"leidos": len(raw_movs), "duplicados": 0, "nuevos": 0, "actualizables": 0}
         
+        # Movimientos existentes en memoria: todas las filas se clasifican en una pasada
+        indice = self._cargar_indice_existentes(raw_movs, cuenta_id)
+        
         for raw in raw_movs:
             try:
                 es_usd = raw.get('moneda') == 'USD'
                 valor_para_check = 0 if es_usd else raw['valor']
                 usd_val = raw['valor'] if es_usd else None
                 
-                es_duplicado = self.movimiento_repo.existe_movimiento(
-                    fecha=raw['fecha'], valor=valor_para_check,
+                es_duplicado = self._existe_movimiento(
+                    indice, fecha=raw['fecha'], valor=valor_para_check,
                     referencia=raw.get('referencia', ''), cuenta_id=cuenta_id,
                     descripcion=raw['descripcion'], usd=usd_val
                 )
@@ -111,17 +193,16 @@ class CargarMovimientosService:
                 descripcion_actual = None
 
                 if not es_duplicado and cuenta_id:
-                    soft_match = self.movimiento_repo.obtener_exacto(
-                        cuenta_id=cuenta_id, fecha=raw['fecha'],
-                        valor=valor_para_check, referencia=None, descripcion=None
+                    soft_match = self._obtener_exacto(
+                        indice, cuenta_id=cuenta_id, fecha=raw['fecha'], valor=valor_para_check
                     )
                     if soft_match:
                         es_actualizable = True
                         descripcion_actual = soft_match.descripcion
 
                 if not es_duplicado and tipo_cuenta in ['MasterCardPesos', 'MasterCardUSD']:
-                    posible_duplicado = self.movimiento_repo.existe_movimiento(
-                        fecha=raw['fecha'], valor=valor_para_check,
+                    posible_duplicado = self._existe_movimiento(
+                        indice, fecha=raw['fecha'], valor=valor_para_check,
                         referencia=raw.get('referencia', ''), cuenta_id=cuenta_id,
                         descripcion='', usd=usd_val
                     )
@@ -161,6 +242,14 @@ class CargarMovimientosService:
         total_ingresos_usd = 0
         total_egresos_usd = 0
         
+        # Movimientos existentes en memoria; lo que se guarde se registra en el índice
+        indice = self._cargar_indice_existentes(raw_movs, cuenta_id)
+        
+        # Movimientos nuevos por ID provisional; se insertan juntos al final.
+        # Los IDs provisionales son mayores que cualquier ID real, así el soft
+        # match prefiere los movimientos existentes, como en la BD.
+        pendientes: Dict[int, Movimiento] = {}
+        
         for raw in raw_movs:
             try:
                 es_usd = raw.get('moneda') == 'USD'
@@ -182,15 +271,15 @@ class CargarMovimientosService:
                     else:
                         total_egresos += valor
 
-                existe = self.movimiento_repo.existe_movimiento(
-                    fecha=raw['fecha'], valor=valor_para_check,
+                existe = self._existe_movimiento(
+                    indice, fecha=raw['fecha'], valor=valor_para_check,
                     referencia=raw.get('referencia', ''), cuenta_id=cuenta_id,
                     descripcion=raw['descripcion'], usd=usd_val
                 )
                 
                 if not existe and tipo_cuenta in ['MasterCardPesos', 'MasterCardUSD']:
-                    existe = self.movimiento_repo.existe_movimiento(
-                        fecha=raw['fecha'], valor=valor_para_check,
+                    existe = self._existe_movimiento(
+                        indice, fecha=raw['fecha'], valor=valor_para_check,
                         referencia=raw.get('referencia', ''), cuenta_id=cuenta_id,
                         descripcion='', usd=usd_val
                     )
@@ -200,14 +289,23 @@ class CargarMovimientosService:
                     continue
                 
                 if actualizar_descripciones:
-                    soft_match = self.movimiento_repo.obtener_exacto(
-                        cuenta_id=cuenta_id, fecha=raw['fecha'],
-                        valor=valor_para_check, referencia=None, descripcion=None
+                    soft_match = self._obtener_exacto(
+                        indice, cuenta_id=cuenta_id, fecha=raw['fecha'], valor=valor_para_check
                     )
+                    id_pendiente = None
+                    if soft_match and soft_match.id in pendientes:
+                        # Movimiento nuevo de este mismo archivo: se actualiza antes de insertarlo
+                        id_pendiente = soft_match.id
+                        soft_match = pendientes[id_pendiente]
+                    elif soft_match and not isinstance(soft_match, Movimiento):
+                        # Del índice solo se tiene el encabezado: cargar el movimiento completo
+                        soft_match = self.movimiento_repo.obtener_por_id(soft_match.id)
                     if soft_match:
                         soft_match.descripcion = raw['descripcion']
                         if raw.get('referencia'): soft_match.referencia = raw['referencia']
-                        self.movimiento_repo.guardar(soft_match)
+                        if id_pendiente is None:
+                            self.movimiento_repo.guardar(soft_match)
+                        self._registrar_en_indice(indice, soft_match, id=id_pendiente)
                         actualizados += 1
                         continue
 
@@ -218,12 +316,17 @@ class CargarMovimientosService:
                     referencia=raw.get('referencia', ''), valor=valor_para_bd,
                     moneda_id=moneda_id, cuenta_id=cuenta_id, usd=usd_val
                 )
-                self.movimiento_repo.guardar(nuevo_mov)
-                insertados += 1
+                id_provisional = self.ID_PROVISIONAL + len(pendientes)
+                pendientes[id_provisional] = nuevo_mov
+                self._registrar_en_indice(indice, nuevo_mov, id=id_provisional)
             except Exception as e:
                 logger.error(f"ERROR procesando movimiento: {e}")
                 logger.error(traceback.format_exc())
                 errores += 1
+        
+        errores_lote = self._insertar_pendientes(list(pendientes.values()))
+        insertados += len(pendientes) - errores_lote
+        errores += errores_lote
                 
         return {
             "archivo": filename, "total_extraidos": len(raw_movs),
@@ -1,7 +1,7 @@
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from decimal import Decimal
 import os
-from difflib import SequenceMatcher
+from functools import lru_cache
 from src.domain.models.movimiento import Movimiento
 from src.domain.ports.movimiento_repository import MovimientoRepository
 from src.domain.ports.reglas_repository import ReglasRepository
@@ -9,21 +9,40 @@ from src.domain.ports.tercero_repository import TerceroRepository
 from src.domain.ports.tercero_descripcion_repository import TerceroDescripcionRepository
 from src.domain.ports.centro_costo_repository import CentroCostoRepository
 from src.domain.ports.concepto_repository import ConceptoRepository
+from src.domain.services.indice_reglas import CacheIndiceReglas, IndiceReglas
+from src.domain.services.indice_descripciones import CacheIndiceDescripciones, EntradaDescripcion
+from src.domain.services.similitud_texto import MotorSimilitudRapido
+
+# Motor de similitud compartido (mismo ratio que SequenceMatcher, con caché por par)
+_motor_similitud = MotorSimilitudRapido(max_entradas=50_000)
+
+
+@lru_cache(maxsize=20_000)
+def _normalizar_texto(texto: str) -> str:
+    """Minúsculas y espacios colapsados; cada descripción se normaliza una sola vez"""
+    return " ".join(texto.lower().split())
+
+
+@lru_cache(maxsize=20_000)
+def _palabras_significativas(texto: str) -> frozenset:
+    """Palabras de más de 2 caracteres, en minúsculas"""
+    return frozenset(p for p in texto.lower().split() if len(p) > 2)
+
 
 def calcular_similitud_texto(texto1: str, texto2: str) -> float:
     """
-    Calcula la similitud entre dos textos usando SequenceMatcher.
+    Calcula la similitud entre dos textos (ratio de SequenceMatcher).
     Retorna un valor entre 0 y 100 (porcentaje de similitud).
     """
     if not texto1 or not texto2:
         return 0.0
     
     # Normalizar textos: minúsculas y sin espacios extras
-    t1 = " ".join(texto1.lower().split())
-    t2 = " ".join(texto2.lower().split())
+    t1 = _normalizar_texto(texto1)
+    t2 = _normalizar_texto(texto2)
     
     # Calcular similitud
-    ratio = SequenceMatcher(None, t1, t2).ratio()
+    ratio = _motor_similitud.ratio(t1, t2)
     return ratio * 100
 
 def calcular_similitud_palabras(texto1: str, texto2: str) -> float:
@@ -37,13 +56,9 @@ def calcular_similitud_palabras(texto1: str, texto2: str) -> float:
     if not texto1 or not texto2:
         return 0.0
     
-    # Normalizar y extraer palabras
-    palabras1 = set(texto1.lower().split())
-    palabras2 = set(texto2.lower().split())
-    
-    # Eliminar palabras muy cortas (1-2 caracteres) que no aportan significado
-    palabras1 = {p for p in palabras1 if len(p) > 2}
-    palabras2 = {p for p in palabras2 if len(p) > 2}
+    # Normalizar y extraer palabras, sin las muy cortas (1-2 caracteres) que no aportan significado
+    palabras1 = _palabras_significativas(texto1)
+    palabras2 = _palabras_significativas(texto2)
     
     if not palabras1 or not palabras2:
         return 0.0
@@ -83,19 +98,38 @@ class ClasificacionService:
                  tercero_repo: TerceroRepository,
                  tercero_descripcion_repo: TerceroDescripcionRepository = None,
                  concepto_repo: ConceptoRepository = None,
-                 centro_costo_repo: CentroCostoRepository = None):
+                 centro_costo_repo: CentroCostoRepository = None,
+                 cache_reglas: Optional[CacheIndiceReglas] = None,
+                 cache_descripciones: Optional[CacheIndiceDescripciones] = None):
         self.movimiento_repo = movimiento_repo
         self.reglas_repo = reglas_repo
         self.tercero_repo = tercero_repo
         self.tercero_descripcion_repo = tercero_descripcion_repo
         self.concepto_repo = concepto_repo
         self.centro_costo_repo = centro_costo_repo
+        self.cache_reglas = cache_reglas
+        self.cache_descripciones = cache_descripciones
+
+    def obtener_indice_reglas(self) -> IndiceReglas:
+        """Reglas compiladas: del caché compartido si existe, o recién cargadas"""
+        if self.cache_reglas:
+            return self.cache_reglas.obtener(self.reglas_repo.obtener_todos)
+        return IndiceReglas(self.reglas_repo.obtener_todos())
 
-    def clasificar_movimiento(self, movimiento: Movimiento) -> Tuple[bool, str]:
+    def clasificar_movimiento(self, movimiento: Movimiento, indice_reglas: Optional[IndiceReglas] = None,
+                              historial_referencias: Optional[Dict[str, List[Movimiento]]] = None,
+                              catalogo_referencias: Optional[Dict[str, object]] = None) -> Tuple[bool, str]:
         """
         Intenta clasificar un movimiento.
         Retorna (exito, razon).
         Modifica el objeto movimiento en sitio si tiene éxito.
+        
+        Args:
+            indice_reglas: Reglas ya compiladas (para lotes); si no se pasa, se obtienen.
+            historial_referencias: Movimientos precargados por referencia sin ceros
+                iniciales (movimiento_repo.buscar_por_referencias); si no se pasa, se consulta.
+            catalogo_referencias: Descripciones precargadas por referencia
+                (tercero_descripcion_repo.buscar_por_referencias); si no se pasa, se consulta.
         """
         # Si ya está clasificado, no hacer nada
         if not movimiento.necesita_clasificacion:
@@ -104,54 +138,38 @@ class ClasificacionService:
         # 1. Estrategia: Reglas Estáticas (Alta prioridad)
         # ------------------------------------------------
         
-        # Obtener y ordenar reglas: 
-        # Las reglas con cuenta_id específica deben evaluarse PRIMERO que las globales (None)
-        reglas = self.reglas_repo.obtener_todos()
-        # Ordenar: x.cuenta_id is not None (True=1, False=0) descendente -> Primero las que tienen cuenta
-        reglas.sort(key=lambda x: x.cuenta_id is not None, reverse=True)
-        
-        for regla in reglas:
-            # 1.1 Filtro por Cuenta (Si la regla especifica cuenta, debe coincidir)
-            if regla.cuenta_id is not None:
-                if movimiento.cuenta_id != regla.cuenta_id:
-                    continue # No aplica esta regla para esta cuenta
-            
-            # 1.2 Coincidencia de Patrón
-            coincide = False
-            texto_upper = (movimiento.descripcion or "").upper()
-            patron_upper = regla.patron.upper()
+        # Reglas cuyo patrón coincide, en orden de evaluación:
+        # las de la cuenta del movimiento PRIMERO, luego las globales (None)
+        if indice_reglas is None:
+            indice_reglas = self.obtener_indice_reglas()
+        
+        for regla in indice_reglas.reglas_coincidentes(movimiento.descripcion, movimiento.cuenta_id):
+            modificado = False
+            if regla.tercero_id and not movimiento.tercero_id:
+                movimiento.tercero_id = regla.tercero_id
+                # Propagar al detalle si es único (consistencia)
+                if len(movimiento.detalles) == 1:
+                    movimiento.detalles[0].tercero_id = regla.tercero_id
+                modificado = True
+            if regla.centro_costo_id and not movimiento.centro_costo_id:
+                movimiento.centro_costo_id = regla.centro_costo_id
+                modificado = True
+            if regla.concepto_id and not movimiento.concepto_id:
+                movimiento.concepto_id = regla.concepto_id
+                modificado = True
             
-            if regla.tipo_match == 'contiene':
-                if patron_upper in texto_upper: coincide = True
-            elif regla.tipo_match == 'inicio':
-                if texto_upper.startswith(patron_upper): coincide = True
-            elif regla.tipo_match == 'exacto':
-                if texto_upper == patron_upper: coincide = True
-                
-            if coincide:
-                modificado = False
-                if regla.tercero_id and not movimiento.tercero_id:
-                    movimiento.tercero_id = regla.tercero_id
-                    # Propagar al detalle si es único (consistencia)
-                    if len(movimiento.detalles) == 1:
-                        movimiento.detalles[0].tercero_id = regla.tercero_id
-                    modificado = True
-                if regla.centro_costo_id and not movimiento.centro_costo_id:
-                    movimiento.centro_costo_id = regla.centro_costo_id
-                    modificado = True
-                if regla.concepto_id and not movimiento.concepto_id:
-                    movimiento.concepto_id = regla.concepto_id
-                    modificado = True
-                
-                if modificado:
-                    tipo_regla = "Cuenta Específica" if regla.cuenta_id else "Global"
-                    return True, f"Regla estática [{tipo_regla}]: '{regla.patron}'"
+            if modificado:
+                tipo_regla = "Cuenta Específica" if regla.cuenta_id else "Global"
+                return True, f"Regla estática [{tipo_regla}]: '{regla.patron}'"
 
         # 2. Estrategia: Histórico por Referencia
         # ---------------------------------------
         if movimiento.referencia:
             # Buscar movimientos previos con la misma referencia que ya estén clasificados
-            similares = self.movimiento_repo.buscar_por_referencia(movimiento.referencia)
+            if historial_referencias is not None:
+                similares = historial_referencias.get(movimiento.referencia.lstrip('0'), [])
+            else:
+                similares = self.movimiento_repo.buscar_por_referencia(movimiento.referencia)
             
             # Filtrar el propio movimiento si ya existe y quedarse con los que tengan clasificación
             candidatos = [
@@ -178,7 +196,10 @@ class ClasificacionService:
         if (movimiento.referencia and len(movimiento.referencia) > 8 
             and movimiento.referencia.isdigit() and self.tercero_descripcion_repo):
             
-            td = self.tercero_descripcion_repo.buscar_por_referencia(movimiento.referencia)
+            if catalogo_referencias is not None:
+                td = catalogo_referencias.get(movimiento.referencia)
+            else:
+                td = self.tercero_descripcion_repo.buscar_por_referencia(movimiento.referencia)
             if td:
                 movimiento.tercero_id = td.terceroid
                 # Propagar al detalle si es único
@@ -192,16 +213,46 @@ class ClasificacionService:
         """
         Busca todos los pendientes y trata de clasificarlos.
         Guarda los cambios inmediatamente.
+
+        Modo por lotes: el histórico por referencia y el catálogo de
+        referencias se precargan para todo el conjunto en una consulta cada
+        uno, la clasificación se resuelve en memoria y los cambios se guardan
+        en una sola transacción (guardar_clasificacion_lote).
         """
         pendientes = self.movimiento_repo.buscar_pendientes_clasificacion()
         resumen = {'total': len(pendientes), 'clasificados': 0, 'detalles': []}
+        if not pendientes:
+            return resumen
+        
+        # Reglas compiladas una sola vez para todo el lote
+        indice_reglas = self.obtener_indice_reglas()
+
+        referencias = [m.referencia for m in pendientes if m.referencia]
+        historial = self.movimiento_repo.buscar_por_referencias(referencias)
+        # Los pendientes del histórico se reemplazan por los mismos objetos del lote:
+        # un pendiente clasificado antes en el recorrido ya cuenta como histórico
+        # para los siguientes, igual que al guardar uno por uno.
+        por_id = {m.id: m for m in pendientes}
+        historial = {
+            ref: [por_id.get(m.id, m) for m in movs]
+            for ref, movs in historial.items()
+        }
+
+        catalogo = {}
+        if self.tercero_descripcion_repo:
+            catalogo = self.tercero_descripcion_repo.buscar_por_referencias([
+                r for r in referencias if len(r) > 8 and r.isdigit()
+            ])
         
+        clasificados = []
         for mov in pendientes:
-            exito, razon = self.clasificar_movimiento(mov)
+            exito, razon = self.clasificar_movimiento(mov, indice_reglas, historial, catalogo)
             if exito:
-                self.movimiento_repo.guardar(mov)
+                clasificados.append(mov)
                 resumen['clasificados'] += 1
                 resumen['detalles'].append(f"ID {mov.id}: {razon}")
+
+        self.movimiento_repo.guardar_clasificacion_lote(clasificados)
         
         return resumen
 
@@ -340,22 +391,34 @@ class ClasificacionService:
             
             print(f"   🔎 Buscando candidatos con palabras: {palabras_clave}")
             
-            for palabra in palabras_clave:
-                # Buscar en repo (Aumentado límite para evitar perder matches por palabras comunes como MASTER)
-                # FIX: Limit aumentado de 30 a 100
-                cands, _ = self.movimiento_repo.buscar_avanzado(descripcion_contiene=palabra, limit=100)
-                
-                for m in cands:
-                    if m.id == movimiento.id or not m.tercero_id:
+            if self.cache_descripciones:
+                # Índice invertido en memoria: una consulta para todas las palabras.
+                # Los candidatos quedan como EntradaDescripcion y solo se hidratan los del top.
+                indice = self.cache_descripciones.obtener(self.movimiento_repo.obtener_indice_descripciones)
+                for m_id, (entrada, cobertura) in indice.candidatos_por_palabras(palabras_clave, 100).items():
+                    if m_id == movimiento.id:
                         continue
+                    if m_id not in candidatos_map:
+                        candidatos_map[m_id] = {'mov': entrada, 'origen': {'texto'}, 'score_cobertura': 0}
+                    candidatos_map[m_id]['origen'].add('texto')
+                    candidatos_map[m_id]['score_cobertura'] += cobertura
+            else:
+                for palabra in palabras_clave:
+                    # Buscar en repo (Aumentado límite para evitar perder matches por palabras comunes como MASTER)
+                    # FIX: Limit aumentado de 30 a 100
+                    cands, _ = self.movimiento_repo.buscar_avanzado(descripcion_contiene=palabra, limit=100)
+                
+                    for m in cands:
+                        if m.id == movimiento.id or not m.tercero_id:
+                            continue
                         
-                    if m.id not in candidatos_map:
-                        candidatos_map[m.id] = {'mov': m, 'origen': {'texto'}, 'score_cobertura': 0}
+                        if m.id not in candidatos_map:
+                            candidatos_map[m.id] = {'mov': m, 'origen': {'texto'}, 'score_cobertura': 0}
                     
-                    if 'texto' not in candidatos_map[m.id]['origen']:
-                        candidatos_map[m.id]['origen'].add('texto')
+                        if 'texto' not in candidatos_map[m.id]['origen']:
+                            candidatos_map[m.id]['origen'].add('texto')
                     
-                    candidatos_map[m.id]['score_cobertura'] += 1
+                        candidatos_map[m.id]['score_cobertura'] += 1
 
         # ============================================
         # 3. CASOS ESPECIALES (FONDO RENTA / TRASLADO)
@@ -421,6 +484,7 @@ class ClasificacionService:
             
         # Ordenar por Score Final Descendente (Ranking Competitivo)
         resultados_scoring.sort(key=lambda x: x['score_final'], reverse=True)
+        resultados_scoring = self._hidratar_ranking(resultados_scoring, 5)
         
         # Logging Top 5
         print(f"\n   🏆 TOP 5 CANDIDATOS (Ranking Unificado):")
@@ -477,6 +541,28 @@ class ClasificacionService:
             'referencia': movimiento.referencia if referencia_no_existe else None
         }
 
+    def _hidratar_ranking(self, resultados: List[dict], k: int) -> List[dict]:
+        """
+        Reemplaza por movimientos completos las entradas del índice de
+        descripciones entre los primeros k resultados (una consulta por
+        tanda). Las que ya no existen o perdieron el tercero desde que se
+        indexaron se descartan y entra el siguiente del ranking.
+        """
+        finales = []
+        restantes = resultados
+        while restantes and len(finales) < k:
+            tanda, restantes = restantes[:k - len(finales)], restantes[k - len(finales):]
+            ids = [r['movimiento'].id for r in tanda if isinstance(r['movimiento'], EntradaDescripcion)]
+            completos = {m.id: m for m in self.movimiento_repo.obtener_por_ids(ids)} if ids else {}
+            for r in tanda:
+                if isinstance(r['movimiento'], EntradaDescripcion):
+                    mov = completos.get(r['movimiento'].id)
+                    if not mov or not mov.tercero_id:
+                        continue
+                    r['movimiento'] = mov
+                finales.append(r)
+        return finales + restantes
+
     def aplicar_regla_lote(self, patron: str, tercero_id: int, centro_costo_id: int, concepto_id: int) -> int:
         """
         Aplica una clasificación a todos los movimientos pendientes que coinciden con un patrón.
@@ -2,16 +2,26 @@ from datetime import date
 import calendar
 from typing import List, Dict, Optional
 import os
-import io
-import csv
-import zipfile
-from datetime import datetime
 
 from src.domain.ports.movimiento_repository import MovimientoRepository
 from src.domain.ports.conciliacion_repository import ConciliacionRepository
 from src.infrastructure.database.connection import get_db_connection
+from src.infrastructure.database.snapshots_incrementales import SnapshotsIncrementales
+from src.infrastructure.database import resumen_mensual
 from src.infrastructure.api.routers.admin import ALLOWED_TABLES, SNAPSHOT_DIR
 
+# Tablas que modifica la desvinculación (padres antes que hijas: así se restauran)
+TABLAS_CRITICAS = [
+    "conciliaciones",
+    "movimientos_encabezado",
+    "movimientos_detalle",
+    "movimiento_vinculaciones"
+]
+# Borrar conciliaciones borra en cascada movimientos_extracto (que no está en
+# el snapshot) y sus vinculaciones: se restaura con upsert por periodo
+LLAVES_RESTAURACION = {"conciliaciones": ("cuenta_id", "year", "month")}
+SNAPSHOTS_INCREMENTALES_DIR = os.path.join(SNAPSHOT_DIR, "incrementales")
+
 class MantenimientoService:
     def __init__(self, 
                  movimiento_repo: MovimientoRepository,
@@ -80,42 +90,48 @@ class MantenimientoService:
         # 3. Ejecutar desvinculación (reset)
         return self.movimiento_repo.desvincular_rango(fecha_corte, fecha_fin, cuenta_id)
 
-    def _realizar_backup_seguridad(self, prefix="autosave_pre_unlink"):
-        """Genera un backup automático de las tablas críticas antes de eliminar"""
-        tablas_criticas = [
-            "movimientos_encabezado", 
-            "movimientos_detalle", 
-            "movimiento_vinculaciones",
-            "conciliaciones"
-        ]
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{prefix}_{timestamp}.zip"
-        full_path = os.path.join(SNAPSHOT_DIR, filename)
-        
-        # Reutilizamos lógica de exportación manual para consistencia
-        # pero optimizada para este caso
-        cursor = self.conn.cursor()
+    def _snapshots(self) -> SnapshotsIncrementales:
+        return SnapshotsIncrementales(
+            SNAPSHOTS_INCREMENTALES_DIR,
+            TABLAS_CRITICAS,
+            tamano_bloque=int(os.getenv('SNAPSHOT_BLOQUE_IDS', '1000')),
+            max_deltas=int(os.getenv('SNAPSHOT_DELTAS_POR_BASE', '30')),
+            llaves=LLAVES_RESTAURACION
+        )
+
+    def _realizar_backup_seguridad(self, prefix="autosave_pre_unlink") -> Dict:
+        """
+        Snapshot de las tablas críticas antes de desvincular. Solo el
+        primero de cada cadena es completo; los siguientes guardan los
+        bloques de filas que cambiaron desde el anterior.
+        """
+        entrada = self._snapshots().crear(self.conn, prefix)
+        # Cierra la transacción de lectura del snapshot antes de escribir
+        self.conn.rollback()
+        print(f"Backup de seguridad ({entrada['tipo']}) creado en: "
+              f"{os.path.join(SNAPSHOTS_INCREMENTALES_DIR, entrada['archivo'])}")
+        return entrada
+
+    def listar_snapshots(self) -> List[Dict]:
+        return self._snapshots().listar()
+
+    def restaurar_snapshot(self, nombre: str) -> Dict[str, Dict]:
+        """
+        Restaura las tablas críticas al estado del snapshot `nombre`
+        (su base más los deltas hasta él). Destructivo.
+
+        Returns:
+            Métricas de la copia por tabla
+        """
         try:
-            with zipfile.ZipFile(full_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
-                for table in tablas_criticas:
-                    cursor.execute(f"SELECT * FROM {table}")
-                    
-                    # Obtener headers
-                    if cursor.description:
-                        headers = [desc[0] for desc in cursor.description]
-                    else:
-                        headers = []
-                    
-                    # Escribir CSV en memoria
-                    csv_buffer = io.StringIO()
-                    writer = csv.writer(csv_buffer)
-                    writer.writerow(headers)
-                    writer.writerows(cursor.fetchall())
-                    
-                    zip_file.writestr(f"{table}.csv", csv_buffer.getvalue())
-                    
-            print(f"Backup de seguridad creado en: {full_path}")
-            
-        finally:
-            cursor.close()
+            resultados = self._snapshots().restaurar(self.conn, nombre)
+            cursor = self.conn.cursor()
+            try:
+                resumen_mensual.reconstruir(cursor)
+            finally:
+                cursor.close()
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return {tabla: resultado.resumen() for tabla, resultado in resultados.items()}
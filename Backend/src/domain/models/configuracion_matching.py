@@ -2,6 +2,13 @@ from dataclasses import dataclass
 from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
+from enum import Enum
+
+
+class ModoAsignacion(str, Enum):
+    """Estrategia para asignar movimientos del extracto a movimientos del sistema"""
+    GREEDY = "GREEDY"   # Fila por fila, en orden, toma el mejor candidato disponible
+    OPTIMO = "OPTIMO"   # Asignación global que maximiza la suma de scores por ventana de días
 
 
 @dataclass
@@ -27,6 +34,9 @@ class ConfiguracionMatching:
     score_minimo_exacto: Decimal  # ej: 0.95 = 95% para considerar EXACTO
     score_minimo_probable: Decimal  # ej: 0.70 = 70% para considerar PROBABLE
     
+    # Estrategia de asignación
+    modo_asignacion: ModoAsignacion = ModoAsignacion.GREEDY
+    
     # Metadata
     id: Optional[int] = None
     activo: bool = True
@@ -44,6 +54,18 @@ class ConfiguracionMatching:
             if value is not None and not isinstance(value, Decimal):
                 setattr(self, attr, Decimal(str(value)))
         
+        # Normalizar modo de asignación (puede venir como texto desde BD o API)
+        if self.modo_asignacion is None:
+            self.modo_asignacion = ModoAsignacion.GREEDY
+        elif not isinstance(self.modo_asignacion, ModoAsignacion):
+            try:
+                self.modo_asignacion = ModoAsignacion(str(self.modo_asignacion).upper())
+            except ValueError:
+                raise ValueError(
+                    f"modo_asignacion debe ser uno de {[m.value for m in ModoAsignacion]}, "
+                    f"recibido: {self.modo_asignacion}"
+                )
+        
         # Validar que los pesos sumen 1.00 (con tolerancia de 0.01 por redondeo)
         suma_pesos = self.peso_fecha + self.peso_valor + self.peso_descripcion
         if abs(suma_pesos - Decimal('1.00')) > Decimal('0.01'):
@@ -122,6 +144,21 @@ class ConfiguracionMatching:
         return self.score_minimo_probable <= score_total < self.score_minimo_exacto
 
     
+    def es_match_asignable(self, score_total: Decimal) -> bool:
+        """
+        Determina si un score permite vincular automáticamente (OK o PROBABLE).
+        
+        Args:
+            score_total: Score total calculado
+        
+        Returns:
+            True si supera la similitud mínima y califica como OK o PROBABLE
+        """
+        return (
+            score_total >= self.similitud_descripcion_minima and
+            (self.es_match_exacto(score_total) or self.es_match_probable(score_total))
+        )
+    
     @staticmethod
     def crear_configuracion_default() -> 'ConfiguracionMatching':
         """
@@ -147,6 +184,7 @@ class ConfiguracionMatching:
             f"tolerancia=${float(self.tolerancia_valor):.2f}, "
             f"similitud_min={float(self.similitud_descripcion_minima):.0%}, "
             f"pesos=[{float(self.peso_fecha):.0%}, {float(self.peso_valor):.0%}, {float(self.peso_descripcion):.0%}], "
-            f"scores=[exacto={float(self.score_minimo_exacto):.0%}, probable={float(self.score_minimo_probable):.0%}]"
+            f"scores=[exacto={float(self.score_minimo_exacto):.0%}, probable={float(self.score_minimo_probable):.0%}], "
+            f"modo={self.modo_asignacion.value}"
             f")"
         )
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
 from src.domain.models.conciliacion import Conciliacion
 
 class ConciliacionRepository(ABC):
@@ -22,3 +22,12 @@ class ConciliacionRepository(ABC):
         Debe recalcular: sistema_entradas, sistema_salidas, sistema_saldo_final
         """
         pass
+
+    @abstractmethod
+    def recalcular_sistema_lote(self, periodos: Optional[Iterable[Tuple[int, int, int]]] = None) -> int:
+        """
+        Recalcula los valores del sistema de varios periodos (cuenta_id, year, month)
+        en una sola operación; None = todas las conciliaciones.
+        Retorna el número de conciliaciones actualizadas.
+        """
+        pass
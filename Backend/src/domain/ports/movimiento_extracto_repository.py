@@ -38,6 +38,11 @@ class MovimientoExtractoRepository(ABC):
         """Obtiene un movimiento de extracto por ID"""
         pass
     
+    @abstractmethod
+    def obtener_por_ids(self, ids: List[int]) -> List[MovimientoExtracto]:
+        """Obtiene varios movimientos de extracto por ID en una sola consulta"""
+        pass
+    
     @abstractmethod
     def contar_por_periodo(self, cuenta_id: int, year: int, month: int) -> int:
         """Cuenta movimientos de extracto para un periodo"""
@@ -46,4 +51,21 @@ class MovimientoExtractoRepository(ABC):
     @abstractmethod
     def existe_movimiento(self, fecha, valor, referencia, cuenta_id: int, descripcion=None, usd=None) -> bool:
         """Verifica si existe un movimiento en el extracto"""
-        pass
\ No newline at end of file
+        pass
+
+
+class MovimientoExtractoRepositoryAsync(ABC):
+    """
+    Lecturas de MovimientoExtractoRepository para endpoints async
+    (mismo contrato, sin bloquear el event loop).
+    """
+
+    @abstractmethod
+    async def obtener_por_periodo(self, cuenta_id: int, year: int, month: int) -> List[MovimientoExtracto]:
+        """Obtiene todos los movimientos del extracto para un periodo específico"""
+        pass
+
+    @abstractmethod
+    async def obtener_por_ids(self, ids: List[int]) -> List[MovimientoExtracto]:
+        """Obtiene varios movimientos de extracto por ID en una sola consulta"""
+        pass
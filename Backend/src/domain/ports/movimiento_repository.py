@@ -1,8 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 from datetime import date
 from decimal import Decimal
 from src.domain.models.movimiento import Movimiento
+from src.domain.services.indice_movimientos_existentes import IndiceMovimientosExistentes
+from src.domain.services.indice_descripciones import IndiceDescripciones
 
 class MovimientoRepository(ABC):
     """
@@ -14,6 +16,22 @@ class MovimientoRepository(ABC):
         """Guarda o actualiza un movimiento"""
         pass
 
+    @abstractmethod
+    def guardar_lote(self, movimientos: List[Movimiento]) -> List[Movimiento]:
+        """
+        Inserta movimientos nuevos (encabezado y detalles) en una sola transacción.
+        Si alguno no es válido no se inserta ninguno.
+        """
+        pass
+
+    @abstractmethod
+    def guardar_clasificacion_lote(self, movimientos: List[Movimiento]) -> List[Movimiento]:
+        """
+        Guarda la clasificación (tercero y detalles) de movimientos existentes
+        en una sola transacción. Si alguno no es válido no se guarda ninguno.
+        """
+        pass
+
     @abstractmethod
     def obtener_por_id(self, id: int) -> Optional[Movimiento]:
         """Obtiene un movimiento por su ID único"""
@@ -46,11 +64,36 @@ class MovimientoRepository(ABC):
     def buscar_por_referencia(self, referencia: str) -> List[Movimiento]:
         """Busca movimientos por su referencia bancaria exacta"""
         pass
+
+    @abstractmethod
+    def buscar_por_referencias(self, referencias: List[str]) -> Dict[str, List[Movimiento]]:
+        """
+        Busca en una sola consulta los movimientos de varias referencias.
+        Retorna {referencia sin ceros iniciales: movimientos por fecha descendente}.
+        """
+        pass
     
     @abstractmethod
     def existe_movimiento(self, fecha: date, valor: Decimal, referencia: str, cuenta_id: int, descripcion: str = None, usd: Decimal = None) -> bool:
         pass
 
+    @abstractmethod
+    def obtener_indice_descripciones(self) -> IndiceDescripciones:
+        """
+        Carga en una sola consulta todos los movimientos como índice
+        invertido de sus descripciones (candidatos de sugerencias).
+        """
+        pass
+
+    @abstractmethod
+    def obtener_indice_existentes(self, cuenta_id: int, fecha_inicio: date, fecha_fin: date) -> IndiceMovimientosExistentes:
+        """
+        Carga en una sola consulta los movimientos de la cuenta en el rango de fechas
+        como índice en memoria para detectar duplicados en bloque.
+        Responde igual que existe_movimiento / obtener_exacto fila por fila.
+        """
+        pass
+
     @abstractmethod
     def contar_movimientos_similares(self, fecha: date, valor: Decimal, referencia: str, cuenta_id: int, descripcion: str = None, usd: Decimal = None) -> int:
         """
@@ -84,19 +127,83 @@ class MovimientoRepository(ABC):
                        concepto_id: Optional[int] = None,
                        centros_costos_excluidos: Optional[List[int]] = None,
                        solo_pendientes: bool = False,
+                       solo_clasificados: bool = False,
                        tipo_movimiento: Optional[str] = None,
                        descripcion_contiene: Optional[str] = None,
                        skip: int = 0,
-                       limit: Optional[int] = None
+                       limit: Optional[int] = None,
+                       despues_de: Optional[Tuple[date, Decimal, int]] = None
     ) -> tuple[List[Movimiento], int]:
         """
         Búsqueda con múltiples filtros opcionales y paginación.
+        Orden: fecha, valor absoluto e ID descendentes.
+        
+        Args:
+            despues_de: (fecha, abs(valor), id) del último movimiento de la página
+                anterior, para paginar por llave en lugar de OFFSET.
         
         Returns:
             tuple: (lista de movimientos, total de registros)
         """
         pass
 
+    @abstractmethod
+    def resumir_busqueda_avanzada(self,
+                                 fecha_inicio: Optional[date] = None,
+                                 fecha_fin: Optional[date] = None,
+                                 cuenta_id: Optional[int] = None,
+                                 tercero_id: Optional[int] = None,
+                                 centro_costo_id: Optional[int] = None,
+                                 concepto_id: Optional[int] = None,
+                                 centros_costos_excluidos: Optional[List[int]] = None,
+                                 solo_pendientes: bool = False,
+                                 solo_clasificados: bool = False,
+                                 tipo_movimiento: Optional[str] = None,
+                                 descripcion_contiene: Optional[str] = None
+    ) -> dict:
+        """
+        Totales de buscar_avanzado calculados en SQL.
+        
+        Returns:
+            dict: {'total', 'ingresos', 'egresos'} (egresos en valor absoluto)
+        """
+        pass
+
+    @abstractmethod
+    def iterar_avanzado(self,
+                        fecha_inicio: Optional[date] = None,
+                        fecha_fin: Optional[date] = None,
+                        cuenta_id: Optional[int] = None,
+                        tercero_id: Optional[int] = None,
+                        centro_costo_id: Optional[int] = None,
+                        concepto_id: Optional[int] = None,
+                        centros_costos_excluidos: Optional[List[int]] = None,
+                        solo_pendientes: bool = False,
+                        solo_clasificados: bool = False,
+                        tipo_movimiento: Optional[str] = None,
+                        descripcion_contiene: Optional[str] = None,
+                        tamano_lote: int = 500
+    ) -> Iterator[Movimiento]:
+        """
+        Recorre los resultados de buscar_avanzado (mismo orden) por lotes,
+        sin cargarlos todos en memoria.
+        """
+        pass
+
+    @abstractmethod
+    def iterar_datos_exportacion(self,
+                                 limit: Optional[int] = None,
+                                 plain_format: bool = False,
+                                 tamano_lote: int = 2000,
+                                 columnas: Optional[List[Tuple[str, int]]] = None
+    ) -> Iterator[dict]:
+        """
+        Recorre las filas de obtener_datos_exportacion (mismas columnas y
+        orden) por lotes, sin cargarlas todas en memoria. Si se pasa
+        `columnas`, se llena con (nombre, OID del tipo) antes de la primera fila.
+        """
+        pass
+
     @abstractmethod
     def resumir_por_clasificacion(self, 
                                  tipo_agrupacion: str,
@@ -193,3 +300,69 @@ class MovimientoRepository(ABC):
         """
         pass
 
+
+class MovimientoRepositoryAsync(ABC):
+    """
+    Lecturas de MovimientoRepository para endpoints async (mismo contrato,
+    sin bloquear el event loop). Las escrituras siguen en MovimientoRepository.
+    """
+
+    @abstractmethod
+    async def obtener_por_ids(self, ids: List[int]) -> List[Movimiento]:
+        """Obtiene varios movimientos (con sus detalles) por ID en bloque"""
+        pass
+
+    @abstractmethod
+    async def buscar_avanzado(self,
+                             fecha_inicio: Optional[date] = None,
+                             fecha_fin: Optional[date] = None,
+                             cuenta_id: Optional[int] = None,
+                             tercero_id: Optional[int] = None,
+                             centro_costo_id: Optional[int] = None,
+                             concepto_id: Optional[int] = None,
+                             centros_costos_excluidos: Optional[List[int]] = None,
+                             solo_pendientes: bool = False,
+                             solo_clasificados: bool = False,
+                             tipo_movimiento: Optional[str] = None,
+                             descripcion_contiene: Optional[str] = None,
+                             skip: int = 0,
+                             limit: Optional[int] = None,
+                             despues_de: Optional[Tuple[date, Decimal, int]] = None
+    ) -> tuple[List[Movimiento], int]:
+        """Ver MovimientoRepository.buscar_avanzado"""
+        pass
+
+    @abstractmethod
+    async def resumir_busqueda_avanzada(self,
+                                       fecha_inicio: Optional[date] = None,
+                                       fecha_fin: Optional[date] = None,
+                                       cuenta_id: Optional[int] = None,
+                                       tercero_id: Optional[int] = None,
+                                       centro_costo_id: Optional[int] = None,
+                                       concepto_id: Optional[int] = None,
+                                       centros_costos_excluidos: Optional[List[int]] = None,
+                                       solo_pendientes: bool = False,
+                                       solo_clasificados: bool = False,
+                                       tipo_movimiento: Optional[str] = None,
+                                       descripcion_contiene: Optional[str] = None
+    ) -> dict:
+        """Ver MovimientoRepository.resumir_busqueda_avanzada"""
+        pass
+
+    @abstractmethod
+    def iterar_avanzado(self,
+                        fecha_inicio: Optional[date] = None,
+                        fecha_fin: Optional[date] = None,
+                        cuenta_id: Optional[int] = None,
+                        tercero_id: Optional[int] = None,
+                        centro_costo_id: Optional[int] = None,
+                        concepto_id: Optional[int] = None,
+                        centros_costos_excluidos: Optional[List[int]] = None,
+                        solo_pendientes: bool = False,
+                        solo_clasificados: bool = False,
+                        tipo_movimiento: Optional[str] = None,
+                        descripcion_contiene: Optional[str] = None,
+                        tamano_lote: int = 500
+    ) -> AsyncIterator[Movimiento]:
+        """Ver MovimientoRepository.iterar_avanzado (generador async)"""
+        pass
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import date
+from typing import List, Optional, Tuple
 from src.domain.models.movimiento_match import MovimientoMatch, MatchEstado
 
 
@@ -184,3 +185,58 @@ class MovimientoVinculacionRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    def obtener_marca_periodo(
+        self,
+        cuenta_id: int,
+        year: int,
+        month: int,
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> Tuple:
+        """
+        Huella de los datos que usa el matching del periodo: movimientos del
+        extracto, sus vinculaciones y los movimientos del sistema (rango de
+        fechas de la cuenta más los vinculados). Cambia con cualquier
+        inserción, modificación o eliminación en ellos.
+        
+        Args:
+            cuenta_id: ID de la cuenta
+            year: Año del periodo
+            month: Mes del periodo
+            fecha_inicio: Inicio del rango de movimientos del sistema
+            fecha_fin: Fin del rango de movimientos del sistema
+            
+        Returns:
+            Tupla comparable (conteos, último created_at y suma de hashes por tabla)
+        """
+        pass
+
+
+class MovimientoVinculacionRepositoryAsync(ABC):
+    """
+    Lecturas de MovimientoVinculacionRepository para endpoints async
+    (mismo contrato, sin bloquear el event loop).
+    """
+
+    @abstractmethod
+    async def obtener_por_periodo(
+        self,
+        cuenta_id: int,
+        year: int,
+        month: int
+    ) -> List[MovimientoMatch]:
+        """Obtiene todas las vinculaciones de un periodo específico"""
+        pass
+
+    @abstractmethod
+    async def obtener_marca_periodo(
+        self,
+        cuenta_id: int,
+        year: int,
+        month: int,
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> Tuple:
+        """Huella de los datos que usa el matching del periodo (ver MovimientoVinculacionRepository)"""
+        pass
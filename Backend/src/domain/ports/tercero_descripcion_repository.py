@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Dict, List, Optional
 from src.domain.models.tercero_descripcion import TerceroDescripcion
 
 class TerceroDescripcionRepository(ABC):
@@ -34,6 +34,11 @@ class TerceroDescripcionRepository(ABC):
     def buscar_por_referencia(self, referencia: str) -> Optional['TerceroDescripcion']:
         """Busca una descripción por referencia exacta."""
         pass
+
+    @abstractmethod
+    def buscar_por_referencias(self, referencias: List[str]) -> Dict[str, 'TerceroDescripcion']:
+        """Busca en una sola consulta las descripciones de varias referencias exactas."""
+        pass
     
     @abstractmethod
     def buscar_por_descripcion(self, texto: str) -> List['TerceroDescripcion']:
@@ -0,0 +1,115 @@
+import heapq
+import time
+from typing import List, Optional, Sequence, Tuple
+
+
+class TiempoAsignacionAgotado(Exception):
+    """Se agotó el presupuesto de tiempo antes de terminar la asignación óptima"""
+    pass
+
+
+# Cada cuántos nodos extraídos de la cola se revisa el límite de tiempo
+_REVISAR_LIMITE_CADA = 256
+
+
+def resolver_asignacion_maxima(
+    aristas: Sequence[Sequence[Tuple[int, int]]],
+    limite: Optional[float] = None
+) -> List[int]:
+    """
+    Resuelve la asignación de peso máximo sobre un grafo bipartito disperso
+    (caminos de aumento más cortos con potenciales, Dijkstra sobre las
+    listas de adyacencia): el costo es proporcional a las aristas que
+    recorre cada búsqueda, no a filas × columnas.
+
+    Cada fila tiene además una columna ficticia propia de costo 0 ("sin
+    asignar"), así que una fila solo toma una columna si eso aumenta el
+    peso total. Los pesos son enteros para que la optimización sea exacta;
+    las aristas con peso <= 0 se ignoran.
+
+    Args:
+        aristas: Por fila, lista de (columna, peso); las columnas son enteros >= 0
+        limite: Instante (time.monotonic) a partir del cual se aborta
+
+    Returns:
+        Lista con la columna asignada a cada fila, o -1 si la fila quedó libre
+
+    Raises:
+        TiempoAsignacionAgotado: Si se supera el límite de tiempo
+    """
+    n = len(aristas)
+    m = 1 + max((j for fila in aristas for j, _ in fila), default=-1)
+
+    # Costos = -peso (minimización); la columna ficticia de la fila i es m + i
+    costos = [
+        [(j, -peso) for j, peso in fila if peso > 0] + [(m + i, 0)]
+        for i, fila in enumerate(aristas)
+    ]
+    # Potenciales: costo reducido c - u[i] - v[j] >= 0 en toda arista, 0 en las asignadas
+    u = [0] * n
+    v = [0] * (m + n)
+    fila_de_columna = [-1] * (m + n)
+    columna_de_fila = [-1] * n
+    extraidos = 0
+
+    for r in range(n):
+        if limite is not None and time.monotonic() > limite:
+            raise TiempoAsignacionAgotado()
+
+        u[r] = min(c - v[j] for j, c in costos[r])
+        distancia = {}
+        previo = {}
+        cola = []
+        for j, c in costos[r]:
+            d = c - u[r] - v[j]
+            if d < distancia.get(j, d + 1):
+                distancia[j] = d
+                previo[j] = r
+                cola.append((d, j))
+        heapq.heapify(cola)
+
+        # Dijkstra hasta la primera columna libre (la ficticia de r siempre lo está)
+        finalizadas = []
+        vistas = set()
+        while True:
+            d, j = heapq.heappop(cola)
+            if j in vistas or d > distancia[j]:
+                continue
+            extraidos += 1
+            if limite is not None and extraidos % _REVISAR_LIMITE_CADA == 0 and time.monotonic() > limite:
+                raise TiempoAsignacionAgotado()
+            if fila_de_columna[j] < 0:
+                libre, d_libre = j, d
+                break
+            vistas.add(j)
+            finalizadas.append(j)
+            i = fila_de_columna[j]
+            base = d - u[i]
+            for k, c in costos[i]:
+                if k in vistas:
+                    continue
+                nd = base + c - v[k]
+                if nd < distancia.get(k, nd + 1):
+                    distancia[k] = nd
+                    previo[k] = i
+                    heapq.heappush(cola, (nd, k))
+
+        # Ajustar potenciales para conservar costos reducidos no negativos
+        u[r] += d_libre
+        for j in finalizadas:
+            delta = d_libre - distancia[j]
+            v[j] -= delta
+            u[fila_de_columna[j]] += delta
+
+        # Aumentar a lo largo del camino
+        j = libre
+        while True:
+            i = previo[j]
+            anterior = columna_de_fila[i]
+            fila_de_columna[j] = i
+            columna_de_fila[i] = j
+            if i == r:
+                break
+            j = anterior
+
+    return [j if j < m else -1 for j in columna_de_fila]
@@ -1,10 +1,32 @@
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from src.domain.models.movimiento import Movimiento
-from src.domain.ports.movimiento_repository import MovimientoRepository
-from src.domain.ports.movimiento_vinculacion_repository import MovimientoVinculacionRepository
+from src.domain.models.movimiento_match import MovimientoMatch
+from src.domain.ports.movimiento_repository import MovimientoRepository, MovimientoRepositoryAsync
+from src.domain.ports.movimiento_vinculacion_repository import MovimientoVinculacionRepository, MovimientoVinculacionRepositoryAsync
 from src.domain.services.date_range_service import DateRangeService
 from src.domain.ports.conciliacion_repository import ConciliacionRepository
 
+def _combinar_universo(
+    movs_calendario: List[Movimiento],
+    matches: List[MovimientoMatch]
+) -> Tuple[Dict[int, Movimiento], List[int]]:
+    """
+    Universo por ID con los movimientos del calendario, y los IDs vinculados
+    (de otros periodos) que faltan por traer.
+    """
+    # Recolectar IDs de sistema vinculados
+    linked_system_ids = set()
+    for match in matches:
+        if match.mov_sistema:
+            linked_system_ids.add(match.mov_sistema.id)
+            
+    # Usamos un dict por ID para acceso rápido
+    universo = {m.id: m for m in movs_calendario}
+    
+    # Identificar cuáles faltan
+    return universo, [mid for mid in linked_system_ids if mid not in universo]
+
+
 class ConciliacionService:
     def __init__(
         self, 
@@ -18,7 +40,13 @@ class ConciliacionService:
         self.conciliacion_repo = conciliacion_repo
         self.date_service = date_service
 
-    def obtener_universo_sistema(self, cuenta_id: int, year: int, month: int) -> List[Movimiento]:
+    def obtener_universo_sistema(
+        self,
+        cuenta_id: int,
+        year: int,
+        month: int,
+        vinculaciones: Optional[List[MovimientoMatch]] = None
+    ) -> List[Movimiento]:
         """
         Obtiene todos los movimientos del sistema relevantes para la conciliación del periodo.
         
@@ -29,6 +57,9 @@ class ConciliacionService:
            (Esto cubre los 'Traslados' o cheques cobrados en fecha distinta).
         
         Esto garantiza que la vista de 'Sistema' y 'Matching' sean consistentes.
+        
+        Args:
+            vinculaciones: Vinculaciones del periodo ya cargadas (evita volver a consultarlas)
         """
         
         # 1. Obtener rango del mes calendario (1 al 31)
@@ -43,20 +74,12 @@ class ConciliacionService:
         )
         
         # 3. Obtener movimientos de OTROS periodos que estén vinculados a este mes
-        matches = self.vinculacion_repo.obtener_por_periodo(cuenta_id, year, month)
+        matches = vinculaciones
+        if matches is None:
+            matches = self.vinculacion_repo.obtener_por_periodo(cuenta_id, year, month)
         
-        # Recolectar IDs de sistema vinculados
-        linked_system_ids = set()
-        for match in matches:
-            if match.mov_sistema:
-                linked_system_ids.add(match.mov_sistema.id)
-                
         # 4. Combinar conjuntos evitando duplicados
-        # Usamos un dict por ID para acceso rápido
-        universo = {m.id: m for m in movs_calendario}
-        
-        # Identificar cuáles faltan
-        ids_faltantes = [mid for mid in linked_system_ids if mid not in universo]
+        universo, ids_faltantes = _combinar_universo(movs_calendario, matches)
         
         if ids_faltantes:
             # Traer los que faltan (Traslados, cheques antiguos, etc)
@@ -83,3 +106,49 @@ class ConciliacionService:
         self.conciliacion_repo.recalcular_sistema(cuenta_id, year, month, fecha_inicio, fecha_fin)
         
         return eliminados
+
+
+class ConciliacionServiceAsync:
+    """
+    Lecturas de ConciliacionService para endpoints async, sobre los
+    repositorios async (mismas reglas de negocio).
+    """
+
+    def __init__(
+        self,
+        movimiento_repo: MovimientoRepositoryAsync,
+        vinculacion_repo: MovimientoVinculacionRepositoryAsync,
+        date_service: DateRangeService
+    ):
+        self.movimiento_repo = movimiento_repo
+        self.vinculacion_repo = vinculacion_repo
+        self.date_service = date_service
+
+    async def obtener_universo_sistema(
+        self,
+        cuenta_id: int,
+        year: int,
+        month: int,
+        vinculaciones: Optional[List[MovimientoMatch]] = None
+    ) -> List[Movimiento]:
+        """
+        Movimientos del mes calendario más los de otros periodos vinculados al
+        extracto del mes (ver ConciliacionService.obtener_universo_sistema).
+        """
+        fecha_inicio, fecha_fin = self.date_service.get_range_for_period(cuenta_id, year, month)
+        movs_calendario, _ = await self.movimiento_repo.buscar_avanzado(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            cuenta_id=cuenta_id
+        )
+
+        matches = vinculaciones
+        if matches is None:
+            matches = await self.vinculacion_repo.obtener_por_periodo(cuenta_id, year, month)
+
+        universo, ids_faltantes = _combinar_universo(movs_calendario, matches)
+        if ids_faltantes:
+            for m in await self.movimiento_repo.obtener_por_ids(ids_faltantes):
+                universo[m.id] = m
+
+        return list(universo.values())
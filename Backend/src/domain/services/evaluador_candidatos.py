@@ -0,0 +1,367 @@
+import math
+from typing import List, Optional, Tuple
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él se usa el evaluador escalar
+    np = None
+
+from src.domain.models.movimiento_extracto import MovimientoExtracto
+from src.domain.models.movimiento import Movimiento
+from src.domain.models.configuracion_matching import ConfiguracionMatching
+from src.domain.services.indice_candidatos import IndiceCandidatos
+
+
+# (score_total, score_fecha, score_valor, score_descripcion)
+Scores = Tuple[Decimal, Decimal, Decimal, Decimal]
+
+
+class DescripcionesNormalizadas:
+    """
+    Descripciones normalizadas una sola vez por ejecución.
+
+    El extracto se guarda ya proyectado con los alias y el sistema en
+    mayúsculas; el score de descripción de cada par solo compara textos.
+    """
+
+    def __init__(
+        self,
+        movs_extracto: List[MovimientoExtracto],
+        movs_sistema: List[Movimiento],
+        aliases: list,
+        service
+    ):
+        self.service = service
+        self.extracto = [
+            service.proyectar_descripcion_extracto(m.descripcion, aliases) for m in movs_extracto
+        ]
+        self._sistema = {id(m): service.normalizar_descripcion(m.descripcion) for m in movs_sistema}
+
+    def score(self, i: int, mov_sistema: Movimiento) -> Decimal:
+        """Score de descripción entre la fila i del extracto y un movimiento del sistema"""
+        return self.service.score_descripcion_normalizada(self.extracto[i], self._sistema[id(mov_sistema)])
+
+
+class EvaluadorEscalar:
+    """
+    Evalúa candidatos par a par con los cálculos Decimal del MatchingService.
+
+    Es la implementación de referencia: recorre los candidatos de ±1 día en
+    orden y calcula los scores completos de cada uno.
+    """
+
+    def __init__(
+        self,
+        movs_extracto: List[MovimientoExtracto],
+        movs_sistema: List[Movimiento],
+        config: ConfiguracionMatching,
+        aliases: list,
+        service
+    ):
+        self.movs_extracto = movs_extracto
+        self.config = config
+        self.aliases = aliases
+        self.service = service
+        self.indice = IndiceCandidatos(movs_sistema)
+        self.descripciones = DescripcionesNormalizadas(movs_extracto, movs_sistema, aliases, service)
+
+    def _candidatos(self, i: int) -> List[Movimiento]:
+        return self.service._buscar_candidatos(self.movs_extracto[i], self.indice, self.config)
+
+    def _scores(self, i: int, mov_sistema: Movimiento) -> Scores:
+        return self.service._calcular_scores_par(
+            self.movs_extracto[i],
+            mov_sistema,
+            self.config,
+            self.aliases,
+            score_descripcion=self.descripciones.score(i, mov_sistema)
+        )
+
+    def mejor_candidato(self, i: int) -> Optional[Tuple[Movimiento, Scores]]:
+        """
+        Mejor candidato disponible de la fila i (primero en orden ante empates).
+
+        Returns:
+            (movimiento del sistema, scores) o None si ninguno supera 0.00
+        """
+        mejor = None
+        mejor_score = Decimal('0.00')
+        for mov_sistema in self._candidatos(i):
+            scores = self._scores(i, mov_sistema)
+            if scores[0] > mejor_score:
+                mejor_score = scores[0]
+                mejor = (mov_sistema, scores)
+        return mejor
+
+    def candidatos_asignables(self, i: int) -> List[Tuple[Movimiento, Scores]]:
+        """Candidatos de la fila i que permitirían vincular (OK o PROBABLE), en orden"""
+        resultado = []
+        for mov_sistema in self._candidatos(i):
+            scores = self._scores(i, mov_sistema)
+            if self.config.es_match_asignable(scores[0]):
+                resultado.append((mov_sistema, scores))
+        return resultado
+
+    def retirar(self, mov_sistema: Movimiento) -> None:
+        self.indice.retirar(mov_sistema)
+
+
+class EvaluadorVectorizado:
+    """
+    Evalúa candidatos en lote con NumPy sobre columnas enteras.
+
+    Fechas (días desde la época), valores y USD se convierten una sola vez a
+    enteros escalados (centavos o la escala decimal que requieran los datos).
+    Fecha y valor se puntúan para todos los pares de ±1 día a la vez, en una
+    escala entera común donde el score total es exacto:
+
+        K = score_total × 10000 × L   (L = mcm de las tolerancias enteras)
+
+    La descripción solo se calcula para los pares cuyo K máximo posible aún
+    puede ganar, y los Decimal se construyen solo para el par elegido (y para
+    empates exactos, que se resuelven con la misma regla del cálculo Decimal).
+    """
+
+    ESCALA_SCORE = 10000          # scores de 2 decimales × pesos de 2 decimales
+    MAX_DECIMALES = 6
+    MAX_ENTERO = 2 ** 52
+    SCORE_IDENTIDAD = Decimal('0.85')
+
+    @classmethod
+    def es_aplicable(
+        cls,
+        movs_extracto: List[MovimientoExtracto],
+        movs_sistema: List[Movimiento],
+        config: ConfiguracionMatching
+    ) -> bool:
+        """Indica si los datos se pueden representar exactamente en enteros"""
+        if np is None:
+            return False
+
+        for peso in (config.peso_fecha, config.peso_valor, config.peso_descripcion):
+            if (peso * 100) % 1 != 0:
+                return False
+
+        decimales = cls._decimales_requeridos(movs_extracto, movs_sistema, config)
+        if decimales is None:
+            return False
+
+        # El K máximo (score 1.00) debe caber holgadamente en int64
+        _, _, mcm = cls._tolerancias(config, 10 ** decimales)
+        return mcm * cls.ESCALA_SCORE < cls.MAX_ENTERO
+
+    @staticmethod
+    def _tolerancias(config: ConfiguracionMatching, factor: int) -> Tuple[int, int, int]:
+        """Tolerancias enteras COP y USD (misma regla USD del cálculo escalar) y su mcm"""
+        t_cop = int(config.tolerancia_valor * factor)
+        t_usd = int(Decimal('0.01') * factor) if config.tolerancia_valor > Decimal('1.00') else t_cop
+        return t_cop, t_usd, math.lcm(t_cop or 1, t_usd or 1)
+
+    @classmethod
+    def _decimales_requeridos(cls, movs_extracto, movs_sistema, config) -> Optional[int]:
+        decimales = 2
+        maximo = Decimal('0')
+        valores = [config.tolerancia_valor]
+        for mov in list(movs_extracto) + list(movs_sistema):
+            valores.append(mov.valor)
+            if mov.usd is not None:
+                valores.append(mov.usd)
+
+        for valor in valores:
+            if not isinstance(valor, Decimal) or not valor.is_finite():
+                return None
+            exponente = valor.as_tuple().exponent
+            if exponente < 0:
+                decimales = max(decimales, -exponente)
+            maximo = max(maximo, abs(valor))
+
+        if decimales > cls.MAX_DECIMALES:
+            return None
+        if maximo * (10 ** decimales) * 2 >= cls.MAX_ENTERO:
+            return None
+        return decimales
+
+    def __init__(
+        self,
+        movs_extracto: List[MovimientoExtracto],
+        movs_sistema: List[Movimiento],
+        config: ConfiguracionMatching,
+        aliases: list,
+        service
+    ):
+        self.movs_extracto = movs_extracto
+        self.movs_sistema = movs_sistema
+        self.config = config
+        self.aliases = aliases
+        self.service = service
+        self.descripciones = DescripcionesNormalizadas(movs_extracto, movs_sistema, aliases, service)
+
+        factor = 10 ** self._decimales_requeridos(movs_extracto, movs_sistema, config)
+
+        def entero(valor: Decimal) -> int:
+            return int(valor * factor)
+
+        # --- Columnas ---
+        e_dia = np.array([m.fecha.toordinal() for m in movs_extracto], dtype=np.int64)
+        e_valor = np.array([entero(m.valor) for m in movs_extracto], dtype=np.int64)
+        e_tiene_usd = np.array([m.usd is not None for m in movs_extracto], dtype=bool)
+        e_usd = np.array([entero(m.usd) if m.usd is not None else 0 for m in movs_extracto], dtype=np.int64)
+
+        s_dia = np.array([m.fecha.toordinal() for m in movs_sistema], dtype=np.int64)
+        s_valor = np.array([entero(m.valor) for m in movs_sistema], dtype=np.int64)
+        s_tiene_usd = np.array([m.usd is not None for m in movs_sistema], dtype=bool)
+        s_usd = np.array([entero(m.usd) if m.usd is not None else 0 for m in movs_sistema], dtype=np.int64)
+
+        # --- Tolerancias ---
+        t_cop, t_usd, self.L = self._tolerancias(config, factor)
+
+        self.w_fecha = int(config.peso_fecha * 100)
+        self.w_valor = int(config.peso_valor * 100)
+        self.w_descripcion = int(config.peso_descripcion * 100)
+        self.k_identidad = int(self.SCORE_IDENTIDAD * self.ESCALA_SCORE) * self.L
+
+        # --- Pares candidatos (±1 día), agrupados por fila del extracto ---
+        orden_sistema = np.lexsort((np.arange(len(movs_sistema)), s_dia))
+        dias_ordenados = s_dia[orden_sistema]
+        desde = np.searchsorted(dias_ordenados, e_dia - 1, side='left')
+        hasta = np.searchsorted(dias_ordenados, e_dia + 1, side='right')
+        conteos = hasta - desde
+
+        self.offsets = np.zeros(len(movs_extracto) + 1, dtype=np.int64)
+        np.cumsum(conteos, out=self.offsets[1:])
+        total_pares = int(self.offsets[-1])
+
+        par_e = np.repeat(np.arange(len(movs_extracto), dtype=np.int64), conteos)
+        relativo = np.arange(total_pares, dtype=np.int64) - np.repeat(self.offsets[:-1], conteos)
+        par_s = orden_sistema[np.repeat(desde, conteos) + relativo]
+
+        # Dentro de cada fila, orden original del sistema (regla de desempate)
+        orden_pares = np.lexsort((par_s, par_e))
+        par_e = par_e[orden_pares]
+        par_s = par_s[orden_pares]
+        self.par_s = par_s
+
+        # --- Scores de fecha y valor para todos los pares a la vez ---
+        misma_fecha = e_dia[par_e] == s_dia[par_s]
+        usa_usd = e_tiene_usd[par_e] & s_tiene_usd[par_s]
+        diferencia = np.where(
+            usa_usd,
+            np.abs(e_usd[par_e] - s_usd[par_s]),
+            np.abs(e_valor[par_e] - s_valor[par_s])
+        )
+        tolerancia = np.where(usa_usd, t_usd, t_cop)
+
+        # score_valor × L (entero exacto): 1 - diferencia/tolerancia, acotado a [0, 1]
+        valor_l = np.where(
+            tolerancia > 0,
+            (self.L // np.maximum(tolerancia, 1)) * np.maximum(tolerancia - diferencia, 0),
+            np.where(diferencia == 0, self.L, 0)
+        )
+
+        self.k_base = (
+            100 * self.w_fecha * self.L * misma_fecha.astype(np.int64) +
+            100 * self.w_valor * valor_l
+        )
+        self.identidad = misma_fecha & (diferencia == 0)
+        k_maximo = self.k_base + 100 * self.w_descripcion * self.L
+        self.k_maximo = np.where(self.identidad, np.maximum(k_maximo, self.k_identidad), k_maximo)
+
+        self.disponible = np.ones(len(movs_sistema), dtype=bool)
+        self._posicion = {id(mov): pos for pos, mov in enumerate(movs_sistema)}
+
+    def _k_umbral(self, umbral: Decimal) -> int:
+        """Menor K entero cuyo score es >= umbral"""
+        return math.ceil(umbral * self.ESCALA_SCORE * self.L)
+
+    def _evaluar(self, i: int, pos: int, k_base: int, identidad: bool) -> Tuple[int, Decimal]:
+        """Completa el K de un par con el score de descripción"""
+        score_descripcion = self.descripciones.score(i, self.movs_sistema[pos])
+        k = k_base + self.w_descripcion * int(score_descripcion * 100) * self.L
+        if identidad and k < self.k_identidad:
+            k = self.k_identidad
+        return k, score_descripcion
+
+    def _scores_decimales(self, i: int, pos: int, score_descripcion: Decimal) -> Scores:
+        return self.service._calcular_scores_par(
+            self.movs_extracto[i],
+            self.movs_sistema[pos],
+            self.config,
+            self.aliases,
+            score_descripcion=score_descripcion
+        )
+
+    def _fila(self, i: int):
+        inicio, fin = int(self.offsets[i]), int(self.offsets[i + 1])
+        par_s = self.par_s[inicio:fin]
+        mascara = self.disponible[par_s]
+        return (
+            par_s[mascara],
+            self.k_base[inicio:fin][mascara],
+            self.k_maximo[inicio:fin][mascara],
+            self.identidad[inicio:fin][mascara]
+        )
+
+    def mejor_candidato(self, i: int) -> Optional[Tuple[Movimiento, Scores]]:
+        """
+        Mejor candidato disponible de la fila i (primero en orden ante empates).
+
+        Returns:
+            (movimiento del sistema, scores) o None si ninguno supera 0.00
+        """
+        posiciones, k_base, k_maximo, identidad = self._fila(i)
+        if len(posiciones) == 0:
+            return None
+
+        # Evaluar de mayor a menor K posible; el orden estable conserva el desempate
+        orden = np.argsort(-k_maximo, kind='stable')
+        posiciones = posiciones[orden].tolist()
+        k_base = k_base[orden].tolist()
+        k_maximo = k_maximo[orden].tolist()
+        identidad = identidad[orden].tolist()
+
+        mejor_k = 0
+        empatados = []
+        for j, pos in enumerate(posiciones):
+            # Solo importan pares que puedan superar (o empatar) al mejor y sean > 0
+            if k_maximo[j] < max(mejor_k, 1):
+                break
+            k, score_descripcion = self._evaluar(i, pos, k_base[j], identidad[j])
+            if k > mejor_k:
+                mejor_k = k
+                empatados = [(pos, score_descripcion)]
+            elif k == mejor_k and k > 0:
+                empatados.append((pos, score_descripcion))
+
+        if not empatados:
+            return None
+
+        # Empate exacto: misma regla que el cálculo Decimal (mayor score, primero en orden)
+        mejor = None
+        for pos, score_descripcion in sorted(empatados):
+            scores = self._scores_decimales(i, pos, score_descripcion)
+            if mejor is None or scores[0] > mejor[1][0]:
+                mejor = (self.movs_sistema[pos], scores)
+        return mejor
+
+    def candidatos_asignables(self, i: int) -> List[Tuple[Movimiento, Scores]]:
+        """Candidatos de la fila i que permitirían vincular (OK o PROBABLE), en orden"""
+        posiciones, k_base, k_maximo, identidad = self._fila(i)
+        umbral = max(self.config.similitud_descripcion_minima, self.config.score_minimo_probable)
+        k_umbral = self._k_umbral(umbral)
+
+        resultado = []
+        for j in np.flatnonzero(k_maximo >= k_umbral).tolist():
+            pos = int(posiciones[j])
+            k, score_descripcion = self._evaluar(i, pos, int(k_base[j]), bool(identidad[j]))
+            if k < k_umbral:
+                continue
+            scores = self._scores_decimales(i, pos, score_descripcion)
+            if self.config.es_match_asignable(scores[0]):
+                resultado.append((self.movs_sistema[pos], scores))
+        return resultado
+
+    def retirar(self, mov_sistema: Movimiento) -> None:
+        pos = self._posicion.get(id(mov_sistema))
+        if pos is not None:
+            self.disponible[pos] = False
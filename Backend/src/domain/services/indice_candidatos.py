@@ -0,0 +1,73 @@
+from typing import Dict, List
+from datetime import date
+
+from src.domain.models.movimiento import Movimiento
+
+
+class IndiceCandidatos:
+    """
+    Índice en memoria de los movimientos del sistema agrupados por día.
+
+    Se construye una sola vez por ejecución del matching y permite:
+    - Consultar los candidatos de una fecha tocando solo los buckets de ±1 día.
+    - Retirar un movimiento ya vinculado en O(1).
+
+    Los candidatos se retornan en el mismo orden de la lista original para que
+    el desempate del algoritmo (primer candidato con mejor score) no cambie.
+    """
+
+    def __init__(self, movs_sistema: List[Movimiento], ventana_dias: int = 1):
+        self.ventana_dias = ventana_dias
+
+        # Bucket por ordinal de fecha -> {posición original: movimiento}
+        # Los dict conservan el orden de inserción y permiten borrar en O(1).
+        self._buckets: Dict[int, Dict[int, Movimiento]] = {}
+        # id(objeto) -> (ordinal, posición) para retirar sin recorrer la lista
+        self._ubicaciones: Dict[int, tuple] = {}
+
+        for posicion, mov in enumerate(movs_sistema):
+            ordinal = mov.fecha.toordinal()
+            self._buckets.setdefault(ordinal, {})[posicion] = mov
+            self._ubicaciones[id(mov)] = (ordinal, posicion)
+
+    def candidatos(self, fecha: date) -> List[Movimiento]:
+        """
+        Retorna los movimientos disponibles dentro de la ventana de días de la fecha.
+
+        Args:
+            fecha: Fecha del movimiento del extracto
+
+        Returns:
+            Lista de candidatos en el orden original de los movimientos del sistema
+        """
+        ordinal = fecha.toordinal()
+        encontrados = []
+
+        for dia in range(ordinal - self.ventana_dias, ordinal + self.ventana_dias + 1):
+            bucket = self._buckets.get(dia)
+            if bucket:
+                encontrados.extend(bucket.items())
+
+        encontrados.sort(key=lambda item: item[0])
+        return [mov for _, mov in encontrados]
+
+    def retirar(self, mov: Movimiento) -> None:
+        """
+        Retira un movimiento del índice (ya fue vinculado).
+
+        Args:
+            mov: Movimiento del sistema a retirar
+        """
+        ubicacion = self._ubicaciones.pop(id(mov), None)
+        if ubicacion is None:
+            return
+
+        ordinal, posicion = ubicacion
+        bucket = self._buckets.get(ordinal)
+        if bucket is not None:
+            bucket.pop(posicion, None)
+            if not bucket:
+                del self._buckets[ordinal]
+
+    def __len__(self) -> int:
+        return len(self._ubicaciones)
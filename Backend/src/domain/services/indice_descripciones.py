@@ -0,0 +1,260 @@
+import heapq
+import re
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.domain.models.movimiento import Movimiento
+
+
+class EntradaDescripcion:
+    """Datos de un movimiento que necesita el ranking de sugerencias."""
+    __slots__ = ('id', 'descripcion', 'fecha', 'valor', 'tercero_id')
+
+    def __init__(self, id: int, descripcion: Optional[str], fecha: Optional[date], valor: Optional[Decimal], tercero_id: Optional[int]):
+        self.id = id
+        self.descripcion = descripcion
+        self.fecha = fecha
+        self.valor = valor
+        self.tercero_id = tercero_id
+
+    @classmethod
+    def desde_movimiento(cls, mov: Movimiento) -> 'EntradaDescripcion':
+        return cls(mov.id, mov.descripcion, mov.fecha, mov.valor, mov.tercero_id)
+
+    @property
+    def orden(self) -> Tuple:
+        """
+        Mismo orden que buscar_avanzado (fecha, valor absoluto e ID
+        descendentes); en PostgreSQL los NULL van primero en orden DESC.
+        """
+        return (
+            self.fecha is None, self.fecha or date.min,
+            self.valor is None, abs(self.valor) if self.valor is not None else Decimal(0),
+            self.id
+        )
+
+
+_COMODINES_LIKE = re.compile(r'[%_\\\s]')
+
+
+def _patron_like(palabra: str) -> 're.Pattern':
+    """
+    Expresión regular equivalente a LIKE '%palabra%' (escape por defecto
+    '\\'): % es cualquier secuencia, _ cualquier carácter.
+    """
+    partes = []
+    i = 0
+    while i < len(palabra):
+        c = palabra[i]
+        if c == '\\' and i + 1 < len(palabra):
+            i += 1
+            partes.append(re.escape(palabra[i]))
+        elif c == '%':
+            partes.append('.*')
+        elif c == '_':
+            partes.append('.')
+        else:
+            partes.append(re.escape(c))
+        i += 1
+    return re.compile(''.join(partes), re.DOTALL)
+
+
+class IndiceDescripciones:
+    """
+    Índice invertido token → movimientos, sobre las descripciones en
+    mayúsculas separadas por espacios, más un índice de n-gramas (1 a 3
+    caracteres) sobre el vocabulario.
+
+    buscar() equivale a buscar_avanzado(descripcion_contiene=palabra):
+    descripcion_busqueda LIKE UPPER('%palabra%') sobre todos los
+    movimientos, con el mismo orden y límite. Una palabra sin espacios ni
+    comodines está contenida en una descripción si y solo si está contenida
+    en alguno de sus tokens; los tokens candidatos salen de los n-gramas de
+    la palabra. Con comodines LIKE (% _ \\) o espacios se evalúa el patrón
+    sobre las descripciones completas.
+    """
+
+    N_GRAMA = 3
+
+    def __init__(self, entradas: Iterable[EntradaDescripcion] = ()):
+        self._lock = threading.RLock()
+        self._entradas: Dict[int, EntradaDescripcion] = {}
+        self._tokens: Dict[str, Set[int]] = {}
+        self._gramas: Dict[str, Set[str]] = {}
+        for entrada in entradas:
+            self._agregar(entrada)
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    @staticmethod
+    def _tokenizar(descripcion: Optional[str]) -> Set[str]:
+        return set((descripcion or "").upper().split())
+
+    @classmethod
+    def _gramas_de(cls, token: str) -> Set[str]:
+        return {
+            token[i:i + n]
+            for n in range(1, cls.N_GRAMA + 1)
+            for i in range(len(token) - n + 1)
+        }
+
+    def _agregar(self, entrada: EntradaDescripcion) -> None:
+        self._entradas[entrada.id] = entrada
+        for token in self._tokenizar(entrada.descripcion):
+            ids = self._tokens.get(token)
+            if ids is None:
+                ids = self._tokens[token] = set()
+                for grama in self._gramas_de(token):
+                    self._gramas.setdefault(grama, set()).add(token)
+            ids.add(entrada.id)
+
+    def _quitar(self, id: int) -> None:
+        entrada = self._entradas.pop(id, None)
+        if entrada is None:
+            return
+        for token in self._tokenizar(entrada.descripcion):
+            ids = self._tokens.get(token)
+            if ids is not None:
+                ids.discard(id)
+                if not ids:
+                    del self._tokens[token]
+                    for grama in self._gramas_de(token):
+                        tokens = self._gramas.get(grama)
+                        if tokens is not None:
+                            tokens.discard(token)
+                            if not tokens:
+                                del self._gramas[grama]
+
+    def actualizar(self, movimientos: Iterable[Movimiento]) -> None:
+        """Refleja movimientos guardados (con o sin tercero)"""
+        with self._lock:
+            for mov in movimientos:
+                if not mov.id:
+                    continue
+                self._quitar(mov.id)
+                self._agregar(EntradaDescripcion.desde_movimiento(mov))
+
+    def eliminar(self, ids: Iterable[int]) -> None:
+        with self._lock:
+            for id in ids:
+                self._quitar(id)
+
+    def _tokens_con(self, palabra: str) -> Iterable[str]:
+        """Tokens del vocabulario que contienen la palabra (sin comodines)"""
+        if len(palabra) <= self.N_GRAMA:
+            return self._gramas.get(palabra, ())
+        conjuntos = sorted(
+            (self._gramas.get(palabra[i:i + self.N_GRAMA], set()) for i in range(len(palabra) - self.N_GRAMA + 1)),
+            key=len
+        )
+        return [token for token in conjuntos[0] if palabra in token]
+
+    def buscar(self, palabra: str, limite: Optional[int] = None) -> List[EntradaDescripcion]:
+        """
+        Movimientos cuya descripción cumple LIKE '%palabra%' (sin distinguir
+        mayúsculas), en el orden de buscar_avanzado y hasta `limite`.
+        """
+        palabra = palabra.upper()
+        with self._lock:
+            if _COMODINES_LIKE.search(palabra):
+                patron = _patron_like(palabra)
+                entradas = [
+                    e for e in self._entradas.values()
+                    if e.descripcion is not None and patron.search(e.descripcion.upper())
+                ]
+            else:
+                ids: Set[int] = set()
+                for token in self._tokens_con(palabra):
+                    ids.update(self._tokens[token])
+                entradas = [self._entradas[id] for id in ids]
+
+        if limite is None:
+            return sorted(entradas, key=lambda e: e.orden, reverse=True)
+        return heapq.nlargest(limite, entradas, key=lambda e: e.orden)
+
+    def candidatos_por_palabras(self, palabras: Iterable[str], limite_por_palabra: int) -> Dict[int, Tuple[EntradaDescripcion, int]]:
+        """
+        {id: (entrada, cobertura)}: cobertura es el número de palabras en
+        cuyos primeros `limite_por_palabra` resultados aparece el movimiento.
+        Como el flujo con buscar_avanzado, el límite se aplica sobre todos
+        los movimientos y después se descartan los que no tienen tercero.
+        """
+        candidatos: Dict[int, Tuple[EntradaDescripcion, int]] = {}
+        for palabra in palabras:
+            for entrada in self.buscar(palabra, limite_por_palabra):
+                if not entrada.tercero_id:
+                    continue
+                _, cobertura = candidatos.get(entrada.id, (entrada, 0))
+                candidatos[entrada.id] = (entrada, cobertura + 1)
+        return candidatos
+
+
+class CacheIndiceDescripciones:
+    """
+    Índice de descripciones compartido entre peticiones del proceso.
+
+    Se construye en la primera consulta y se mantiene al día con los
+    guardados y eliminaciones del repositorio de movimientos. Las escrituras
+    masivas lo invalidan, y se reconstruye cada `max_edad_segundos` para
+    recoger cambios hechos por otros procesos o fuera del repositorio.
+    """
+
+    def __init__(self, max_edad_segundos: Optional[float] = 300):
+        self.max_edad_segundos = max_edad_segundos
+        self._lock = threading.Lock()
+        self._version = 0
+        self._entrada: Optional[Tuple[int, float, IndiceDescripciones]] = None
+
+    def _vigente(self) -> Optional[IndiceDescripciones]:
+        if not self._entrada or self._entrada[0] != self._version:
+            return None
+        if self.max_edad_segundos is not None and time.monotonic() - self._entrada[1] > self.max_edad_segundos:
+            return None
+        return self._entrada[2]
+
+    def obtener(self, cargar_indice: Callable[[], IndiceDescripciones]) -> IndiceDescripciones:
+        """
+        Retorna el índice vigente, construyéndolo si no existe, si fue
+        invalidado o si superó la edad máxima.
+
+        Args:
+            cargar_indice: Función que construye el índice (ej. movimiento_repo.obtener_indice_descripciones)
+        """
+        with self._lock:
+            version = self._version
+            indice = self._vigente()
+            if indice is not None:
+                return indice
+
+        # Construir fuera del lock; si hubo escrituras mientras tanto, la siguiente consulta reconstruye
+        creado = time.monotonic()
+        indice = cargar_indice()
+        with self._lock:
+            self._entrada = (version, creado, indice)
+        return indice
+
+    def actualizar(self, movimientos: List[Movimiento]) -> None:
+        """Aplica movimientos guardados al índice vigente (o lo invalida si se está construyendo)"""
+        with self._lock:
+            indice = self._vigente()
+            if indice is None:
+                self._version += 1
+                return
+        indice.actualizar(movimientos)
+
+    def eliminar(self, ids: List[int]) -> None:
+        with self._lock:
+            indice = self._vigente()
+            if indice is None:
+                self._version += 1
+                return
+        indice.eliminar(ids)
+
+    def invalidar(self) -> None:
+        """Descarta el índice construido"""
+        with self._lock:
+            self._version += 1
@@ -0,0 +1,212 @@
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass
+class MovimientoExistente:
+    """Campos de un movimiento del sistema usados para detectar duplicados"""
+    id: int
+    fecha: date
+    descripcion: Optional[str]
+    referencia: Optional[str]
+    valor: Optional[Decimal]
+    usd: Optional[Decimal]
+
+
+class IndiceMovimientosExistentes:
+    """
+    Índice en memoria de los movimientos de una cuenta en un rango de fechas.
+
+    Reproduce en un solo recorrido las verificaciones por fila de
+    MovimientoRepository.existe_movimiento y obtener_exacto (sin referencia
+    ni descripción), con la misma semántica que las consultas SQL:
+
+    - Fecha, Referencia, Valor y USD se comparan por igualdad exacta
+      (Valor/USD como NUMERIC).
+    - La descripción se compara como `Descripcion ILIKE patrón`
+      (sin distinguir mayúsculas, con los comodines % y _ y escape \\).
+
+    Los movimientos insertados o actualizados durante la carga se registran
+    en el índice, igual que las consultas por fila los verían en la BD.
+    """
+
+    ESCALA_BD = Decimal('0.01')  # NUMERIC(18, 2)
+
+    def __init__(
+        self,
+        cuenta_id: Optional[int],
+        fecha_inicio: date,
+        fecha_fin: date,
+        movimientos: Iterable[MovimientoExistente] = ()
+    ):
+        self.cuenta_id = cuenta_id
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_fin
+
+        self._por_id: Dict[int, MovimientoExistente] = {}
+        self._por_referencia: Dict[Tuple[date, str], List[MovimientoExistente]] = {}
+        self._por_valor: Dict[Tuple[date, Decimal], List[MovimientoExistente]] = {}
+        self._por_usd: Dict[Tuple[date, Decimal], List[MovimientoExistente]] = {}
+
+        for mov in movimientos:
+            self._agregar(mov)
+
+    # --- Normalización de parámetros (como los adapta la BD) ---
+
+    @staticmethod
+    def parsear_fecha(fecha) -> Optional[date]:
+        """Fecha de una fila cruda (date o texto ISO); None si no se puede interpretar"""
+        if isinstance(fecha, datetime):
+            return None
+        if isinstance(fecha, date):
+            return fecha
+        if isinstance(fecha, str):
+            try:
+                return date.fromisoformat(fecha.strip())
+            except ValueError:
+                return None
+        return None
+
+    @staticmethod
+    def _numero(valor) -> Optional[Decimal]:
+        if valor is None or isinstance(valor, bool):
+            return None
+        if isinstance(valor, Decimal):
+            return valor
+        if isinstance(valor, float):
+            # psycopg2 envía los float con repr()
+            return Decimal(repr(valor))
+        try:
+            return Decimal(valor)
+        except (InvalidOperation, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _patron_ilike(patron: str) -> 're.Pattern':
+        """Traduce un patrón LIKE de PostgreSQL (escape por defecto '\\') a regex"""
+        partes = []
+        i = 0
+        while i < len(patron):
+            caracter = patron[i]
+            if caracter == '\\':
+                if i + 1 >= len(patron):
+                    raise ValueError("LIKE pattern must not end with escape character")
+                partes.append(re.escape(patron[i + 1]))
+                i += 2
+                continue
+            if caracter == '%':
+                partes.append('.*')
+            elif caracter == '_':
+                partes.append('.')
+            else:
+                partes.append(re.escape(caracter))
+            i += 1
+        return re.compile(''.join(partes), re.IGNORECASE | re.DOTALL)
+
+    # --- Mantenimiento del índice ---
+
+    def _agregar(self, mov: MovimientoExistente) -> None:
+        self._por_id[mov.id] = mov
+        if mov.referencia is not None:
+            self._por_referencia.setdefault((mov.fecha, mov.referencia), []).append(mov)
+        if mov.valor is not None:
+            self._por_valor.setdefault((mov.fecha, mov.valor), []).append(mov)
+        if mov.usd is not None:
+            self._por_usd.setdefault((mov.fecha, mov.usd), []).append(mov)
+
+    def _retirar(self, id: int) -> None:
+        mov = self._por_id.pop(id, None)
+        if mov is None:
+            return
+        for indice, clave in (
+            (self._por_referencia, (mov.fecha, mov.referencia)),
+            (self._por_valor, (mov.fecha, mov.valor)),
+            (self._por_usd, (mov.fecha, mov.usd)),
+        ):
+            grupo = indice.get(clave, [])
+            for posicion, existente in enumerate(grupo):
+                if existente is mov:
+                    del grupo[posicion]
+                    break
+
+    def registrar(
+        self,
+        id: int,
+        fecha: date,
+        descripcion: Optional[str],
+        referencia: Optional[str],
+        valor,
+        usd=None
+    ) -> None:
+        """
+        Registra (o reemplaza) un movimiento guardado durante la carga.
+        Los valores se redondean a la escala de la columna, como en la BD.
+        """
+        def redondear(numero):
+            numero = self._numero(numero)
+            return numero.quantize(self.ESCALA_BD, rounding=ROUND_HALF_UP) if numero is not None else None
+
+        self._retirar(id)
+        self._agregar(MovimientoExistente(
+            id=id,
+            fecha=fecha,
+            descripcion=descripcion,
+            referencia=referencia,
+            valor=redondear(valor),
+            usd=redondear(usd)
+        ))
+
+    # --- Consultas ---
+
+    def cubre(self, fecha) -> Optional[date]:
+        """Fecha interpretada si el índice puede responder por ella; None si no"""
+        fecha = self.parsear_fecha(fecha)
+        if fecha is None or not (self.fecha_inicio <= fecha <= self.fecha_fin):
+            return None
+        return fecha
+
+    def existe_movimiento(
+        self,
+        fecha: date,
+        valor,
+        referencia: Optional[str],
+        descripcion: Optional[str] = None,
+        usd=None
+    ) -> bool:
+        """Mismo criterio que MovimientoRepository.existe_movimiento para la cuenta del índice"""
+        if self.cuenta_id is None:
+            return False
+
+        if referencia and referencia.strip():
+            candidatos = self._por_referencia.get((fecha, referencia), [])
+            if usd is not None:
+                usd = self._numero(usd)
+                candidatos = [m for m in candidatos if m.usd == usd]
+            return bool(candidatos)
+
+        if usd is not None:
+            candidatos = self._por_usd.get((fecha, self._numero(usd)), [])
+        else:
+            candidatos = self._por_valor.get((fecha, self._numero(valor)), [])
+
+        if not descripcion:
+            return bool(candidatos)
+
+        patron = self._patron_ilike(descripcion)
+        return any(
+            m.descripcion is not None and patron.fullmatch(m.descripcion)
+            for m in candidatos
+        )
+
+    def obtener_exacto(self, fecha: date, valor) -> Optional[MovimientoExistente]:
+        """
+        Movimiento con la misma fecha y valor (obtener_exacto sin referencia
+        ni descripción); el de menor ID si hay varios.
+        """
+        if self.cuenta_id is None:
+            return None
+        candidatos = self._por_valor.get((fecha, self._numero(valor)), [])
+        return min(candidatos, key=lambda m: m.id, default=None)
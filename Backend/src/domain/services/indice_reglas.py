@@ -0,0 +1,173 @@
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from src.domain.models.regla_clasificacion import ReglaClasificacion
+
+
+class _ParticionReglas:
+    """
+    Reglas de una misma cuenta (o las globales) compiladas por tipo de match:
+
+    - 'exacto': diccionario patrón → reglas.
+    - 'inicio': trie de prefijos, recorrido una vez sobre el inicio del texto.
+    - 'contiene': autómata Aho-Corasick, una pasada sobre el texto.
+
+    Los patrones y el texto se comparan en mayúsculas, como en la evaluación
+    lineal. Las reglas se identifican por su posición en el orden de evaluación.
+    """
+
+    def __init__(self, reglas: List[Tuple[int, ReglaClasificacion]]):
+        self._exactas: Dict[str, List[int]] = {}
+
+        self._trie_inicio: List[Dict[str, int]] = [{}]
+        self._salidas_inicio: List[List[int]] = [[]]
+
+        self._transiciones: List[Dict[str, int]] = [{}]
+        self._salidas: List[List[int]] = [[]]
+
+        for posicion, regla in reglas:
+            patron = regla.patron.upper()
+            if regla.tipo_match == 'exacto':
+                self._exactas.setdefault(patron, []).append(posicion)
+            elif regla.tipo_match == 'inicio':
+                nodo = self._insertar(self._trie_inicio, self._salidas_inicio, patron)
+                self._salidas_inicio[nodo].append(posicion)
+            elif regla.tipo_match == 'contiene':
+                nodo = self._insertar(self._transiciones, self._salidas, patron)
+                self._salidas[nodo].append(posicion)
+
+        # Enlaces de fallo (BFS) y enlace al sufijo más cercano con salidas
+        self._fallo: List[int] = [0] * len(self._transiciones)
+        self._siguiente_salida: List[int] = [-1] * len(self._transiciones)
+        cola = deque(self._transiciones[0].values())
+        while cola:
+            nodo = cola.popleft()
+            for caracter, hijo in self._transiciones[nodo].items():
+                fallo = self._fallo[nodo]
+                while fallo and caracter not in self._transiciones[fallo]:
+                    fallo = self._fallo[fallo]
+                destino = self._transiciones[fallo].get(caracter, 0)
+                self._fallo[hijo] = destino if destino != hijo else 0
+                sufijo = self._fallo[hijo]
+                self._siguiente_salida[hijo] = (
+                    sufijo if sufijo and self._salidas[sufijo] else self._siguiente_salida[sufijo]
+                )
+                cola.append(hijo)
+
+    @staticmethod
+    def _insertar(transiciones: List[Dict[str, int]], salidas: List[List[int]], patron: str) -> int:
+        nodo = 0
+        for caracter in patron:
+            siguiente = transiciones[nodo].get(caracter)
+            if siguiente is None:
+                siguiente = len(transiciones)
+                transiciones[nodo][caracter] = siguiente
+                transiciones.append({})
+                salidas.append([])
+            nodo = siguiente
+        return nodo
+
+    def coincidencias(self, texto: str) -> Set[int]:
+        """Posiciones de las reglas de la partición cuyo patrón coincide con el texto"""
+        encontradas: Set[int] = set(self._exactas.get(texto, ()))
+
+        # 'inicio': los nodos del trie visitados son los prefijos del texto
+        nodo = 0
+        encontradas.update(self._salidas_inicio[0])
+        for caracter in texto:
+            nodo = self._trie_inicio[nodo].get(caracter)
+            if nodo is None:
+                break
+            encontradas.update(self._salidas_inicio[nodo])
+
+        # 'contiene': el patrón vacío está contenido en cualquier texto
+        encontradas.update(self._salidas[0])
+        if len(self._transiciones) > 1:
+            transiciones, fallo, salidas, siguiente_salida = (
+                self._transiciones, self._fallo, self._salidas, self._siguiente_salida
+            )
+            nodo = 0
+            for caracter in texto:
+                while nodo and caracter not in transiciones[nodo]:
+                    nodo = fallo[nodo]
+                nodo = transiciones[nodo].get(caracter, 0)
+                salida = nodo if salidas[nodo] else siguiente_salida[nodo]
+                while salida > 0:
+                    encontradas.update(salidas[salida])
+                    salida = siguiente_salida[salida]
+
+        return encontradas
+
+
+class IndiceReglas:
+    """
+    Reglas de clasificación compiladas una vez para evaluar muchos movimientos.
+
+    Mismo orden de evaluación que el recorrido lineal de clasificar_movimiento:
+    primero las reglas de la cuenta del movimiento y luego las globales
+    (cuenta_id None), cada grupo en el orden del repositorio. Las reglas se
+    particionan por cuenta, así un movimiento solo consulta su partición y la
+    global.
+    """
+
+    def __init__(self, reglas: List[ReglaClasificacion]):
+        self.reglas = sorted(reglas, key=lambda r: r.cuenta_id is not None, reverse=True)
+
+        por_cuenta: Dict[Optional[int], List[Tuple[int, ReglaClasificacion]]] = {}
+        for posicion, regla in enumerate(self.reglas):
+            por_cuenta.setdefault(regla.cuenta_id, []).append((posicion, regla))
+        self._particiones = {
+            cuenta_id: _ParticionReglas(reglas_cuenta)
+            for cuenta_id, reglas_cuenta in por_cuenta.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.reglas)
+
+    def reglas_coincidentes(self, descripcion: Optional[str], cuenta_id: Optional[int]) -> List[ReglaClasificacion]:
+        """Reglas cuyo patrón coincide con la descripción, en orden de evaluación"""
+        texto = (descripcion or "").upper()
+
+        posiciones: List[int] = []
+        if cuenta_id is not None and cuenta_id in self._particiones:
+            posiciones.extend(sorted(self._particiones[cuenta_id].coincidencias(texto)))
+        if None in self._particiones:
+            posiciones.extend(sorted(self._particiones[None].coincidencias(texto)))
+        return [self.reglas[posicion] for posicion in posiciones]
+
+
+class CacheIndiceReglas:
+    """
+    Índice de reglas compilado y compartido entre peticiones, con un número
+    de versión que se incrementa al invalidarlo (CRUD de /api/reglas,
+    importaciones de la tabla). El caché es por proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._entrada: Optional[Tuple[int, IndiceReglas]] = None
+
+    def obtener(self, cargar_reglas: Callable[[], List[ReglaClasificacion]]) -> IndiceReglas:
+        """
+        Retorna el índice vigente, compilándolo si no existe o si fue invalidado.
+
+        Args:
+            cargar_reglas: Función que carga todas las reglas (ej. reglas_repo.obtener_todos)
+        """
+        with self._lock:
+            version = self._version
+            if self._entrada and self._entrada[0] == version:
+                return self._entrada[1]
+
+        # Compilar fuera del lock; si se invalidó mientras tanto, la siguiente consulta recompila
+        indice = IndiceReglas(cargar_reglas())
+        with self._lock:
+            self._entrada = (version, indice)
+        return indice
+
+    def invalidar(self) -> None:
+        """Descarta el índice compilado"""
+        with self._lock:
+            self._version += 1
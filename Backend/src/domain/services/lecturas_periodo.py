@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class LecturaPeriodo:
+    """
+    Modelo de lectura calculado para un periodo.
+
+    - valor: lo que retornó la función de cálculo.
+    - version: versión del periodo con que se calculó.
+    - modificado: momento (UTC, al segundo) en que se calculó.
+    """
+
+    __slots__ = ("valor", "version", "modificado", "creado")
+
+    def __init__(self, valor: Any, version: int):
+        self.valor = valor
+        self.version = version
+        self.modificado = datetime.now(timezone.utc).replace(microsecond=0)
+        self.creado = time.monotonic()
+
+
+class CacheLecturasPeriodo:
+    """
+    Modelos de lectura de la conciliación por periodo (cuenta, año, mes),
+    compartidos entre peticiones del proceso.
+
+    Cada periodo tiene una versión que avanza con las escrituras que lo
+    afectan; los repositorios de extracto, vinculaciones y movimientos la
+    invalidan después de cada commit. Una invalidación puede ser de un
+    periodo, de una cuenta o global (cuando la escritura no sabe a qué
+    periodos afecta). Un modelo calculado sirve mientras la versión de su
+    periodo no cambie.
+
+    La versión se toma antes de calcular: si una escritura ocurre durante
+    el cálculo, el resultado queda con la versión anterior y la siguiente
+    consulta lo recalcula. Los modelos expiran a los `max_edad_segundos`
+    para recoger escrituras que no pasan por los repositorios (otros
+    procesos, SQL directo, cambios de nombres de terceros).
+    """
+
+    def __init__(self, max_edad_segundos: Optional[float] = 300, max_entradas: int = 256):
+        self.max_edad_segundos = max_edad_segundos
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._reloj = 0
+        self._cambio_global = 0
+        self._cambios_cuenta: Dict[int, int] = {}
+        self._cambios_periodo: Dict[Tuple[int, int, int], int] = {}
+        self._lecturas: "OrderedDict[Tuple[int, int, int, str], LecturaPeriodo]" = OrderedDict()
+
+    def _version(self, cuenta_id: int, year: int, month: int) -> int:
+        return max(
+            self._cambio_global,
+            self._cambios_cuenta.get(cuenta_id, 0),
+            self._cambios_periodo.get((cuenta_id, year, month), 0)
+        )
+
+    def version(self, cuenta_id: int, year: int, month: int) -> int:
+        """Versión actual del periodo (último cambio que lo afecta)"""
+        with self._lock:
+            return self._version(cuenta_id, year, month)
+
+    def vigente(
+        self,
+        cuenta_id: int,
+        year: int,
+        month: int,
+        nombre: str
+    ) -> Tuple[Optional[LecturaPeriodo], int]:
+        """
+        Modelo de lectura `nombre` del periodo si sigue vigente (o None), y la
+        versión actual del periodo para guardar el que se calcule con guardar().
+        """
+        with self._lock:
+            version = self._version(cuenta_id, year, month)
+            lectura = self._lecturas.get((cuenta_id, year, month, nombre))
+        if lectura is not None and lectura.version == version and not self._expirada(lectura):
+            return lectura, version
+        return None, version
+
+    def guardar(
+        self,
+        cuenta_id: int,
+        year: int,
+        month: int,
+        nombre: str,
+        valor: Any,
+        version: int
+    ) -> LecturaPeriodo:
+        """Guarda un modelo calculado con la versión que retornó vigente()"""
+        clave = (cuenta_id, year, month, nombre)
+        lectura = LecturaPeriodo(valor, version)
+        with self._lock:
+            self._lecturas.pop(clave, None)
+            self._lecturas[clave] = lectura
+            # Descartar los modelos calculados hace más tiempo
+            while len(self._lecturas) > self.max_entradas:
+                self._lecturas.popitem(last=False)
+        return lectura
+
+    def obtener(
+        self,
+        cuenta_id: int,
+        year: int,
+        month: int,
+        nombre: str,
+        calcular: Callable[[], Any]
+    ) -> LecturaPeriodo:
+        """
+        Modelo de lectura `nombre` del periodo; lo calcula con `calcular()`
+        si no hay uno vigente. Las excepciones de `calcular` se propagan y no
+        se guarda nada.
+        """
+        lectura, version = self.vigente(cuenta_id, year, month, nombre)
+        if lectura is not None:
+            return lectura
+        return self.guardar(cuenta_id, year, month, nombre, calcular(), version)
+
+    def _expirada(self, lectura: LecturaPeriodo) -> bool:
+        return self.max_edad_segundos is not None and time.monotonic() - lectura.creado > self.max_edad_segundos
+
+    def _avanzar(self) -> int:
+        self._reloj += 1
+        return self._reloj
+
+    def invalidar_periodo(self, cuenta_id: int, year: int, month: int) -> None:
+        """Una escritura afectó un periodo"""
+        with self._lock:
+            self._cambios_periodo[(cuenta_id, year, month)] = self._avanzar()
+
+    def invalidar_cuenta(self, cuenta_id: int) -> None:
+        """Una escritura afectó periodos no determinados de una cuenta"""
+        with self._lock:
+            self._cambios_cuenta[cuenta_id] = self._avanzar()
+
+    def invalidar(self) -> None:
+        """Una escritura afectó periodos no determinados (de cualquier cuenta)"""
+        with self._lock:
+            self._cambio_global = self._avanzar()
+            # Ningún modelo guardado sigue vigente
+            self._lecturas.clear()
@@ -0,0 +1,238 @@
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from src.domain.models.configuracion_matching import ConfiguracionMatching, ModoAsignacion
+from src.domain.models.movimiento import Movimiento
+from src.domain.models.movimiento_extracto import MovimientoExtracto
+from src.domain.models.movimiento_match import MovimientoMatch, MatchEstado
+from src.domain.services.matching_service import MatchingService
+
+
+def _firma(mov) -> Tuple:
+    """Campos que intervienen en el scoring de un movimiento (extracto o sistema)"""
+    return (mov.fecha, mov.valor, mov.usd, mov.trm, mov.descripcion, mov.referencia)
+
+
+class InstantaneaMatching:
+    """
+    Resultado de una ejecución del matching de un periodo, con lo necesario
+    para decidir en la siguiente qué filas del extracto volver a evaluar.
+
+    - marca: huella del periodo en BD tomada antes de ejecutar (ver
+      MovimientoVinculacionRepository.obtener_marca_periodo).
+    - resultado: respuesta completa, reutilizable si la marca no cambió.
+    - resultados: match calculado para cada fila pendiente (por ID de extracto).
+    - firmas_extracto / firmas_sistema: firmas de las filas pendientes y de los
+      movimientos del sistema disponibles al empezar la ejecución.
+    """
+
+    def __init__(
+        self,
+        marca: Hashable,
+        config: ConfiguracionMatching,
+        aliases: Any,
+        resultado: Any,
+        matches: List[MovimientoMatch],
+        movs_extracto_pendientes: List[MovimientoExtracto],
+        movs_sistema_disponibles: List[Movimiento]
+    ):
+        self.marca = marca
+        self.config = config
+        self.aliases = aliases
+        self.resultado = resultado
+        self.resultados: Dict[int, MovimientoMatch] = {m.mov_extracto.id: m for m in matches}
+        self.firmas_extracto: Dict[int, Tuple] = {m.id: _firma(m) for m in movs_extracto_pendientes}
+        self.firmas_sistema: Dict[int, Tuple] = {m.id: _firma(m) for m in movs_sistema_disponibles}
+        self.creado = time.monotonic()
+
+    def es_compatible(self, config: ConfiguracionMatching, aliases: Any) -> bool:
+        """Misma configuración y mismos alias compilados (el proyector del caché es inmutable)"""
+        return self.config == config and self.aliases is aliases
+
+    def vigente(self, marca: Hashable, config: ConfiguracionMatching, aliases: Any) -> bool:
+        """Nada cambió desde esta ejecución: su resultado sigue siendo el del periodo"""
+        return self.marca == marca and self.es_compatible(config, aliases)
+
+
+class MatchingIncremental:
+    """
+    Matching de las filas pendientes del extracto que re-evalúa solo las
+    afectadas por cambios desde la instantánea anterior.
+
+    En GREEDY el resultado de una fila depende de los candidatos de su
+    ventana de días que siguen libres cuando le llega el turno: los
+    disponibles menos los que retiraron (OK o PROBABLE) las filas anteriores.
+    Una fila que quedó SIN_MATCH no retira candidatos, así que su resultado
+    se conserva mientras ese conjunto no cambie en su ventana. Cambia en los
+    días con un movimiento disponible nuevo o modificado, con uno que ya no
+    está disponible, o con uno que ahora retira otra fila (o ninguna, o una
+    fila modificada, que pudo cambiar de turno). Ej.: el candidato que una
+    fila anterior le quitó queda libre porque esa fila se vinculó a otro
+    movimiento o se eliminó.
+
+    Se re-evalúa una fila si es nueva o cambió, si su resultado previo no
+    fue SIN_MATCH, o si su ventana contiene uno de esos días. Las filas
+    re-evaluadas se ejecutan juntas, en su orden original; si sus
+    retiros difieren de los de la ejecución anterior se agregan las filas
+    SIN_MATCH de esos días y se repite, hasta que no haya más. Así el
+    resultado es el mismo de una ejecución completa.
+
+    El modo OPTIMO resuelve ventanas conectadas en conjunto; en ese modo (o
+    sin instantánea compatible) se ejecuta el matching completo.
+    """
+
+    def __init__(self, matching_service: MatchingService, ventana_dias: int = 1):
+        self.matching_service = matching_service
+        self.ventana_dias = ventana_dias
+
+    def _en_ventana(self, fecha: date, dias: Set[int]) -> bool:
+        ordinal = fecha.toordinal()
+        return any(dia in dias for dia in range(ordinal - self.ventana_dias, ordinal + self.ventana_dias + 1))
+
+    @staticmethod
+    def _dias_con_candidatos_cambiados(previa: InstantaneaMatching, movs_sistema_disponibles: List[Movimiento]) -> Set[int]:
+        """Días con movimientos del sistema disponibles nuevos o modificados, o que dejaron de estar disponibles"""
+        dias = {
+            m.fecha.toordinal() for m in movs_sistema_disponibles
+            if previa.firmas_sistema.get(m.id) != _firma(m)
+        }
+        actuales = {m.id for m in movs_sistema_disponibles}
+        dias.update(
+            firma[0].toordinal() for id, firma in previa.firmas_sistema.items()
+            if id not in actuales
+        )
+        return dias
+
+    @staticmethod
+    def _retiros(matches) -> Dict[int, int]:
+        """ID del movimiento del sistema → ID de la fila del extracto que lo retiró"""
+        return {
+            m.mov_sistema.id: m.mov_extracto.id for m in matches
+            if m.mov_sistema is not None and m.estado in (MatchEstado.OK, MatchEstado.PROBABLE)
+        }
+
+    def ejecutar(
+        self,
+        previa: Optional[InstantaneaMatching],
+        movs_extracto_pendientes: List[MovimientoExtracto],
+        movs_sistema_disponibles: List[Movimiento],
+        config: ConfiguracionMatching,
+        aliases=None
+    ) -> List[MovimientoMatch]:
+        """
+        Matching de los pendientes, equivalente a
+        matching_service.ejecutar_matching(movs_extracto_pendientes, movs_sistema_disponibles, config, aliases=aliases).
+
+        Returns:
+            Un MovimientoMatch por fila pendiente, en el orden de movs_extracto_pendientes
+        """
+        if previa is None or config.modo_asignacion == ModoAsignacion.OPTIMO or not previa.es_compatible(config, aliases):
+            return self.matching_service.ejecutar_matching(
+                movs_extracto_pendientes, movs_sistema_disponibles, config, aliases=aliases
+            )
+
+        dias = self._dias_con_candidatos_cambiados(previa, movs_sistema_disponibles)
+        # Filas nuevas o modificadas (su fecha puede cambiar su turno en el orden)
+        cambiadas = {
+            mov.id for mov in movs_extracto_pendientes
+            if previa.firmas_extracto.get(mov.id) != _firma(mov)
+        }
+        reevaluar: Set[int] = set()
+        for mov in movs_extracto_pendientes:
+            anterior = previa.resultados.get(mov.id)
+            if (anterior is None or anterior.estado != MatchEstado.SIN_MATCH
+                    or mov.id in cambiadas
+                    or self._en_ventana(mov.fecha, dias)):
+                reevaluar.add(mov.id)
+
+        retiros_previos = self._retiros(previa.resultados.values())
+        nuevos: Dict[int, MovimientoMatch] = {}
+        while True:
+            filas = [mov for mov in movs_extracto_pendientes if mov.id in reevaluar]
+            matches = self.matching_service.ejecutar_matching(
+                filas, movs_sistema_disponibles, config, aliases=aliases
+            ) if filas else []
+            nuevos = {m.mov_extracto.id: m for m in matches}
+
+            # Candidatos que se liberan o cambian de fila: las filas SIN_MATCH
+            # conservadas de esos días ya no ven los mismos candidatos libres
+            retiros = self._retiros(matches)
+            dias = {
+                m.fecha.toordinal() for m in movs_sistema_disponibles
+                if retiros.get(m.id) != retiros_previos.get(m.id) or retiros.get(m.id) in cambiadas
+            }
+            faltantes = {
+                mov.id for mov in movs_extracto_pendientes
+                if mov.id not in reevaluar and self._en_ventana(mov.fecha, dias)
+            }
+            if not faltantes:
+                break
+            reevaluar |= faltantes
+
+        sistema_por_id = {m.id: m for m in movs_sistema_disponibles}
+        resultado = []
+        for mov in movs_extracto_pendientes:
+            match = nuevos.get(mov.id)
+            if match is None:
+                # Mismos candidatos libres en su ventana: se copia el resultado previo
+                anterior = previa.resultados[mov.id]
+                mov_sistema = anterior.mov_sistema
+                if mov_sistema is not None:
+                    mov_sistema = sistema_por_id.get(mov_sistema.id, mov_sistema)
+                match = MovimientoMatch(
+                    mov_extracto=mov,
+                    mov_sistema=mov_sistema,
+                    estado=anterior.estado,
+                    score_total=anterior.score_total,
+                    score_fecha=anterior.score_fecha,
+                    score_valor=anterior.score_valor,
+                    score_descripcion=anterior.score_descripcion
+                )
+            resultado.append(match)
+        return resultado
+
+
+class CacheMatchingPeriodos:
+    """
+    Última instantánea del matching por periodo (cuenta, año, mes),
+    compartida entre peticiones del proceso.
+
+    No necesita invalidación explícita: la marca del periodo cambia con
+    cualquier escritura en sus movimientos, extracto o vinculaciones. Las
+    instantáneas expiran a los `max_edad_segundos` para recoger cambios que
+    la marca no ve (ej. nombres de terceros o centros de costo).
+    """
+
+    def __init__(self, max_edad_segundos: Optional[float] = 600, max_periodos: int = 64):
+        self.max_edad_segundos = max_edad_segundos
+        self.max_periodos = max_periodos
+        self._lock = threading.Lock()
+        self._instantaneas: Dict[Tuple[int, int, int], InstantaneaMatching] = {}
+
+    def obtener(self, cuenta_id: int, year: int, month: int) -> Optional[InstantaneaMatching]:
+        with self._lock:
+            instantanea = self._instantaneas.get((cuenta_id, year, month))
+        if instantanea is None:
+            return None
+        if self.max_edad_segundos is not None and time.monotonic() - instantanea.creado > self.max_edad_segundos:
+            return None
+        return instantanea
+
+    def guardar(self, cuenta_id: int, year: int, month: int, instantanea: InstantaneaMatching) -> None:
+        with self._lock:
+            self._instantaneas.pop((cuenta_id, year, month), None)
+            self._instantaneas[(cuenta_id, year, month)] = instantanea
+            # Descartar los periodos consultados hace más tiempo
+            while len(self._instantaneas) > self.max_periodos:
+                del self._instantaneas[next(iter(self._instantaneas))]
+
+    def invalidar(self, cuenta_id: Optional[int] = None) -> None:
+        """Descarta las instantáneas de una cuenta (o todas)"""
+        with self._lock:
+            if cuenta_id is None:
+                self._instantaneas.clear()
+            else:
+                for clave in [c for c in self._instantaneas if c[0] == cuenta_id]:
+                    del self._instantaneas[clave]
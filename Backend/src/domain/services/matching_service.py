@@ -1,12 +1,20 @@
+import time
+import logging
 from typing import List, Optional, Tuple
 from decimal import Decimal
 from datetime import date
-from difflib import SequenceMatcher
 
 from src.domain.models.movimiento_extracto import MovimientoExtracto
 from src.domain.models.movimiento import Movimiento
 from src.domain.models.movimiento_match import MovimientoMatch, MatchEstado
-from src.domain.models.configuracion_matching import ConfiguracionMatching
+from src.domain.models.configuracion_matching import ConfiguracionMatching, ModoAsignacion
+from src.domain.services.indice_candidatos import IndiceCandidatos
+from src.domain.services.evaluador_candidatos import EvaluadorEscalar, EvaluadorVectorizado
+from src.domain.services.asignacion_optima import resolver_asignacion_maxima, TiempoAsignacionAgotado
+from src.domain.services.similitud_texto import MotorSimilitudRapido
+from src.domain.services.proyector_alias import ProyectorAlias
+
+logger = logging.getLogger("app_logger")
 
 
 class MatchingService:
@@ -18,120 +26,93 @@ class MatchingService:
     Contiene lógica de negocio pura, sin dependencias de infraestructura.
     """
     
+    def __init__(
+        self,
+        presupuesto_asignacion_segundos: float = 2.0,
+        usar_vectorizado: bool = True,
+        motor_similitud=None
+    ):
+        """
+        Args:
+            presupuesto_asignacion_segundos: Tiempo máximo para el modo OPTIMO.
+                Al agotarse, las ventanas restantes se resuelven con GREEDY.
+            usar_vectorizado: Usa el scoring en lote con NumPy cuando está disponible.
+                Los resultados son idénticos al cálculo escalar.
+            motor_similitud: Motor de similitud de texto (objeto con ratio(a, b)).
+                Por defecto MotorSimilitudRapido, equivalente a SequenceMatcher.
+        """
+        self.presupuesto_asignacion_segundos = presupuesto_asignacion_segundos
+        self.usar_vectorizado = usar_vectorizado
+        self.motor_similitud = motor_similitud or MotorSimilitudRapido()
+    
     def ejecutar_matching(
         self,
         movs_extracto: List[MovimientoExtracto],
         movs_sistema: List[Movimiento],
         config: ConfiguracionMatching,
         todas_cuentas: Optional[List[int]] = None,
-        aliases: Optional[List['MatchingAlias']] = None
+        aliases=None
     ) -> List[MovimientoMatch]:
         """
         Ejecuta el algoritmo de matching completo.
         
+        La estrategia de asignación se toma de config.modo_asignacion:
+        - GREEDY: Cada fila del extracto, en orden, toma su mejor candidato.
+        - OPTIMO: Maximiza la suma de scores de cada ventana de días conectada.
+        
         Args:
             movs_extracto: Movimientos del extracto bancario
             movs_sistema: Movimientos del sistema
             config: Configuración de parámetros del algoritmo
             todas_cuentas: IDs de todas las cuentas (para detectar traslados)
-            aliases: Lista de reglas de normalización (alias)
+            aliases: Reglas de normalización (lista de MatchingAlias o ProyectorAlias ya compilado)
         
         Returns:
             Lista de MovimientoMatch con estados y scores asignados
         """
+        # Alias compilados una sola vez; cada descripción del extracto se proyecta una vez
+        aliases = ProyectorAlias.compilar(aliases)
+        
+        # Evaluador de candidatos construido una sola vez por ejecución
+        # (índice por día; columnas NumPy si aplica)
+        evaluador = self._crear_evaluador(movs_extracto, movs_sistema, config, aliases)
+        
+        if config.modo_asignacion == ModoAsignacion.OPTIMO:
+            return self._asignar_optimo(movs_extracto, evaluador, config)
+        
+        return self._asignar_greedy(movs_extracto, evaluador, config)
+    
+    def _crear_evaluador(
+        self,
+        movs_extracto: List[MovimientoExtracto],
+        movs_sistema: List[Movimiento],
+        config: ConfiguracionMatching,
+        aliases: ProyectorAlias
+    ):
+        """Elige el evaluador en lote (NumPy) si los datos lo permiten, o el escalar"""
+        if self.usar_vectorizado and EvaluadorVectorizado.es_aplicable(movs_extracto, movs_sistema, config):
+            return EvaluadorVectorizado(movs_extracto, movs_sistema, config, aliases, self)
+        return EvaluadorEscalar(movs_extracto, movs_sistema, config, aliases, self)
+    
+    def _asignar_greedy(
+        self,
+        movs_extracto: List[MovimientoExtracto],
+        evaluador,
+        config: ConfiguracionMatching
+    ) -> List[MovimientoMatch]:
+        """
+        Asignación fila por fila: cada movimiento del extracto toma su mejor
+        candidato disponible, que se retira si queda vinculado.
+        """
         resultados: List[MovimientoMatch] = []
-        movs_sistema_disponibles = movs_sistema.copy()
-        
-        # Pre-procesar aliases para búsqueda rápida si es necesario
-        # Pero como son pocos por cuenta, iteración directa está bien.
-        aliases = aliases or []
-        
-        for mov_extracto in movs_extracto:
-            # Buscar candidatos en sistema (mismo día o cercano)
-            candidatos = self._buscar_candidatos(
-                mov_extracto, 
-                movs_sistema_disponibles,
-                config
-            )
-            
-            if not candidatos:
-                # Sin candidatos: SIN_MATCH directamente
-                
-                estado = MatchEstado.SIN_MATCH
-                
-                match = MovimientoMatch(
-                    mov_extracto=mov_extracto,
-                    mov_sistema=None,
-                    estado=estado,
-                    score_total=Decimal('0.00'),
-                    score_fecha=Decimal('0.00'),
-                    score_valor=Decimal('0.00'),
-                    score_descripcion=Decimal('0.00')
-                )
-                resultados.append(match)
-                continue
-            
-            # Calcular scores para cada candidato
-            mejor_match = None
-            mejor_score = Decimal('0.00')
-            
-            for mov_sistema in candidatos:
-                score_fecha = self.calcular_score_fecha(
-                    mov_extracto.fecha, 
-                    mov_sistema.fecha
-                )
-                
-                # REGLA PARA USD: Si ambos tienen USD, priorizamos USD para el score_valor
-                # En cuentas USD, el valor COP puede ser 0 o inconsistente por TRM.
-                val1 = mov_extracto.valor
-                val2 = mov_sistema.valor
-                tolerancia = config.tolerancia_valor
-
-                if mov_extracto.usd is not None and mov_sistema.usd is not None:
-                    val1 = mov_extracto.usd
-                    val2 = mov_sistema.usd
-                    # Si comparamos USD, una tolerancia de pesos (ej: 500) es muy alta.
-                    # Usamos una tolerancia técnica mínima para USD (ej: 0.01) si la proporcionada es mayor.
-                    if tolerancia > Decimal('1.00'):
-                        tolerancia = Decimal('0.01')
-
-                score_valor = self.calcular_score_valor(
-                    val1,
-                    val2,
-                    tolerancia
-                )
-                
-                score_descripcion = self.calcular_score_descripcion(
-                    mov_extracto.descripcion,
-                    mov_sistema.descripcion,
-                    aliases
-                )
-                
-                # Calcular score total ponderado
-                score_total = config.calcular_score_ponderado(
-                    score_fecha,
-                    score_valor,
-                    score_descripcion
-                )
-
-                # ELEGANT MATCHING RULE: Strong Identity Match
-                # If Date and Value are identical (score 1.0), but description differs,
-                # we treat it as a strong PROBABLE match.
-                if score_fecha == Decimal('1.00') and score_valor == Decimal('1.00'):
-                    # Force score to be high enough to be PROBABLE (e.g. 0.85 or based on config)
-                    # Using 0.85 as a safe default for "High Probability"
-                    min_probable = Decimal('0.85')
-                    if score_total < min_probable:
-                        score_total = min_probable
-                
-                # Guardar si es el mejor hasta ahora
-                if score_total > mejor_score:
-                    mejor_score = score_total
-                    mejor_match = (mov_sistema, score_fecha, score_valor, score_descripcion)
+        
+        for i, mov_extracto in enumerate(movs_extracto):
+            # Mejor candidato en sistema (mismo día o cercano)
+            mejor = evaluador.mejor_candidato(i)
             
             # Determinar estado basado en score
-            if mejor_match and mejor_score >= config.similitud_descripcion_minima:
-                mov_sistema, score_fecha, score_valor, score_descripcion = mejor_match
+            if mejor and mejor[1][0] >= config.similitud_descripcion_minima:
+                mov_sistema, (mejor_score, score_fecha, score_valor, score_descripcion) = mejor
                 
                 estado = self._determinar_estado_match(mejor_score, config)
                 
@@ -148,27 +129,229 @@ class MatchingService:
                 # Remover de disponibles si ya fue vinculado (auto-vincular OK o Sugerencia PROBABLE)
                 # Esto garantiza la integridad 1-a-1 desde el algoritmo
                 if estado in [MatchEstado.OK, MatchEstado.PROBABLE]:
-                    movs_sistema_disponibles.remove(mov_sistema)
+                    evaluador.retirar(mov_sistema)
                 
                 resultados.append(match)
             else:
-                # Score muy bajo: SIN_MATCH
-                
-                estado = MatchEstado.SIN_MATCH
-                
-                match = MovimientoMatch(
-                    mov_extracto=mov_extracto,
-                    mov_sistema=None,
-                    estado=estado,
-                    score_total=Decimal('0.00'),
-                    score_fecha=Decimal('0.00'),
-                    score_valor=Decimal('0.00'),
-                    score_descripcion=Decimal('0.00')
-                )
-                resultados.append(match)
+                # Sin candidatos o score muy bajo: SIN_MATCH
+                resultados.append(self._crear_sin_match(mov_extracto))
         
         return resultados
     
+    def _asignar_optimo(
+        self,
+        movs_extracto: List[MovimientoExtracto],
+        evaluador,
+        config: ConfiguracionMatching
+    ) -> List[MovimientoMatch]:
+        """
+        Asignación global: resuelve el problema bipartito extracto↔sistema.
+        
+        Solo se consideran aristas que permitirían vincular (OK o PROBABLE).
+        El grafo se separa en componentes conexas (ventanas de días que
+        comparten candidatos) y cada una se resuelve como asignación de peso
+        máximo sobre sus aristas. Si se agota el presupuesto de tiempo, las
+        componentes pendientes se resuelven con la estrategia GREEDY.
+        """
+        # 1. Aristas asignables por fila del extracto (en orden de candidato)
+        aristas: List[List[Tuple[Movimiento, Tuple[Decimal, Decimal, Decimal, Decimal]]]] = [
+            evaluador.candidatos_asignables(i) for i in range(len(movs_extracto))
+        ]
+        
+        # 2. Componentes conexas (union-find sobre filas del extracto vía sistema)
+        padre = list(range(len(movs_extracto)))
+        
+        def raiz(i: int) -> int:
+            while padre[i] != i:
+                padre[i] = padre[padre[i]]
+                i = padre[i]
+            return i
+        
+        primera_fila_por_sistema = {}
+        for i, filas in enumerate(aristas):
+            for mov_sistema, _ in filas:
+                j = primera_fila_por_sistema.setdefault(id(mov_sistema), i)
+                padre[raiz(i)] = raiz(j)
+        
+        componentes = {}
+        for i, filas in enumerate(aristas):
+            if filas:
+                componentes.setdefault(raiz(i), []).append(i)
+        
+        # 3. Resolver cada componente (el presupuesto cubre solo la optimización)
+        limite = time.monotonic() + self.presupuesto_asignacion_segundos
+        asignacion = {}  # índice fila extracto -> (mov_sistema, scores)
+        agotado = False
+        for filas_comp in componentes.values():
+            if not agotado:
+                try:
+                    asignacion.update(self._resolver_componente(filas_comp, aristas, limite))
+                    continue
+                except TiempoAsignacionAgotado:
+                    agotado = True
+                    logger.warning(
+                        f"Presupuesto de asignación óptima agotado "
+                        f"({self.presupuesto_asignacion_segundos}s); se continúa con GREEDY"
+                    )
+            asignacion.update(self._resolver_componente_greedy(filas_comp, aristas))
+        
+        # 4. Construir resultados en el orden original del extracto
+        resultados: List[MovimientoMatch] = []
+        for i, mov_extracto in enumerate(movs_extracto):
+            if i not in asignacion:
+                resultados.append(self._crear_sin_match(mov_extracto))
+                continue
+            
+            mov_sistema, (score_total, score_fecha, score_valor, score_descripcion) = asignacion[i]
+            evaluador.retirar(mov_sistema)
+            resultados.append(MovimientoMatch(
+                mov_extracto=mov_extracto,
+                mov_sistema=mov_sistema,
+                estado=self._determinar_estado_match(score_total, config),
+                score_total=score_total,
+                score_fecha=score_fecha,
+                score_valor=score_valor,
+                score_descripcion=score_descripcion
+            ))
+        
+        return resultados
+    
+    def _resolver_componente(
+        self,
+        filas_comp: List[int],
+        aristas: List[list],
+        limite: float
+    ) -> dict:
+        """
+        Resuelve una componente con asignación de suma máxima de scores,
+        sobre sus listas de aristas (sin matriz densa).
+        
+        Raises:
+            TiempoAsignacionAgotado: Si se supera el límite de tiempo
+        """
+        if time.monotonic() > limite:
+            raise TiempoAsignacionAgotado()
+        
+        columnas = {}
+        movs_columna = []
+        pesos = []
+        scores_fila = []
+        for i in filas_comp:
+            fila, scores_col = [], {}
+            for mov_sistema, scores in aristas[i]:
+                col = columnas.setdefault(id(mov_sistema), len(movs_columna))
+                if col == len(movs_columna):
+                    movs_columna.append(mov_sistema)
+                # Scores en diezmilésimas (enteros) para que la optimización sea exacta
+                fila.append((col, int(scores[0] * 10000)))
+                scores_col[col] = scores
+            pesos.append(fila)
+            scores_fila.append(scores_col)
+        
+        solucion = resolver_asignacion_maxima(pesos, limite)
+        
+        return {
+            filas_comp[fila]: (movs_columna[col], scores_fila[fila][col])
+            for fila, col in enumerate(solucion)
+            if col >= 0
+        }
+    
+    def _resolver_componente_greedy(self, filas_comp: List[int], aristas: List[list]) -> dict:
+        """Resuelve una componente fila por fila (respaldo cuando se agota el tiempo)"""
+        usados = set()
+        asignacion = {}
+        for i in filas_comp:
+            mejor = None
+            for mov_sistema, scores in aristas[i]:
+                if id(mov_sistema) in usados:
+                    continue
+                if mejor is None or scores[0] > mejor[1][0]:
+                    mejor = (mov_sistema, scores)
+            if mejor:
+                usados.add(id(mejor[0]))
+                asignacion[i] = mejor
+        return asignacion
+    
+    def _calcular_scores_par(
+        self,
+        mov_extracto: MovimientoExtracto,
+        mov_sistema: Movimiento,
+        config: ConfiguracionMatching,
+        aliases: List['MatchingAlias'],
+        score_descripcion: Optional[Decimal] = None
+    ) -> Tuple[Decimal, Decimal, Decimal, Decimal]:
+        """
+        Calcula los scores de un par extracto/sistema.
+        
+        Args:
+            score_descripcion: Score de descripción ya calculado (evita recalcularlo)
+        
+        Returns:
+            Tupla (score_total, score_fecha, score_valor, score_descripcion)
+        """
+        score_fecha = self.calcular_score_fecha(
+            mov_extracto.fecha, 
+            mov_sistema.fecha
+        )
+        
+        # REGLA PARA USD: Si ambos tienen USD, priorizamos USD para el score_valor
+        # En cuentas USD, el valor COP puede ser 0 o inconsistente por TRM.
+        val1 = mov_extracto.valor
+        val2 = mov_sistema.valor
+        tolerancia = config.tolerancia_valor
+
+        if mov_extracto.usd is not None and mov_sistema.usd is not None:
+            val1 = mov_extracto.usd
+            val2 = mov_sistema.usd
+            # Si comparamos USD, una tolerancia de pesos (ej: 500) es muy alta.
+            # Usamos una tolerancia técnica mínima para USD (ej: 0.01) si la proporcionada es mayor.
+            if tolerancia > Decimal('1.00'):
+                tolerancia = Decimal('0.01')
+
+        score_valor = self.calcular_score_valor(
+            val1,
+            val2,
+            tolerancia
+        )
+        
+        if score_descripcion is None:
+            score_descripcion = self.calcular_score_descripcion(
+                mov_extracto.descripcion,
+                mov_sistema.descripcion,
+                aliases
+            )
+        
+        # Calcular score total ponderado
+        score_total = config.calcular_score_ponderado(
+            score_fecha,
+            score_valor,
+            score_descripcion
+        )
+
+        # ELEGANT MATCHING RULE: Strong Identity Match
+        # If Date and Value are identical (score 1.0), but description differs,
+        # we treat it as a strong PROBABLE match.
+        if score_fecha == Decimal('1.00') and score_valor == Decimal('1.00'):
+            # Force score to be high enough to be PROBABLE (e.g. 0.85 or based on config)
+            # Using 0.85 as a safe default for "High Probability"
+            min_probable = Decimal('0.85')
+            if score_total < min_probable:
+                score_total = min_probable
+        
+        return score_total, score_fecha, score_valor, score_descripcion
+    
+    def _crear_sin_match(self, mov_extracto: MovimientoExtracto) -> MovimientoMatch:
+        """Crea el resultado SIN_MATCH (sin movimiento de sistema y scores en cero)"""
+        return MovimientoMatch(
+            mov_extracto=mov_extracto,
+            mov_sistema=None,
+            estado=MatchEstado.SIN_MATCH,
+            score_total=Decimal('0.00'),
+            score_fecha=Decimal('0.00'),
+            score_valor=Decimal('0.00'),
+            score_descripcion=Decimal('0.00')
+        )
+    
     def calcular_score_fecha(self, fecha1: date, fecha2: date) -> Decimal:
         """
         Calcula score de coincidencia de fecha.
@@ -215,7 +398,7 @@ class MatchingService:
             self, 
             desc1: str, 
             desc2: str,
-            aliases: Optional[List['MatchingAlias']] = None
+            aliases=None
         ) -> Decimal:
         """
         Calcula score de similitud de descripción usando algoritmo de texto.
@@ -228,63 +411,98 @@ class MatchingService:
         Args:
             desc1: Descripción del Extracto (Fuente)
             desc2: Descripción del Sistema (Destino a comparar)
-            aliases: Lista de reglas de normalización
+            aliases: Reglas de normalización (lista de MatchingAlias o ProyectorAlias)
         
         Returns:
             Score de 0.0 a 1.0 basado en similitud de texto
         """
-        if not desc1 or not desc2:
-            return Decimal('0.00')
+        return self.score_descripcion_normalizada(
+            self.proyectar_descripcion_extracto(desc1, aliases),
+            self.normalizar_descripcion(desc2)
+        )
+    
+    def normalizar_descripcion(self, descripcion: Optional[str]) -> Optional[str]:
+        """
+        Normaliza una descripción para compararla (mayúsculas, sin espacios en los extremos).
         
-        # Normalizar textos base
-        desc1_norm = desc1.upper().strip()  # EXTRACTO
-        desc2_norm = desc2.upper().strip()  # SISTEMA
+        Returns:
+            Texto normalizado, o None si la descripción está vacía
+        """
+        if not descripcion:
+            return None
+        return descripcion.upper().strip()
+    
+    def proyectar_descripcion_extracto(
+            self,
+            descripcion: Optional[str],
+            aliases=None
+        ) -> Optional[str]:
+        """
+        Normaliza la descripción del EXTRACTO y le aplica las reglas (alias)
+        para proyectar lo que "Debería decir el Sistema".
         
-        # Aplicar reglas SOLO al Extracto para proyectar lo que "Debería decir el Sistema"
-        desc_esperada_sistema = desc1_norm
+        Si varios patrones aparecen en la descripción, se aplica el último
+        alias de la lista (ver ProyectorAlias).
         
-        if aliases:
-            for alias in aliases:
-                # El patrón del alias (ej. "ADICION") se busca en el Extracto
-                if alias.patron in desc1_norm:
-                    # Se reemplaza por el texto del Sistema (ej. "TRASLADO DESDE CUENTA")
-                    # Usamos replace para permitir coincidencias parciales si el patrón es solo una parte
-                    desc_esperada_sistema = desc1_norm.replace(alias.patron, alias.reemplazo)
+        Args:
+            descripcion: Descripción del Extracto
+            aliases: Lista de MatchingAlias o ProyectorAlias ya compilado
         
-        # Usar SequenceMatcher para comparar lo que ESPERAMOS vs lo que TENEMOS
-        similitud = SequenceMatcher(None, desc_esperada_sistema, desc2_norm).ratio()
+        Returns:
+            Descripción esperada en el sistema, o None si está vacía
+        """
+        desc_norm = self.normalizar_descripcion(descripcion)
+        if desc_norm is None:
+            return None
+        
+        if not aliases:
+            return desc_norm
+        
+        # El patrón del alias (ej. "ADICION") se busca en el Extracto y se reemplaza
+        # por el texto del Sistema (ej. "TRASLADO DESDE CUENTA")
+        return ProyectorAlias.compilar(aliases).proyectar(desc_norm)
+    
+    def score_descripcion_normalizada(
+            self,
+            desc_esperada_sistema: Optional[str],
+            desc_sistema_norm: Optional[str]
+        ) -> Decimal:
+        """
+        Score de descripción sobre textos ya normalizados (ver proyectar_descripcion_extracto
+        y normalizar_descripcion). Permite normalizar cada movimiento una sola vez por ejecución.
+        
+        Returns:
+            Score de 0.0 a 1.0 basado en similitud de texto
+        """
+        if desc_esperada_sistema is None or desc_sistema_norm is None:
+            return Decimal('0.00')
+        
+        # Comparar lo que ESPERAMOS vs lo que TENEMOS (mismo ratio que SequenceMatcher)
+        similitud = self.motor_similitud.ratio(desc_esperada_sistema, desc_sistema_norm)
         
         return Decimal(str(round(similitud, 2)))
     
     def _buscar_candidatos(
         self,
         mov_extracto: MovimientoExtracto,
-        movs_sistema: List[Movimiento],
+        indice_sistema: IndiceCandidatos,
         config: ConfiguracionMatching
     ) -> List[Movimiento]:
         """
         Busca candidatos en sistema para un movimiento del extracto.
         
-        Filtra por fecha (mismo día o ±1 día) para optimizar.
+        Filtra por fecha (mismo día o ±1 día) consultando el índice por día,
+        sin recorrer todos los movimientos disponibles.
         
         Args:
             mov_extracto: Movimiento del extracto
-            movs_sistema: Lista de movimientos del sistema disponibles
+            indice_sistema: Índice de movimientos del sistema disponibles
             config: Configuración
         
         Returns:
-            Lista de candidatos potenciales
+            Lista de candidatos potenciales (en el orden original)
         """
-        candidatos = []
-        
-        for mov_sistema in movs_sistema:
-            # Filtro por fecha: mismo día o ±1 día
-            diferencia_dias = abs((mov_extracto.fecha - mov_sistema.fecha).days)
-            
-            if diferencia_dias <= 1:  # Mismo día o adyacente
-                candidatos.append(mov_sistema)
-        
-        return candidatos
+        return indice_sistema.candidatos(mov_extracto.fecha)
     
     def _determinar_estado_match(
         self, 
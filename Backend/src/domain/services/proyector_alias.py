@@ -0,0 +1,143 @@
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.domain.models.matching_alias import MatchingAlias
+
+
+class ProyectorAlias:
+    """
+    Reglas de normalización (alias) de una cuenta compiladas en un autómata
+    Aho-Corasick.
+
+    Proyecta una descripción del extracto con una sola pasada sobre el texto,
+    en lugar de buscar cada patrón con `in`. La regla es la misma del cálculo
+    original: entre los alias cuyo patrón aparece en la descripción gana el
+    último de la lista, y solo ese se aplica con str.replace.
+    """
+
+    def __init__(self, aliases: List[MatchingAlias]):
+        self.aliases = list(aliases)
+
+        # Trie: transiciones por nodo y mayor índice de alias que termina en él
+        self._transiciones: List[Dict[str, int]] = [{}]
+        self._ultimo_alias: List[int] = [-1]
+
+        for indice, alias in enumerate(self.aliases):
+            nodo = 0
+            for caracter in alias.patron:
+                siguiente = self._transiciones[nodo].get(caracter)
+                if siguiente is None:
+                    siguiente = len(self._transiciones)
+                    self._transiciones[nodo][caracter] = siguiente
+                    self._transiciones.append({})
+                    self._ultimo_alias.append(-1)
+                nodo = siguiente
+            self._ultimo_alias[nodo] = max(self._ultimo_alias[nodo], indice)
+
+        # Enlaces de fallo (BFS); cada nodo hereda los alias de su sufijo
+        self._fallo: List[int] = [0] * len(self._transiciones)
+        cola = deque(self._transiciones[0].values())
+        while cola:
+            nodo = cola.popleft()
+            for caracter, hijo in self._transiciones[nodo].items():
+                fallo = self._fallo[nodo]
+                while fallo and caracter not in self._transiciones[fallo]:
+                    fallo = self._fallo[fallo]
+                destino = self._transiciones[fallo].get(caracter, 0)
+                self._fallo[hijo] = destino if destino != hijo else 0
+                self._ultimo_alias[hijo] = max(self._ultimo_alias[hijo], self._ultimo_alias[self._fallo[hijo]])
+                cola.append(hijo)
+
+    @classmethod
+    def compilar(cls, aliases) -> 'ProyectorAlias':
+        """Compila una lista de alias (si ya es un ProyectorAlias, lo retorna tal cual)"""
+        if isinstance(aliases, cls):
+            return aliases
+        return cls(aliases or [])
+
+    def __len__(self) -> int:
+        return len(self.aliases)
+
+    def alias_aplicable(self, texto: str) -> Optional[MatchingAlias]:
+        """Último alias (en orden de la lista) cuyo patrón aparece en el texto"""
+        if not self.aliases:
+            return None
+
+        transiciones, fallo, ultimo_alias = self._transiciones, self._fallo, self._ultimo_alias
+        mejor = -1
+        nodo = 0
+        for caracter in texto:
+            while nodo and caracter not in transiciones[nodo]:
+                nodo = fallo[nodo]
+            nodo = transiciones[nodo].get(caracter, 0)
+            if ultimo_alias[nodo] > mejor:
+                mejor = ultimo_alias[nodo]
+
+        return self.aliases[mejor] if mejor >= 0 else None
+
+    def proyectar(self, texto: str) -> str:
+        """
+        Proyecta una descripción ya normalizada del extracto a la
+        "Descripción Esperada del Sistema".
+        """
+        alias = self.alias_aplicable(texto)
+        if alias is None:
+            return texto
+        return texto.replace(alias.patron, alias.reemplazo)
+
+
+class CacheProyectoresAlias:
+    """
+    Proyectores de alias compilados por cuenta, con un sello de versión.
+
+    Cada cuenta tiene un número de versión que se incrementa al invalidarla
+    (CRUD de /api/matching/alias, importaciones de la tabla). Un proyector
+    compilado solo se reutiliza si se compiló con la versión vigente.
+    El caché es por proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versiones: Dict[int, int] = {}
+        self._version_global = 0
+        self._proyectores: Dict[int, Tuple[Tuple[int, int], ProyectorAlias]] = {}
+
+    def _sello(self, cuenta_id: int) -> Tuple[int, int]:
+        return self._version_global, self._versiones.get(cuenta_id, 0)
+
+    def obtener(
+        self,
+        cuenta_id: int,
+        cargar_aliases: Callable[[int], List[MatchingAlias]]
+    ) -> ProyectorAlias:
+        """
+        Retorna el proyector de la cuenta, compilándolo si no existe o si fue invalidado.
+
+        Args:
+            cuenta_id: ID de la cuenta
+            cargar_aliases: Función que carga los alias de la cuenta
+                (ej. alias_repo.obtener_por_cuenta)
+        """
+        with self._lock:
+            sello = self._sello(cuenta_id)
+            entrada = self._proyectores.get(cuenta_id)
+            if entrada and entrada[0] == sello:
+                return entrada[1]
+
+        # Compilar fuera del lock; si otra petición invalidó mientras tanto,
+        # se guarda con el sello leído y la siguiente consulta recompila.
+        proyector = ProyectorAlias(cargar_aliases(cuenta_id))
+        with self._lock:
+            self._proyectores[cuenta_id] = (sello, proyector)
+        return proyector
+
+    def invalidar(self, cuenta_id: int) -> None:
+        """Descarta el proyector compilado de una cuenta"""
+        with self._lock:
+            self._versiones[cuenta_id] = self._versiones.get(cuenta_id, 0) + 1
+
+    def invalidar_todo(self) -> None:
+        """Descarta los proyectores de todas las cuentas"""
+        with self._lock:
+            self._version_global += 1
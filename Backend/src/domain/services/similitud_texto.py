@@ -0,0 +1,113 @@
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+
+class MotorSequenceMatcher:
+    """
+    Motor de similitud de referencia: difflib.SequenceMatcher par a par.
+
+    Se conserva para las pruebas de equivalencia y como alternativa
+    configurable del motor rápido.
+    """
+
+    def ratio(self, texto1: str, texto2: str) -> float:
+        return SequenceMatcher(None, texto1, texto2).ratio()
+
+
+class MotorSimilitudRapido:
+    """
+    Calcula exactamente el mismo ratio que difflib.SequenceMatcher
+    (Ratcliff/Obershelp: 2·M / T) con menos trabajo por par.
+
+    - El índice carácter → posiciones (b2j) de cada texto se construye una
+      sola vez y se reutiliza en todos los pares donde es el segundo texto.
+    - La suma de bloques coincidentes se calcula sin crear objetos Match ni
+      ordenar bloques, con la misma regla de desempate que difflib.
+    - El resultado de cada par de textos se memoriza: las descripciones
+      bancarias se repiten mucho dentro de un periodo.
+
+    Textos de 200+ caracteres activan la heurística autojunk de difflib;
+    esos pares se delegan a SequenceMatcher para conservar la equivalencia.
+    """
+
+    LONGITUD_AUTOJUNK = 200
+
+    def __init__(self, max_entradas: int = 200_000):
+        """
+        Args:
+            max_entradas: Tamaño máximo de cada caché; al superarse se vacía.
+        """
+        self.max_entradas = max_entradas
+        self._ratios: Dict[Tuple[str, str], float] = {}
+        self._indices: Dict[str, Dict[str, List[int]]] = {}
+
+    def ratio(self, texto1: str, texto2: str) -> float:
+        clave = (texto1, texto2)
+        ratio = self._ratios.get(clave)
+        if ratio is None:
+            ratio = self._calcular_ratio(texto1, texto2)
+            if len(self._ratios) >= self.max_entradas:
+                self._ratios.clear()
+            self._ratios[clave] = ratio
+        return ratio
+
+    def _calcular_ratio(self, a: str, b: str) -> float:
+        total = len(a) + len(b)
+        if total == 0:
+            return 1.0
+        if a == b:
+            return 1.0
+        if not a or not b:
+            return 0.0
+        if len(b) >= self.LONGITUD_AUTOJUNK:
+            return SequenceMatcher(None, a, b).ratio()
+        return 2.0 * self._coincidencias(a, b, self._indice(b)) / total
+
+    def _indice(self, b: str) -> Dict[str, List[int]]:
+        """Posiciones de cada carácter de b (b2j de difflib sin junk)"""
+        b2j = self._indices.get(b)
+        if b2j is None:
+            b2j = {}
+            for j, caracter in enumerate(b):
+                b2j.setdefault(caracter, []).append(j)
+            if len(self._indices) >= self.max_entradas:
+                self._indices.clear()
+            self._indices[b] = b2j
+        return b2j
+
+    @staticmethod
+    def _coincidencias(a: str, b: str, b2j: Dict[str, List[int]]) -> int:
+        """
+        Total de caracteres en bloques coincidentes (M de difflib).
+
+        Mismo recorrido que SequenceMatcher.get_matching_blocks: el bloque
+        común más largo (el primero en a, y luego en b, ante empates) divide
+        el problema en los tramos de la izquierda y de la derecha.
+        """
+        total = 0
+        pendientes = [(0, len(a), 0, len(b))]
+        while pendientes:
+            alo, ahi, blo, bhi = pendientes.pop()
+
+            # find_longest_match sin junk: programación dinámica por filas
+            besti, bestj, bestsize = alo, blo, 0
+            j2len: Dict[int, int] = {}
+            for i in range(alo, ahi):
+                nuevo: Dict[int, int] = {}
+                for j in b2j.get(a[i], ()):
+                    if j < blo:
+                        continue
+                    if j >= bhi:
+                        break
+                    k = nuevo[j] = j2len.get(j - 1, 0) + 1
+                    if k > bestsize:
+                        besti, bestj, bestsize = i - k + 1, j - k + 1, k
+                j2len = nuevo
+
+            if bestsize:
+                total += bestsize
+                if alo < besti and blo < bestj:
+                    pendientes.append((alo, besti, blo, bestj))
+                if besti + bestsize < ahi and bestj + bestsize < bhi:
+                    pendientes.append((besti + bestsize, ahi, bestj + bestsize, bhi))
+        return total
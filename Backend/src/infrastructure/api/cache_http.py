@@ -0,0 +1,114 @@
+"""
+Respuestas GET con ETag / Last-Modified sobre CacheLecturasPeriodo.
+
+El modelo de lectura se guarda ya serializado a JSON junto con su ETag (hash
+del cuerpo): una consulta vigente no recalcula ni serializa nada, y con
+`If-None-Match` (o `If-Modified-Since`) coincidente se responde 304 sin
+cuerpo. Como el ETag depende solo del contenido, dos workers que calculan lo
+mismo entregan el mismo ETag.
+"""
+import hashlib
+import json
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from src.domain.services.lecturas_periodo import CacheLecturasPeriodo, LecturaPeriodo
+
+
+def _serializar(valor: Any) -> Tuple[bytes, str]:
+    """Cuerpo JSON (como lo escribe JSONResponse) y su ETag"""
+    cuerpo = json.dumps(
+        jsonable_encoder(valor),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+    return cuerpo, '"%s"' % hashlib.blake2b(cuerpo, digest_size=16).hexdigest()
+
+
+def _coincide_etag(if_none_match: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 7232 §3.2)"""
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*":
+            return True
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == etag:
+            return True
+    return False
+
+
+def _no_modificado_desde(if_modified_since: str, modificado: datetime) -> bool:
+    try:
+        desde = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if desde is None or desde.tzinfo is None:
+        return False
+    return modificado <= desde
+
+
+def _es_no_modificado(request: Request, etag: str, modificado: datetime) -> bool:
+    if_none_match: Optional[str] = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Si viene If-None-Match, If-Modified-Since se ignora
+        return _coincide_etag(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    return if_modified_since is not None and _no_modificado_desde(if_modified_since, modificado)
+
+
+def responder_lectura(
+    request: Request,
+    cache: CacheLecturasPeriodo,
+    cuenta_id: int,
+    year: int,
+    month: int,
+    nombre: str,
+    calcular: Callable[[], Any]
+) -> Response:
+    """
+    Responde el modelo de lectura `nombre` del periodo, calculándolo con
+    `calcular()` (objeto serializable por FastAPI) si no hay uno vigente.
+    """
+    lectura: LecturaPeriodo = cache.obtener(
+        cuenta_id, year, month, nombre, lambda: _serializar(calcular())
+    )
+    return _responder(request, lectura)
+
+
+async def responder_lectura_async(
+    request: Request,
+    cache: CacheLecturasPeriodo,
+    cuenta_id: int,
+    year: int,
+    month: int,
+    nombre: str,
+    calcular: Callable[[], Awaitable[Any]]
+) -> Response:
+    """
+    Igual que responder_lectura, para endpoints async: `calcular()` es una
+    corrutina y solo se espera si no hay un modelo vigente.
+    """
+    lectura, version = cache.vigente(cuenta_id, year, month, nombre)
+    if lectura is None:
+        valor = _serializar(await calcular())
+        lectura = cache.guardar(cuenta_id, year, month, nombre, valor, version)
+    return _responder(request, lectura)
+
+
+def _responder(request: Request, lectura: LecturaPeriodo) -> Response:
+    cuerpo, etag = lectura.valor
+    cabeceras = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(lectura.modificado, usegmt=True),
+        # El navegador puede guardar la respuesta, pero debe revalidarla siempre
+        "Cache-Control": "no-cache",
+    }
+    if _es_no_modificado(request, etag, lectura.modificado):
+        return Response(status_code=304, headers=cabeceras)
+    return Response(content=cuerpo, media_type="application/json", headers=cabeceras)
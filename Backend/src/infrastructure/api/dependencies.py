@@ -62,8 +62,35 @@ def get_centro_costo_repository(conn=Depends(get_db_connection)) -> CentroCostoR
 def get_concepto_repository(conn=Depends(get_db_connection)) -> ConceptoRepository:
     return PostgresConceptoRepository(conn)
 
+import os
+from src.domain.services.indice_descripciones import CacheIndiceDescripciones
+
+# Índice invertido de descripciones de movimientos clasificados (sugerencias),
+# compartido entre peticiones del proceso y actualizado por el repositorio
+_cache_indice_descripciones = CacheIndiceDescripciones(
+    max_edad_segundos=float(os.getenv('INDICE_DESCRIPCIONES_MAX_EDAD_SEGUNDOS', '300'))
+)
+
+def get_cache_indice_descripciones() -> CacheIndiceDescripciones:
+    return _cache_indice_descripciones
+
+from src.domain.services.lecturas_periodo import CacheLecturasPeriodo
+
+# Modelos de lectura de la conciliación por periodo (extracto, sistema,
+# comparación, matching), invalidados por los repositorios al escribir
+_cache_lecturas_periodo = CacheLecturasPeriodo(
+    max_edad_segundos=float(os.getenv('LECTURAS_PERIODO_MAX_EDAD_SEGUNDOS', '300'))
+)
+
+def get_cache_lecturas_periodo() -> CacheLecturasPeriodo:
+    return _cache_lecturas_periodo
+
 def get_movimiento_repository(conn=Depends(get_db_connection)) -> MovimientoRepository:
-    return PostgresMovimientoRepository(conn)
+    return PostgresMovimientoRepository(
+        conn,
+        indice_descripciones=_cache_indice_descripciones,
+        lecturas_periodo=_cache_lecturas_periodo
+    )
 
 def get_reglas_repository(conn=Depends(get_db_connection)) -> ReglasRepository:
     return PostgresReglasRepository(conn)
@@ -78,7 +105,7 @@ def get_conciliacion_repository(conn=Depends(get_db_connection)) -> Conciliacion
     return PostgresConciliacionRepository(conn)
 
 def get_movimiento_extracto_repository(conn=Depends(get_db_connection)) -> MovimientoExtractoRepository:
-    return PostgresMovimientoExtractoRepository(conn)
+    return PostgresMovimientoExtractoRepository(conn, lecturas_periodo=_cache_lecturas_periodo)
 
 from src.infrastructure.database.postgres_cuenta_extractor_repository import PostgresCuentaExtractorRepository
 from src.domain.ports.cuenta_extractor_repository import CuentaExtractorRepository
@@ -96,7 +123,7 @@ from src.domain.ports.configuracion_matching_repository import ConfiguracionMatc
 from src.domain.services.matching_service import MatchingService
 
 def get_movimiento_vinculacion_repository(conn=Depends(get_db_connection)) -> MovimientoVinculacionRepository:
-    return PostgresMovimientoVinculacionRepository(conn)
+    return PostgresMovimientoVinculacionRepository(conn, lecturas_periodo=_cache_lecturas_periodo)
 
 def get_configuracion_matching_repository(conn=Depends(get_db_connection)) -> ConfiguracionMatchingRepository:
     return PostgresConfiguracionMatchingRepository(conn)
@@ -115,6 +142,32 @@ from src.domain.ports.matching_alias_repository import MatchingAliasRepository
 
 def get_matching_alias_repository(conn=Depends(get_db_connection)) -> MatchingAliasRepository:
     return PostgresMatchingAliasRepository(conn)
+
+from src.domain.services.proyector_alias import CacheProyectoresAlias
+
+# Alias compilados por cuenta, compartidos entre peticiones del proceso
+_cache_proyectores_alias = CacheProyectoresAlias()
+
+def get_cache_proyectores_alias() -> CacheProyectoresAlias:
+    return _cache_proyectores_alias
+
+from src.domain.services.matching_incremental import CacheMatchingPeriodos
+
+# Última ejecución del matching por periodo (modo incremental), por proceso
+_cache_matching_periodos = CacheMatchingPeriodos(
+    max_edad_segundos=float(os.getenv('MATCHING_CACHE_MAX_EDAD_SEGUNDOS', '600'))
+)
+
+def get_cache_matching_periodos() -> CacheMatchingPeriodos:
+    return _cache_matching_periodos
+
+from src.domain.services.indice_reglas import CacheIndiceReglas
+
+# Reglas de clasificación compiladas, compartidas entre peticiones del proceso
+_cache_indice_reglas = CacheIndiceReglas()
+
+def get_cache_indice_reglas() -> CacheIndiceReglas:
+    return _cache_indice_reglas
 from src.domain.services.date_range_service import DateRangeService
 
 def get_date_range_service(
@@ -131,3 +184,29 @@ def get_conciliacion_service(
     date_service: DateRangeService = Depends(get_date_range_service)
 ) -> ConciliacionService:
     return ConciliacionService(mov_repo, vinc_repo, conciliacion_repo, date_service)
+
+# Lecturas async (asyncpg) para endpoints async; las escrituras siguen por los repositorios de arriba
+from src.infrastructure.database.async_connection import get_async_db_connection
+from src.infrastructure.database.async_postgres_movimiento_repository import AsyncPostgresMovimientoRepository
+from src.infrastructure.database.async_postgres_movimiento_extracto_repository import AsyncPostgresMovimientoExtractoRepository
+from src.infrastructure.database.async_postgres_movimiento_vinculacion_repository import AsyncPostgresMovimientoVinculacionRepository
+from src.domain.ports.movimiento_repository import MovimientoRepositoryAsync
+from src.domain.ports.movimiento_extracto_repository import MovimientoExtractoRepositoryAsync
+from src.domain.ports.movimiento_vinculacion_repository import MovimientoVinculacionRepositoryAsync
+from src.domain.services.conciliacion_service import ConciliacionServiceAsync
+
+def get_movimiento_repository_async(conn=Depends(get_async_db_connection)) -> MovimientoRepositoryAsync:
+    return AsyncPostgresMovimientoRepository(conn)
+
+def get_movimiento_extracto_repository_async(conn=Depends(get_async_db_connection)) -> MovimientoExtractoRepositoryAsync:
+    return AsyncPostgresMovimientoExtractoRepository(conn)
+
+def get_movimiento_vinculacion_repository_async(conn=Depends(get_async_db_connection)) -> MovimientoVinculacionRepositoryAsync:
+    return AsyncPostgresMovimientoVinculacionRepository(conn)
+
+def get_conciliacion_service_async(
+    mov_repo: MovimientoRepositoryAsync = Depends(get_movimiento_repository_async),
+    vinc_repo: MovimientoVinculacionRepositoryAsync = Depends(get_movimiento_vinculacion_repository_async)
+) -> ConciliacionServiceAsync:
+    # El rango del periodo es el mes calendario: DateRangeService no consulta su repositorio
+    return ConciliacionServiceAsync(mov_repo, vinc_repo, DateRangeService(None))
@@ -0,0 +1,238 @@
+"""
+Escritura incremental de exportaciones (CSV, NDJSON, Parquet) para
+StreamingResponse.
+
+Cada formato recibe un iterador de filas (dicts con las mismas llaves) y
+produce bloques de bytes a medida que las lee, así que la memoria no
+depende del número de filas: como máximo un bloque de texto o un grupo de
+filas de Parquet. Opcionalmente los bloques salen comprimidos con gzip.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin él no se ofrece Parquet
+    pa = None
+    pq = None
+
+# Se emite un bloque cuando el texto acumulado llega a este tamaño
+TAMANO_BLOQUE = 64 * 1024
+# Filas por grupo de filas (row group) de Parquet
+FILAS_POR_GRUPO_PARQUET = 10_000
+
+
+def _valor_json(valor: Any) -> Any:
+    # Mismos tipos que el JSON de la exportación no streaming (jsonable_encoder)
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def _csv(filas: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    encabezado = False
+    for fila in filas:
+        if not encabezado:
+            writer.writerow(fila.keys())
+            encabezado = True
+        writer.writerow(fila.values())
+        if buffer.tell() >= TAMANO_BLOQUE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson(filas: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    partes: List[str] = []
+    tamano = 0
+    for fila in filas:
+        linea = json.dumps(fila, default=_valor_json, ensure_ascii=False) + "\n"
+        partes.append(linea)
+        tamano += len(linea)
+        if tamano >= TAMANO_BLOQUE:
+            yield "".join(partes).encode("utf-8")
+            partes, tamano = [], 0
+    if partes:
+        yield "".join(partes).encode("utf-8")
+
+
+class _Drenaje(io.RawIOBase):
+    """Archivo de solo escritura cuyo contenido se retira por partes con tomar()"""
+
+    def __init__(self):
+        self._pendiente = bytearray()
+        self._posicion = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, datos) -> int:
+        self._pendiente += datos
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def tomar(self) -> bytes:
+        datos = bytes(self._pendiente)
+        self._pendiente.clear()
+        return datos
+
+
+# OID de tipos de PostgreSQL → tipo Arrow. Los demás se exportan como texto.
+_TIPOS_PARQUET_POR_OID = {
+    16: lambda: pa.bool_(),
+    20: lambda: pa.int64(),
+    21: lambda: pa.int16(),
+    23: lambda: pa.int32(),
+    700: lambda: pa.float32(),
+    701: lambda: pa.float64(),
+    1700: lambda: pa.decimal128(38, 10),
+    1082: lambda: pa.date32(),
+    1114: lambda: pa.timestamp('us'),
+    1184: lambda: pa.timestamp('us', tz='UTC'),
+}
+# Tipos de texto: el valor ya llega como str
+_OIDS_TEXTO = {18, 19, 25, 1042, 1043}
+
+
+def _texto(valor: Any) -> Optional[str]:
+    if valor is None or isinstance(valor, str):
+        return valor
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, default=_valor_json, ensure_ascii=False)
+    return str(valor)
+
+
+def _esquema_desde_columnas(columnas: List[Tuple[str, int]]):
+    """
+    Esquema fijo desde los tipos de la consulta (cursor.description), antes
+    de ver los datos: una columna nula en las primeras filas no cambia su tipo.
+    Retorna (esquema, columnas que se convierten a texto).
+    """
+    campos = []
+    a_texto = []
+    for nombre, oid in columnas:
+        tipo = _TIPOS_PARQUET_POR_OID.get(oid)
+        if tipo is None:
+            if oid not in _OIDS_TEXTO:
+                a_texto.append(nombre)
+            campos.append(pa.field(nombre, pa.string()))
+        else:
+            campos.append(pa.field(nombre, tipo()))
+    return pa.schema(campos), a_texto
+
+
+def _esquema_parquet(lote: List[Dict[str, Any]]):
+    """
+    Esquema tomado del primer lote cuando no se conocen los tipos de las
+    columnas: Decimal → decimal128(38, 10) (sin redondear montos) y
+    columnas sin ningún valor → texto.
+    """
+    campos = []
+    for nombre in lote[0].keys():
+        valores = [fila[nombre] for fila in lote if fila[nombre] is not None]
+        if not valores:
+            tipo = pa.string()
+        elif isinstance(valores[0], Decimal):
+            tipo = pa.decimal128(38, 10)
+        else:
+            tipo = pa.array(valores).type
+        campos.append(pa.field(nombre, tipo))
+    return pa.schema(campos)
+
+
+def _parquet(filas: Iterable[Dict[str, Any]], columnas: Optional[List[Tuple[str, int]]] = None) -> Iterator[bytes]:
+    drenaje = _Drenaje()
+    writer = None
+    esquema = None
+    a_texto: List[str] = []
+    lote: List[Dict[str, Any]] = []
+
+    def abrir(nuevo_esquema):
+        nonlocal writer, esquema
+        esquema = nuevo_esquema
+        writer = pq.ParquetWriter(drenaje, esquema)
+
+    def escribir():
+        if esquema is None:
+            # `columnas` ya está lleno: el repositorio lo llena antes de la primera fila
+            if columnas:
+                nuevo_esquema, a_texto[:] = _esquema_desde_columnas(columnas)
+                abrir(nuevo_esquema)
+            else:
+                abrir(_esquema_parquet(lote))
+        for nombre in a_texto:
+            for fila in lote:
+                fila[nombre] = _texto(fila[nombre])
+        writer.write_table(pa.Table.from_pylist(lote, schema=esquema))
+
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= FILAS_POR_GRUPO_PARQUET:
+            escribir()
+            lote = []
+            yield drenaje.tomar()
+    if lote:
+        escribir()
+    if writer is None:
+        # Sin filas: archivo válido con las columnas de la consulta (o sin columnas)
+        abrir(_esquema_desde_columnas(columnas)[0] if columnas else pa.schema([]))
+    writer.close()
+    yield drenaje.tomar()
+
+
+FORMATOS: Dict[str, Dict[str, Any]] = {
+    "csv": {"escribir": _csv, "media_type": "text/csv; charset=utf-8", "extension": "csv"},
+    "ndjson": {"escribir": _ndjson, "media_type": "application/x-ndjson", "extension": "ndjson"},
+    "parquet": {"escribir": _parquet, "media_type": "application/vnd.apache.parquet", "extension": "parquet"},
+}
+
+
+def formato_disponible(formato: str) -> Optional[str]:
+    """None si se puede exportar en `formato`; si no, el motivo"""
+    if formato not in FORMATOS:
+        return f"Formato no soportado (use {', '.join(FORMATOS)})"
+    if formato == "parquet" and pa is None:
+        return "La exportación Parquet requiere el paquete pyarrow en el servidor"
+    return None
+
+
+def _gzip(bloques: Iterable[bytes]) -> Iterator[bytes]:
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: contenedor gzip
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def escribir_exportacion(
+    filas: Iterable[Dict[str, Any]],
+    formato: str,
+    comprimir: bool = False,
+    columnas: Optional[List[Tuple[str, int]]] = None
+) -> Iterator[bytes]:
+    """
+    Bloques de bytes de `filas` en `formato`, opcionalmente en gzip.
+
+    `columnas` son (nombre, OID del tipo de PostgreSQL); Parquet las usa para
+    fijar el esquema. Puede llenarse mientras se leen las filas (antes de la
+    primera), como hace iterar_datos_exportacion.
+    """
+    escribir: Callable[..., Iterator[bytes]] = FORMATOS[formato]["escribir"]
+    bloques = escribir(filas, columnas) if formato == "parquet" else escribir(filas)
+    return _gzip(bloques) if comprimir else bloques
@@ -6,6 +6,7 @@ import os
 from src.infrastructure.logging.config import logger
 from src.infrastructure.api.exception_handlers import register_exception_handlers
 from src.infrastructure.database.connection import get_connection_pool, close_all_connections
+from src.infrastructure.database.async_connection import close_async_pool
 
 # Importar routers
 from src.infrastructure.api.routers import (
@@ -43,7 +44,7 @@ async def lifespan(app: FastAPI):
     - Inicializa el connection pool
     
     Shutdown:
-    - Cierra todas las conexiones del pool
+    - Cierra todas las conexiones del pool (psycopg2 y asyncpg)
     """
     # Startup
     logger.info("=" * 50)
@@ -58,6 +59,7 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Cerrando aplicación...")
     close_all_connections()
+    await close_async_pool()
     logger.info("Aplicación cerrada correctamente")
     logger.info("=" * 50)
 
@@ -1,13 +1,18 @@
 import os
-import csv
-import io
+import json
+import shutil
 import zipfile
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime
 from pydantic import BaseModel
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Body
-from fastapi.responses import StreamingResponse
-from src.infrastructure.database.connection import get_db_connection
+from fastapi.responses import FileResponse
+from src.infrastructure.database.connection import get_db_connection, get_connection_pool
+from src.infrastructure.database.async_connection import metricas_async_pool
+from src.infrastructure.database.copia_tablas import exportar_tabla, reemplazar_tabla
+from src.infrastructure.database import resumen_mensual
+from src.infrastructure.database.postgres_conciliacion_repository import PostgresConciliacionRepository
+from src.infrastructure.api.dependencies import get_cache_proyectores_alias, get_cache_indice_reglas, get_cache_indice_descripciones, get_cache_lecturas_periodo
 from src.infrastructure.logging.config import logger
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
@@ -66,283 +71,226 @@ os.makedirs(RESTORE_DIR, exist_ok=True)
 class BulkExportRequest(BaseModel):
     tables: List[str]
 
+class PeriodoConciliacion(BaseModel):
+    cuenta_id: int
+    year: int
+    month: int
+
+def _guardar_upload(file: UploadFile, ruta: str) -> None:
+    """Copia el archivo subido a disco por bloques (sin leerlo entero a memoria)"""
+    with open(ruta, "wb") as f:
+        shutil.copyfileobj(file.file, f, 1024 * 1024)
+
+def _invalidar_caches(tablas) -> None:
+    if "matching_alias" in tablas:
+        get_cache_proyectores_alias().invalidar_todo()
+    if "reglas_clasificacion" in tablas:
+        get_cache_indice_reglas().invalidar()
+    if "movimientos_encabezado" in tablas:
+        get_cache_indice_descripciones().invalidar()
+    # La restauración escribe con SQL directo, fuera de los repositorios
+    get_cache_lecturas_periodo().invalidar()
+
+def _reconstruir_resumen(conn, tablas) -> None:
+    """El agregado mensual de los reportes se deriva de encabezados y detalles"""
+    if {"movimientos_encabezado", "movimientos_detalle"} & set(tablas):
+        cursor = conn.cursor()
+        try:
+            resumen_mensual.reconstruir(cursor)
+        finally:
+            cursor.close()
+
+def _borrar_si_existe(ruta: str) -> None:
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
 @router.post("/bulk-export")
 def bulk_export_tables(request: BulkExportRequest, conn=Depends(get_db_connection)):
     """
     Exporta múltiples tablas en un solo archivo ZIP.
+    
+    Cada tabla sale con COPY ... TO STDOUT directamente al miembro del ZIP
+    en disco (SNAPSHOT_DIR), que luego se envía desde el archivo. Las tablas
+    se leen en una transacción REPEATABLE READ: el respaldo es consistente
+    entre tablas. La cabecera X-Resumen-Copia trae filas y rendimiento por tabla.
     """
+    logger.info(f"Iniciando backup masivo de {len(request.tables)} tablas")
+    for table in request.tables:
+        if table not in ALLOWED_TABLES:
+            raise HTTPException(status_code=400, detail=f"Tabla no permitida: {table}")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"bulk_backup_{timestamp}.zip"
+    full_path = os.path.join(SNAPSHOT_DIR, filename)
+
+    resumen = {}
     try:
-        logger.info(f"Iniciando backup masivo de {len(request.tables)} tablas")
-        for table in request.tables:
-            if table not in ALLOWED_TABLES:
-                raise HTTPException(status_code=400, detail=f"Tabla no permitida: {table}")
+        cursor = conn.cursor()
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        cursor.close()
 
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED, False) as zip_file:
+        with zipfile.ZipFile(full_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
             for table_name in request.tables:
-                cursor = conn.cursor()
-                try:
-                    # Obtener columnas
-                    cursor.execute(f"SELECT * FROM {table_name} LIMIT 0")
-                    if cursor.description:
-                        colnames = [desc[0] for desc in cursor.description]
-                    else:
-                        colnames = []
-
-                    # Obtener datos
-                    cursor.execute(f"SELECT * FROM {table_name}")
-                    rows = cursor.fetchall()
-
-                    # Generar CSV en memoria
-                    csv_output = io.StringIO()
-                    writer = csv.writer(csv_output)
-                    writer.writerow(colnames)
-                    writer.writerows(rows)
-                    
-                    zip_file.writestr(f"{table_name}.csv", csv_output.getvalue())
-                except Exception as e:
-                    logger.error(f"Error procesando tabla {table_name}: {str(e)}")
-                    # Continuar con otras tablas o fallar? 
-                    # Preferible fallar para no generar backup incompleto silencioso
-                    raise e
-                finally:
-                    cursor.close()
-
-        zip_buffer.seek(0)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"bulk_backup_{timestamp}.zip"
-        
-        # Opcional: Guardar copia en el servidor (en SNAPSHOT_DIR)
-        try:
-            full_path = os.path.join(SNAPSHOT_DIR, filename)
-            logger.info(f"Guardando copia en servidor: {full_path}")
-            with open(full_path, "wb") as f:
-                f.write(zip_buffer.read())
-            zip_buffer.seek(0)
-        except Exception as e:
-            logger.error(f"No se pudo guardar copia local del backup: {e}")
-            # No fallar la descarga si solo falla el guardado local
-            zip_buffer.seek(0)
-
-        return StreamingResponse(
-            iter([zip_buffer.getvalue()]),
-            media_type="application/x-zip-compressed",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-    except HTTPException:
-        raise
+                with zip_file.open(f"{table_name}.csv", "w", force_zip64=True) as destino:
+                    resultado = exportar_tabla(conn, table_name, destino)
+                resumen[table_name] = resultado.resumen()
+                logger.info(f"Backup {table_name}: {resumen[table_name]}")
     except Exception as e:
+        # Preferible fallar para no generar backup incompleto silencioso
+        _borrar_si_existe(full_path)
         logger.error(f"Error crítico en bulk-export: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generando backup: {str(e)}")
 
+    logger.info(f"Backup masivo guardado en servidor: {full_path}")
+    return FileResponse(
+        full_path,
+        media_type="application/x-zip-compressed",
+        filename=filename,
+        headers={"X-Resumen-Copia": json.dumps(resumen, separators=(",", ":"))}
+    )
+
 @router.post("/bulk-import")
-async def bulk_import_tables(file: UploadFile = File(...), conn=Depends(get_db_connection)):
+def bulk_import_tables(file: UploadFile = File(...), conn=Depends(get_db_connection)):
     """
     Importa múltiples tablas desde un archivo ZIP. (Destructivo)
+    
+    El ZIP se guarda en RESTORE_DIR y cada CSV se carga con COPY ... FROM
+    STDIN leyendo directamente del miembro del ZIP, todo en una transacción.
     """
     if not file.filename.endswith(".zip"):
         raise HTTPException(status_code=400, detail="El archivo debe ser un .zip")
 
-    content = await file.read()
-    zip_buffer = io.BytesIO(content)
-    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename_copy = f"bulk_restore_{timestamp}.zip"
+    ruta = os.path.join(RESTORE_DIR, filename_copy)
+    _guardar_upload(file, ruta)
+
     results = {}
-    
-    with zipfile.ZipFile(zip_buffer, "r") as zip_ref:
-        # Primero validamos que todos los archivos sean .csv y de tablas permitidas
-        for filename in zip_ref.namelist():
-            table_name = filename.replace(".csv", "")
-            if not filename.endswith(".csv") or table_name not in ALLOWED_TABLES:
-                raise HTTPException(status_code=400, detail=f"Archivo no válido en el ZIP: {filename}")
-
-        # Procesamos cada archivo
-        cursor = conn.cursor()
-        try:
+    metricas = {}
+    try:
+        with zipfile.ZipFile(ruta, "r") as zip_ref:
+            # Primero validamos que todos los archivos sean .csv y de tablas permitidas
             for filename in zip_ref.namelist():
                 table_name = filename.replace(".csv", "")
-                csv_data = zip_ref.read(filename).decode("utf-8")
-                io_string = io.StringIO(csv_data)
-                reader = csv.reader(io_string)
-                
-                header = next(reader)
-                rows = list(reader)
-                
-                if not rows:
+                if not filename.endswith(".csv") or table_name not in ALLOWED_TABLES:
+                    raise HTTPException(status_code=400, detail=f"Archivo no válido en el ZIP: {filename}")
+
+            # Procesamos cada archivo
+            for filename in zip_ref.namelist():
+                table_name = filename.replace(".csv", "")
+                with zip_ref.open(filename) as origen:
+                    resultado = reemplazar_tabla(conn, table_name, origen)
+                if resultado is None:
                     results[table_name] = "Vacío"
                     continue
+                results[table_name] = f"OK ({resultado.filas} regs)"
+                metricas[table_name] = resultado.resumen()
+                logger.info(f"Restauración {table_name}: {metricas[table_name]}")
 
-                processed_rows = [[None if cell == "" else cell for cell in row] for row in rows]
-                
-                # Deshabilitar triggers (si es posible)
-                try:
-                    cursor.execute(f"ALTER TABLE {table_name} DISABLE TRIGGER ALL")
-                except:
-                    conn.rollback()
-                    # Re-obtener el cursor si falló por permisos
-                    cursor = conn.cursor()
-
-                # Limpiar tabla
-                cursor.execute(f"DELETE FROM {table_name}")
-                
-                # Insertar datos
-                columns = ", ".join(header)
-                placeholders = ", ".join(["%s"] * len(header))
-                query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-                cursor.executemany(query, processed_rows)
-                
-                # Rehabilitar
-                try:
-                    cursor.execute(f"ALTER TABLE {table_name} ENABLE TRIGGER ALL")
-                except:
-                    pass
-                
-                results[table_name] = f"OK ({len(processed_rows)} regs)"
-
-            conn.commit()
-            
-            # Guardar copia del ZIP subido
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename_copy = f"bulk_restore_{timestamp}.zip"
-            with open(os.path.join(RESTORE_DIR, filename_copy), "wb") as f:
-                f.write(content)
-
-            return {
-                "mensaje": "Importación masiva completada satisfactoriamente",
-                "detalles": results,
-                "backup_servidor": filename_copy
-            }
-
-        except Exception as e:
-            conn.rollback()
-            logger.error(f"Error en bulk import: {e}")
-            raise HTTPException(status_code=500, detail=f"Error fatal: {str(e)}")
-        finally:
-            cursor.close()
+        _reconstruir_resumen(conn, metricas)
+        conn.commit()
+    except HTTPException:
+        conn.rollback()
+        _borrar_si_existe(ruta)
+        raise
+    except (ValueError, zipfile.BadZipFile) as e:
+        conn.rollback()
+        _borrar_si_existe(ruta)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        conn.rollback()
+        _borrar_si_existe(ruta)
+        logger.error(f"Error en bulk import: {e}")
+        raise HTTPException(status_code=500, detail=f"Error fatal: {str(e)}")
+
+    _invalidar_caches(results)
+
+    return {
+        "mensaje": "Importación masiva completada satisfactoriamente",
+        "detalles": results,
+        "metricas": metricas,
+        "backup_servidor": filename_copy
+    }
 
 @router.get("/export/{table_name}")
 def export_table_raw(table_name: str, conn=Depends(get_db_connection)):
     """
     Exporta el contenido completo de una tabla en formato CSV.
+    
+    COPY ... TO STDOUT escribe la copia del servidor (SNAPSHOT_DIR) y la
+    respuesta se envía desde ese archivo.
     """
     if table_name not in ALLOWED_TABLES:
         raise HTTPException(status_code=400, detail="Tabla no permitida")
 
-    cursor = conn.cursor()
-    try:
-        # Obtener columnas
-        cursor.execute(f"SELECT * FROM {table_name} LIMIT 0")
-        colnames = [desc[0] for desc in cursor.description]
-
-        # Obtener datos
-        cursor.execute(f"SELECT * FROM {table_name}")
-        rows = cursor.fetchall()
-
-        # Generar CSV en memoria
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(colnames)
-        writer.writerows(rows)
-        output.seek(0)
-
-        # Guardar copia en el servidor
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"snapshot_{timestamp}_{table_name}.csv"
-        server_path = os.path.join(SNAPSHOT_DIR, filename)
-        
-        with open(server_path, "w", newline="", encoding="utf-8") as f:
-            f.write(output.read())
-            output.seek(0) # Volver al inicio para la respuesta
-
-        logger.info(f"Snapshot generado para {table_name}: {filename}")
-
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"snapshot_{timestamp}_{table_name}.csv"
+    server_path = os.path.join(SNAPSHOT_DIR, filename)
 
+    try:
+        with open(server_path, "wb") as f:
+            resultado = exportar_tabla(conn, table_name, f)
     except Exception as e:
+        _borrar_si_existe(server_path)
         logger.error(f"Error exportando tabla {table_name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
+
+    logger.info(f"Snapshot generado para {table_name}: {filename} {resultado.resumen()}")
+
+    return FileResponse(
+        server_path,
+        media_type="text/csv",
+        filename=filename,
+        headers={"X-Resumen-Copia": json.dumps(resultado.resumen(), separators=(",", ":"))}
+    )
 
 @router.post("/import/{table_name}")
-async def import_table_raw(table_name: str, file: UploadFile = File(...), conn=Depends(get_db_connection)):
+def import_table_raw(table_name: str, file: UploadFile = File(...), conn=Depends(get_db_connection)):
     """
     Importa contenido a una tabla desde un CSV. ADVERTENCIA: Destructivo.
+    
+    El archivo se guarda en RESTORE_DIR y se carga desde ahí con COPY ...
+    FROM STDIN.
     """
     if table_name not in ALLOWED_TABLES:
         raise HTTPException(status_code=400, detail="Tabla no permitida")
 
-    content = await file.read()
-    decoded = content.decode("utf-8")
-    io_string = io.StringIO(decoded)
-    reader = csv.reader(io_string)
-    
-    header = next(reader)
-    rows = list(reader)
-
-    if not rows:
-        return {"mensaje": "Archivo vacío, no se realizó ninguna acción."}
-
     # Guardar copia del archivo subido
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"restore_{timestamp}_{table_name}.csv"
     restore_path = os.path.join(RESTORE_DIR, filename)
-    with open(restore_path, "wb") as f:
-        f.write(content)
+    _guardar_upload(file, restore_path)
 
-    cursor = conn.cursor()
     try:
-        # 1. Preparar filas: convertir "" a None para que Postgres lo tome como NULL
-        processed_rows = []
-        for row in rows:
-            processed_rows.append([None if cell == "" else cell for cell in row])
-
         logger.info(f"Iniciando restauración de {table_name} desde {filename}")
-        
-        # 2. Deshabilitar triggers temporalmente para evitar problemas de FKs circulares o auditoría
-        # OJO: Requiere permisos de superusuario o ser dueño de la tabla.
-        # Si falla, procederemos con el DELETE/INSERT normal.
-        try:
-            cursor.execute(f"ALTER TABLE {table_name} DISABLE TRIGGER ALL")
-        except:
-            conn.rollback() # Limpiar error de permiso si ocurre
-            logger.warning(f"No se pudieron deshabilitar triggers para {table_name}")
-
-        # 3. Limpiar tabla
-        cursor.execute(f"DELETE FROM {table_name}")
-        
-        # 4. INSERT
-        columns = ", ".join(header)
-        placeholders = ", ".join(["%s"] * len(header))
-        query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-        
-        cursor.executemany(query, processed_rows)
-        
-        # Rehabilitar triggers
-        try:
-            cursor.execute(f"ALTER TABLE {table_name} ENABLE TRIGGER ALL")
-        except:
-            pass
+        with open(restore_path, "rb") as origen:
+            resultado = reemplazar_tabla(conn, table_name, origen)
 
-        conn.commit()
-        logger.info(f"Restauración exitosa: {len(processed_rows)} registros insertados en {table_name}")
-        
-        return {
-            "mensaje": f"Tabla {table_name} restaurada exitosamente.",
-            "registros_importados": len(processed_rows),
-            "archivo_backup": filename
-        }
+        if resultado is None:
+            _borrar_si_existe(restore_path)
+            return {"mensaje": "Archivo vacío, no se realizó ninguna acción."}
 
+        _reconstruir_resumen(conn, {table_name})
+        conn.commit()
+    except ValueError as e:
+        conn.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         conn.rollback()
         logger.error(f"Error importando tabla {table_name}: {e}")
         raise HTTPException(status_code=500, detail=f"Error en la restauración: {str(e)}")
-    finally:
-        cursor.close()
+
+    logger.info(f"Restauración exitosa: {resultado.filas} registros insertados en {table_name} {resultado.resumen()}")
+    _invalidar_caches({table_name})
+
+    return {
+        "mensaje": f"Tabla {table_name} restaurada exitosamente.",
+        "registros_importados": resultado.filas,
+        "archivo_backup": filename,
+        "metricas": resultado.resumen()
+    }
 
 @router.get("/snapshots")
 def list_snapshots():
@@ -359,3 +307,55 @@ def list_snapshots():
                     "date": datetime.fromtimestamp(stats.st_mtime).isoformat()
                 })
     return files
+
+
+@router.get("/pool")
+def metricas_pool():
+    """
+    Métricas de los pools de conexiones del proceso: conexiones en uso,
+    espera por una conexión y duración de los préstamos (psycopg2), y
+    tamaño del pool asyncpg.
+    """
+    return {
+        "psycopg2": get_connection_pool().metricas(),
+        "asyncpg": metricas_async_pool()
+    }
+
+
+@router.get("/resumen-mensual/verificar")
+def verificar_resumen_mensual(conn=Depends(get_db_connection)):
+    """
+    Recalcula el agregado mensual de los reportes desde los movimientos y
+    lo compara con resumen_movimientos_mensual: lista los periodos
+    (cuenta, año, mes) con diferencias.
+    """
+    return resumen_mensual.verificar(conn)
+
+
+@router.post("/resumen-mensual/reparar")
+def reparar_resumen_mensual(conn=Depends(get_db_connection)):
+    """Como /verificar, y recalcula los periodos con diferencias."""
+    return resumen_mensual.verificar(conn, reparar=True)
+
+
+@router.post("/conciliaciones/recalcular")
+def recalcular_conciliaciones(
+    periodos: Optional[List[PeriodoConciliacion]] = Body(None),
+    conn=Depends(get_db_connection)
+):
+    """
+    Recalcula sistema_entradas/salidas/saldo_final y el estado
+    (CUADRADO/PENDIENTE) de los periodos indicados en una sola operación.
+    Sin cuerpo recalcula todas las conciliaciones.
+    """
+    inicio = datetime.now()
+    try:
+        actualizadas = PostgresConciliacionRepository(conn).recalcular_sistema_lote(
+            None if periodos is None else [(p.cuenta_id, p.year, p.month) for p in periodos]
+        )
+    except Exception as e:
+        logger.error(f"Error recalculando conciliaciones: {e}")
+        raise HTTPException(status_code=500, detail=f"Error recalculando conciliaciones: {str(e)}")
+    segundos = round((datetime.now() - inicio).total_seconds(), 3)
+    logger.info(f"Conciliaciones recalculadas: {actualizadas} en {segundos} s")
+    return {"actualizadas": actualizadas, "segundos": segundos}
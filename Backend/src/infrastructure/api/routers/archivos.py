@@ -1,4 +1,5 @@
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, Any, Optional, List
 from decimal import Decimal
 import os
@@ -45,8 +46,11 @@ async def cargar_archivo(
         raise HTTPException(status_code=400, detail="Solo se permiten archivos PDF")
 
     try:
-        # file.file es un SpooledTemporaryFile compatible con pdfplumber
-        resultado = service.procesar_archivo(file.file, file.filename, tipo_cuenta, cuenta_id, actualizar_descripciones)
+        # file.file es un SpooledTemporaryFile compatible con pdfplumber.
+        # Extracción y escrituras bloquean: en el threadpool, no en el event loop
+        resultado = await run_in_threadpool(
+            service.procesar_archivo, file.file, file.filename, tipo_cuenta, cuenta_id, actualizar_descripciones
+        )
         return resultado
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
@@ -70,7 +74,7 @@ async def analizar_archivo(
         raise HTTPException(status_code=400, detail="Solo se permiten archivos PDF")
 
     try:
-        resultado = service.analizar_archivo(file.file, file.filename, tipo_cuenta, cuenta_id)
+        resultado = await run_in_threadpool(service.analizar_archivo, file.file, file.filename, tipo_cuenta, cuenta_id)
         return resultado
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
@@ -142,12 +146,12 @@ async def procesar_archivo_local(
         with open(filepath, 'rb') as f:
             if accion == "analizar":
                 if tipo == "movimientos":
-                    return service.analizar_archivo(f, filename, tipo_cuenta, cuenta_id)
+                    return await run_in_threadpool(service.analizar_archivo, f, filename, tipo_cuenta, cuenta_id)
                 elif tipo == "extractos":
-                    return service.analizar_extracto(f, filename, tipo_cuenta, cuenta_id)
+                    return await run_in_threadpool(service.analizar_extracto, f, filename, tipo_cuenta, cuenta_id)
             elif accion == "cargar":
                 if tipo == "movimientos":
-                    return service.procesar_archivo(f, filename, tipo_cuenta, cuenta_id, actualizar_descripciones)
+                    return await run_in_threadpool(service.procesar_archivo, f, filename, tipo_cuenta, cuenta_id, actualizar_descripciones)
                 elif tipo == "extractos":
                     # Prepare overrides
                     overrides = {}
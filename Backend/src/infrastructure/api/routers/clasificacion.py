@@ -8,7 +8,9 @@ from src.infrastructure.api.dependencies import (
     get_tercero_repository, 
     get_tercero_descripcion_repository,
     get_centro_costo_repository,
-    get_concepto_repository
+    get_concepto_repository,
+    get_cache_indice_reglas,
+    get_cache_indice_descripciones
 )
 from src.domain.ports.movimiento_repository import MovimientoRepository
 from src.domain.ports.reglas_repository import ReglasRepository
@@ -17,6 +19,8 @@ from src.domain.ports.tercero_descripcion_repository import TerceroDescripcionRe
 from src.domain.ports.centro_costo_repository import CentroCostoRepository
 from src.domain.ports.concepto_repository import ConceptoRepository
 from src.application.services.clasificacion_service import ClasificacionService
+from src.domain.services.indice_reglas import CacheIndiceReglas
+from src.domain.services.indice_descripciones import CacheIndiceDescripciones
 from src.infrastructure.api.routers.movimientos import MovimientoResponse, _to_response # Reuse existing DTOs
 
 router = APIRouter(prefix="/api/clasificacion", tags=["clasificacion"])
@@ -52,7 +56,9 @@ def get_clasificacion_service(
     tercero_repo: TerceroRepository = Depends(get_tercero_repository),
     tercero_desc_repo: TerceroDescripcionRepository = Depends(get_tercero_descripcion_repository),
     grupo_repo: CentroCostoRepository = Depends(get_centro_costo_repository),
-    concepto_repo: ConceptoRepository = Depends(get_concepto_repository)
+    concepto_repo: ConceptoRepository = Depends(get_concepto_repository),
+    cache_reglas: CacheIndiceReglas = Depends(get_cache_indice_reglas),
+    cache_descripciones: CacheIndiceDescripciones = Depends(get_cache_indice_descripciones)
 ) -> ClasificacionService:
     return ClasificacionService(
         mov_repo, 
@@ -60,7 +66,9 @@ def get_clasificacion_service(
         tercero_repo, 
         tercero_desc_repo, 
         concepto_repo, 
-        grupo_repo
+        grupo_repo,
+        cache_reglas=cache_reglas,
+        cache_descripciones=cache_descripciones
     )
 
 @router.get("/sugerencia/{id}", response_model=ContextoClasificacionResponse)
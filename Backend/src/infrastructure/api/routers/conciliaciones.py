@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Request
 from typing import Optional
 from datetime import date
 from fastapi import File, UploadFile, Form
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from decimal import Decimal
 import logging
@@ -187,7 +188,7 @@ async def analizar_extracto(
 
     try:
         # Usamos file.file directamente
-        resultado = service.analizar_extracto(file.file, file.filename, tipo_cuenta, cuenta_id)
+        resultado = await run_in_threadpool(service.analizar_extracto, file.file, file.filename, tipo_cuenta, cuenta_id)
         return resultado
     except ValueError as ve:
         # El extractor ya incluye detalles en el mensaje
@@ -264,22 +265,40 @@ async def cargar_extracto(
 
 # --- Nuevos Endpoints para Movimientos de Extracto ---
 
-from src.infrastructure.api.dependencies import get_movimiento_extracto_repository, get_movimiento_repository
-from src.domain.ports.movimiento_extracto_repository import MovimientoExtractoRepository
-from src.domain.ports.movimiento_repository import MovimientoRepository
+from src.infrastructure.api.dependencies import (
+    get_movimiento_extracto_repository_async, get_movimiento_repository_async,
+    get_conciliacion_service_async, get_cache_lecturas_periodo
+)
+from src.domain.ports.movimiento_extracto_repository import MovimientoExtractoRepositoryAsync
+from src.domain.ports.movimiento_repository import MovimientoRepositoryAsync
+from src.domain.services.conciliacion_service import ConciliacionServiceAsync
+from src.domain.services.lecturas_periodo import CacheLecturasPeriodo
+from src.infrastructure.api.cache_http import responder_lectura_async
+
+# Los GET del periodo se sirven desde CacheLecturasPeriodo con ETag/Last-Modified:
+# si el periodo no cambió, un refresco con If-None-Match recibe 304 sin cuerpo.
+# Son async y leen con asyncpg: esperar la base de datos no ocupa un hilo.
 
 @router.get("/{cuenta_id}/{year}/{month}/movimientos-extracto")
-def obtener_movimientos_extracto(
+async def obtener_movimientos_extracto(
     cuenta_id: int,
     year: int,
     month: int,
-    repo: MovimientoExtractoRepository = Depends(get_movimiento_extracto_repository)
+    request: Request,
+    repo: MovimientoExtractoRepositoryAsync = Depends(get_movimiento_extracto_repository_async),
+    lecturas: CacheLecturasPeriodo = Depends(get_cache_lecturas_periodo)
 ):
     """
     Obtiene los movimientos del extracto para un periodo específico.
     Estos son los movimientos extraídos del PDF del extracto bancario.
     """
-    movimientos = repo.obtener_por_periodo(cuenta_id, year, month)
+    return await responder_lectura_async(
+        request, lecturas, cuenta_id, year, month, "movimientos-extracto",
+        lambda: _listar_movimientos_extracto(repo, cuenta_id, year, month)
+    )
+
+async def _listar_movimientos_extracto(repo: MovimientoExtractoRepositoryAsync, cuenta_id: int, year: int, month: int):
+    movimientos = await repo.obtener_por_periodo(cuenta_id, year, month)
     return [
         {
             'id': m.id,
@@ -296,20 +315,28 @@ def obtener_movimientos_extracto(
     ]
 
 @router.get("/{cuenta_id}/{year}/{month}/movimientos-sistema")
-def obtener_movimientos_sistema(
+async def obtener_movimientos_sistema(
     cuenta_id: int,
     year: int,
     month: int,
-    repo: MovimientoRepository = Depends(get_movimiento_repository)
+    request: Request,
+    repo: MovimientoRepositoryAsync = Depends(get_movimiento_repository_async),
+    lecturas: CacheLecturasPeriodo = Depends(get_cache_lecturas_periodo)
 ):
     """
     Obtiene los movimientos del sistema para un periodo específico.
     """
+    return await responder_lectura_async(
+        request, lecturas, cuenta_id, year, month, "movimientos-sistema",
+        lambda: _listar_movimientos_sistema(repo, cuenta_id, year, month)
+    )
+
+async def _listar_movimientos_sistema(repo: MovimientoRepositoryAsync, cuenta_id: int, year: int, month: int):
     from datetime import date
     import calendar
     
     ultimo_dia = calendar.monthrange(year, month)[1]
-    movimientos, _ = repo.buscar_avanzado(
+    movimientos, _ = await repo.buscar_avanzado(
         fecha_inicio=date(year, month, 1),
         fecha_fin=date(year, month, ultimo_dia),
         cuenta_id=cuenta_id
@@ -333,12 +360,14 @@ def obtener_movimientos_sistema(
     ]
 
 @router.get("/{cuenta_id}/{year}/{month}/comparacion")
-def comparar_movimientos(
+async def comparar_movimientos(
     cuenta_id: int,
     year: int,
     month: int,
-    repo_extracto: MovimientoExtractoRepository = Depends(get_movimiento_extracto_repository),
-    conciliacion_service: ConciliacionService = Depends(get_conciliacion_service)
+    request: Request,
+    repo_extracto: MovimientoExtractoRepositoryAsync = Depends(get_movimiento_extracto_repository_async),
+    conciliacion_service: ConciliacionServiceAsync = Depends(get_conciliacion_service_async),
+    lecturas: CacheLecturasPeriodo = Depends(get_cache_lecturas_periodo)
 ):
     """
     Compara movimientos del sistema vs extracto para identificar diferencias.
@@ -347,13 +376,25 @@ def comparar_movimientos(
     - Estadísticas de ambas fuentes (incluyendo USD)
     - Diferencias detectadas
     """
+    return await responder_lectura_async(
+        request, lecturas, cuenta_id, year, month, "comparacion",
+        lambda: _calcular_comparacion(repo_extracto, conciliacion_service, cuenta_id, year, month)
+    )
+
+async def _calcular_comparacion(
+    repo_extracto: MovimientoExtractoRepositoryAsync,
+    conciliacion_service: ConciliacionServiceAsync,
+    cuenta_id: int,
+    year: int,
+    month: int
+):
     logger.info(f"Comparando movimientos para cuenta {cuenta_id}, periodo {year}/{month}")
 
     # Obtener movimientos del extracto (tabla movimientos_extracto)
-    movs_extracto = repo_extracto.obtener_por_periodo(cuenta_id, year, month)
+    movs_extracto = await repo_extracto.obtener_por_periodo(cuenta_id, year, month)
 
     # Obtener universo de movimientos del sistema (Calendario + Vinculados)
-    movs_sistema = conciliacion_service.obtener_universo_sistema(cuenta_id, year, month)
+    movs_sistema = await conciliacion_service.obtener_universo_sistema(cuenta_id, year, month)
     
     # helper para sumar usd safely
     def sum_usd(movs, condition):
@@ -5,11 +5,20 @@ from src.infrastructure.database.connection import get_db_connection
 from src.infrastructure.database.postgres_movimiento_repository import PostgresMovimientoRepository
 from src.infrastructure.database.postgres_conciliacion_repository import PostgresConciliacionRepository
 from src.application.services.mantenimiento_service import MantenimientoService
+from src.infrastructure.api.dependencies import get_cache_indice_descripciones, get_cache_lecturas_periodo
+from src.domain.services.indice_descripciones import CacheIndiceDescripciones
+from src.domain.services.lecturas_periodo import CacheLecturasPeriodo
 
 router = APIRouter(prefix="/api/mantenimiento", tags=["mantenimiento"])
 
-def get_mantenimiento_service(conn=Depends(get_db_connection)) -> MantenimientoService:
-    mov_repo = PostgresMovimientoRepository(conn)
+def get_mantenimiento_service(
+    conn=Depends(get_db_connection),
+    indice_descripciones: CacheIndiceDescripciones = Depends(get_cache_indice_descripciones),
+    lecturas_periodo: CacheLecturasPeriodo = Depends(get_cache_lecturas_periodo)
+) -> MantenimientoService:
+    mov_repo = PostgresMovimientoRepository(
+        conn, indice_descripciones=indice_descripciones, lecturas_periodo=lecturas_periodo
+    )
     conciliacion_repo = PostgresConciliacionRepository(conn)
     return MantenimientoService(mov_repo, conciliacion_repo, conn)
 
@@ -76,3 +85,40 @@ def desvincular_lote(
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/snapshots")
+def listar_snapshots(service: MantenimientoService = Depends(get_mantenimiento_service)):
+    """
+    Snapshots de seguridad previos a desvincular (base y deltas), con sus
+    bloques copiados por tabla y el sha256 de cada archivo.
+    """
+    return service.listar_snapshots()
+
+@router.post("/restaurar-snapshot")
+def restaurar_snapshot(
+    nombre: str = Query(..., description="Nombre del snapshot (ver /snapshots)"),
+    service: MantenimientoService = Depends(get_mantenimiento_service),
+    indice_descripciones: CacheIndiceDescripciones = Depends(get_cache_indice_descripciones),
+    lecturas_periodo: CacheLecturasPeriodo = Depends(get_cache_lecturas_periodo)
+):
+    """
+    Restaura movimientos, detalles, vinculaciones y conciliaciones al
+    estado del snapshot indicado (su base más los deltas hasta él).
+    ADVERTENCIA: Destructivo.
+    """
+    try:
+        metricas = service.restaurar_snapshot(nombre)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # La restauración escribe con SQL directo, fuera de los repositorios
+    indice_descripciones.invalidar()
+    lecturas_periodo.invalidar()
+    return {
+        "mensaje": f"Tablas restauradas al snapshot {nombre}.",
+        "metricas": metricas
+    }
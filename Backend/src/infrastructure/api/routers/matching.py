@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import date, datetime
@@ -7,11 +8,11 @@ import calendar
 
 from src.domain.models.movimiento import Movimiento
 from src.domain.models.movimiento_match import MovimientoMatch, MatchEstado
-from src.domain.models.configuracion_matching import ConfiguracionMatching
+from src.domain.models.configuracion_matching import ConfiguracionMatching, ModoAsignacion
 from src.domain.models.matching_alias import MatchingAlias
-from src.domain.ports.movimiento_vinculacion_repository import MovimientoVinculacionRepository
+from src.domain.ports.movimiento_vinculacion_repository import MovimientoVinculacionRepository, MovimientoVinculacionRepositoryAsync
 from src.domain.ports.configuracion_matching_repository import ConfiguracionMatchingRepository
-from src.domain.ports.movimiento_extracto_repository import MovimientoExtractoRepository
+from src.domain.ports.movimiento_extracto_repository import MovimientoExtractoRepository, MovimientoExtractoRepositoryAsync
 from src.domain.ports.movimiento_repository import MovimientoRepository
 from src.domain.ports.matching_alias_repository import MatchingAliasRepository
 from src.domain.ports.cuenta_repository import CuentaRepository
@@ -28,11 +29,21 @@ from src.infrastructure.api.dependencies import (
     get_matching_alias_repository,
     get_cuenta_repository,
     get_date_range_service,
-    get_conciliacion_service
+    get_conciliacion_service,
+    get_cache_proyectores_alias,
+    get_cache_matching_periodos,
+    get_cache_lecturas_periodo,
+    get_movimiento_extracto_repository_async,
+    get_movimiento_vinculacion_repository_async,
+    get_conciliacion_service_async
 )
 
 from src.domain.services.date_range_service import DateRangeService
-from src.domain.services.conciliacion_service import ConciliacionService
+from src.domain.services.conciliacion_service import ConciliacionService, ConciliacionServiceAsync
+from src.domain.services.proyector_alias import CacheProyectoresAlias
+from src.domain.services.matching_incremental import CacheMatchingPeriodos, InstantaneaMatching, MatchingIncremental
+from src.domain.services.lecturas_periodo import CacheLecturasPeriodo
+from src.infrastructure.api.cache_http import responder_lectura_async
 
 from src.infrastructure.logging.config import logger
 
@@ -107,6 +118,7 @@ class ConfiguracionMatchingResponse(BaseModel):
     peso_descripcion: float
     score_minimo_exacto: float
     score_minimo_probable: float
+    modo_asignacion: str
     activo: bool
     created_at: Optional[datetime]
     updated_at: Optional[datetime]
@@ -119,6 +131,7 @@ class ConfiguracionMatchingUpdate(BaseModel):
     peso_descripcion: float
     score_minimo_exacto: float
     score_minimo_probable: float
+    modo_asignacion: Optional[str] = None  # GREEDY | OPTIMO (None conserva el actual)
 
 
 class CrearMovimientoItem(BaseModel):
@@ -170,6 +183,11 @@ def crear_movimientos_lote(
     
     logger.info(f"Iniciando creación en lote de {len(items)} movimientos.")
     
+    # (item, mov_extracto, mov_sistema) listos para vincular y movimientos por crear
+    por_vincular = []
+    por_crear = []
+    reutilizados = set()
+    
     for item in items:
         try:
             # 1. Obtener movimiento del extracto
@@ -193,8 +211,12 @@ def crear_movimientos_lote(
             )
 
             if mov_sistema_existente:
-                # Verificar si ya está vinculado (para no violar constraint UNIQUE)
-                is_linked = vinculacion_repo.obtener_por_sistema_id(mov_sistema_existente.id)
+                # Verificar si ya está vinculado (para no violar constraint UNIQUE).
+                # También cuenta como ocupado si otro item de este lote ya lo reutiliza.
+                is_linked = (
+                    mov_sistema_existente.id in reutilizados
+                    or vinculacion_repo.obtener_por_sistema_id(mov_sistema_existente.id)
+                )
                 
                 if is_linked:
                     # Ya está ocupado, NO podemos reutilizarlo.
@@ -203,8 +225,9 @@ def crear_movimientos_lote(
                     mov_sistema_existente = None
                 else:
                     # Si existe y está libre, lo usamos
-                    mov_creado = mov_sistema_existente
-                    logger.info(f"Movimiento existente encontrado ID {mov_creado.id} (libre), reutilizando.")
+                    reutilizados.add(mov_sistema_existente.id)
+                    por_vincular.append((item, mov_extracto, mov_sistema_existente))
+                    logger.info(f"Movimiento existente encontrado ID {mov_sistema_existente.id} (libre), reutilizando.")
             
             if not mov_sistema_existente:
                 # Si no existe o estaba ocupado, lo creamos
@@ -225,58 +248,81 @@ def crear_movimientos_lote(
                 if nuevo_mov.moneda_id is None:
                     nuevo_mov.moneda_id = 1
 
-                logger.debug(f"Intentando guardar nuevo movimiento: {nuevo_mov.descripcion} | {nuevo_mov.valor}")
-                mov_creado = repo_sistema.guardar(nuevo_mov)
-                
-                if mov_creado and mov_creado.id:
-                    logger.info(f"Movimiento creado exitosamente con ID {mov_creado.id}")
-                    creados_count += 1
-                else:
-                    msg = f"ID {item.movimiento_extracto_id}: Fallo al guardar movimiento (sin ID retornado)"
-                    logger.error(msg)
-                    errores.append(msg)
-                    continue
-            
-            if mov_creado and mov_creado.id:
-                # 4. Auto-vincular (Matching Manual Inmediato)
-                # Verificar si ya existe una vinculación (ej: SIN_MATCH) para actualizarla
-                existing_match = vinculacion_repo.obtener_por_extracto_id(item.movimiento_extracto_id)
-                match_id = existing_match.id if existing_match else None
-                created_at = existing_match.created_at if existing_match else None
-
-                # Calcular scores
-                config = config_repo.obtener_activa()
-                score_fecha = matching_service.calcular_score_fecha(mov_extracto.fecha, mov_creado.fecha)
-                score_valor = matching_service.calcular_score_valor(
-                    mov_extracto.valor, 
-                    mov_creado.valor, 
-                    config.tolerancia_valor
-                )
-                score_descripcion = matching_service.calcular_score_descripcion(
-                    mov_extracto.descripcion, 
-                    mov_creado.descripcion
-                )
-                score_total = config.calcular_score_ponderado(score_fecha, score_valor, score_descripcion)
-                
-                match = MovimientoMatch(
-                    id=match_id,
-                    mov_extracto=mov_extracto,
-                    mov_sistema=mov_creado,
-                    estado=MatchEstado.OK, # Siempre OK al crear/vincular explícitamente
-                    score_total=score_total,
-                    score_fecha=score_fecha,
-                    score_valor=score_valor,
-                    score_descripcion=score_descripcion,
-                    confirmado_por_usuario=True,
-                    created_by="sistema", 
-                    notas="Creado/Vinculado desde extracto",
-                    created_at=created_at
-                )
-                
-                match_guardado = vinculacion_repo.guardar(match)
-                logger.info(f"Vinculación creada exitosamente ID {match_guardado.id} para Extracto {mov_extracto.id} <-> Sistema {mov_creado.id}")
+                por_crear.append((item, mov_extracto, nuevo_mov))
+
+        except Exception as e:
+            logger.error(f"Error procesando item {item.movimiento_extracto_id}: {e}", exc_info=True)
+            errores.append(f"ID {item.movimiento_extracto_id}: {str(e)}")
+    
+    # 3. Crear los movimientos nuevos en una sola transacción.
+    # Si el lote falla se reintenta item por item para reportar cada error.
+    if por_crear:
+        logger.debug(f"Intentando guardar {len(por_crear)} movimientos nuevos en lote")
+        try:
+            repo_sistema.guardar_lote([nuevo_mov for _, _, nuevo_mov in por_crear])
+            creados = por_crear
+        except Exception as e:
+            logger.warning(f"Creación en lote fallida, reintentando item por item: {e}")
+            creados = []
+            for item, mov_extracto, nuevo_mov in por_crear:
+                try:
+                    repo_sistema.guardar_lote([nuevo_mov])
+                    creados.append((item, mov_extracto, nuevo_mov))
+                except Exception as e:
+                    logger.error(f"Error procesando item {item.movimiento_extracto_id}: {e}", exc_info=True)
+                    errores.append(f"ID {item.movimiento_extracto_id}: {str(e)}")
+        
+        for item, mov_extracto, mov_creado in creados:
+            if mov_creado.id:
+                logger.info(f"Movimiento creado exitosamente con ID {mov_creado.id}")
+                creados_count += 1
+                por_vincular.append((item, mov_extracto, mov_creado))
             else:
-                errores.append(f"ID {item.movimiento_extracto_id}: Error lógico, movimiento no disponible")
+                msg = f"ID {item.movimiento_extracto_id}: Fallo al guardar movimiento (sin ID retornado)"
+                logger.error(msg)
+                errores.append(msg)
+    
+    # 4. Auto-vincular (Matching Manual Inmediato)
+    config = None
+    for item, mov_extracto, mov_creado in por_vincular:
+        try:
+            # Verificar si ya existe una vinculación (ej: SIN_MATCH) para actualizarla
+            existing_match = vinculacion_repo.obtener_por_extracto_id(item.movimiento_extracto_id)
+            match_id = existing_match.id if existing_match else None
+            created_at = existing_match.created_at if existing_match else None
+
+            # Calcular scores (configuración leída una vez por lote)
+            if config is None:
+                config = config_repo.obtener_activa()
+            score_fecha = matching_service.calcular_score_fecha(mov_extracto.fecha, mov_creado.fecha)
+            score_valor = matching_service.calcular_score_valor(
+                mov_extracto.valor, 
+                mov_creado.valor, 
+                config.tolerancia_valor
+            )
+            score_descripcion = matching_service.calcular_score_descripcion(
+                mov_extracto.descripcion, 
+                mov_creado.descripcion
+            )
+            score_total = config.calcular_score_ponderado(score_fecha, score_valor, score_descripcion)
+            
+            match = MovimientoMatch(
+                id=match_id,
+                mov_extracto=mov_extracto,
+                mov_sistema=mov_creado,
+                estado=MatchEstado.OK, # Siempre OK al crear/vincular explícitamente
+                score_total=score_total,
+                score_fecha=score_fecha,
+                score_valor=score_valor,
+                score_descripcion=score_descripcion,
+                confirmado_por_usuario=True,
+                created_by="sistema", 
+                notas="Creado/Vinculado desde extracto",
+                created_at=created_at
+            )
+            
+            match_guardado = vinculacion_repo.guardar(match)
+            logger.info(f"Vinculación creada exitosamente ID {match_guardado.id} para Extracto {mov_extracto.id} <-> Sistema {mov_creado.id}")
 
         except Exception as e:
             logger.error(f"Error procesando item {item.movimiento_extracto_id}: {e}", exc_info=True)
@@ -337,228 +383,325 @@ def _match_to_response(match: MovimientoMatch) -> MovimientoMatchResponse:
 # --- Endpoints ---
 
 @router.get("/{cuenta_id}/{year}/{month}", response_model=MatchingResultResponse)
-def ejecutar_matching(
+async def ejecutar_matching(
     cuenta_id: int,
     year: int,
     month: int,
+    request: Request,
     matching_service: MatchingService = Depends(get_matching_service),
-    repo_extracto: MovimientoExtractoRepository = Depends(get_movimiento_extracto_repository),
-    repo_sistema: MovimientoRepository = Depends(get_movimiento_repository),
+    repo_extracto: MovimientoExtractoRepositoryAsync = Depends(get_movimiento_extracto_repository_async),
     vinculacion_repo: MovimientoVinculacionRepository = Depends(get_movimiento_vinculacion_repository),
+    vinculaciones_async: MovimientoVinculacionRepositoryAsync = Depends(get_movimiento_vinculacion_repository_async),
     config_repo: ConfiguracionMatchingRepository = Depends(get_configuracion_matching_repository),
     alias_repo: MatchingAliasRepository = Depends(get_matching_alias_repository),
     cuenta_repo: CuentaRepository = Depends(get_cuenta_repository),
-    conciliacion_service: ConciliacionService = Depends(get_conciliacion_service)
+    conciliacion_service: ConciliacionServiceAsync = Depends(get_conciliacion_service_async),
+    proyectores_alias: CacheProyectoresAlias = Depends(get_cache_proyectores_alias),
+    date_service: DateRangeService = Depends(get_date_range_service),
+    cache_matching: CacheMatchingPeriodos = Depends(get_cache_matching_periodos),
+    lecturas: CacheLecturasPeriodo = Depends(get_cache_lecturas_periodo),
+    incremental: bool = Query(True, description="Reutilizar la ejecución anterior del periodo y re-evaluar solo lo que cambió")
 ):
     """
     Ejecuta el algoritmo de matching para un periodo específico.
     
     Compara movimientos del extracto bancario con movimientos del sistema
     y retorna las vinculaciones encontradas con sus scores de similitud.
+    
+    En modo incremental (por defecto) se guarda una instantánea por periodo
+    con una marca de sus datos en BD: si la marca no cambió se retorna el
+    resultado anterior; si cambió, solo se re-evalúan las filas pendientes
+    cuyas ventanas de candidatos vieron cambios.
+    
+    El resultado se sirve desde CacheLecturasPeriodo con ETag/Last-Modified
+    (304 con If-None-Match si el periodo no cambió). La ejecución guarda las
+    vinculaciones nuevas e invalida el periodo, así que el resultado se
+    reutiliza a partir de la primera ejecución que no encuentra nada nuevo.
+    
+    Las lecturas del periodo van por asyncpg sin ocupar un hilo; el
+    algoritmo (CPU) y las escrituras (psycopg2) corren en el threadpool.
     """
+    if not incremental:
+        # Ejecución completa pedida explícitamente: no reutilizar el resultado guardado
+        lecturas.invalidar_periodo(cuenta_id, year, month)
+    return await responder_lectura_async(
+        request, lecturas, cuenta_id, year, month, "matching",
+        lambda: _ejecutar_matching(
+            cuenta_id, year, month, matching_service, repo_extracto, vinculacion_repo,
+            vinculaciones_async, config_repo, alias_repo, cuenta_repo, conciliacion_service,
+            proyectores_alias, date_service, cache_matching, incremental
+        )
+    )
+
+
+async def _ejecutar_matching(
+    cuenta_id: int,
+    year: int,
+    month: int,
+    matching_service: MatchingService,
+    repo_extracto: MovimientoExtractoRepositoryAsync,
+    vinculacion_repo: MovimientoVinculacionRepository,
+    vinculaciones_async: MovimientoVinculacionRepositoryAsync,
+    config_repo: ConfiguracionMatchingRepository,
+    alias_repo: MatchingAliasRepository,
+    cuenta_repo: CuentaRepository,
+    conciliacion_service: ConciliacionServiceAsync,
+    proyectores_alias: CacheProyectoresAlias,
+    date_service: DateRangeService,
+    cache_matching: CacheMatchingPeriodos,
+    incremental: bool
+) -> MatchingResultResponse:
     try:
         logger.info(f"Ejecutando matching para cuenta {cuenta_id}, periodo {year}/{month}")
         
         # 1. Obtener configuración activa
-        config = config_repo.obtener_activa()
+        config = await run_in_threadpool(config_repo.obtener_activa)
         
-        # 2. Obtener movimientos del extracto
-        movs_extracto = repo_extracto.obtener_por_periodo(cuenta_id, year, month)
-        logger.info(f"Encontrados {len(movs_extracto)} movimientos en extracto")
+        # Reglas de normalización (Alias), compiladas y cacheadas por cuenta
+        aliases = await run_in_threadpool(proyectores_alias.obtener, cuenta_id, alias_repo.obtener_por_cuenta)
         
-        # 3. Obtener movimientos del sistema (Universo Completo: Calendario + Vinculados)
-        movs_sistema = conciliacion_service.obtener_universo_sistema(cuenta_id, year, month)
-        logger.info(f"Encontrados {len(movs_sistema)} movimientos en universo sistema")
-
-        # 3.1 Obtener vinculaciones existentes en DB
-        matches_existentes = vinculacion_repo.obtener_por_periodo(cuenta_id, year, month)
-        
-        # Identificar y limpiar "orphans" (matches que apuntan a movimientos de sistema borrados)
-        matches_validos = []
-        for match in matches_existentes:
-            es_huerfano = False
-            # Si el estado implica que debería haber un movimiento de sistema...
-            if match.estado in [MatchEstado.OK, MatchEstado.PROBABLE, MatchEstado.MANUAL]:
-                # ...pero no hay movimiento de sistema asociado
-                if not match.mov_sistema:
-                    es_huerfano = True
-            
-            if es_huerfano:
-                logger.warning(f"Detectado match huérfano ID {match.id} (Estado {match.estado.value}, Extracto {match.mov_extracto.id}). Eliminando...")
-                vinculacion_repo.eliminar(match.id)
-                # No lo agregamos a matches_validos, así el extracto quedará libre para ser procesado de nuevo
-            else:
-                matches_validos.append(match)
-
-        matches_map = {m.mov_extracto.id: m for m in matches_validos}
+        # 1.1 Modo incremental: marca del periodo tomada antes de leer los datos
+        marca = None
+        previa = None
+        if incremental:
+            fecha_inicio, fecha_fin = date_service.get_range_for_period(cuenta_id, year, month)
+            marca = await vinculaciones_async.obtener_marca_periodo(cuenta_id, year, month, fecha_inicio, fecha_fin)
+            previa = cache_matching.obtener(cuenta_id, year, month)
+            if previa and previa.vigente(marca, config, aliases):
+                logger.info("Periodo sin cambios desde la última ejecución; se retorna el resultado anterior")
+                return previa.resultado
         
-        # Identificar items ya procesados y sistemas ocupados
-        extracto_ids_procesados = set(matches_map.keys())
-        sistema_ids_ocupados = {m.mov_sistema.id for m in matches_validos if m.mov_sistema}
+        # 2. Obtener movimientos del extracto
+        movs_extracto = await repo_extracto.obtener_por_periodo(cuenta_id, year, month)
+        logger.info(f"Encontrados {len(movs_extracto)} movimientos en extracto")
         
-        # Filtrar pendientes
-        movs_extracto_pendientes = [m for m in movs_extracto if m.id not in extracto_ids_procesados]
-        movs_sistema_disponibles = [m for m in movs_sistema if m.id not in sistema_ids_ocupados]
+        # 3. Obtener vinculaciones existentes en DB (una sola carga para todo el endpoint)
+        matches_existentes = await vinculaciones_async.obtener_por_periodo(cuenta_id, year, month)
 
-        logger.info(f"Procesando {len(movs_extracto_pendientes)} items pendientes y {len(movs_sistema_disponibles)} sistemas disponibles")
-        
-        # 3.2 Obtener reglas de normalización (Alias)
-        aliases = alias_repo.obtener_por_cuenta(cuenta_id)
-        
-        # 4. Ejecutar algoritmo de matching solo en pendientes
-        matches_nuevos = matching_service.ejecutar_matching(
-            movs_extracto_pendientes, 
-            movs_sistema_disponibles, 
-            config,
-            aliases=aliases
+        # 3.1 Obtener movimientos del sistema (Universo Completo: Calendario + Vinculados)
+        movs_sistema = await conciliacion_service.obtener_universo_sistema(
+            cuenta_id, year, month, vinculaciones=matches_existentes
         )
-        logger.info(f"Matching completado: {len(matches_nuevos)} vinculaciones nuevas generadas")
-        
-        # 5. Guardar vinculaciones nuevas (solo las automáticas relevantes)
-        for match in matches_nuevos:
-             # Guardamos incluso SIN_MATCH para evitar re-procesar? 
-             # No, SIN_MATCH no se suele guardar en DB a menos que queramos 'cachear' el fallo.
-             # Pero si no lo guardamos, la próxima vez se re-calcula.
-             # La lógica original guardaba OK y PROBABLE.
-            if match.estado in [MatchEstado.OK, MatchEstado.PROBABLE]:
-                try:
-                    match_guardado = vinculacion_repo.guardar(match)
-                    # Actualizar ID generado
-                    match.id = match_guardado.id
-                    match.created_at = match_guardado.created_at
-                except Exception as e:
-                    logger.warning(f"Error guardando vinculación: {e}")
-        
-        # 6. Combinar resultados (Existentes + Nuevos)
-        matches_finales = list(matches_map.values()) + matches_nuevos
-        
-        # --- CALCULAR NO EMPAREJADOS DEL SISTEMA ---
-        # Identificar qué movimientos del sistema (de los disponibles) NO fueron usados en los matches nuevos
-        used_system_ids = {m.mov_sistema.id for m in matches_nuevos if m.mov_sistema}
-        
-        # Los disponibles eran los que no estaban en DB.
-        # Restamos los que acabamos de usar en el matching en memoria.
-        movimientos_sistema_sin_match_objs = [
-            m for m in movs_sistema_disponibles 
-            if m.id not in used_system_ids
-        ]
-        
-        # Convertir a dicts
-        movimientos_sistema_sin_match_dicts = [
-            _movimiento_sistema_to_dict(m) for m in movimientos_sistema_sin_match_objs
-        ]
-        
-        # Ordenar por fecha desc
-        movimientos_sistema_sin_match_dicts.sort(key=lambda x: x['fecha'], reverse=True)
+        logger.info(f"Encontrados {len(movs_sistema)} movimientos en universo sistema")
         
-        # --- VALIDACIÓN DE INTEGRIDAD 1-A-1 ---
-        # Verificar relaciones 1-a-muchos (sistema -> múltiples extractos)
-        from src.application.services.matching_validation_service import detectar_matches_1_a_muchos
+        # 4-8. Algoritmo, escrituras y estadísticas: fuera del event loop
+        return await run_in_threadpool(
+            _completar_matching, cuenta_id, year, month, matching_service, vinculacion_repo,
+            cuenta_repo, cache_matching, incremental, config, aliases, marca, previa,
+            movs_extracto, matches_existentes, movs_sistema
+        )
         
-        resultado_validacion_1aM = detectar_matches_1_a_muchos(cuenta_id, year, month)
-        tiene_duplicados = resultado_validacion_1aM['total_movimientos_sistema_afectados'] > 0
+    except ValueError as ve:
+        logger.error(f"Error de validación en matching: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error ejecutando matching: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error interno ejecutando matching: {str(e)}")
+
+
+def _completar_matching(
+    cuenta_id: int,
+    year: int,
+    month: int,
+    matching_service: MatchingService,
+    vinculacion_repo: MovimientoVinculacionRepository,
+    cuenta_repo: CuentaRepository,
+    cache_matching: CacheMatchingPeriodos,
+    incremental: bool,
+    config: ConfiguracionMatching,
+    aliases,
+    marca,
+    previa,
+    movs_extracto,
+    matches_existentes: List[MovimientoMatch],
+    movs_sistema: List[Movimiento]
+) -> MatchingResultResponse:
+    # Identificar y limpiar "orphans" (matches que apuntan a movimientos de sistema borrados)
+    matches_validos = []
+    for match in matches_existentes:
+        es_huerfano = False
+        # Si el estado implica que debería haber un movimiento de sistema...
+        if match.estado in [MatchEstado.OK, MatchEstado.PROBABLE, MatchEstado.MANUAL]:
+            # ...pero no hay movimiento de sistema asociado
+            if not match.mov_sistema:
+                es_huerfano = True
         
-        # 7. Calcular estadísticas detalladas
+        if es_huerfano:
+            logger.warning(f"Detectado match huérfano ID {match.id} (Estado {match.estado.value}, Extracto {match.mov_extracto.id}). Eliminando...")
+            vinculacion_repo.eliminar(match.id)
+            # No lo agregamos a matches_validos, así el extracto quedará libre para ser procesado de nuevo
+        else:
+            matches_validos.append(match)
+
+    matches_map = {m.mov_extracto.id: m for m in matches_validos}
+    
+    # Identificar items ya procesados y sistemas ocupados
+    extracto_ids_procesados = set(matches_map.keys())
+    sistema_ids_ocupados = {m.mov_sistema.id for m in matches_validos if m.mov_sistema}
+    
+    # Filtrar pendientes
+    movs_extracto_pendientes = [m for m in movs_extracto if m.id not in extracto_ids_procesados]
+    movs_sistema_disponibles = [m for m in movs_sistema if m.id not in sistema_ids_ocupados]
 
-        # 7. Calcular estadísticas detalladas
-        # Detectar si es cuenta USD para usar las columnas correctas en stats e integridad
-        cuenta_obj = cuenta_repo.obtener_por_id(cuenta_id)
-        es_usd = cuenta_obj and "USD" in cuenta_obj.cuenta.upper()
+    logger.info(f"Procesando {len(movs_extracto_pendientes)} items pendientes y {len(movs_sistema_disponibles)} sistemas disponibles")
+    
+    # 4. Ejecutar algoritmo de matching solo en pendientes
+    # (con instantánea previa, solo las filas afectadas por cambios)
+    matches_nuevos = MatchingIncremental(matching_service).ejecutar(
+        previa,
+        movs_extracto_pendientes, 
+        movs_sistema_disponibles, 
+        config,
+        aliases=aliases
+    )
+    logger.info(f"Matching completado: {len(matches_nuevos)} vinculaciones nuevas generadas")
+    
+    # 5. Guardar vinculaciones nuevas (solo las automáticas relevantes)
+    for match in matches_nuevos:
+         # Guardamos incluso SIN_MATCH para evitar re-procesar? 
+         # No, SIN_MATCH no se suele guardar en DB a menos que queramos 'cachear' el fallo.
+         # Pero si no lo guardamos, la próxima vez se re-calcula.
+         # La lógica original guardaba OK y PROBABLE.
+        if match.estado in [MatchEstado.OK, MatchEstado.PROBABLE]:
+            try:
+                match_guardado = vinculacion_repo.guardar(match)
+                # Actualizar ID generado
+                match.id = match_guardado.id
+                match.created_at = match_guardado.created_at
+            except Exception as e:
+                logger.warning(f"Error guardando vinculación: {e}")
+    
+    # 6. Combinar resultados (Existentes + Nuevos)
+    matches_finales = list(matches_map.values()) + matches_nuevos
+    
+    # --- CALCULAR NO EMPAREJADOS DEL SISTEMA ---
+    # Identificar qué movimientos del sistema (de los disponibles) NO fueron usados en los matches nuevos
+    used_system_ids = {m.mov_sistema.id for m in matches_nuevos if m.mov_sistema}
+    
+    # Los disponibles eran los que no estaban en DB.
+    # Restamos los que acabamos de usar en el matching en memoria.
+    movimientos_sistema_sin_match_objs = [
+        m for m in movs_sistema_disponibles 
+        if m.id not in used_system_ids
+    ]
+    
+    # Convertir a dicts
+    movimientos_sistema_sin_match_dicts = [
+        _movimiento_sistema_to_dict(m) for m in movimientos_sistema_sin_match_objs
+    ]
+    
+    # Ordenar por fecha desc
+    movimientos_sistema_sin_match_dicts.sort(key=lambda x: x['fecha'], reverse=True)
+    
+    # --- VALIDACIÓN DE INTEGRIDAD 1-A-1 ---
+    # Verificar relaciones 1-a-muchos (sistema -> múltiples extractos)
+    from src.application.services.matching_validation_service import detectar_matches_1_a_muchos
+    
+    resultado_validacion_1aM = detectar_matches_1_a_muchos(cuenta_id, year, month)
+    tiene_duplicados = resultado_validacion_1aM['total_movimientos_sistema_afectados'] > 0
+    
+    # 7. Calcular estadísticas detalladas
 
-        def calcular_stat_movimientos(movimientos):
-            """Helper para calcular stats de una lista de objetos movimiento o extracto"""
-            cantidad = len(movimientos)
-            
-            def get_val(m):
-                # Si es cuenta USD, priorizar el campo usd si está disponible
-                if es_usd and hasattr(m, 'usd') and m.usd is not None:
-                    return m.usd
-                return m.valor
+    # 7. Calcular estadísticas detalladas
+    # Detectar si es cuenta USD para usar las columnas correctas en stats e integridad
+    cuenta_obj = cuenta_repo.obtener_por_id(cuenta_id)
+    es_usd = cuenta_obj and "USD" in cuenta_obj.cuenta.upper()
 
-            total = sum(get_val(m) for m in movimientos)
-            
-            # Para ingresos/egresos, usamos la lógica de signo
-            ingresos = sum(get_val(m) for m in movimientos if get_val(m) > 0)
-            egresos = sum(get_val(m) for m in movimientos if get_val(m) < 0)
-            
-            return {
-                'cantidad': cantidad,
-                'total': float(total),
-                'ingresos': float(ingresos),
-                'egresos': float(egresos)
-            }
-
-        def calcular_stat_matches(matches, key='mov_extracto'):
-            """Helper para calcular stats de una lista de MovimientoMatch usando el lado extracto o sistema"""
-            # Filtrar los que tienen el objeto requerido (ej: mov_sistema puede ser None)
-            valid_items = [getattr(m, key) for m in matches if getattr(m, key)]
-            return calcular_stat_movimientos(valid_items)
-
-        # Filtrar listas de matches por estado
-        # IMPORTANTE: OK debe incluir MANUAL para que las estadísticas cierren
-        ok_list = [m for m in matches_finales if m.estado in [MatchEstado.OK, MatchEstado.MANUAL]]
-        probables_list = [m for m in matches_finales if m.estado == MatchEstado.PROBABLE]
-        sin_match_list = [m for m in matches_finales if m.estado == MatchEstado.SIN_MATCH]
-        ignorados_list = [m for m in matches_finales if m.estado == MatchEstado.IGNORADO]
-
-        # Consolidar movimientos de sistema vinculados (ignorando duplicados para no inflar balance si los hay)
-        # Nota: La integridad 1-a-1 ya se valida por aparte.
-        sistema_vinculado_ids = set()
-        sistema_vinculado_objs = []
-        for m in matches_finales:
-            if m.mov_sistema and m.mov_sistema.id not in sistema_vinculado_ids:
-                sistema_vinculado_ids.add(m.mov_sistema.id)
-                sistema_vinculado_objs.append(m.mov_sistema)
-
-        estadisticas = {
-            'total_extracto': calcular_stat_movimientos(movs_extracto),
-            # SISTEMA CONSOLIDADO: Solo los movimientos que están vinculados
-            'total_sistema': calcular_stat_movimientos(sistema_vinculado_objs),
-            'ok': calcular_stat_matches(ok_list, key='mov_extracto'),
-            'probables': calcular_stat_matches(probables_list, key='mov_extracto'),
-            'sin_match': calcular_stat_matches(sin_match_list, key='mov_extracto'),
-            'ignorados': calcular_stat_matches(ignorados_list, key='mov_extracto')
-        }
+    def calcular_stat_movimientos(movimientos):
+        """Helper para calcular stats de una lista de objetos movimiento o extracto"""
+        cantidad = len(movimientos)
+        
+        def get_val(m):
+            # Si es cuenta USD, priorizar el campo usd si está disponible
+            if es_usd and hasattr(m, 'usd') and m.usd is not None:
+                return m.usd
+            return m.valor
 
-        # --- VALIDACIÓN DE CUADRE ESTRICTO (5 PILARES) ---
-        integridad = {
-            # 1. Balance Global (Extracto vs Lado Sistema Consolidado)
-            "balance_ingresos": abs(estadisticas['total_extracto']['ingresos'] - estadisticas['total_sistema']['ingresos']) < 0.01,
-            "balance_egresos": abs(estadisticas['total_extracto']['egresos'] - estadisticas['total_sistema']['egresos']) < 0.01,
-            
-            # 2. Igualdad de Volumen (Cantidad vinculada vs Cantidad extracto)
-            "igualdad_registros": estadisticas['total_extracto']['cantidad'] == estadisticas['total_sistema']['cantidad'],
-            
-            # 3. Vinculación Total (Todo lo del extracto debe estar OK/MANUAL)
-            "todo_vinculado": estadisticas['ok']['cantidad'] == estadisticas['total_extracto']['cantidad'] and estadisticas['total_extracto']['cantidad'] > 0,
-            
-            # 4. Sin Pendientes (Ni en extracto ni probables)
-            "sin_pendientes": estadisticas['sin_match']['cantidad'] == 0 and estadisticas['probables']['cantidad'] == 0,
-            
-            # 5. Relación 1 a 1 (Sin duplicados de sistema)
-            "relacion_1_a_1": not tiene_duplicados,
-        }
+        total = sum(get_val(m) for m in movimientos)
         
-        # Un periodo está CUADRADO si cumple TODO lo anterior
-        integridad["es_cuadrado"] = all(integridad.values())
+        # Para ingresos/egresos, usamos la lógica de signo
+        ingresos = sum(get_val(m) for m in movimientos if get_val(m) > 0)
+        egresos = sum(get_val(m) for m in movimientos if get_val(m) < 0)
         
-        # 8. Retornar respuesta
-        # Ordenar por fecha y valor para consistencia visual
-        matches_finales.sort(key=lambda m: (m.mov_extracto.fecha, abs(m.mov_extracto.valor)), reverse=True)
+        return {
+            'cantidad': cantidad,
+            'total': float(total),
+            'ingresos': float(ingresos),
+            'egresos': float(egresos)
+        }
 
-        return MatchingResultResponse(
-            matches=[_match_to_response(m) for m in matches_finales],
-            estadisticas=estadisticas,
-            integridad=integridad,
-            movimientos_sistema_sin_match=movimientos_sistema_sin_match_dicts
-        )
+    def calcular_stat_matches(matches, key='mov_extracto'):
+        """Helper para calcular stats de una lista de MovimientoMatch usando el lado extracto o sistema"""
+        # Filtrar los que tienen el objeto requerido (ej: mov_sistema puede ser None)
+        valid_items = [getattr(m, key) for m in matches if getattr(m, key)]
+        return calcular_stat_movimientos(valid_items)
+
+    # Filtrar listas de matches por estado
+    # IMPORTANTE: OK debe incluir MANUAL para que las estadísticas cierren
+    ok_list = [m for m in matches_finales if m.estado in [MatchEstado.OK, MatchEstado.MANUAL]]
+    probables_list = [m for m in matches_finales if m.estado == MatchEstado.PROBABLE]
+    sin_match_list = [m for m in matches_finales if m.estado == MatchEstado.SIN_MATCH]
+    ignorados_list = [m for m in matches_finales if m.estado == MatchEstado.IGNORADO]
+
+    # Consolidar movimientos de sistema vinculados (ignorando duplicados para no inflar balance si los hay)
+    # Nota: La integridad 1-a-1 ya se valida por aparte.
+    sistema_vinculado_ids = set()
+    sistema_vinculado_objs = []
+    for m in matches_finales:
+        if m.mov_sistema and m.mov_sistema.id not in sistema_vinculado_ids:
+            sistema_vinculado_ids.add(m.mov_sistema.id)
+            sistema_vinculado_objs.append(m.mov_sistema)
+
+    estadisticas = {
+        'total_extracto': calcular_stat_movimientos(movs_extracto),
+        # SISTEMA CONSOLIDADO: Solo los movimientos que están vinculados
+        'total_sistema': calcular_stat_movimientos(sistema_vinculado_objs),
+        'ok': calcular_stat_matches(ok_list, key='mov_extracto'),
+        'probables': calcular_stat_matches(probables_list, key='mov_extracto'),
+        'sin_match': calcular_stat_matches(sin_match_list, key='mov_extracto'),
+        'ignorados': calcular_stat_matches(ignorados_list, key='mov_extracto')
+    }
+
+    # --- VALIDACIÓN DE CUADRE ESTRICTO (5 PILARES) ---
+    integridad = {
+        # 1. Balance Global (Extracto vs Lado Sistema Consolidado)
+        "balance_ingresos": abs(estadisticas['total_extracto']['ingresos'] - estadisticas['total_sistema']['ingresos']) < 0.01,
+        "balance_egresos": abs(estadisticas['total_extracto']['egresos'] - estadisticas['total_sistema']['egresos']) < 0.01,
         
-    except ValueError as ve:
-        logger.error(f"Error de validación en matching: {ve}")
-        raise HTTPException(status_code=400, detail=str(ve))
-    except Exception as e:
-        logger.error(f"Error ejecutando matching: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error interno ejecutando matching: {str(e)}")
+        # 2. Igualdad de Volumen (Cantidad vinculada vs Cantidad extracto)
+        "igualdad_registros": estadisticas['total_extracto']['cantidad'] == estadisticas['total_sistema']['cantidad'],
+        
+        # 3. Vinculación Total (Todo lo del extracto debe estar OK/MANUAL)
+        "todo_vinculado": estadisticas['ok']['cantidad'] == estadisticas['total_extracto']['cantidad'] and estadisticas['total_extracto']['cantidad'] > 0,
+        
+        # 4. Sin Pendientes (Ni en extracto ni probables)
+        "sin_pendientes": estadisticas['sin_match']['cantidad'] == 0 and estadisticas['probables']['cantidad'] == 0,
+        
+        # 5. Relación 1 a 1 (Sin duplicados de sistema)
+        "relacion_1_a_1": not tiene_duplicados,
+    }
+    
+    # Un periodo está CUADRADO si cumple TODO lo anterior
+    integridad["es_cuadrado"] = all(integridad.values())
+    
+    # 8. Retornar respuesta
+    # Ordenar por fecha y valor para consistencia visual
+    matches_finales.sort(key=lambda m: (m.mov_extracto.fecha, abs(m.mov_extracto.valor)), reverse=True)
+
+    respuesta = MatchingResultResponse(
+        matches=[_match_to_response(m) for m in matches_finales],
+        estadisticas=estadisticas,
+        integridad=integridad,
+        movimientos_sistema_sin_match=movimientos_sistema_sin_match_dicts
+    )
+    
+    if incremental:
+        cache_matching.guardar(cuenta_id, year, month, InstantaneaMatching(
+            marca, config, aliases, respuesta,
+            matches_nuevos, movs_extracto_pendientes, movs_sistema_disponibles
+        ))
+    
+    return respuesta
 
 
 @router.post("/vincular", response_model=MovimientoMatchResponse)
@@ -774,6 +917,7 @@ def obtener_configuracion(
             peso_descripcion=float(config.peso_descripcion),
             score_minimo_exacto=float(config.score_minimo_exacto),
             score_minimo_probable=float(config.score_minimo_probable),
+            modo_asignacion=config.modo_asignacion.value,
             activo=config.activo,
             created_at=config.created_at,
             updated_at=config.updated_at
@@ -789,7 +933,8 @@ def obtener_configuracion(
 @router.put("/configuracion", response_model=ConfiguracionMatchingResponse)
 def actualizar_configuracion(
     update: ConfiguracionMatchingUpdate,
-    config_repo: ConfiguracionMatchingRepository = Depends(get_configuracion_matching_repository)
+    config_repo: ConfiguracionMatchingRepository = Depends(get_configuracion_matching_repository),
+    lecturas: CacheLecturasPeriodo = Depends(get_cache_lecturas_periodo)
 ):
     """
     Actualiza la configuración del algoritmo de matching.
@@ -811,10 +956,17 @@ def actualizar_configuracion(
         config.peso_descripcion = Decimal(str(update.peso_descripcion))
         config.score_minimo_exacto = Decimal(str(update.score_minimo_exacto))
         config.score_minimo_probable = Decimal(str(update.score_minimo_probable))
+        if update.modo_asignacion is not None:
+            try:
+                config.modo_asignacion = ModoAsignacion(update.modo_asignacion.upper())
+            except ValueError:
+                raise ValueError(f"modo_asignacion inválido: {update.modo_asignacion} (use GREEDY u OPTIMO)")
         
         # 3. Guardar (las validaciones se ejecutan en __post_init__ del modelo)
         config_actualizada = config_repo.actualizar(config)
         logger.info(f"Configuración actualizada: ID {config_actualizada.id}")
+        # Los resultados de matching guardados usaron la configuración anterior
+        lecturas.invalidar()
         
         return ConfiguracionMatchingResponse(
             id=config_actualizada.id,
@@ -825,6 +977,7 @@ def actualizar_configuracion(
             peso_descripcion=float(config_actualizada.peso_descripcion),
             score_minimo_exacto=float(config_actualizada.score_minimo_exacto),
             score_minimo_probable=float(config_actualizada.score_minimo_probable),
+            modo_asignacion=config_actualizada.modo_asignacion.value,
             activo=config_actualizada.activo,
             created_at=config_actualizada.created_at,
             updated_at=config_actualizada.updated_at
@@ -863,7 +1016,9 @@ def listar_aliases(
 @router.post("/alias", response_model=MatchingAliasResponse)
 def crear_alias(
     item: MatchingAliasCreate,
-    alias_repo: MatchingAliasRepository = Depends(get_matching_alias_repository)
+    alias_repo: MatchingAliasRepository = Depends(get_matching_alias_repository),
+    proyectores_alias: CacheProyectoresAlias = Depends(get_cache_proyectores_alias),
+    lecturas: CacheLecturasPeriodo = Depends(get_cache_lecturas_periodo)
 ):
     try:
         alias = MatchingAlias(
@@ -872,6 +1027,8 @@ def crear_alias(
             reemplazo=item.reemplazo
         )
         guardado = alias_repo.guardar(alias)
+        proyectores_alias.invalidar(guardado.cuenta_id)
+        lecturas.invalidar_cuenta(guardado.cuenta_id)
         return MatchingAliasResponse(
             id=guardado.id,
             cuenta_id=guardado.cuenta_id,
@@ -889,7 +1046,9 @@ def crear_alias(
 def actualizar_alias(
     id: int,
     item: MatchingAliasUpdate,
-    alias_repo: MatchingAliasRepository = Depends(get_matching_alias_repository)
+    alias_repo: MatchingAliasRepository = Depends(get_matching_alias_repository),
+    proyectores_alias: CacheProyectoresAlias = Depends(get_cache_proyectores_alias),
+    lecturas: CacheLecturasPeriodo = Depends(get_cache_lecturas_periodo)
 ):
     try:
         # Obtenemos el alias existente para mantener cuenta_id y fecha
@@ -902,6 +1061,8 @@ def actualizar_alias(
         
         # Guardar (update)
         guardado = alias_repo.guardar(existente)
+        proyectores_alias.invalidar(guardado.cuenta_id)
+        lecturas.invalidar_cuenta(guardado.cuenta_id)
         return MatchingAliasResponse(
             id=guardado.id,
             cuenta_id=guardado.cuenta_id,
@@ -918,10 +1079,16 @@ def actualizar_alias(
 @router.delete("/alias/{id}")
 def eliminar_alias(
     id: int,
-    alias_repo: MatchingAliasRepository = Depends(get_matching_alias_repository)
+    alias_repo: MatchingAliasRepository = Depends(get_matching_alias_repository),
+    proyectores_alias: CacheProyectoresAlias = Depends(get_cache_proyectores_alias),
+    lecturas: CacheLecturasPeriodo = Depends(get_cache_lecturas_periodo)
 ):
     try:
+        existente = alias_repo.obtener_por_id(id)
         alias_repo.eliminar(id)
+        if existente:
+            proyectores_alias.invalidar(existente.cuenta_id)
+            lecturas.invalidar_cuenta(existente.cuenta_id)
         return {"mensaje": "Regla eliminada exitosamente"}
     except Exception as e:
         logger.error(f"Error eliminando alias: {e}", exc_info=True)
@@ -956,7 +1123,10 @@ def api_detectar_matches_1_a_muchos(request: DetectarMatchesRequest):
 
 
 @router.post("/invalidar-1-a-muchos")
-def api_invalidar_matches_1_a_muchos(request: DetectarMatchesRequest):
+def api_invalidar_matches_1_a_muchos(
+    request: DetectarMatchesRequest,
+    lecturas: CacheLecturasPeriodo = Depends(get_cache_lecturas_periodo)
+):
     """
     Elimina vinculaciones incorrectas donde 1 sistema → múltiples extractos.
     """
@@ -968,6 +1138,8 @@ def api_invalidar_matches_1_a_muchos(request: DetectarMatchesRequest):
             request.year,
             request.month
         )
+        # El servicio borra vinculaciones con SQL directo
+        lecturas.invalidar_periodo(request.cuenta_id, request.year, request.month)
         return resultado
     except Exception as e:
         logger.error(f"Error invalidando matches 1-a-muchos: {e}", exc_info=True)
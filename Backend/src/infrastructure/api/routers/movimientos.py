@@ -1,13 +1,17 @@
+import base64
+import json
+import math
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
 from datetime import date, datetime
 from decimal import Decimal
 from src.infrastructure.logging.config import logger
 
 from src.domain.models.movimiento import Movimiento
 from src.domain.models.movimiento_detalle import MovimientoDetalle
-from src.domain.ports.movimiento_repository import MovimientoRepository
+from src.domain.ports.movimiento_repository import MovimientoRepository, MovimientoRepositoryAsync
 from src.domain.ports.cuenta_repository import CuentaRepository
 from src.domain.ports.moneda_repository import MonedaRepository
 from src.domain.ports.tercero_repository import TerceroRepository
@@ -16,6 +20,7 @@ from src.domain.ports.concepto_repository import ConceptoRepository
 
 from src.infrastructure.api.dependencies import (
     get_movimiento_repository,
+    get_movimiento_repository_async,
     get_cuenta_repository,
     get_moneda_repository,
     get_tercero_repository,
@@ -24,6 +29,11 @@ from src.infrastructure.api.dependencies import (
     get_config_valor_pendiente_repository
 )
 from src.domain.ports.config_valor_pendiente_repository import ConfigValorPendienteRepository
+from src.infrastructure.database.async_connection import conexion_async_del_pool
+from src.infrastructure.database.connection import conexion_del_pool
+from src.infrastructure.database.postgres_movimiento_repository import PostgresMovimientoRepository
+from src.infrastructure.api.exportacion_streaming import FORMATOS, escribir_exportacion, formato_disponible
+from src.infrastructure.database.async_postgres_movimiento_repository import AsyncPostgresMovimientoRepository
 
 router = APIRouter(prefix="/api/movimientos", tags=["movimientos"])
 
@@ -93,6 +103,7 @@ class PaginatedMovimientosResponse(BaseModel):
     page_size: int
     total_pages: int
     totales: dict  # Global totals: {ingresos, egresos, saldo}
+    siguiente_cursor: Optional[str] = None  # Paginación por cursor: token de la página siguiente
 
 def _to_response(mov: Movimiento) -> MovimientoResponse:
     """Convierte un Movimiento de dominio a MovimientoResponse con formato display"""
@@ -179,8 +190,31 @@ def _validar_catalogos(
                  detail=f"El concepto {dto.concepto_id} no pertenece al centro de costo {dto.centro_costo_id}"
              )
 
+# Tamaño de página por defecto cuando se pide paginación por cursor sin `limite`
+LIMITE_PAGINA_DEFECTO = 100
+
+def _codificar_cursor(mov: Movimiento, pagina: int) -> str:
+    """Token opaco con la llave (fecha, abs(valor), id) del último movimiento de la página"""
+    datos = {'f': mov.fecha.isoformat(), 'v': str(abs(mov.valor)), 'id': mov.id, 'p': pagina}
+    return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode().rstrip('=')
+
+def _decodificar_cursor(token: str) -> Tuple[Tuple[date, Decimal, int], int]:
+    try:
+        relleno = '=' * (-len(token) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(token + relleno))
+        return (date.fromisoformat(datos['f']), Decimal(datos['v']), int(datos['id'])), int(datos['p'])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
+async def _movimientos_ndjson(filtros: dict) -> AsyncIterator[str]:
+    """Una línea JSON por movimiento, leídos por lotes con un cursor del servidor"""
+    async with conexion_async_del_pool() as conn:
+        repo = AsyncPostgresMovimientoRepository(conn)
+        async for mov in repo.iterar_avanzado(**filtros):
+            yield _to_response(mov).model_dump_json() + "\n"
+
 @router.get("", response_model=PaginatedMovimientosResponse)
-def listar_movimientos(
+async def listar_movimientos(
     desde: Optional[date] = None,
     hasta: Optional[date] = None,
     cuenta_id: Optional[int] = None,
@@ -190,15 +224,24 @@ def listar_movimientos(
     centros_costos_excluidos: Optional[List[int]] = Query(None),
     pendiente: Optional[bool] = None,
     tipo_movimiento: Optional[str] = None,
-    repo: MovimientoRepository = Depends(get_movimiento_repository)
+    limite: Optional[int] = Query(None, ge=1, le=5000, description="Tamaño de página (activa la paginación por cursor)"),
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior"),
+    formato: Optional[str] = Query(None, description="'ndjson' para recibir todos los movimientos en streaming"),
+    repo: MovimientoRepositoryAsync = Depends(get_movimiento_repository_async)
 ):
     """
-    Lista todos los movimientos con filtros (legacy compatible way).
+    Lista los movimientos con filtros.
     Si pendiente is None, trae todos.
     Si pendiente is False, aplica solo_clasificados=True en repo.
-    """
-    logger.info(f"Listando todos los movimientos sin paginación")
     
+    - Sin `limite` ni `cursor`: todos los movimientos en una página (legacy compatible way).
+    - Con `limite` y/o `cursor`: paginación por llave (fecha, abs(valor), id);
+      la respuesta trae `siguiente_cursor` mientras haya más páginas.
+    - `formato=ndjson`: todos los movimientos, una línea JSON por movimiento,
+      en streaming y con memoria constante.
+    
+    Los totales (ingresos, egresos, saldo) se calculan en SQL sobre todo el filtro.
+    """
     # Logic transformation for repo
     solo_clasificados_val = False
     solo_pendientes = None 
@@ -210,39 +253,66 @@ def listar_movimientos(
         else:
             solo_clasificados_val = True
 
+    filtros = dict(
+        fecha_inicio=desde,
+        fecha_fin=hasta,
+        cuenta_id=cuenta_id,
+        tercero_id=tercero_id,
+        centro_costo_id=centro_costo_id,
+        concepto_id=concepto_id,
+        centros_costos_excluidos=centros_costos_excluidos,
+        solo_pendientes=solo_pendientes_val,
+        solo_clasificados=solo_clasificados_val,
+        tipo_movimiento=tipo_movimiento
+    )
+
+    if formato is not None:
+        if formato != 'ndjson':
+            raise HTTPException(status_code=400, detail="Formato no soportado (use 'ndjson')")
+        logger.info("Listando movimientos en streaming (NDJSON)")
+        return StreamingResponse(_movimientos_ndjson(filtros), media_type="application/x-ndjson")
+
+    paginar = limite is not None or cursor is not None
+    despues_de, pagina_anterior = _decodificar_cursor(cursor) if cursor else (None, 0)
+
     try:
-        # Obtener TODOS los movimientos sin límites de paginación
-        movimientos, total = repo.buscar_avanzado(
-            fecha_inicio=desde,
-            fecha_fin=hasta,
-            cuenta_id=cuenta_id,
-            tercero_id=tercero_id,
-            centro_costo_id=centro_costo_id,
-            concepto_id=concepto_id,
-            centros_costos_excluidos=centros_costos_excluidos,
-            solo_pendientes=solo_pendientes_val,
-            solo_clasificados=solo_clasificados_val,
-            tipo_movimiento=tipo_movimiento,
-            skip=0,
-            limit=None  # Sin límite - retornar todos
-        )
-        
-        # Calcular totales globales
-        ingresos = sum(float(m.valor) for m in movimientos if m.valor > 0)
-        egresos = sum(abs(float(m.valor)) for m in movimientos if m.valor < 0)
-        saldo = ingresos - egresos
+        resumen = await repo.resumir_busqueda_avanzada(**filtros)
+        total = resumen['total']
+        ingresos = float(resumen['ingresos'])
+        egresos = float(resumen['egresos'])
+        totales = {
+            "ingresos": ingresos,
+            "egresos": egresos,
+            "saldo": ingresos - egresos
+        }
+
+        if not paginar:
+            logger.info(f"Listando todos los movimientos sin paginación")
+            movimientos, _ = await repo.buscar_avanzado(**filtros, skip=0, limit=None)
+            return PaginatedMovimientosResponse(
+                items=[_to_response(m) for m in movimientos],
+                total=total,
+                page=1,  # Siempre página 1 (sin paginación)
+                page_size=total,  # Tamaño = total de registros
+                total_pages=1,  # Siempre 1 página
+                totales=totales
+            )
+
+        limite = limite or LIMITE_PAGINA_DEFECTO
+        # Un movimiento extra indica si hay página siguiente
+        movimientos, _ = await repo.buscar_avanzado(**filtros, limit=limite + 1, despues_de=despues_de)
+        hay_mas = len(movimientos) > limite
+        movimientos = movimientos[:limite]
+        pagina = pagina_anterior + 1
         
         return PaginatedMovimientosResponse(
             items=[_to_response(m) for m in movimientos],
             total=total,
-            page=1,  # Siempre página 1 (sin paginación)
-            page_size=total,  # Tamaño = total de registros
-            total_pages=1,  # Siempre 1 página
-            totales={
-                "ingresos": ingresos,
-                "egresos": egresos,
-                "saldo": saldo
-            }
+            page=pagina,
+            page_size=limite,
+            total_pages=max(1, math.ceil(total / limite)),
+            totales=totales,
+            siguiente_cursor=_codificar_cursor(movimientos[-1], pagina) if hay_mas else None
         )
     except Exception as e:
         logger.error(f"Error listando movimientos: {str(e)}", exc_info=True)
@@ -525,17 +595,50 @@ def actualizar_movimiento(
         logger.error(f"Error al actualizar movimiento: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _exportacion_streaming(limit: Optional[int], plain: bool, formato: str, comprimir: bool) -> Iterator[bytes]:
+    """Filas leídas por lotes con un cursor del servidor y escritas a medida que llegan"""
+    with conexion_del_pool() as conn:
+        repo = PostgresMovimientoRepository(conn)
+        columnas = []  # (nombre, OID) que llena el repositorio antes de la primera fila
+        yield from escribir_exportacion(
+            repo.iterar_datos_exportacion(limit=limit, plain_format=plain, columnas=columnas),
+            formato, comprimir, columnas=columnas
+        )
+
 @router.get("/exportar/datos", response_model=List[dict])
 def obtener_datos_exportacion(
     limit: Optional[int] = None,
     plain: bool = False,
+    formato: Optional[str] = Query(None, description="'csv', 'ndjson' o 'parquet' para descargar en streaming"),
+    gzip: bool = Query(False, description="Comprimir la descarga en streaming (Content-Encoding: gzip)"),
     repo: MovimientoRepository = Depends(get_movimiento_repository)
 ):
     """
     Retorna los datos crudos para la exportación.
     Si limit es None, trae todo.
     Si plain es True, trae solo la tabla movimientos sin los nombres de FKs.
+    
+    Con `formato` el archivo se envía en streaming: las filas se leen por
+    lotes con un cursor del servidor y se escriben a medida que llegan, así
+    que la memoria no crece con el historial. `gzip=true` comprime la
+    descarga.
     """
+    if formato is not None:
+        motivo = formato_disponible(formato)
+        if motivo:
+            raise HTTPException(status_code=400, detail=motivo)
+        logger.info(f"Exportación en streaming - Formato: {formato}, Limit: {limit}, Plain: {plain}, Gzip: {gzip}")
+        cabeceras = {
+            "Content-Disposition": f'attachment; filename="movimientos.{FORMATOS[formato]["extension"]}"'
+        }
+        if gzip:
+            cabeceras["Content-Encoding"] = "gzip"
+        return StreamingResponse(
+            _exportacion_streaming(limit, plain, formato, gzip),
+            media_type=FORMATOS[formato]["media_type"],
+            headers=cabeceras
+        )
+
     try:
         logger.info(f"Solicitud de exportación - Limit: {limit}, Plain: {plain}")
         return repo.obtener_datos_exportacion(limit=limit, plain_format=plain)
@@ -4,7 +4,8 @@ from pydantic import BaseModel
 
 from src.domain.models.regla_clasificacion import ReglaClasificacion
 from src.domain.ports.reglas_repository import ReglasRepository
-from src.infrastructure.api.dependencies import get_reglas_repository
+from src.domain.services.indice_reglas import CacheIndiceReglas
+from src.infrastructure.api.dependencies import get_reglas_repository, get_cache_indice_reglas
 
 router = APIRouter(prefix="/api/reglas", tags=["reglas"])
 
@@ -23,7 +24,11 @@ def listar_reglas(repo: ReglasRepository = Depends(get_reglas_repository)):
     return repo.obtener_todos()
 
 @router.post("/", response_model=ReglaDTO)
-def crear_regla(dto: ReglaDTO, repo: ReglasRepository = Depends(get_reglas_repository)):
+def crear_regla(
+    dto: ReglaDTO,
+    repo: ReglasRepository = Depends(get_reglas_repository),
+    cache_reglas: CacheIndiceReglas = Depends(get_cache_indice_reglas)
+):
     try:
         nueva_regla = ReglaClasificacion(
             id=None,
@@ -34,7 +39,9 @@ def crear_regla(dto: ReglaDTO, repo: ReglasRepository = Depends(get_reglas_repos
             concepto_id=dto.concepto_id,
             tipo_match=dto.tipo_match
         )
-        return repo.guardar(nueva_regla)
+        guardada = repo.guardar(nueva_regla)
+        cache_reglas.invalidar()
+        return guardada
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -42,7 +49,8 @@ def crear_regla(dto: ReglaDTO, repo: ReglasRepository = Depends(get_reglas_repos
 def actualizar_regla(
     id: int, 
     dto: ReglaDTO, 
-    repo: ReglasRepository = Depends(get_reglas_repository)
+    repo: ReglasRepository = Depends(get_reglas_repository),
+    cache_reglas: CacheIndiceReglas = Depends(get_cache_indice_reglas)
 ):
     try:
         # Idealmente buscaríamos primero, pero por brevedad actualizamos directo
@@ -56,14 +64,21 @@ def actualizar_regla(
             concepto_id=dto.concepto_id,
             tipo_match=dto.tipo_match
         )
-        return repo.guardar(regla)
+        guardada = repo.guardar(regla)
+        cache_reglas.invalidar()
+        return guardada
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{id}")
-def eliminar_regla(id: int, repo: ReglasRepository = Depends(get_reglas_repository)):
+def eliminar_regla(
+    id: int,
+    repo: ReglasRepository = Depends(get_reglas_repository),
+    cache_reglas: CacheIndiceReglas = Depends(get_cache_indice_reglas)
+):
     try:
         repo.eliminar(id)
+        cache_reglas.invalidar()
         return {"mensaje": "Regla eliminada"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
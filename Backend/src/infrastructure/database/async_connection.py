@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+import re
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+
+from src.infrastructure.database.connection import DB_CONFIG
+from src.infrastructure.logging.config import logger
+
+# Pool asyncpg global, creado al primer uso (dentro del event loop de la app)
+_async_pool = None
+_async_pool_lock = asyncio.Lock()
+
+
+async def _configurar_conexion(conn) -> None:
+    """json/jsonb como objetos Python, igual que psycopg2 (ej. json_agg de detalles)"""
+    for tipo in ('json', 'jsonb'):
+        await conn.set_type_codec(tipo, encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+
+async def get_async_pool() -> asyncpg.Pool:
+    """
+    Obtiene o crea el pool asyncpg global.
+
+    Convive con el pool psycopg2 de connection.py: los endpoints async leen
+    por aquí sin bloquear el event loop; las escrituras siguen pasando por los
+    repositorios síncronos.
+
+    Returns:
+        asyncpg.Pool: Pool de conexiones a PostgreSQL
+    """
+    global _async_pool
+
+    async with _async_pool_lock:
+        if _async_pool is None:
+            min_size = int(os.getenv('DB_ASYNC_POOL_MIN_SIZE', '1'))
+            max_size = int(os.getenv('DB_ASYNC_POOL_MAX_SIZE', '10'))
+            logger.info(f"Inicializando pool asyncpg: min={min_size}, max={max_size}")
+            _async_pool = await asyncpg.create_pool(
+                host=DB_CONFIG['host'],
+                port=int(DB_CONFIG['port']),
+                database=DB_CONFIG['database'],
+                user=DB_CONFIG['user'],
+                password=DB_CONFIG['password'],
+                min_size=min_size,
+                max_size=max_size,
+                init=_configurar_conexion
+            )
+            logger.info("Pool asyncpg inicializado correctamente")
+
+    return _async_pool
+
+
+async def get_async_db_connection() -> AsyncIterator[asyncpg.Connection]:
+    """
+    Dependency provider para endpoints async: una conexión asyncpg del pool
+    por petición. Sin transacción de petición: cada sentencia se confirma
+    sola y las escrituras de varias sentencias abren la suya.
+    """
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        yield conn
+
+
+@asynccontextmanager
+async def conexion_async_del_pool() -> AsyncIterator[asyncpg.Connection]:
+    """
+    Conexión asyncpg para usar fuera de las dependencias de FastAPI (ej.
+    respuestas en streaming, que siguen leyendo después de que las
+    dependencias se cierran).
+    """
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        yield conn
+
+
+async def close_async_pool() -> None:
+    """
+    Cierra el pool asyncpg.
+
+    Debe llamarse al shutdown de la aplicación.
+    """
+    global _async_pool
+
+    if _async_pool is not None:
+        logger.info("Cerrando pool asyncpg...")
+        await _async_pool.close()
+        _async_pool = None
+        logger.info("Pool asyncpg cerrado")
+
+
+def metricas_async_pool() -> Optional[Dict[str, int]]:
+    """Tamaño del pool asyncpg, o None si todavía no se creó"""
+    if _async_pool is None:
+        return None
+    libres = _async_pool.get_idle_size()
+    return {
+        'minimo': _async_pool.get_min_size(),
+        'maximo': _async_pool.get_max_size(),
+        'abiertas': _async_pool.get_size(),
+        'en_uso': _async_pool.get_size() - libres,
+        'libres': libres,
+    }
+
+
+_IN_AL_FINAL = re.compile(r"(\bNOT\s+)?\bIN\s*$", re.IGNORECASE)
+
+
+def traducir_consulta(query: str, params: Sequence = ()) -> Tuple[str, List]:
+    """
+    Consulta con marcadores de psycopg2 (%s) → consulta asyncpg ($1, $2...).
+
+    Permite reutilizar las consultas de los repositorios síncronos. Las
+    tuplas de `IN %s` / `NOT IN %s` (que psycopg2 expande) pasan como arreglo
+    con `= ANY($n)` / `<> ALL($n)`, y `%%` vuelve a ser `%`.
+
+    Raises:
+        ValueError: Si el número de marcadores no coincide con los parámetros
+            o una tupla no está en un IN
+    """
+    partes = query.split('%s')
+    if len(partes) - 1 != len(params):
+        raise ValueError(f"La consulta tiene {len(partes) - 1} marcadores y {len(params)} parámetros")
+
+    sql = [partes[0].replace('%%', '%')]
+    args = []
+    for numero, (valor, resto) in enumerate(zip(params, partes[1:]), start=1):
+        if isinstance(valor, tuple):
+            anterior = _IN_AL_FINAL.search(sql[-1])
+            if not anterior:
+                raise ValueError("Solo se admiten tuplas como lista de un IN / NOT IN")
+            operador = "<> ALL" if anterior.group(1) else "= ANY"
+            sql[-1] = sql[-1][:anterior.start()] + f"{operador}(${numero})"
+            valor = list(valor)
+        else:
+            sql.append(f"${numero}")
+        sql.append(resto.replace('%%', '%'))
+        args.append(valor)
+
+    return ''.join(sql), args
+
+
+def argumentos(query: str, params: Sequence = ()) -> List:
+    """[sql, *args] traducidos, para conn.fetch(*argumentos(query, params)) y similares"""
+    sql, args = traducir_consulta(query, params)
+    return [sql, *args]
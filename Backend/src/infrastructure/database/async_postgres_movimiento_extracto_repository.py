@@ -0,0 +1,31 @@
+from typing import List
+
+from src.domain.models.movimiento_extracto import MovimientoExtracto
+from src.domain.ports.movimiento_extracto_repository import MovimientoExtractoRepositoryAsync
+from src.infrastructure.database.async_connection import argumentos
+from src.infrastructure.database.postgres_movimiento_extracto_repository import PostgresMovimientoExtractoRepository
+
+
+class AsyncPostgresMovimientoExtractoRepository(MovimientoExtractoRepositoryAsync):
+    """
+    Lecturas de Movimientos de Extracto con asyncpg.
+    
+    Usa las mismas consultas y la misma conversión de filas que
+    PostgresMovimientoExtractoRepository; solo cambia el driver.
+    """
+    
+    def __init__(self, connection):
+        self.conn = connection
+        # Adaptador síncrono sin conexión: solo aporta consultas y conversión de filas
+        self._sql = PostgresMovimientoExtractoRepository(None)
+    
+    async def obtener_por_periodo(self, cuenta_id: int, year: int, month: int) -> List[MovimientoExtracto]:
+        rows = await self.conn.fetch(*argumentos(self._sql._CONSULTA_POR_PERIODO, (cuenta_id, year, month)))
+        return [self._sql._row_to_movimiento(tuple(row)) for row in rows]
+    
+    async def obtener_por_ids(self, ids: List[int]) -> List[MovimientoExtracto]:
+        if not ids:
+            return []
+        
+        rows = await self.conn.fetch(*argumentos(self._sql._CONSULTA_POR_IDS, (list(ids),)))
+        return [self._sql._row_to_movimiento(tuple(row)) for row in rows]
@@ -0,0 +1,145 @@
+from datetime import date
+from decimal import Decimal
+from typing import AsyncIterator, List, Optional, Tuple
+
+from src.domain.models.movimiento import Movimiento
+from src.domain.ports.movimiento_repository import MovimientoRepositoryAsync
+from src.infrastructure.database.async_connection import argumentos
+from src.infrastructure.database.postgres_movimiento_repository import PostgresMovimientoRepository
+
+
+class AsyncPostgresMovimientoRepository(MovimientoRepositoryAsync):
+    """
+    Lecturas de movimientos del sistema con asyncpg.
+
+    Las consultas se arman con los mismos métodos de
+    PostgresMovimientoRepository (_consulta_avanzada, _consulta_listado) y
+    las filas se convierten igual: solo cambia el driver.
+    """
+
+    def __init__(self, connection):
+        self.conn = connection
+        # Adaptador síncrono sin conexión: solo arma consultas y convierte filas
+        self._sql = PostgresMovimientoRepository(None)
+
+    async def obtener_por_ids(self, ids: List[int]) -> List[Movimiento]:
+        if not ids:
+            return []
+
+        # Encabezados y detalles en una sola consulta (json_agg)
+        query = self._sql._consulta_listado("FROM movimientos_encabezado m WHERE m.Id = ANY(%s)", paginada=False)
+        rows = await self.conn.fetch(*argumentos(query, (list(ids),)))
+        return [self._sql._fila_listado_a_movimiento(tuple(row), paginada=False) for row in rows]
+
+    async def buscar_avanzado(self,
+                             fecha_inicio: Optional[date] = None,
+                             fecha_fin: Optional[date] = None,
+                             cuenta_id: Optional[int] = None,
+                             tercero_id: Optional[int] = None,
+                             centro_costo_id: Optional[int] = None,
+                             concepto_id: Optional[int] = None,
+                             centros_costos_excluidos: Optional[List[int]] = None,
+                             solo_pendientes: bool = False,
+                             solo_clasificados: bool = False,
+                             tipo_movimiento: Optional[str] = None,
+                             descripcion_contiene: Optional[str] = None,
+                             skip: int = 0,
+                             limit: Optional[int] = None,
+                             despues_de: Optional[Tuple[date, Decimal, int]] = None
+    ) -> tuple[List[Movimiento], int]:
+        query_full_where, params = self._sql._consulta_avanzada(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            cuenta_id=cuenta_id,
+            tercero_id=tercero_id,
+            centro_costo_id=centro_costo_id,
+            concepto_id=concepto_id,
+            centros_costos_excluidos=centros_costos_excluidos,
+            solo_pendientes=solo_pendientes,
+            solo_clasificados=solo_clasificados,
+            tipo_movimiento=tipo_movimiento,
+            descripcion_contiene=descripcion_contiene,
+            despues_de=despues_de
+        )
+
+        # Página, total y detalles en un solo viaje; LIMIT NULL = sin límite
+        query = self._sql._consulta_listado(query_full_where, paginada=True)
+        rows = await self.conn.fetch(*argumentos(query, tuple(params) + (limit, skip)))
+
+        if rows:
+            return [self._sql._fila_listado_a_movimiento(tuple(row), paginada=True) for row in rows], rows[0][12]
+
+        if not skip:
+            return [], 0
+
+        # Página fuera de rango: la función de ventana no trae filas, el total se cuenta aparte
+        return [], await self.conn.fetchval(*argumentos("SELECT COUNT(*) " + query_full_where, params))
+
+    async def resumir_busqueda_avanzada(self,
+                                       fecha_inicio: Optional[date] = None,
+                                       fecha_fin: Optional[date] = None,
+                                       cuenta_id: Optional[int] = None,
+                                       tercero_id: Optional[int] = None,
+                                       centro_costo_id: Optional[int] = None,
+                                       concepto_id: Optional[int] = None,
+                                       centros_costos_excluidos: Optional[List[int]] = None,
+                                       solo_pendientes: bool = False,
+                                       solo_clasificados: bool = False,
+                                       tipo_movimiento: Optional[str] = None,
+                                       descripcion_contiene: Optional[str] = None
+    ) -> dict:
+        query_full_where, params = self._sql._consulta_avanzada(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            cuenta_id=cuenta_id,
+            tercero_id=tercero_id,
+            centro_costo_id=centro_costo_id,
+            concepto_id=concepto_id,
+            centros_costos_excluidos=centros_costos_excluidos,
+            solo_pendientes=solo_pendientes,
+            solo_clasificados=solo_clasificados,
+            tipo_movimiento=tipo_movimiento,
+            descripcion_contiene=descripcion_contiene
+        )
+        query = f"""
+            SELECT COUNT(*),
+                   COALESCE(SUM(CASE WHEN m.Valor > 0 THEN m.Valor ELSE 0 END), 0),
+                   COALESCE(SUM(CASE WHEN m.Valor < 0 THEN -m.Valor ELSE 0 END), 0)
+            {query_full_where}
+        """
+        total, ingresos, egresos = await self.conn.fetchrow(*argumentos(query, params))
+        return {'total': total, 'ingresos': ingresos, 'egresos': egresos}
+
+    async def iterar_avanzado(self,
+                              fecha_inicio: Optional[date] = None,
+                              fecha_fin: Optional[date] = None,
+                              cuenta_id: Optional[int] = None,
+                              tercero_id: Optional[int] = None,
+                              centro_costo_id: Optional[int] = None,
+                              concepto_id: Optional[int] = None,
+                              centros_costos_excluidos: Optional[List[int]] = None,
+                              solo_pendientes: bool = False,
+                              solo_clasificados: bool = False,
+                              tipo_movimiento: Optional[str] = None,
+                              descripcion_contiene: Optional[str] = None,
+                              tamano_lote: int = 500
+    ) -> AsyncIterator[Movimiento]:
+        query_full_where, params = self._sql._consulta_avanzada(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            cuenta_id=cuenta_id,
+            tercero_id=tercero_id,
+            centro_costo_id=centro_costo_id,
+            concepto_id=concepto_id,
+            centros_costos_excluidos=centros_costos_excluidos,
+            solo_pendientes=solo_pendientes,
+            solo_clasificados=solo_clasificados,
+            tipo_movimiento=tipo_movimiento,
+            descripcion_contiene=descripcion_contiene
+        )
+        query = self._sql._consulta_listado(query_full_where, paginada=False)
+
+        # Cursor del lado del servidor (requiere transacción): las filas llegan por lotes
+        async with self.conn.transaction():
+            async for fila in self.conn.cursor(*argumentos(query, params), prefetch=tamano_lote):
+                yield self._sql._fila_listado_a_movimiento(tuple(fila), paginada=False)
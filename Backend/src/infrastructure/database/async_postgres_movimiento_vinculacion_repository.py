@@ -0,0 +1,65 @@
+from datetime import date
+from typing import List, Tuple
+
+from src.domain.models.movimiento_match import MovimientoMatch
+from src.domain.ports.movimiento_vinculacion_repository import MovimientoVinculacionRepositoryAsync
+from src.infrastructure.database.async_connection import argumentos
+from src.infrastructure.database.async_postgres_movimiento_extracto_repository import AsyncPostgresMovimientoExtractoRepository
+from src.infrastructure.database.async_postgres_movimiento_repository import AsyncPostgresMovimientoRepository
+from src.infrastructure.database.postgres_movimiento_vinculacion_repository import PostgresMovimientoVinculacionRepository
+
+
+class AsyncPostgresMovimientoVinculacionRepository(MovimientoVinculacionRepositoryAsync):
+    """
+    Lecturas de vinculaciones con asyncpg.
+
+    Mismas consultas y armado de MovimientoMatch que
+    PostgresMovimientoVinculacionRepository; solo cambia el driver.
+    """
+
+    def __init__(self, connection):
+        self.conn = connection
+        # Adaptador síncrono sin conexión: solo aporta consultas y conversión de filas
+        self._sql = PostgresMovimientoVinculacionRepository(None)
+
+    async def obtener_por_periodo(
+        self,
+        cuenta_id: int,
+        year: int,
+        month: int
+    ) -> List[MovimientoMatch]:
+        rows = [
+            tuple(row) for row in
+            await self.conn.fetch(*argumentos(self._sql._CONSULTA_POR_PERIODO, (cuenta_id, year, month)))
+        ]
+        if not rows:
+            return []
+
+        # Movimientos relacionados en bloque (sin una consulta por fila)
+        ids_extracto = list({row[2] for row in rows})
+        ids_sistema = list({row[1] for row in rows if row[1]})
+
+        extractos = {
+            m.id: m for m in await AsyncPostgresMovimientoExtractoRepository(self.conn).obtener_por_ids(ids_extracto)
+        }
+        sistemas = {}
+        if ids_sistema:
+            sistemas = {
+                m.id: m for m in await AsyncPostgresMovimientoRepository(self.conn).obtener_por_ids(ids_sistema)
+            }
+
+        return self._sql._armar_vinculaciones(rows, extractos, sistemas)
+
+    async def obtener_marca_periodo(
+        self,
+        cuenta_id: int,
+        year: int,
+        month: int,
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> Tuple:
+        row = await self.conn.fetchrow(*argumentos(
+            self._sql._CONSULTA_MARCA_PERIODO,
+            (cuenta_id, year, month, cuenta_id, fecha_inicio, fecha_fin)
+        ))
+        return tuple(row)
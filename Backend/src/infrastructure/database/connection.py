@@ -1,9 +1,12 @@
 import psycopg2
-from psycopg2 import pool
 import os
-from typing import Generator
+import threading
+from contextlib import contextmanager
+from typing import Generator, Iterator
 from dotenv import load_dotenv
 from src.infrastructure.logging.config import logger
+from src.infrastructure.database.pool_conexiones import PoolConexiones, PoolAgotadoError
+from src.domain.exceptions import DatabaseConnectionException
 
 # Cargar variables de entorno desde archivo .env
 load_dotenv()
@@ -29,7 +32,20 @@ if not DB_CONFIG['password']:
 _connection_pool = None
 
 
-def get_connection_pool() -> pool.SimpleConnectionPool:
+_connection_pool_lock = threading.Lock()
+
+
+def _conectar():
+    """Nueva conexión con los parámetros de sesión del pool"""
+    statement_timeout_ms = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '120000'))
+    opciones = {}
+    if statement_timeout_ms > 0:
+        # Se fija al conectar (sin un viaje extra); una sesión puede cambiarlo con SET LOCAL
+        opciones['options'] = f"-c statement_timeout={statement_timeout_ms}"
+    return psycopg2.connect(**DB_CONFIG, **opciones)
+
+
+def get_connection_pool() -> PoolConexiones:
     """
     Obtiene o crea el pool de conexiones global.
     
@@ -37,34 +53,47 @@ def get_connection_pool() -> pool.SimpleConnectionPool:
     imports circulares y permitir que la configuración se cargue primero.
     
     Returns:
-        SimpleConnectionPool: Pool de conexiones a PostgreSQL
+        PoolConexiones: Pool de conexiones a PostgreSQL (seguro entre hilos)
     """
     global _connection_pool
     
-    if _connection_pool is None:
-        # Configurar tamaño del pool desde variables de entorno
-        min_connections = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
-        max_connections = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
-        
-        logger.info(
-            f"Inicializando connection pool: "
-            f"min={min_connections}, max={max_connections}"
-        )
-        
-        try:
-            _connection_pool = pool.SimpleConnectionPool(
-                minconn=min_connections,
-                maxconn=max_connections,
-                **DB_CONFIG
+    with _connection_pool_lock:
+        if _connection_pool is None:
+            # Configurar tamaño del pool desde variables de entorno
+            min_connections = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+            max_connections = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+            
+            logger.info(
+                f"Inicializando connection pool: "
+                f"min={min_connections}, max={max_connections}"
             )
-            logger.info("Connection pool inicializado correctamente")
-        except psycopg2.Error as e:
-            logger.error(f"Error al inicializar connection pool: {e}")
-            raise
+            
+            try:
+                _connection_pool = PoolConexiones(
+                    _conectar,
+                    minimo=min_connections,
+                    maximo=max_connections,
+                    espera_segundos=float(os.getenv('DB_POOL_TIMEOUT_SEGUNDOS', '30')),
+                    max_edad_segundos=float(os.getenv('DB_POOL_MAX_EDAD_SEGUNDOS', '1800')),
+                    verificar_inactiva_segundos=float(os.getenv('DB_POOL_VERIFICAR_INACTIVA_SEGUNDOS', '30'))
+                )
+                logger.info("Connection pool inicializado correctamente")
+            except psycopg2.Error as e:
+                logger.error(f"Error al inicializar connection pool: {e}")
+                raise
     
     return _connection_pool
 
 
+def _prestar(connection_pool: PoolConexiones):
+    try:
+        return connection_pool.getconn()
+    except PoolAgotadoError as e:
+        # 503: el servidor está saturado, el cliente puede reintentar
+        logger.error(f"Pool de conexiones agotado: {e}")
+        raise DatabaseConnectionException(e)
+
+
 def get_db_connection() -> Generator:
     """
     Dependency provider for database connection.
@@ -76,7 +105,7 @@ def get_db_connection() -> Generator:
         psycopg2.connection: Conexión a PostgreSQL del pool
     """
     connection_pool = get_connection_pool()
-    conn = connection_pool.getconn()
+    conn = _prestar(connection_pool)
     
     try:
         yield conn
@@ -92,6 +121,28 @@ def get_db_connection() -> Generator:
         connection_pool.putconn(conn)
 
 
+@contextmanager
+def conexion_del_pool() -> Iterator:
+    """
+    Conexión del pool para usar fuera de las dependencias de FastAPI.
+    
+    Las dependencias con yield se cierran antes de enviar la respuesta, así
+    que las respuestas en streaming toman su propia conexión con esto y la
+    devuelven al terminar (o si el cliente corta la descarga).
+    """
+    connection_pool = get_connection_pool()
+    conn = _prestar(connection_pool)
+    
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        connection_pool.putconn(conn)
+
+
 def close_all_connections():
     """
     Cierra todas las conexiones del pool.
@@ -0,0 +1,249 @@
+"""
+Copia de tablas completas en CSV con COPY ... TO STDOUT / FROM STDIN
+(copy_expert).
+
+Los datos pasan en bloques entre PostgreSQL y un archivo (un miembro de un
+ZIP, un upload, un CSV en disco) sin armar listas de filas en Python, y
+cada copia informa filas, bytes y tiempo para medir el rendimiento.
+"""
+import csv
+import io
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, Sequence
+
+from psycopg2 import sql
+
+
+# Una copia completa puede tardar más que el statement_timeout de las
+# conexiones del pool; SET LOCAL lo quita solo en esta transacción
+_SIN_TIMEOUT = "SET LOCAL statement_timeout = 0"
+
+
+@dataclass
+class ResultadoCopia:
+    tabla: str
+    filas: int
+    bytes: int
+    segundos: float
+
+    def resumen(self) -> dict:
+        segundos = max(self.segundos, 1e-6)
+        return {
+            "filas": self.filas,
+            "bytes": self.bytes,
+            "segundos": round(self.segundos, 3),
+            "filas_por_segundo": round(self.filas / segundos, 1),
+            "mb_por_segundo": round(self.bytes / segundos / 1_000_000, 2),
+        }
+
+
+class _Contador(io.RawIOBase):
+    """Envoltura de un archivo binario que cuenta los bytes leídos o escritos"""
+
+    def __init__(self, archivo: BinaryIO, prefijo: bytes = b""):
+        self._archivo = archivo
+        self._prefijo = prefijo
+        self.bytes = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if self._prefijo:
+            datos, self._prefijo = self._prefijo, b""
+        else:
+            datos = self._archivo.read(size)
+        self.bytes += len(datos)
+        return datos
+
+    def readline(self, size: int = -1) -> bytes:
+        if self._prefijo:
+            return self.read()
+        datos = self._archivo.readline(size)
+        self.bytes += len(datos)
+        return datos
+
+    def write(self, datos) -> int:
+        self.bytes += len(datos)
+        return self._archivo.write(datos)
+
+
+class _LectorLineas(io.RawIOBase):
+    """Archivo de lectura sobre un iterador de bloques de bytes (para COPY FROM)"""
+
+    def __init__(self, bloques: Iterator[bytes]):
+        self._bloques = bloques
+        self._pendiente = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._pendiente:
+            try:
+                self._pendiente = next(self._bloques)
+            except StopIteration:
+                return b""
+        if size is None or size < 0:
+            size = len(self._pendiente)
+        datos, self._pendiente = self._pendiente[:size], self._pendiente[size:]
+        return datos
+
+    readline = read
+
+
+def _columnas(cursor, tabla: str):
+    cursor.execute(
+        "SELECT column_name, is_generated = 'ALWAYS' FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s ORDER BY ordinal_position",
+        (tabla,)
+    )
+    columnas = {}
+    for nombre, generada in cursor.fetchall():
+        columnas[nombre.lower()] = generada
+    return columnas
+
+
+def _sin_columnas(lineas: Iterator[bytes], quitar: List[int]) -> Iterator[bytes]:
+    """Filas CSV sin las columnas de índices `quitar`, una a una"""
+    texto = io.TextIOWrapper(_LectorLineas(lineas), encoding="utf-8", newline="")
+    salida = io.StringIO()
+    writer = csv.writer(salida)
+    for fila in csv.reader(texto):
+        writer.writerow([v for i, v in enumerate(fila) if i not in quitar])
+        yield salida.getvalue().encode("utf-8")
+        salida.seek(0)
+        salida.truncate()
+
+
+def _filas_copiadas(cursor, fuente: sql.Composable) -> int:
+    """Filas de la última COPY (rowcount, o un conteo si el driver no lo informa)"""
+    if cursor.rowcount >= 0:
+        return cursor.rowcount
+    cursor.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(fuente))
+    return cursor.fetchone()[0]
+
+
+def exportar_tabla(
+    conn, tabla: str, destino: BinaryIO, consulta: Optional[sql.Composable] = None
+) -> ResultadoCopia:
+    """
+    Escribe la tabla completa como CSV con encabezado en `destino`
+    (archivo binario). Las columnas generadas no se incluyen.
+
+    Con `consulta` (un SELECT) se copia su resultado en lugar de la tabla.
+    """
+    if consulta is None:
+        copia = conteo = sql.Identifier(tabla)
+    else:
+        copia = sql.SQL("({})").format(consulta)
+        conteo = sql.SQL("({}) AS consulta").format(consulta)
+    contador = _Contador(destino)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_SIN_TIMEOUT)
+        inicio = time.perf_counter()
+        cursor.copy_expert(
+            sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER true)").format(copia),
+            contador
+        )
+        segundos = time.perf_counter() - inicio
+        return ResultadoCopia(tabla, _filas_copiadas(cursor, conteo), contador.bytes, segundos)
+    finally:
+        cursor.close()
+
+
+def reemplazar_tabla(
+    conn, tabla: str, origen: BinaryIO, llave: Optional[Sequence[str]] = None
+) -> Optional[ResultadoCopia]:
+    """
+    Reemplaza el contenido de la tabla con el CSV (con encabezado) de
+    `origen`, dentro de la transacción de `conn` (no hace commit).
+
+    - Sin filas de datos no se toca la tabla y se retorna None.
+    - Las columnas generadas que traen los respaldos antiguos se descartan
+      fila a fila; una columna que la tabla no tiene es un error.
+    - Los triggers se deshabilitan durante la carga si los permisos lo
+      permiten (si no, se carga igual).
+    - Con `llave` (columnas de un índice único) no se borra la tabla: las
+      filas se insertan o actualizan por esa llave y las demás se conservan.
+      Es para tablas con hijas ON DELETE CASCADE que no se restauran con
+      ella (con los triggers activos, el DELETE las borraría).
+
+    Raises:
+        ValueError: Si el encabezado tiene columnas que no existen en la tabla
+    """
+    encabezado = origen.readline()
+    primera = origen.readline()
+    if not primera.strip():
+        return None
+
+    header = next(csv.reader([encabezado.decode("utf-8-sig")]))
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_SIN_TIMEOUT)
+        columnas = _columnas(cursor, tabla)
+        desconocidas = [c for c in header if c.lower() not in columnas]
+        if desconocidas:
+            raise ValueError(f"Columnas desconocidas para {tabla}: {', '.join(desconocidas)}")
+        quitar = [i for i, c in enumerate(header) if columnas[c.lower()]]
+        destino = [c.lower() for i, c in enumerate(header) if i not in quitar]
+        lista = sql.SQL(", ").join(sql.Identifier(c) for c in destino)
+
+        triggers_deshabilitados = False
+        if llave:
+            # Las filas se cargan en una tabla temporal y se pasan con ON CONFLICT
+            copia = sql.SQL("pg_temp.{}").format(sql.Identifier(f"_restaurar_{tabla}"))
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(copia))
+            cursor.execute(
+                sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(
+                    copia, lista, sql.Identifier(tabla)
+                )
+            )
+        else:
+            copia = sql.Identifier(tabla)
+            # Un fallo por permisos no debe abortar la transacción (ni lo ya cargado)
+            cursor.execute("SAVEPOINT sin_triggers")
+            try:
+                cursor.execute(sql.SQL("ALTER TABLE {} DISABLE TRIGGER ALL").format(sql.Identifier(tabla)))
+                triggers_deshabilitados = True
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT sin_triggers")
+            cursor.execute("RELEASE SAVEPOINT sin_triggers")
+
+            cursor.execute(sql.SQL("DELETE FROM {}").format(sql.Identifier(tabla)))
+
+        contador = _Contador(origen, prefijo=primera)
+        datos: BinaryIO = contador
+        if quitar:
+            datos = _LectorLineas(_sin_columnas(iter(lambda: contador.read(64 * 1024), b""), quitar))
+
+        inicio = time.perf_counter()
+        cursor.copy_expert(
+            sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(copia, lista),
+            datos
+        )
+        filas = _filas_copiadas(cursor, copia)
+        if llave:
+            actualizar = [c for c in destino if c not in {k.lower() for k in llave}]
+            conflicto = sql.SQL("DO UPDATE SET {}").format(sql.SQL(", ").join(
+                sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c)) for c in actualizar
+            )) if actualizar else sql.SQL("DO NOTHING")
+            cursor.execute(
+                sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} ON CONFLICT ({}) {}").format(
+                    sql.Identifier(tabla), lista, lista, copia,
+                    sql.SQL(", ").join(sql.Identifier(k.lower()) for k in llave), conflicto
+                )
+            )
+        segundos = time.perf_counter() - inicio
+        resultado = ResultadoCopia(tabla, filas, len(encabezado) + contador.bytes, segundos)
+
+        if triggers_deshabilitados:
+            cursor.execute(sql.SQL("ALTER TABLE {} ENABLE TRIGGER ALL").format(sql.Identifier(tabla)))
+        return resultado
+    finally:
+        cursor.close()
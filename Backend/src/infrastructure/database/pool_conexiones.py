@@ -0,0 +1,279 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+from src.infrastructure.logging.config import logger
+
+
+class PoolAgotadoError(pool.PoolError):
+    """No se liberó ninguna conexión dentro del tiempo de espera"""
+
+
+class _Entrada:
+    """Conexión del pool con sus marcas de tiempo (time.monotonic)"""
+
+    __slots__ = ("conn", "creada", "devuelta", "tomada")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.creada = time.monotonic()
+        self.devuelta = self.creada
+        self.tomada = 0.0
+
+
+def _percentil(muestras: Deque[float], p: float) -> float:
+    if not muestras:
+        return 0.0
+    ordenadas = sorted(muestras)
+    return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))]
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones psycopg2 seguro entre hilos.
+
+    Mismo contrato que psycopg2.pool (getconn / putconn / closeall), con:
+
+    - Espera acotada: sin conexiones libres y con `maximo` abiertas,
+      getconn() espera a que se devuelva una hasta `espera_segundos` y
+      luego lanza PoolAgotadoError (SimpleConnectionPool falla de inmediato
+      y no es seguro entre hilos, y los endpoints síncronos corren en el
+      threadpool de FastAPI).
+    - Verificación al prestar: una conexión cerrada, más vieja que
+      `max_edad_segundos` o que falla un `SELECT 1` (solo si estuvo
+      inactiva `verificar_inactiva_segundos` o más) se descarta y se
+      entrega otra.
+    - Métricas: espera por una conexión, conexiones en uso y duración de
+      cada préstamo (ver metricas()).
+
+    Las conexiones se crean con `conectar()`, que fija parámetros de sesión
+    como statement_timeout.
+    """
+
+    def __init__(
+        self,
+        conectar: Callable[[], Any],
+        minimo: int = 1,
+        maximo: int = 10,
+        espera_segundos: float = 30.0,
+        max_edad_segundos: Optional[float] = 1800,
+        verificar_inactiva_segundos: float = 30.0,
+        muestras: int = 1024
+    ):
+        if maximo < 1 or minimo > maximo:
+            raise ValueError(f"Tamaño de pool inválido: min={minimo}, max={maximo}")
+        self._conectar = conectar
+        self.minimo = minimo
+        self.maximo = maximo
+        self.espera_segundos = espera_segundos
+        self.max_edad_segundos = max_edad_segundos
+        self.verificar_inactiva_segundos = verificar_inactiva_segundos
+
+        self._cond = threading.Condition()
+        # Pila: se reutiliza la conexión devuelta más recientemente
+        self._libres: List[_Entrada] = []
+        self._en_uso: Dict[int, _Entrada] = {}
+        # Conexiones abiertas más las que se están abriendo
+        self._abiertas = 0
+        self._esperando = 0
+        self._cerrado = False
+
+        self._prestamos = 0
+        self._esperas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        self._agotados = 0
+        self._uso_total = 0.0
+        self._uso_max = 0.0
+        self._devoluciones = 0
+        self._creadas = 0
+        self._recicladas = 0
+        self._descartadas = 0
+        self._muestras_espera: Deque[float] = deque(maxlen=muestras)
+        self._muestras_uso: Deque[float] = deque(maxlen=muestras)
+
+        for _ in range(minimo):
+            self._libres.append(self._nueva())
+            self._abiertas += 1
+
+    def _nueva(self) -> _Entrada:
+        entrada = _Entrada(self._conectar())
+        with self._cond:
+            self._creadas += 1
+        return entrada
+
+    def getconn(self, timeout: Optional[float] = None):
+        """
+        Presta una conexión sana.
+
+        Raises:
+            PoolAgotadoError: Si no se liberó ninguna en `timeout` segundos
+                (por defecto `espera_segundos`)
+            psycopg2.pool.PoolError: Si el pool está cerrado
+        """
+        espera = self.espera_segundos if timeout is None else timeout
+        inicio = time.monotonic()
+        limite = inicio + espera
+
+        while True:
+            entrada = None
+            with self._cond:
+                while True:
+                    if self._cerrado:
+                        raise pool.PoolError("connection pool is closed")
+                    if self._libres:
+                        entrada = self._libres.pop()
+                        break
+                    if self._abiertas < self.maximo:
+                        # Se abre una nueva fuera del lock
+                        self._abiertas += 1
+                        break
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._agotados += 1
+                        raise PoolAgotadoError(
+                            f"Las {self.maximo} conexiones del pool siguen en uso tras esperar {espera:g}s"
+                        )
+                    self._esperando += 1
+                    try:
+                        self._cond.wait(restante)
+                    finally:
+                        self._esperando -= 1
+
+            if entrada is None:
+                try:
+                    entrada = self._nueva()
+                except Exception:
+                    with self._cond:
+                        self._abiertas -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._sana(entrada):
+                self._descartar(entrada)
+                continue
+
+            ahora = time.monotonic()
+            esperado = ahora - inicio
+            entrada.tomada = ahora
+            with self._cond:
+                self._en_uso[id(entrada.conn)] = entrada
+                self._prestamos += 1
+                self._espera_total += esperado
+                self._espera_max = max(self._espera_max, esperado)
+                self._muestras_espera.append(esperado)
+                if esperado >= 0.001:
+                    self._esperas += 1
+            return entrada.conn
+
+    def _sana(self, entrada: _Entrada) -> bool:
+        conn = entrada.conn
+        if conn.closed:
+            return False
+        ahora = time.monotonic()
+        if self.max_edad_segundos is not None and ahora - entrada.creada > self.max_edad_segundos:
+            with self._cond:
+                self._recicladas += 1
+            return False
+        if ahora - entrada.devuelta >= self.verificar_inactiva_segundos:
+            # Inactiva un rato: el servidor pudo cerrarla (reinicio, idle timeout, red)
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.close()
+                conn.rollback()
+            except psycopg2.Error as e:
+                logger.warning(f"Conexión del pool descartada al verificarla: {e}")
+                return False
+        return True
+
+    def _descartar(self, entrada: _Entrada) -> None:
+        try:
+            entrada.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._abiertas -= 1
+            self._descartadas += 1
+            self._cond.notify()
+
+    def putconn(self, conn, close: bool = False) -> None:
+        """
+        Devuelve una conexión prestada. Una transacción abierta se deshace;
+        si la conexión está rota, cerrada o `close` es True, se descarta.
+        """
+        with self._cond:
+            entrada = self._en_uso.pop(id(conn), None)
+        if entrada is None:
+            raise pool.PoolError("trying to put unkeyed connection")
+
+        ahora = time.monotonic()
+        usado = ahora - entrada.tomada
+        with self._cond:
+            self._devoluciones += 1
+            self._uso_total += usado
+            self._uso_max = max(self._uso_max, usado)
+            self._muestras_uso.append(usado)
+
+        descartar = close or self._cerrado or conn.closed
+        if not descartar and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                descartar = True
+        if descartar:
+            self._descartar(entrada)
+            return
+
+        entrada.devuelta = ahora
+        with self._cond:
+            if self._cerrado:
+                cerrar = True
+            else:
+                cerrar = False
+                self._libres.append(entrada)
+                self._cond.notify()
+        if cerrar:
+            self._descartar(entrada)
+
+    def closeall(self) -> None:
+        """Cierra las conexiones libres; las prestadas se cierran al devolverlas"""
+        with self._cond:
+            self._cerrado = True
+            libres, self._libres = self._libres, []
+            self._cond.notify_all()
+        for entrada in libres:
+            self._descartar(entrada)
+
+    def metricas(self) -> Dict[str, Any]:
+        """Estado y contadores del pool desde su creación (tiempos en ms)"""
+        ahora = time.monotonic()
+        with self._cond:
+            prestamos = self._prestamos
+            devoluciones = self._devoluciones
+            prestamo_mas_largo = max((ahora - e.tomada for e in self._en_uso.values()), default=0.0)
+            return {
+                'minimo': self.minimo,
+                'maximo': self.maximo,
+                'abiertas': self._abiertas,
+                'en_uso': len(self._en_uso),
+                'libres': len(self._libres),
+                'esperando': self._esperando,
+                'prestamos': prestamos,
+                'prestamos_con_espera': self._esperas,
+                'agotados': self._agotados,
+                'espera_promedio_ms': round(1000 * self._espera_total / prestamos, 3) if prestamos else 0.0,
+                'espera_p95_ms': round(1000 * _percentil(self._muestras_espera, 0.95), 3),
+                'espera_max_ms': round(1000 * self._espera_max, 3),
+                'uso_promedio_ms': round(1000 * self._uso_total / devoluciones, 3) if devoluciones else 0.0,
+                'uso_p95_ms': round(1000 * _percentil(self._muestras_uso, 0.95), 3),
+                'uso_max_ms': round(1000 * self._uso_max, 3),
+                # Un préstamo muy largo en curso suele ser una conexión que no se devolvió
+                'prestamo_en_curso_max_ms': round(1000 * prestamo_mas_largo, 3),
+                'creadas': self._creadas,
+                'recicladas': self._recicladas,
+                'descartadas': self._descartadas,
+            }
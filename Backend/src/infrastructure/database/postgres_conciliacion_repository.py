@@ -1,6 +1,7 @@
-from typing import Optional
+from typing import Iterable, Optional, Tuple
 from decimal import Decimal
 import json
+import psycopg2.extras
 from src.domain.models.conciliacion import Conciliacion
 from src.domain.ports.conciliacion_repository import ConciliacionRepository
 from datetime import date
@@ -258,6 +259,115 @@ class PostgresConciliacionRepository(ConciliacionRepository):
         finally:
             cursor.close()
 
+    def recalcular_sistema_lote(self, periodos: Optional[Iterable[Tuple[int, int, int]]] = None) -> int:
+        """
+        Como recalcular_sistema (mes completo) para muchos periodos a la vez:
+        una consulta agrupada calcula las sumas de todos los periodos y un
+        solo UPDATE ... FROM (VALUES ...) aplica sistema_* y el estado.
+
+        Antes sincroniza los totales del extracto de esos periodos con
+        movimientos_extracto en un solo UPDATE (la misma regla de
+        _verificar_y_sincronizar_extracto), porque el saldo final del sistema
+        y el estado dependen de ellos.
+
+        Args:
+            periodos: (cuenta_id, year, month) a recalcular; None = todas las
+                conciliaciones existentes.
+
+        Returns:
+            Número de conciliaciones actualizadas (los periodos sin
+            conciliación se ignoran, como en recalcular_sistema).
+        """
+        cursor = self.conn.cursor()
+        try:
+            if periodos is None:
+                origen, params = "SELECT cuenta_id, year, month FROM conciliaciones", []
+            else:
+                periodos = sorted({(c, y, m) for c, y, m in periodos if c is not None})
+                if not periodos:
+                    return 0
+                origen = "VALUES " + ", ".join(["(%s::integer, %s::integer, %s::integer)"] * len(periodos))
+                params = [v for p in periodos for v in p]
+
+            # 1. Totales del extracto desde movimientos_extracto; sin movimientos
+            #    de extracto el saldo anterior también queda en 0
+            cursor.execute(f"""
+                UPDATE conciliaciones c
+                SET
+                    extracto_saldo_anterior = CASE WHEN e.entradas = 0 AND e.salidas = 0
+                                                   THEN 0 ELSE c.extracto_saldo_anterior END,
+                    extracto_entradas = e.entradas,
+                    extracto_salidas = e.salidas,
+                    extracto_saldo_final = CASE WHEN e.entradas = 0 AND e.salidas = 0
+                                                THEN 0 ELSE c.extracto_saldo_anterior END + e.entradas - e.salidas,
+                    updated_at = CURRENT_TIMESTAMP
+                FROM (
+                    SELECT p.cuenta_id, p.year, p.month,
+                           COALESCE(SUM(CASE WHEN (x.valor + COALESCE(x.usd, 0)) > 0 THEN (x.valor + COALESCE(x.usd, 0)) ELSE 0 END), 0) as entradas,
+                           COALESCE(SUM(CASE WHEN (x.valor + COALESCE(x.usd, 0)) < 0 THEN ABS(x.valor + COALESCE(x.usd, 0)) ELSE 0 END), 0) as salidas
+                    FROM ({origen}) AS p(cuenta_id, year, month)
+                    LEFT JOIN movimientos_extracto x
+                           ON x.cuenta_id = p.cuenta_id AND x.year = p.year AND x.month = p.month
+                    GROUP BY p.cuenta_id, p.year, p.month
+                ) e
+                WHERE c.cuenta_id = e.cuenta_id AND c.year = e.year AND c.month = e.month
+                  AND (ABS(c.extracto_entradas - e.entradas) > 0.01
+                       OR ABS(c.extracto_salidas - e.salidas) > 0.01
+                       OR (e.entradas = 0 AND e.salidas = 0 AND c.extracto_saldo_anterior <> 0))
+            """, params)
+
+            # 2. Sumas de todos los periodos en una sola consulta (mes completo por rango de fechas)
+            cursor.execute(f"""
+                SELECT p.cuenta_id, p.year, p.month,
+                       COALESCE(SUM(CASE WHEN m.Valor > 0 THEN m.Valor ELSE 0 END), 0) as entradas,
+                       COALESCE(SUM(CASE WHEN m.Valor < 0 THEN ABS(m.Valor) ELSE 0 END), 0) as salidas
+                FROM ({origen}) AS p(cuenta_id, year, month)
+                LEFT JOIN movimientos_encabezado m
+                       ON m.cuentaid = p.cuenta_id
+                      AND m.fecha >= make_date(p.year, p.month, 1)
+                      AND m.fecha < (make_date(p.year, p.month, 1) + INTERVAL '1 month')::date
+                GROUP BY p.cuenta_id, p.year, p.month
+            """, params)
+            sumas = cursor.fetchall()
+            if not sumas:
+                return 0
+
+            # 3. Un solo UPDATE con la misma regla de estado que recalcular_sistema
+            actualizadas = psycopg2.extras.execute_values(
+                cursor,
+                """
+                    UPDATE conciliaciones c
+                    SET
+                        sistema_entradas = v.entradas,
+                        sistema_salidas = v.salidas,
+                        sistema_saldo_final = (COALESCE(c.extracto_saldo_anterior, 0) + v.entradas - v.salidas),
+                        estado = CASE
+                            WHEN c.estado = 'CONCILIADO' THEN 'CONCILIADO'
+                            WHEN ABS(v.entradas - COALESCE(c.extracto_entradas, 0)) < 0.01
+                                 AND ABS(v.salidas - COALESCE(c.extracto_salidas, 0)) < 0.01
+                                 AND ABS((COALESCE(c.extracto_saldo_anterior, 0) + v.entradas - v.salidas) - c.extracto_saldo_final) < 0.01
+                            THEN 'CUADRADO'
+                            ELSE 'PENDIENTE'
+                        END,
+                        updated_at = CURRENT_TIMESTAMP
+                    FROM (VALUES %s) AS v(cuenta_id, year, month, entradas, salidas)
+                    WHERE c.cuenta_id = v.cuenta_id AND c.year = v.year AND c.month = v.month
+                    RETURNING c.id
+                """,
+                sumas,
+                template="(%s::integer, %s::integer, %s::integer, %s::numeric, %s::numeric)",
+                page_size=len(sumas),
+                fetch=True
+            )
+            self.conn.commit()
+            return len(actualizadas)
+
+        except Exception as e:
+            self.conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+
     def cerrar_periodo(self, cuenta_id: int, year: int, month: int) -> Conciliacion:
         """Cambia el estado a CONCILIADO si la diferencia es cero"""
         cursor = self.conn.cursor()
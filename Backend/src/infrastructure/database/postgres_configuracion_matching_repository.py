@@ -2,7 +2,7 @@ from typing import Optional
 from datetime import datetime
 from decimal import Decimal
 import psycopg2
-from src.domain.models.configuracion_matching import ConfiguracionMatching
+from src.domain.models.configuracion_matching import ConfiguracionMatching, ModoAsignacion
 from src.domain.ports.configuracion_matching_repository import ConfiguracionMatchingRepository
 
 
@@ -25,7 +25,7 @@ class PostgresConfiguracionMatchingRepository(ConfiguracionMatchingRepository):
         id, tolerancia_valor, similitud_descripcion_minima,
         peso_fecha, peso_valor, peso_descripcion,
         score_minimo_exacto, score_minimo_probable,
-        activo, created_at, updated_at
+        activo, created_at, updated_at, modo_asignacion
         """
         return ConfiguracionMatching(
             id=row[0],
@@ -38,7 +38,8 @@ class PostgresConfiguracionMatchingRepository(ConfiguracionMatchingRepository):
             score_minimo_probable=Decimal(str(row[7])) if row[7] is not None else Decimal('0.70'),
             activo=row[8] if row[8] is not None else True,
             created_at=row[9] if row[9] is not None else None,
-            updated_at=row[10] if row[10] is not None else None
+            updated_at=row[10] if row[10] is not None else None,
+            modo_asignacion=row[11] if len(row) > 11 and row[11] is not None else ModoAsignacion.GREEDY
         )
     
     def obtener_activa(self) -> ConfiguracionMatching:
@@ -57,7 +58,7 @@ class PostgresConfiguracionMatchingRepository(ConfiguracionMatchingRepository):
                 SELECT id, tolerancia_valor, similitud_descripcion_minima,
                        peso_fecha, peso_valor, peso_descripcion,
                        score_minimo_exacto, score_minimo_probable,
-                       activo, created_at, updated_at
+                       activo, created_at, updated_at, modo_asignacion
                 FROM configuracion_matching
                 WHERE activo = TRUE
                 LIMIT 1
@@ -92,7 +93,7 @@ class PostgresConfiguracionMatchingRepository(ConfiguracionMatchingRepository):
                 SELECT id, tolerancia_valor, similitud_descripcion_minima,
                        peso_fecha, peso_valor, peso_descripcion,
                        score_minimo_exacto, score_minimo_probable,
-                       activo, created_at, updated_at
+                       activo, created_at, updated_at, modo_asignacion
                 FROM configuracion_matching
                 WHERE id = %s
             """
@@ -134,8 +135,9 @@ class PostgresConfiguracionMatchingRepository(ConfiguracionMatchingRepository):
                     peso_descripcion,
                     score_minimo_exacto,
                     score_minimo_probable,
-                    activo
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    activo,
+                    modo_asignacion
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 RETURNING id, created_at, updated_at
             """
             
@@ -147,7 +149,8 @@ class PostgresConfiguracionMatchingRepository(ConfiguracionMatchingRepository):
                 float(config.peso_descripcion),
                 float(config.score_minimo_exacto),
                 float(config.score_minimo_probable),
-                config.activo
+                config.activo,
+                config.modo_asignacion.value
             ))
             
             result = cursor.fetchone()
@@ -201,6 +204,7 @@ class PostgresConfiguracionMatchingRepository(ConfiguracionMatchingRepository):
                     score_minimo_exacto = %s,
                     score_minimo_probable = %s,
                     activo = %s,
+                    modo_asignacion = %s,
                     updated_at = CURRENT_TIMESTAMP
                 WHERE id = %s
                 RETURNING updated_at
@@ -215,6 +219,7 @@ class PostgresConfiguracionMatchingRepository(ConfiguracionMatchingRepository):
                 float(config.score_minimo_exacto),
                 float(config.score_minimo_probable),
                 config.activo,
+                config.modo_asignacion.value,
                 config.id
             ))
             
@@ -1,13 +1,34 @@
 from typing import List, Optional
 from src.domain.models.movimiento_extracto import MovimientoExtracto
 from src.domain.ports.movimiento_extracto_repository import MovimientoExtractoRepository
+from src.domain.services.lecturas_periodo import CacheLecturasPeriodo
 class PostgresMovimientoExtractoRepository(MovimientoExtractoRepository):
     """
     Implementación PostgreSQL del repositorio de Movimientos de Extracto.
     """
     
-    def __init__(self, connection):
+    # Columnas de _row_to_movimiento (con el nombre de la cuenta)
+    _SELECT = """
+        SELECT 
+            me.id, me.cuenta_id, me.year, me.month, me.fecha,
+            me.descripcion, me.referencia, me.valor, me.usd, me.trm,
+            me.numero_linea, me.raw_text, me.created_at,
+            c.cuenta
+        FROM movimientos_extracto me
+        JOIN cuentas c ON me.cuenta_id = c.cuentaid
+    """
+    _CONSULTA_POR_PERIODO = _SELECT + """
+        WHERE me.cuenta_id = %s AND me.year = %s AND me.month = %s
+        ORDER BY me.fecha, me.numero_linea
+    """
+    _CONSULTA_POR_IDS = _SELECT + """
+        WHERE me.id = ANY(%s)
+    """
+    
+    def __init__(self, connection, lecturas_periodo: Optional[CacheLecturasPeriodo] = None):
         self.conn = connection
+        # Modelos de lectura por periodo a invalidar después de cada escritura
+        self.lecturas_periodo = lecturas_periodo
     
     def _row_to_movimiento(self, row) -> MovimientoExtracto:
         """Convierte una fila de BD a MovimientoExtracto"""
@@ -53,6 +74,8 @@ class PostgresMovimientoExtractoRepository(MovimientoExtractoRepository):
             movimiento.created_at = result[1]
             
             self.conn.commit()
+            if self.lecturas_periodo:
+                self.lecturas_periodo.invalidar_periodo(movimiento.cuenta_id, movimiento.year, movimiento.month)
             return movimiento
             
         except Exception as e:
@@ -83,6 +106,9 @@ class PostgresMovimientoExtractoRepository(MovimientoExtractoRepository):
             cursor.executemany(query, data)
             count = cursor.rowcount
             self.conn.commit()
+            if self.lecturas_periodo:
+                for cuenta_id, year, month in {(m.cuenta_id, m.year, m.month) for m in movimientos}:
+                    self.lecturas_periodo.invalidar_periodo(cuenta_id, year, month)
             
             return count
             
@@ -94,19 +120,7 @@ class PostgresMovimientoExtractoRepository(MovimientoExtractoRepository):
     
     def obtener_por_periodo(self, cuenta_id: int, year: int, month: int) -> List[MovimientoExtracto]:
         cursor = self.conn.cursor()
-        query = """
-            SELECT 
-                me.id, me.cuenta_id, me.year, me.month, me.fecha,
-                me.descripcion, me.referencia, me.valor, me.usd, me.trm,
-                me.numero_linea, me.raw_text, me.created_at,
-                c.cuenta
-            FROM movimientos_extracto me
-
-            JOIN cuentas c ON me.cuenta_id = c.cuentaid
-            WHERE me.cuenta_id = %s AND me.year = %s AND me.month = %s
-            ORDER BY me.fecha, me.numero_linea
-        """
-        cursor.execute(query, (cuenta_id, year, month))
+        cursor.execute(self._CONSULTA_POR_PERIODO, (cuenta_id, year, month))
         rows = cursor.fetchall()
         cursor.close()
         
@@ -122,6 +136,8 @@ class PostgresMovimientoExtractoRepository(MovimientoExtractoRepository):
             cursor.execute(query, (cuenta_id, year, month))
             count = cursor.rowcount
             self.conn.commit()
+            if self.lecturas_periodo:
+                self.lecturas_periodo.invalidar_periodo(cuenta_id, year, month)
             return count
             
         except Exception as e:
@@ -132,14 +148,7 @@ class PostgresMovimientoExtractoRepository(MovimientoExtractoRepository):
     
     def obtener_por_id(self, id: int) -> Optional[MovimientoExtracto]:
         cursor = self.conn.cursor()
-        query = """
-            SELECT 
-                me.id, me.cuenta_id, me.year, me.month, me.fecha,
-                me.descripcion, me.referencia, me.valor, me.usd, me.trm,
-                me.numero_linea, me.raw_text, me.created_at,
-                c.cuenta
-            FROM movimientos_extracto me
-            JOIN cuentas c ON me.cuenta_id = c.cuentaid
+        query = self._SELECT + """
             WHERE me.id = %s
         """
         cursor.execute(query, (id,))
@@ -148,6 +157,17 @@ class PostgresMovimientoExtractoRepository(MovimientoExtractoRepository):
         
         return self._row_to_movimiento(row)
     
+    def obtener_por_ids(self, ids: List[int]) -> List[MovimientoExtracto]:
+        if not ids:
+            return []
+        
+        cursor = self.conn.cursor()
+        cursor.execute(self._CONSULTA_POR_IDS, (list(ids),))
+        rows = cursor.fetchall()
+        cursor.close()
+        
+        return [self._row_to_movimiento(row) for row in rows]
+    
     def contar_por_periodo(self, cuenta_id: int, year: int, month: int) -> int:
         cursor = self.conn.cursor()
         query = """
@@ -1,11 +1,18 @@
-from typing import List, Optional
-from datetime import date
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import date, datetime
 from decimal import Decimal
+import uuid
 import psycopg2
+import psycopg2.extras
 from src.domain.models.movimiento import Movimiento
 from src.domain.models.movimiento_detalle import MovimientoDetalle
 from src.domain.ports.movimiento_repository import MovimientoRepository
+from src.domain.services.indice_movimientos_existentes import IndiceMovimientosExistentes, MovimientoExistente
+from src.domain.services.indice_descripciones import CacheIndiceDescripciones, EntradaDescripcion, IndiceDescripciones
+from src.domain.services.lecturas_periodo import CacheLecturasPeriodo
 from src.infrastructure.database.postgres_conciliacion_repository import PostgresConciliacionRepository
+from src.infrastructure.database import resumen_mensual
+from src.infrastructure.logging.config import logger
 
 class PostgresMovimientoRepository(MovimientoRepository):
     """
@@ -14,12 +21,29 @@ class PostgresMovimientoRepository(MovimientoRepository):
     
     
 
-    def __init__(self, connection):
+    def __init__(
+        self,
+        connection,
+        indice_descripciones: Optional[CacheIndiceDescripciones] = None,
+        lecturas_periodo: Optional[CacheLecturasPeriodo] = None
+    ):
         self.conn = connection
+        # Índice de descripciones del proceso (sugerencias); se actualiza con cada escritura
+        self.indice_descripciones = indice_descripciones
+        # Modelos de lectura de la conciliación por periodo; se invalidan con cada escritura
+        self.lecturas_periodo = lecturas_periodo
         # Instanciar repositorio de conciliacion "on-the-fly" usando la misma conexión
         # Esto evita inyeccion compleja en este punto, manteniendo el coupling aceptable para un hook
         self.conciliacion_repo = PostgresConciliacionRepository(connection)
 
+    def _invalidar_lecturas(self) -> None:
+        """
+        Un movimiento puede estar vinculado al extracto de cualquier periodo
+        (traslados, cheques cobrados en otra fecha): se invalidan todos.
+        """
+        if self.lecturas_periodo:
+            self.lecturas_periodo.invalidar()
+
     def _get_ids_traslados(self) -> tuple[Optional[int], Optional[int]]:
         """Busca dinámicamente el ID de centro_costo y concepto para 'Traslados'"""
         cursor = self.conn.cursor()
@@ -52,16 +76,24 @@ class PostgresMovimientoRepository(MovimientoRepository):
                            solo_pendientes: bool = False,
                            solo_clasificados: bool = False,
                            tipo_movimiento: Optional[str] = None,
-                           descripcion_contiene: Optional[str] = None
+                           descripcion_contiene: Optional[str] = None,
+                           detalle_en_exists: bool = False
     ) -> tuple[str, list]:
         """
         Construye la cláusula WHERE y los parámetros para los filtros comunes.
         Asume que la consulta base tiene JOINs con:
         m (movimientos_encabezado)
         md (movimientos_detalle) - REQUIRED for classification filters
+
+        Con detalle_en_exists=True la consulta base solo necesita m: los filtros
+        de detalle van en un EXISTS con la misma semántica del LEFT JOIN (un
+        movimiento sin detalles se evalúa contra una fila de detalle nula).
         """
         conditions = []
         params = []
+        # Condiciones sobre el detalle (md), con sus parámetros aparte
+        condiciones_detalle = []
+        params_detalle = []
         
         if fecha_inicio:
             conditions.append("m.Fecha >= %s")
@@ -80,19 +112,19 @@ class PostgresMovimientoRepository(MovimientoRepository):
         
         # Centro de Costo y Concepto siguen siendo del DETALLE (md)
         if centro_costo_id:
-            conditions.append("md.centro_costo_id = %s")
-            params.append(centro_costo_id)
+            condiciones_detalle.append("md.centro_costo_id = %s")
+            params_detalle.append(centro_costo_id)
         if concepto_id:
-            conditions.append("md.ConceptoID = %s")
-            params.append(concepto_id)
+            condiciones_detalle.append("md.ConceptoID = %s")
+            params_detalle.append(concepto_id)
              
         if centros_costos_excluidos and len(centros_costos_excluidos) > 0:
-            conditions.append("(md.centro_costo_id IS NULL OR md.centro_costo_id NOT IN %s)")
-            params.append(tuple(centros_costos_excluidos))
+            condiciones_detalle.append("(md.centro_costo_id IS NULL OR md.centro_costo_id NOT IN %s)")
+            params_detalle.append(tuple(centros_costos_excluidos))
              
         if solo_pendientes:
             # Pendiente si el tercero en el encabezado es nulo O si alguno de los campos clave en detalle es nulo
-            conditions.append("(m.terceroid IS NULL OR md.id IS NULL OR md.centro_costo_id IS NULL OR md.ConceptoID IS NULL)")
+            condiciones_detalle.append("(m.terceroid IS NULL OR md.id IS NULL OR md.centro_costo_id IS NULL OR md.ConceptoID IS NULL)")
             
         if tipo_movimiento:
             if tipo_movimiento == 'ingresos':
@@ -101,25 +133,73 @@ class PostgresMovimientoRepository(MovimientoRepository):
                 conditions.append("m.Valor < 0")
         
         if descripcion_contiene:
-            conditions.append("m.Descripcion ILIKE %s")
+            # descripcion_busqueda = UPPER(Descripcion), con índice trigram (pg_trgm)
+            conditions.append("m.descripcion_busqueda LIKE UPPER(%s)")
             params.append(f"%{descripcion_contiene}%")
         
-        if not conditions:
+        if not conditions and not condiciones_detalle:
             return "", []
             
-        if solo_pendientes:
-            # Pendiente si el tercero en el encabezado es nulo O si alguno de los campos clave en detalle es nulo
-            conditions.append("(m.terceroid IS NULL OR md.id IS NULL OR md.centro_costo_id IS NULL OR md.ConceptoID IS NULL)")
-            
         if solo_clasificados:
              # Clasificado si tiene tercero en encabezado (vieja logica) Y detalle completo? 
              # O simplemente lo inverso a pendiente?
              # Definición de Clasificado: Tiene Centro de Costo Y Concepto asignados (Tercero ahora está en encabezado, pero puede ser nulo en algunos casos validos? No, asumimos que clasificado total implica todo)
              # Simplifiquemos: No es pendiente.
-             conditions.append("NOT (m.terceroid IS NULL OR md.id IS NULL OR md.centro_costo_id IS NULL OR md.ConceptoID IS NULL)")
+             condiciones_detalle.append("NOT (m.terceroid IS NULL OR md.id IS NULL OR md.centro_costo_id IS NULL OR md.ConceptoID IS NULL)")
+
+        if condiciones_detalle:
+            if detalle_en_exists:
+                # (VALUES (1)) LEFT JOIN: una fila por detalle, o una fila nula si no tiene
+                conditions.append(f"""EXISTS (
+                    SELECT 1 FROM (VALUES (1)) AS fila
+                    LEFT JOIN movimientos_detalle md ON md.movimiento_id = m.Id
+                    WHERE {' AND '.join(condiciones_detalle)}
+                )""")
+            else:
+                conditions.extend(condiciones_detalle)
+            params.extend(params_detalle)
              
         return f" AND {' AND '.join(conditions)}", params
 
+    def _filtros_resumen(self,
+                         cuenta_id: Optional[int] = None,
+                         tercero_id: Optional[int] = None,
+                         centro_costo_id: Optional[int] = None,
+                         concepto_id: Optional[int] = None,
+                         centros_costos_excluidos: Optional[List[int]] = None,
+                         tipo_movimiento: Optional[str] = None
+    ) -> tuple[str, list]:
+        """
+        Los filtros de _construir_filtros (salvo fechas, que resuelve
+        resumen_mensual.fuente) sobre las filas del agregado mensual (f).
+        """
+        conditions = []
+        params = []
+        if cuenta_id:
+            conditions.append("f.cuenta_id = %s")
+            params.append(cuenta_id)
+        # Tercero del ENCABEZADO, como en _construir_filtros
+        if tercero_id:
+            conditions.append("f.tercero_id = %s")
+            params.append(tercero_id)
+        if centro_costo_id:
+            conditions.append("f.centro_costo_id = %s")
+            params.append(centro_costo_id)
+        if concepto_id:
+            conditions.append("f.concepto_id = %s")
+            params.append(concepto_id)
+        if centros_costos_excluidos and len(centros_costos_excluidos) > 0:
+            conditions.append("(f.centro_costo_id IS NULL OR f.centro_costo_id NOT IN %s)")
+            params.append(tuple(centros_costos_excluidos))
+        if tipo_movimiento == 'ingresos':
+            conditions.append("f.signo > 0")
+        elif tipo_movimiento == 'egresos':
+            conditions.append("f.signo < 0")
+
+        if not conditions:
+            return "", []
+        return f" AND {' AND '.join(conditions)}", params
+
     def _row_to_movimiento(self, row) -> Movimiento:
         """Helper para convertir fila de BD (Encabezado) a objeto Movimiento"""
         # Nuevo orden esperado (según query actualizada): 
@@ -269,6 +349,11 @@ class PostgresMovimientoRepository(MovimientoRepository):
 
         cursor = self.conn.cursor()
         try:
+            # Periodos del agregado mensual: el anterior (si cambia fecha o cuenta) y el nuevo
+            periodos = resumen_mensual.periodos_de_movimientos(cursor, [mov.id] if mov.id else [])
+            if mov.fecha:
+                periodos.add((mov.cuenta_id, mov.fecha.year, mov.fecha.month))
+
             if mov.id:
                 # Update Encabezado
                 query = """
@@ -349,7 +434,11 @@ class PostgresMovimientoRepository(MovimientoRepository):
                     d.id = res_det[0]
                     d.created_at = res_det[1]
 
+            resumen_mensual.actualizar_periodos(cursor, periodos)
             self.conn.commit()
+            self._invalidar_lecturas()
+            if self.indice_descripciones:
+                self.indice_descripciones.actualizar([mov])
             
             # --- AUTO-RECONCILIATION HOOK ---
             try:
@@ -368,6 +457,253 @@ class PostgresMovimientoRepository(MovimientoRepository):
         finally:
             cursor.close()
 
+    def guardar_lote(self, movimientos: List[Movimiento]) -> List[Movimiento]:
+        """
+        Inserta movimientos nuevos (encabezado + detalles) en una sola transacción.
+
+        - El bloqueo se valida una vez por (cuenta, año, mes), no por fila.
+        - Los IDs se reservan de las secuencias con una sola consulta y los
+          encabezados y detalles se insertan con VALUES de varias filas.
+        - Un movimiento sin detalles recibe el detalle por defecto (sin
+          clasificar, por el valor del encabezado).
+        - La conciliación se recalcula una vez por periodo afectado.
+        """
+        if not movimientos:
+            return []
+
+        for mov in movimientos:
+            if mov.id:
+                raise ValueError(f"guardar_lote solo inserta movimientos nuevos (ID {mov.id} ya existe).")
+
+            if not mov.detalles:
+                mov.detalles = [MovimientoDetalle(
+                    valor=mov.valor,
+                    centro_costo_id=None,
+                    concepto_id=None,
+                    tercero_id=mov.tercero_id
+                )]
+
+            total_detalles = sum(d.valor for d in mov.detalles)
+            if abs(total_detalles - mov.valor) > Decimal('0.01'):
+                raise ValueError(
+                    f"La suma de los valores de los detalles ({total_detalles}) debe ser igual "
+                    f"al valor del encabezado ({mov.valor}). Diferencia encontrada: {mov.valor - total_detalles}"
+                )
+
+            # Misma sincronización de tercero que guardar()
+            if len(mov.detalles) == 1:
+                detalle = mov.detalles[0]
+                if detalle.tercero_id and mov.tercero_id != detalle.tercero_id:
+                    mov.tercero_id = detalle.tercero_id
+
+        periodos = set(
+            (mov.cuenta_id, mov.fecha.year, mov.fecha.month)
+            for mov in movimientos if mov.cuenta_id and mov.fecha
+        )
+        for c_id, y, m in periodos:
+            self._validar_bloqueo(c_id, date(y, m, 1))
+
+        detalles = [d for mov in movimientos for d in mov.detalles]
+
+        cursor = self.conn.cursor()
+        try:
+            # 1. Reservar IDs (permite enlazar detalles sin depender del orden de RETURNING)
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence('movimientos_encabezado', 'id')) FROM generate_series(1, %s)",
+                (len(movimientos),)
+            )
+            for mov, row in zip(movimientos, cursor.fetchall()):
+                mov.id = row[0]
+
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence('movimientos_detalle', 'id')) FROM generate_series(1, %s)",
+                (len(detalles),)
+            )
+            for d, row in zip(detalles, cursor.fetchall()):
+                d.id = row[0]
+
+            # 2. Encabezados
+            creados = psycopg2.extras.execute_values(
+                cursor,
+                """
+                    INSERT INTO movimientos_encabezado (
+                        Id, Fecha, Descripcion, Referencia, Valor, USD, TRM,
+                        MonedaID, CuentaID, terceroid, Detalle
+                    ) VALUES %s
+                    RETURNING Id, created_at
+                """,
+                [
+                    (mov.id, mov.fecha, mov.descripcion, mov.referencia, mov.valor, mov.usd, mov.trm,
+                     mov.moneda_id, mov.cuenta_id, mov.tercero_id, mov.detalle)
+                    for mov in movimientos
+                ],
+                fetch=True
+            )
+            created_at = dict(creados)
+            for mov in movimientos:
+                mov.created_at = created_at.get(mov.id)
+
+            # 3. Detalles
+            for mov in movimientos:
+                for d in mov.detalles:
+                    d.movimiento_id = mov.id
+            creados = psycopg2.extras.execute_values(
+                cursor,
+                """
+                    INSERT INTO movimientos_detalle (id, movimiento_id, centro_costo_id, ConceptoID, TerceroID, Valor)
+                    VALUES %s
+                    RETURNING id, created_at
+                """,
+                [(d.id, d.movimiento_id, d.centro_costo_id, d.concepto_id, d.tercero_id, d.valor) for d in detalles],
+                fetch=True
+            )
+            created_at = dict(creados)
+            for d in detalles:
+                d.created_at = created_at.get(d.id)
+
+            resumen_mensual.actualizar_periodos(cursor, periodos)
+            self.conn.commit()
+            self._invalidar_lecturas()
+            if self.indice_descripciones:
+                self.indice_descripciones.actualizar(movimientos)
+        except Exception as e:
+            self.conn.rollback()
+            # Los objetos quedan como estaban: nada se insertó
+            for mov in movimientos:
+                mov.id = None
+                mov.created_at = None
+                for d in mov.detalles:
+                    d.id = None
+                    d.movimiento_id = None
+            raise e
+        finally:
+            cursor.close()
+
+        # --- AUTO-RECONCILIATION HOOK (todos los periodos en lote) ---
+        try:
+            self.conciliacion_repo.recalcular_sistema_lote(periodos)
+        except Exception as e:
+            logger.warning(f"Error al recalcular conciliaciones ({len(periodos)} periodos): {e}")
+
+        return movimientos
+
+    def guardar_clasificacion_lote(self, movimientos: List[Movimiento]) -> List[Movimiento]:
+        """
+        Guarda la clasificación (tercero y detalles) de movimientos existentes
+        en una sola transacción, con un UPDATE por tabla.
+
+        - Mismas validaciones y sincronización de tercero que guardar(); el
+          bloqueo se valida una vez por (cuenta, año, mes).
+        - Solo se escriben el tercero del encabezado y la clasificación de los
+          detalles; los demás campos del encabezado no cambian al clasificar.
+        - Los detalles sin ID (creados al asignar centro de costo o concepto a
+          un movimiento sin detalles) se insertan.
+        - La conciliación se recalcula una vez por periodo afectado.
+        """
+        if not movimientos:
+            return []
+
+        for mov in movimientos:
+            if not mov.id:
+                raise ValueError("guardar_clasificacion_lote solo actualiza movimientos existentes.")
+
+            if not mov.detalles:
+                raise ValueError(f"Movimiento {mov.id}: Debe proporcionar al menos un detalle de clasificación para el movimiento.")
+
+            total_detalles = sum(d.valor for d in mov.detalles)
+            if abs(total_detalles - mov.valor) > Decimal('0.01'):
+                raise ValueError(
+                    f"Movimiento {mov.id}: La suma de los valores de los detalles ({total_detalles}) debe ser igual "
+                    f"al valor del encabezado ({mov.valor}). Diferencia encontrada: {mov.valor - total_detalles}"
+                )
+
+            # Misma sincronización de tercero que guardar()
+            if len(mov.detalles) == 1:
+                detalle = mov.detalles[0]
+                if detalle.tercero_id and mov.tercero_id != detalle.tercero_id:
+                    mov.tercero_id = detalle.tercero_id
+
+        periodos = set(
+            (mov.cuenta_id, mov.fecha.year, mov.fecha.month)
+            for mov in movimientos if mov.cuenta_id and mov.fecha
+        )
+        for c_id, y, m in periodos:
+            self._validar_bloqueo(c_id, date(y, m, 1))
+
+        for mov in movimientos:
+            for d in mov.detalles:
+                d.movimiento_id = mov.id
+        existentes = [d for mov in movimientos for d in mov.detalles if d.id]
+        nuevos = [d for mov in movimientos for d in mov.detalles if not d.id]
+
+        cursor = self.conn.cursor()
+        try:
+            psycopg2.extras.execute_values(
+                cursor,
+                """
+                    UPDATE movimientos_encabezado AS m
+                    SET terceroid = v.terceroid
+                    FROM (VALUES %s) AS v(id, terceroid)
+                    WHERE m.Id = v.id
+                """,
+                [(mov.id, mov.tercero_id) for mov in movimientos],
+                template="(%s, %s::integer)"
+            )
+
+            if existentes:
+                psycopg2.extras.execute_values(
+                    cursor,
+                    """
+                        UPDATE movimientos_detalle AS d
+                        SET centro_costo_id = v.centro_costo_id, ConceptoID = v.concepto_id,
+                            TerceroID = v.tercero_id, Valor = v.valor
+                        FROM (VALUES %s) AS v(id, centro_costo_id, concepto_id, tercero_id, valor)
+                        WHERE d.id = v.id
+                    """,
+                    [(d.id, d.centro_costo_id, d.concepto_id, d.tercero_id, d.valor) for d in existentes],
+                    template="(%s, %s::integer, %s::integer, %s::integer, %s::numeric)"
+                )
+
+            if nuevos:
+                creados = psycopg2.extras.execute_values(
+                    cursor,
+                    """
+                        INSERT INTO movimientos_detalle (movimiento_id, centro_costo_id, ConceptoID, TerceroID, Valor)
+                        VALUES %s
+                        RETURNING id, created_at
+                    """,
+                    [(d.movimiento_id, d.centro_costo_id, d.concepto_id, d.tercero_id, d.valor) for d in nuevos],
+                    fetch=True
+                )
+                # RETURNING respeta el orden de VALUES en un INSERT de varias filas
+                for d, (det_id, creado) in zip(nuevos, creados):
+                    d.id = det_id
+                    d.created_at = creado
+
+            resumen_mensual.actualizar_periodos(
+                cursor, resumen_mensual.periodos_de_movimientos(cursor, [mov.id for mov in movimientos])
+            )
+            self.conn.commit()
+            self._invalidar_lecturas()
+            if self.indice_descripciones:
+                self.indice_descripciones.actualizar(movimientos)
+        except Exception as e:
+            self.conn.rollback()
+            for d in nuevos:
+                d.id = None
+                d.created_at = None
+            raise e
+        finally:
+            cursor.close()
+
+        # --- AUTO-RECONCILIATION HOOK (todos los periodos en lote) ---
+        try:
+            self.conciliacion_repo.recalcular_sistema_lote(periodos)
+        except Exception as e:
+            logger.warning(f"Error al recalcular conciliaciones ({len(periodos)} periodos): {e}")
+
+        return movimientos
+
     def obtener_por_id(self, id: int) -> Optional[Movimiento]:
         cursor = self.conn.cursor()
         query = """
@@ -538,6 +874,42 @@ class PostgresMovimientoRepository(MovimientoRepository):
         self._cargar_detalles_para_movimientos(movimientos)
         return movimientos
 
+    def buscar_por_referencias(self, referencias: List[str]) -> Dict[str, List[Movimiento]]:
+        """
+        Igual que buscar_por_referencia para varias referencias en una sola
+        consulta. Retorna {referencia sin ceros iniciales: movimientos}, cada
+        lista ordenada por fecha descendente.
+        """
+        normalizadas = list({r.lstrip('0') for r in referencias if r})
+        if not normalizadas:
+            return {}
+
+        cursor = self.conn.cursor()
+        query = """
+            SELECT m.Id, m.Fecha, m.Descripcion, m.Referencia, m.Valor, m.USD, m.TRM, 
+                   m.MonedaID, m.CuentaID, m.terceroid, m.Detalle, m.created_at,
+                   c.cuenta AS cuenta_nombre,
+                   mon.moneda AS moneda_nombre,
+                   t.tercero AS tercero_nombre
+            FROM movimientos_encabezado m
+            LEFT JOIN cuentas c ON m.CuentaID = c.cuentaid
+            LEFT JOIN monedas mon ON m.MonedaID = mon.monedaid
+            LEFT JOIN terceros t ON m.terceroid = t.terceroid
+            WHERE LTRIM(m.Referencia, '0') = ANY(%s)
+            ORDER BY m.Fecha DESC
+        """
+        cursor.execute(query, (normalizadas,))
+        rows = cursor.fetchall()
+        cursor.close()
+
+        movimientos = [self._row_to_movimiento(row) for row in rows]
+        self._cargar_detalles_para_movimientos(movimientos)
+
+        resultado: Dict[str, List[Movimiento]] = {}
+        for mov in movimientos:
+            resultado.setdefault((mov.referencia or '').lstrip('0'), []).append(mov)
+        return resultado
+
     def existe_movimiento(self, fecha: date, valor: Decimal, referencia: str, cuenta_id: int, descripcion: str = None, usd: Decimal = None) -> bool:
         cursor = self.conn.cursor()
         
@@ -572,8 +944,8 @@ class PostgresMovimientoRepository(MovimientoRepository):
             
             if descripcion:
                 # CRITICAL FIX: Always check Description if Reference is missing
-                # Use ILIKE for case-insensitive comparison
-                query += " AND Descripcion ILIKE %s"
+                # Case-insensitive: columna en mayúsculas (indexada) contra el patrón en mayúsculas
+                query += " AND descripcion_busqueda LIKE UPPER(%s)"
                 params.append(descripcion)
             else:
                 # If no description provided either, we are forced to check just by Value/Date
@@ -585,6 +957,38 @@ class PostgresMovimientoRepository(MovimientoRepository):
         cursor.close()
         return exists
 
+    def obtener_indice_descripciones(self) -> IndiceDescripciones:
+        """Carga en una sola consulta todos los movimientos como índice de descripciones"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT Id, Descripcion, Fecha, Valor, terceroid
+            FROM movimientos_encabezado
+        """)
+        rows = cursor.fetchall()
+        cursor.close()
+        return IndiceDescripciones(EntradaDescripcion(*row) for row in rows)
+
+    def obtener_indice_existentes(self, cuenta_id: int, fecha_inicio: date, fecha_fin: date) -> IndiceMovimientosExistentes:
+        cursor = self.conn.cursor()
+        try:
+            query = """
+                SELECT Id, Fecha, Descripcion, Referencia, Valor, USD
+                FROM movimientos_encabezado
+                WHERE CuentaID = %s AND Fecha BETWEEN %s AND %s
+                ORDER BY Id
+            """
+            cursor.execute(query, (cuenta_id, fecha_inicio, fecha_fin))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        
+        return IndiceMovimientosExistentes(
+            cuenta_id,
+            fecha_inicio,
+            fecha_fin,
+            (MovimientoExistente(*row) for row in rows)
+        )
+
     def contar_movimientos_similares(self, fecha: date, valor: Decimal, referencia: str, cuenta_id: int, descripcion: str = None, usd: Decimal = None) -> int:
         cursor = self.conn.cursor()
         
@@ -607,7 +1011,7 @@ class PostgresMovimientoRepository(MovimientoRepository):
             params.append(target_val)
             
             if descripcion:
-                query += " AND Descripcion ILIKE %s"
+                query += " AND descripcion_busqueda LIKE UPPER(%s)"
                 params.append(descripcion)
             
         cursor.execute(query, tuple(params))
@@ -662,6 +1066,123 @@ class PostgresMovimientoRepository(MovimientoRepository):
         finally:
             cursor.close()
 
+    def _consulta_avanzada(self,
+                           fecha_inicio: Optional[date] = None,
+                           fecha_fin: Optional[date] = None,
+                           cuenta_id: Optional[int] = None,
+                           tercero_id: Optional[int] = None,
+                           centro_costo_id: Optional[int] = None,
+                           concepto_id: Optional[int] = None,
+                           centros_costos_excluidos: Optional[List[int]] = None,
+                           solo_pendientes: bool = False,
+                           solo_clasificados: bool = False,
+                           tipo_movimiento: Optional[str] = None,
+                           descripcion_contiene: Optional[str] = None,
+                           despues_de: Optional[Tuple[date, Decimal, int]] = None
+    ) -> Tuple[str, list]:
+        """
+        FROM ... WHERE de buscar_avanzado y sus variantes (totales, streaming).
+        Solo recorre encabezados: los filtros de detalle van en un EXISTS, así
+        cada movimiento aparece una vez y no hace falta GROUP BY.
+        `despues_de` = (fecha, abs(valor), id) del último movimiento de la página
+        anterior: paginación por llave en el orden del listado.
+        """
+        query_base = """
+            FROM movimientos_encabezado m
+            WHERE 1=1
+        """
+        
+        where_clause, params = self._construir_filtros(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            cuenta_id=cuenta_id,
+            tercero_id=tercero_id,
+            centro_costo_id=centro_costo_id,
+            concepto_id=concepto_id,
+            centros_costos_excluidos=centros_costos_excluidos,
+            solo_pendientes=solo_pendientes,
+            solo_clasificados=solo_clasificados,
+            tipo_movimiento=tipo_movimiento,
+            descripcion_contiene=descripcion_contiene,
+            detalle_en_exists=True
+        )
+
+        if despues_de:
+            where_clause += " AND (m.Fecha, ABS(m.Valor), m.Id) < (%s, %s, %s)"
+            params = list(params) + list(despues_de)
+        
+        return query_base + where_clause, list(params)
+
+    # Orden del listado; la paginación por llave (despues_de) sigue este mismo orden
+    _ORDEN_AVANZADO = " ORDER BY m.Fecha DESC, ABS(m.Valor) DESC, m.Id DESC"
+
+    def _consulta_listado(self, query_full_where: str, paginada: bool) -> str:
+        """
+        Encabezados filtrados (CTE) con los nombres de cuenta, moneda y tercero y
+        sus detalles agregados en JSON, en una sola consulta y en el orden del
+        listado. Paginada: agrega el total (función de ventana, antes del
+        LIMIT) y espera los parámetros LIMIT y OFFSET al final.
+        """
+        total = ", COUNT(*) OVER () AS total" if paginada else ""
+        limite = " LIMIT %s OFFSET %s" if paginada else ""
+        return f"""
+            WITH pagina AS (
+                SELECT m.Id, m.Fecha, m.Descripcion, m.Referencia, m.Valor, m.USD, m.TRM,
+                       m.MonedaID, m.CuentaID, m.terceroid, m.Detalle, m.created_at{total}
+                {query_full_where}
+                {self._ORDEN_AVANZADO}{limite}
+            )
+            SELECT p.*,
+                   c.cuenta AS cuenta_nombre,
+                   mon.moneda AS moneda_nombre,
+                   t.tercero AS tercero_nombre,
+                   det.detalles
+            FROM pagina p
+            LEFT JOIN cuentas c ON p.CuentaID = c.cuentaid
+            LEFT JOIN monedas mon ON p.MonedaID = mon.monedaid
+            LEFT JOIN terceros t ON p.terceroid = t.terceroid
+            LEFT JOIN LATERAL (
+                SELECT json_agg(json_build_object(
+                           'id', d.id,
+                           'centro_costo_id', d.centro_costo_id,
+                           'concepto_id', d.ConceptoID,
+                           'tercero_id', d.TerceroID,
+                           'valor', d.Valor::text,
+                           'created_at', d.created_at,
+                           'centro_costo_nombre', g.centro_costo,
+                           'concepto_nombre', con.concepto,
+                           'tercero_nombre', td.tercero
+                       ) ORDER BY d.id) AS detalles
+                FROM movimientos_detalle d
+                LEFT JOIN centro_costos g ON d.centro_costo_id = g.centro_costo_id
+                LEFT JOIN conceptos con ON d.ConceptoID = con.conceptoid
+                LEFT JOIN terceros td ON d.TerceroID = td.terceroid
+                WHERE d.movimiento_id = p.Id
+            ) det ON TRUE
+            ORDER BY p.Fecha DESC, ABS(p.Valor) DESC, p.Id DESC
+        """
+
+    def _fila_listado_a_movimiento(self, row, paginada: bool) -> Movimiento:
+        """Fila de _consulta_listado → Movimiento con sus detalles"""
+        # Columnas: 12 del encabezado [+ total], nombres de cuenta/moneda/tercero, detalles
+        inicio_nombres = 13 if paginada else 12
+        mov = self._row_to_movimiento(tuple(row[:12]) + tuple(row[inicio_nombres:inicio_nombres + 3]))
+        for d in row[inicio_nombres + 3] or []:
+            mov.detalles.append(MovimientoDetalle(
+                id=d['id'],
+                movimiento_id=mov.id,
+                centro_costo_id=d['centro_costo_id'],
+                concepto_id=d['concepto_id'],
+                tercero_id=d['tercero_id'],
+                # Valor como texto en el JSON para no pasar por float
+                valor=Decimal(d['valor']) if d['valor'] is not None else None,
+                created_at=datetime.fromisoformat(d['created_at']) if d['created_at'] else None,
+                centro_costo_nombre=d['centro_costo_nombre'],
+                concepto_nombre=d['concepto_nombre'],
+                tercero_nombre=d['tercero_nombre']
+            ))
+        return mov
+
     def buscar_avanzado(self, 
                        fecha_inicio: Optional[date] = None, 
                        fecha_fin: Optional[date] = None,
@@ -675,23 +1196,99 @@ class PostgresMovimientoRepository(MovimientoRepository):
                        tipo_movimiento: Optional[str] = None,
                        descripcion_contiene: Optional[str] = None,
                        skip: int = 0,
-                       limit: Optional[int] = None
+                       limit: Optional[int] = None,
+                       despues_de: Optional[Tuple[date, Decimal, int]] = None
     ) -> tuple[List[Movimiento], int]:
-        cursor = self.conn.cursor()
+        query_full_where, params = self._consulta_avanzada(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            cuenta_id=cuenta_id,
+            tercero_id=tercero_id,
+            centro_costo_id=centro_costo_id,
+            concepto_id=concepto_id,
+            centros_costos_excluidos=centros_costos_excluidos,
+            solo_pendientes=solo_pendientes,
+            solo_clasificados=solo_clasificados,
+            tipo_movimiento=tipo_movimiento,
+            descripcion_contiene=descripcion_contiene,
+            despues_de=despues_de
+        )
         
-        # Estrategia: Obtener IDs primero para evitar problemas con JOINs + Pagination
-        # y para asegurar DISTINCT.
+        # Página, total y detalles en un solo viaje; LIMIT NULL = sin límite
+        query = self._consulta_listado(query_full_where, paginada=True)
         
-        # Base query for filtering
-        query_base = """
-            FROM movimientos_encabezado m
-            LEFT JOIN cuentas c ON m.CuentaID = c.cuentaid
-            LEFT JOIN monedas mon ON m.MonedaID = mon.monedaid
-            LEFT JOIN movimientos_detalle md ON m.Id = md.movimiento_id
-            WHERE 1=1
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(query, tuple(params) + (limit, skip))
+            rows = cursor.fetchall()
+            
+            if rows:
+                return [self._fila_listado_a_movimiento(row, paginada=True) for row in rows], rows[0][12]
+            
+            if not skip:
+                return [], 0
+            
+            # Página fuera de rango: la función de ventana no trae filas, el total se cuenta aparte
+            cursor.execute("SELECT COUNT(*) " + query_full_where, tuple(params))
+            return [], cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def resumir_busqueda_avanzada(self,
+                                 fecha_inicio: Optional[date] = None,
+                                 fecha_fin: Optional[date] = None,
+                                 cuenta_id: Optional[int] = None,
+                                 tercero_id: Optional[int] = None,
+                                 centro_costo_id: Optional[int] = None,
+                                 concepto_id: Optional[int] = None,
+                                 centros_costos_excluidos: Optional[List[int]] = None,
+                                 solo_pendientes: bool = False,
+                                 solo_clasificados: bool = False,
+                                 tipo_movimiento: Optional[str] = None,
+                                 descripcion_contiene: Optional[str] = None
+    ) -> dict:
+        query_full_where, params = self._consulta_avanzada(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            cuenta_id=cuenta_id,
+            tercero_id=tercero_id,
+            centro_costo_id=centro_costo_id,
+            concepto_id=concepto_id,
+            centros_costos_excluidos=centros_costos_excluidos,
+            solo_pendientes=solo_pendientes,
+            solo_clasificados=solo_clasificados,
+            tipo_movimiento=tipo_movimiento,
+            descripcion_contiene=descripcion_contiene
+        )
+        query = f"""
+            SELECT COUNT(*),
+                   COALESCE(SUM(CASE WHEN m.Valor > 0 THEN m.Valor ELSE 0 END), 0),
+                   COALESCE(SUM(CASE WHEN m.Valor < 0 THEN -m.Valor ELSE 0 END), 0)
+            {query_full_where}
         """
-        
-        where_clause, params = self._construir_filtros(
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(query, tuple(params))
+            total, ingresos, egresos = cursor.fetchone()
+        finally:
+            cursor.close()
+        return {'total': total, 'ingresos': ingresos, 'egresos': egresos}
+
+    def iterar_avanzado(self,
+                        fecha_inicio: Optional[date] = None,
+                        fecha_fin: Optional[date] = None,
+                        cuenta_id: Optional[int] = None,
+                        tercero_id: Optional[int] = None,
+                        centro_costo_id: Optional[int] = None,
+                        concepto_id: Optional[int] = None,
+                        centros_costos_excluidos: Optional[List[int]] = None,
+                        solo_pendientes: bool = False,
+                        solo_clasificados: bool = False,
+                        tipo_movimiento: Optional[str] = None,
+                        descripcion_contiene: Optional[str] = None,
+                        tamano_lote: int = 500
+    ) -> Iterator[Movimiento]:
+        query_full_where, params = self._consulta_avanzada(
             fecha_inicio=fecha_inicio,
             fecha_fin=fecha_fin,
             cuenta_id=cuenta_id,
@@ -704,37 +1301,21 @@ class PostgresMovimientoRepository(MovimientoRepository):
             tipo_movimiento=tipo_movimiento,
             descripcion_contiene=descripcion_contiene
         )
-        
-        query_full_where = query_base + where_clause
-        
-        # Count Query (Distinct Header IDs)
-        count_query = "SELECT COUNT(DISTINCT m.Id) " + query_full_where
-        
-        cursor.execute(count_query, tuple(params))
-        total_count = cursor.fetchone()[0]
-        
-        # Data Query (Get IDs first to handle Pagination + Sort + Distinct)
-        # Using GROUP BY m.Id allows us to sort by aggregates like MAX(m.Fecha) or MAX(ABS(m.Valor))
-        query_ids = "SELECT m.Id " + query_full_where + " GROUP BY m.Id"
-        
-        query_ids += " ORDER BY MAX(m.Fecha) DESC, MAX(ABS(m.Valor)) DESC, m.Id DESC"
-        
-        if limit is not None:
-             query_ids += f" OFFSET {skip} LIMIT {limit}"
-             
-        cursor.execute(query_ids, tuple(params))
-        id_rows = cursor.fetchall()
-        
-        ids = [row[0] for row in id_rows]
-        cursor.close()
-        
-        if not ids:
-            return [], total_count
-            
-        # Re-use obtener_por_ids to get full objects with details
-        # Note: obtener_por_ids re-sorts by Fecha DESC, which is consistent.
-        movimientos = self.obtener_por_ids(ids)
-        return movimientos, total_count
+        query = self._consulta_listado(query_full_where, paginada=False)
+
+        # Cursor del lado del servidor: las filas (con sus detalles) llegan por lotes, no todas a memoria
+        cursor = self.conn.cursor(name=f"movimientos_stream_{uuid.uuid4().hex}")
+        cursor.itersize = tamano_lote
+        try:
+            cursor.execute(query, tuple(params))
+            while True:
+                filas = cursor.fetchmany(tamano_lote)
+                if not filas:
+                    break
+                for fila in filas:
+                    yield self._fila_listado_a_movimiento(fila, paginada=False)
+        finally:
+            cursor.close()
 
     def resumir_por_clasificacion(self, 
                                  tipo_agrupacion: str,
@@ -752,34 +1333,19 @@ class PostgresMovimientoRepository(MovimientoRepository):
         # Determinar campo de agrupación y joins necesarios
         if tipo_agrupacion == 'centro_costo':
             group_field = "COALESCE(g.centro_costo, 'Sin Centro de Costo')"
+            join_clause = "LEFT JOIN centro_costos g ON f.centro_costo_id = g.centro_costo_id"
         elif tipo_agrupacion == 'tercero':
             group_field = "COALESCE(t.tercero, 'Sin Tercero')"
+            join_clause = "LEFT JOIN terceros t ON f.tercero_id = t.terceroid"
         elif tipo_agrupacion == 'concepto':
             group_field = "COALESCE(con.concepto, 'Sin Concepto')"
+            join_clause = "LEFT JOIN conceptos con ON f.concepto_id = con.conceptoid"
         else:
              raise ValueError("Tipo de agrupación debe ser 'centro_costo', 'tercero' o 'concepto'")
 
-        # Query principal sobre DETALLES
-        # Usamos md.Valor para la suma por clasificación
-        query = f"""
-            SELECT 
-                {group_field} as nombre,
-                SUM(CASE WHEN md.Valor > 0 THEN md.Valor ELSE 0 END) as ingresos,
-                SUM(CASE WHEN md.Valor < 0 THEN ABS(md.Valor) ELSE 0 END) as egresos,
-                SUM(md.Valor) as saldo
-            FROM movimientos_encabezado m
-            LEFT JOIN movimientos_detalle md ON m.Id = md.movimiento_id
-            LEFT JOIN cuentas c ON m.CuentaID = c.cuentaid
-            LEFT JOIN monedas mon ON m.MonedaID = mon.monedaid
-            LEFT JOIN terceros t ON m.terceroid = t.terceroid
-            LEFT JOIN centro_costos g ON md.centro_costo_id = g.centro_costo_id
-            LEFT JOIN conceptos con ON md.ConceptoID = con.conceptoid
-            WHERE 1=1
-        """
-        
-        where_clause, params = self._construir_filtros(
-            fecha_inicio=fecha_inicio,
-            fecha_fin=fecha_fin,
+        # Sumas de los DETALLES desde el agregado mensual (meses parciales: datos vivos)
+        fuente, params = resumen_mensual.fuente(cursor, fecha_inicio, fecha_fin)
+        where_clause, params_filtros = self._filtros_resumen(
             cuenta_id=cuenta_id,
             tercero_id=tercero_id,
             centro_costo_id=centro_costo_id,
@@ -787,11 +1353,19 @@ class PostgresMovimientoRepository(MovimientoRepository):
             centros_costos_excluidos=centros_costos_excluidos,
             tipo_movimiento=tipo_movimiento
         )
+        query = f"""
+            SELECT 
+                {group_field} as nombre,
+                SUM(f.ingresos) as ingresos,
+                SUM(f.egresos) as egresos,
+                SUM(f.ingresos - f.egresos) as saldo
+            FROM ({fuente}) f
+            {join_clause}
+            WHERE 1=1 {where_clause}
+            GROUP BY {group_field} ORDER BY SUM(f.ingresos - f.egresos) ASC
+        """
         
-        query += where_clause
-        query += f" GROUP BY {group_field} ORDER BY SUM(md.Valor) ASC"
-        
-        cursor.execute(query, tuple(params))
+        cursor.execute(query, tuple(params + params_filtros))
         rows = cursor.fetchall()
         cursor.close()
         
@@ -818,7 +1392,7 @@ class PostgresMovimientoRepository(MovimientoRepository):
             LEFT JOIN monedas mon ON m.MonedaID = mon.monedaid
             LEFT JOIN terceros t ON m.terceroid = t.terceroid
             LEFT JOIN movimientos_detalle md ON m.Id = md.movimiento_id
-            WHERE m.Descripcion ILIKE %s
+            WHERE m.descripcion_busqueda LIKE UPPER(%s)
               AND m.terceroid IS NOT NULL
             ORDER BY m.Fecha DESC 
             LIMIT %s
@@ -838,12 +1412,14 @@ class PostgresMovimientoRepository(MovimientoRepository):
             q_enc = """
                 UPDATE movimientos_encabezado 
                 SET terceroid = %s
-                WHERE Descripcion ILIKE %s
+                WHERE descripcion_busqueda LIKE UPPER(%s)
                   AND terceroid IS NULL
+                RETURNING Id
             """
             like_pattern = f"%{patron}%"
             cursor.execute(q_enc, (tercero_id, like_pattern))
             affected_enc = cursor.rowcount
+            modificados = {r[0] for r in cursor.fetchall()}
 
             # 2. Actualizar Detalle (Centro Costo, Concepto, y TerceroID por consistencia)
             query = """
@@ -851,13 +1427,21 @@ class PostgresMovimientoRepository(MovimientoRepository):
                 SET TerceroID = %s, centro_costo_id = %s, ConceptoID = %s
                 FROM movimientos_encabezado m
                 WHERE md.movimiento_id = m.Id
-                  AND m.Descripcion ILIKE %s
+                  AND m.descripcion_busqueda LIKE UPPER(%s)
                   AND (md.TerceroID IS NULL OR md.centro_costo_id IS NULL OR md.ConceptoID IS NULL)
+                RETURNING md.movimiento_id
             """
             cursor.execute(query, (tercero_id, centro_costo_id, concepto_id, like_pattern))
             
             affected_det = cursor.rowcount
+            modificados.update(r[0] for r in cursor.fetchall())
+            resumen_mensual.actualizar_periodos(
+                cursor, resumen_mensual.periodos_de_movimientos(cursor, list(modificados))
+            )
             self.conn.commit()
+            self._invalidar_lecturas()
+            if self.indice_descripciones and affected_enc:
+                self.indice_descripciones.invalidar()
             return max(affected_enc, affected_det) # Retornar el mayor impacto
         except Exception as e:
             self.conn.rollback()
@@ -865,9 +1449,7 @@ class PostgresMovimientoRepository(MovimientoRepository):
         finally:
             cursor.close()
 
-    def obtener_datos_exportacion(self, limit: int = None, plain_format: bool = False) -> List[dict]:
-        cursor = self.conn.cursor()
-        
+    def _consulta_exportacion(self, limit: Optional[int], plain_format: bool) -> Tuple[str, tuple]:
         # Exportación debe incluir detalles
         if plain_format:
             query = """
@@ -901,9 +1483,14 @@ class PostgresMovimientoRepository(MovimientoRepository):
             """
             
         if limit:
-            query += f" LIMIT {limit}"
-            
-        cursor.execute(query)
+            return query + " LIMIT %s", (limit,)
+        return query, ()
+
+    def obtener_datos_exportacion(self, limit: int = None, plain_format: bool = False) -> List[dict]:
+        cursor = self.conn.cursor()
+        
+        query, params = self._consulta_exportacion(limit, plain_format)
+        cursor.execute(query, params)
         rows = cursor.fetchall()
         
         # Get column names
@@ -918,6 +1505,35 @@ class PostgresMovimientoRepository(MovimientoRepository):
             
         return results
 
+    def iterar_datos_exportacion(self, limit: Optional[int] = None, plain_format: bool = False, tamano_lote: int = 2000,
+                                 columnas: Optional[List[Tuple[str, int]]] = None) -> Iterator[dict]:
+        """
+        Filas de la exportación por lotes. Si se pasa `columnas`, antes de la
+        primera fila se llena con (nombre, OID del tipo) de cada columna
+        (para fijar el esquema de formatos tipados como Parquet).
+        """
+        query, params = self._consulta_exportacion(limit, plain_format)
+
+        # Cursor del lado del servidor: el join completo llega por lotes, no todo a memoria
+        cursor = self.conn.cursor(name=f"exportacion_stream_{uuid.uuid4().hex}")
+        cursor.itersize = tamano_lote
+        try:
+            cursor.execute(query, params)
+            col_names = None
+            while True:
+                filas = cursor.fetchmany(tamano_lote)
+                if col_names is None:
+                    # En un cursor con nombre, description existe después del primer fetch
+                    col_names = [desc[0] for desc in cursor.description]
+                    if columnas is not None:
+                        columnas[:] = [(desc[0], desc[1]) for desc in cursor.description]
+                if not filas:
+                    break
+                for fila in filas:
+                    yield dict(zip(col_names, fila))
+        finally:
+            cursor.close()
+
     def resumir_ingresos_gastos_por_mes(self, 
                                  fecha_inicio: Optional[date] = None, 
                                  fecha_fin: Optional[date] = None,
@@ -929,38 +1545,29 @@ class PostgresMovimientoRepository(MovimientoRepository):
     ) -> List[dict]:
         cursor = self.conn.cursor()
         
-        # Agregamos por Mes usando valores DE LOS DETALLES (md.Valor)
+        # Agregamos por Mes usando valores DE LOS DETALLES, desde el agregado
+        # mensual (los meses parciales del rango salen de los datos vivos).
         # Esto permite filtrar correctamente gastos split.
-        query = """
-            SELECT 
-                TO_CHAR(m.Fecha, 'YYYY-MM') as mes,
-                SUM(CASE WHEN md.Valor > 0 THEN md.Valor ELSE 0 END) as ingresos,
-                SUM(CASE WHEN md.Valor < 0 THEN ABS(md.Valor) ELSE 0 END) as egresos,
-                SUM(md.Valor) as saldo
-            FROM movimientos_encabezado m
-            LEFT JOIN movimientos_detalle md ON m.Id = md.movimiento_id
-            LEFT JOIN cuentas c ON m.CuentaID = c.cuentaid
-            LEFT JOIN monedas mon ON m.MonedaID = mon.monedaid
-            LEFT JOIN terceros t ON m.terceroid = t.terceroid
-            LEFT JOIN centro_costos g ON md.centro_costo_id = g.centro_costo_id
-            LEFT JOIN conceptos con ON md.ConceptoID = con.conceptoid
-            WHERE 1=1
-        """
-        
-        where_clause, params = self._construir_filtros(
-            fecha_inicio=fecha_inicio,
-            fecha_fin=fecha_fin,
+        fuente, params = resumen_mensual.fuente(cursor, fecha_inicio, fecha_fin)
+        where_clause, params_filtros = self._filtros_resumen(
             cuenta_id=cuenta_id,
             tercero_id=tercero_id,
             centro_costo_id=centro_costo_id,
             concepto_id=concepto_id,
             centros_costos_excluidos=centros_costos_excluidos
         )
+        query = f"""
+            SELECT 
+                TO_CHAR(make_date(f.year, f.month, 1), 'YYYY-MM') as mes,
+                SUM(f.ingresos) as ingresos,
+                SUM(f.egresos) as egresos,
+                SUM(f.ingresos - f.egresos) as saldo
+            FROM ({fuente}) f
+            WHERE 1=1 {where_clause}
+            GROUP BY f.year, f.month ORDER BY f.year DESC, f.month DESC
+        """
         
-        query += where_clause
-        query += " GROUP BY TO_CHAR(m.Fecha, 'YYYY-MM') ORDER BY mes DESC"
-        
-        cursor.execute(query, tuple(params))
+        cursor.execute(query, tuple(params + params_filtros))
         rows = cursor.fetchall()
         cursor.close()
         
@@ -973,6 +1580,7 @@ class PostgresMovimientoRepository(MovimientoRepository):
             }
             for row in rows
         ]
+
     def obtener_sugerencias_reclasificacion(self, fecha_inicio: Optional[date] = None, fecha_fin: Optional[date] = None) -> List[dict]:
         """
         Agrupa movimientos por Tercero que NO sean traslados y que tengan Ingresos > 0.
@@ -1055,7 +1663,12 @@ class PostgresMovimientoRepository(MovimientoRepository):
             # 2. Eliminar (Cascade elimina detalles)
             query = "DELETE FROM movimientos_encabezado WHERE Id = %s"
             cursor.execute(query, (id,))
+            if cuenta_id and fecha:
+                resumen_mensual.actualizar_periodos(cursor, [(cuenta_id, fecha.year, fecha.month)])
             self.conn.commit()
+            self._invalidar_lecturas()
+            if self.indice_descripciones:
+                self.indice_descripciones.eliminar([id])
             
             # 3. Recalcular Conciliación (Hook)
             if cuenta_id and fecha:
@@ -1152,10 +1765,15 @@ class PostgresMovimientoRepository(MovimientoRepository):
                 if fecha_fin:
                     query += " AND m.Fecha <= %s"
                     params.append(fecha_fin)
+            query += " RETURNING m.CuentaID, m.Fecha"
             
             cursor.execute(query, tuple(params))
             affected = cursor.rowcount
+            resumen_mensual.actualizar_periodos(
+                cursor, {(r[0], r[1].year, r[1].month) for r in cursor.fetchall() if r[1]}
+            )
             self.conn.commit()
+            self._invalidar_lecturas()
             return affected
         except Exception as e:
             self.conn.rollback()
@@ -1188,58 +1806,47 @@ class PostgresMovimientoRepository(MovimientoRepository):
     ) -> List[dict]:
         cursor = self.conn.cursor()
         
-        # Mapping level to columns (Updated for DETAILS)
+        # Mapping level to columns (Updated for DETAILS, sobre el agregado mensual)
         if nivel == 'tercero':
-            col_id = "md.TerceroID"
+            col_id = "f.tercero_detalle_id"
             col_name = "t.tercero"
-            join_clause = "LEFT JOIN terceros t ON md.TerceroID = t.terceroid"
+            join_clause = "LEFT JOIN terceros t ON f.tercero_detalle_id = t.terceroid"
             order_clause = "ORDER BY egresos DESC"
         elif nivel == 'centro_costo':
-            col_id = "md.centro_costo_id"
+            col_id = "f.centro_costo_id"
             col_name = "g.centro_costo"
-            join_clause = "LEFT JOIN centro_costos g ON md.centro_costo_id = g.centro_costo_id"
+            join_clause = "LEFT JOIN centro_costos g ON f.centro_costo_id = g.centro_costo_id"
             order_clause = "ORDER BY egresos ASC" 
         elif nivel == 'concepto':
-            col_id = "md.ConceptoID"
+            col_id = "f.concepto_id"
             col_name = "con.concepto"
-            join_clause = "LEFT JOIN conceptos con ON md.ConceptoID = con.conceptoid"
+            join_clause = "LEFT JOIN conceptos con ON f.concepto_id = con.conceptoid"
             order_clause = "ORDER BY egresos DESC"
         else:
             raise ValueError("Nivel inválido")
 
-        # SOLUCION: Agregar el JOIN con centro_costos siempre para poder filtrar por ID de centro_costo.
-        joins_extra = ""
-        if 'JOIN centro_costos' not in join_clause:
-            joins_extra = " LEFT JOIN centro_costos g ON md.centro_costo_id = g.centro_costo_id"
-            
-        query = f"""
-            SELECT 
-                {col_id} as id,
-                COALESCE({col_name}, 'Sin Clasificar') as nombre,
-                SUM(CASE WHEN md.Valor > 0 THEN md.Valor ELSE 0 END) as ingresos,
-                SUM(CASE WHEN md.Valor < 0 THEN ABS(md.Valor) ELSE 0 END) as egresos,
-                SUM(md.Valor) as saldo
-            FROM movimientos_encabezado m
-            LEFT JOIN movimientos_detalle md ON m.Id = md.movimiento_id
-            {join_clause}
-            {joins_extra}
-            WHERE 1=1
-        """
-
-        where_clause, params = self._construir_filtros(
-            fecha_inicio=fecha_inicio,
-            fecha_fin=fecha_fin,
+        fuente, params = resumen_mensual.fuente(cursor, fecha_inicio, fecha_fin)
+        where_clause, params_filtros = self._filtros_resumen(
             cuenta_id=cuenta_id,
             tercero_id=tercero_id,
             centro_costo_id=centro_costo_id,
             concepto_id=concepto_id,
             centros_costos_excluidos=centros_costos_excluidos
         )
+        query = f"""
+            SELECT 
+                {col_id} as id,
+                COALESCE({col_name}, 'Sin Clasificar') as nombre,
+                SUM(f.ingresos) as ingresos,
+                SUM(f.egresos) as egresos,
+                SUM(f.ingresos - f.egresos) as saldo
+            FROM ({fuente}) f
+            {join_clause}
+            WHERE 1=1 {where_clause}
+            GROUP BY {col_id}, {col_name} {order_clause}
+        """
         
-        query += where_clause
-        query += f" GROUP BY {col_id}, {col_name} {order_clause}"
-        
-        cursor.execute(query, tuple(params))
+        cursor.execute(query, tuple(params + params_filtros))
         rows = cursor.fetchall()
         cursor.close()
         
@@ -1260,32 +1867,22 @@ class PostgresMovimientoRepository(MovimientoRepository):
     ) -> List[dict]:
         cursor = self.conn.cursor()
         
-        query = """
+        # Agregado mensual (meses parciales del rango: datos vivos). conteo
+        # del agregado suma movimientos distintos por centro de costo.
+        fuente, params = resumen_mensual.fuente(cursor, fecha_inicio, fecha_fin)
+        query = f"""
             SELECT 
-                TO_CHAR(m.Fecha, 'YYYY-Mon') as periodo,
-                m.CuentaID, c.cuenta as cuenta_nombre,
-                md.centro_costo_id, g.centro_costo as centro_costo_nombre,
-                COUNT(DISTINCT m.Id) as conteo,
-                SUM(CASE WHEN md.Valor > 0 THEN md.Valor ELSE 0 END) as ingresos,
-                SUM(CASE WHEN md.Valor < 0 THEN ABS(md.Valor) ELSE 0 END) as egresos
-            FROM movimientos_encabezado m
-            LEFT JOIN cuentas c ON m.CuentaID = c.cuentaid
-            LEFT JOIN movimientos_detalle md ON m.Id = md.movimiento_id
-            LEFT JOIN centro_costos g ON md.centro_costo_id = g.centro_costo_id
-            WHERE 1=1
-        """
-        params = []
-        if fecha_inicio:
-            query += " AND m.Fecha >= %s"
-            params.append(fecha_inicio)
-        if fecha_fin:
-            query += " AND m.Fecha <= %s"
-            params.append(fecha_fin)
-            
-        # Agrupar y Ordenar
-        query += """
-            GROUP BY TO_CHAR(m.Fecha, 'YYYY-Mon'), TO_CHAR(m.Fecha, 'YYYY-MM'), m.CuentaID, c.cuenta, md.centro_costo_id, g.centro_costo
-            ORDER BY TO_CHAR(m.Fecha, 'YYYY-MM') DESC, c.cuenta, g.centro_costo
+                TO_CHAR(make_date(f.year, f.month, 1), 'YYYY-Mon') as periodo,
+                f.cuenta_id, c.cuenta as cuenta_nombre,
+                f.centro_costo_id, g.centro_costo as centro_costo_nombre,
+                SUM(f.conteo) as conteo,
+                SUM(f.ingresos) as ingresos,
+                SUM(f.egresos) as egresos
+            FROM ({fuente}) f
+            LEFT JOIN cuentas c ON f.cuenta_id = c.cuentaid
+            LEFT JOIN centro_costos g ON f.centro_costo_id = g.centro_costo_id
+            GROUP BY f.year, f.month, f.cuenta_id, c.cuenta, f.centro_costo_id, g.centro_costo
+            ORDER BY f.year DESC, f.month DESC, c.cuenta, g.centro_costo
         """
         
         cursor.execute(query, tuple(params))
@@ -1325,8 +1922,13 @@ class PostgresMovimientoRepository(MovimientoRepository):
             
             # 4. Eliminar encabezado
             cursor.execute("DELETE FROM movimientos_encabezado WHERE Id = %s", (id,))
+            if mov:
+                resumen_mensual.actualizar_periodos(cursor, [(mov.cuenta_id, mov.fecha.year, mov.fecha.month)])
             
             self.conn.commit()
+            self._invalidar_lecturas()
+            if self.indice_descripciones:
+                self.indice_descripciones.eliminar([id])
             
             # Hook conciliacion
             if mov:
@@ -1414,15 +2016,18 @@ class PostgresMovimientoRepository(MovimientoRepository):
             # 5. Eliminar encabezados
             cursor.execute("DELETE FROM movimientos_encabezado WHERE Id = ANY(%s)", (ids,))
             count = cursor.rowcount
+            resumen_mensual.actualizar_periodos(cursor, cuentas_afectadas)
             
             self.conn.commit()
+            self._invalidar_lecturas()
+            if self.indice_descripciones:
+                self.indice_descripciones.eliminar(ids)
             
-            # 6. Recalcular conciliaciones afectadas
-            for c_id, y, m in cuentas_afectadas:
-                try:
-                    self.conciliacion_repo.recalcular_sistema(c_id, y, m)
-                except Exception as e:
-                    print(f"Warning: Error recalculando conciliacion {c_id}-{y}-{m}: {e}")
+            # 6. Recalcular conciliaciones afectadas (en lote)
+            try:
+                self.conciliacion_repo.recalcular_sistema_lote(cuentas_afectadas)
+            except Exception as e:
+                logger.warning(f"Error al recalcular conciliaciones ({len(cuentas_afectadas)} periodos): {e}")
             
             return count
             
@@ -1472,15 +2077,16 @@ class PostgresMovimientoRepository(MovimientoRepository):
             """
             insert_data = [(m_id, d['tercero_id'], d['valor']) for m_id, d in id_data_map.items()]
             cursor.executemany(insert_query, insert_data)
+            resumen_mensual.actualizar_periodos(cursor, cuentas_afectadas)
             
             self.conn.commit()
+            self._invalidar_lecturas()
             
-            # 6. Recalcular conciliaciones
-            for c_id, y, m in cuentas_afectadas:
-                try:
-                    self.conciliacion_repo.recalcular_sistema(c_id, y, m)
-                except Exception as e:
-                    print(f"Warning: Error recalculando conciliacion {c_id}-{y}-{m}: {e}")
+            # 6. Recalcular conciliaciones (en lote)
+            try:
+                self.conciliacion_repo.recalcular_sistema_lote(cuentas_afectadas)
+            except Exception as e:
+                logger.warning(f"Error al recalcular conciliaciones ({len(cuentas_afectadas)} periodos): {e}")
             
             return len(found_ids)
             
@@ -1538,16 +2144,17 @@ class PostgresMovimientoRepository(MovimientoRepository):
             # Batch execute is cleaner
             insert_data = [(m_id, d['tercero_id'], d['valor']) for m_id, d in id_data_map.items()]
             cursor.executemany(insert_query, insert_data)
+            resumen_mensual.actualizar_periodos(cursor, cuentas_afectadas)
             
             count = len(ids)
             self.conn.commit()
+            self._invalidar_lecturas()
             
-            # 6. Recalcular conciliaciones afectadas
-            for c_id, y, m in cuentas_afectadas:
-                try:
-                    self.conciliacion_repo.recalcular_sistema(c_id, y, m)
-                except Exception as e:
-                    print(f"Warning: Error recalculando conciliacion {c_id}-{y}-{m}: {e}")
+            # 6. Recalcular conciliaciones afectadas (en lote)
+            try:
+                self.conciliacion_repo.recalcular_sistema_lote(cuentas_afectadas)
+            except Exception as e:
+                logger.warning(f"Error al recalcular conciliaciones ({len(cuentas_afectadas)} periodos): {e}")
             
             return count
             
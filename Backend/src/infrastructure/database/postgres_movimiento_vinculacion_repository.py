@@ -1,11 +1,12 @@
-from typing import List, Optional
-from datetime import datetime
+from typing import List, Optional, Tuple
+from datetime import date, datetime
 from decimal import Decimal
 import psycopg2
 from src.domain.models.movimiento_match import MovimientoMatch, MatchEstado
 from src.domain.models.movimiento_extracto import MovimientoExtracto
 from src.domain.models.movimiento import Movimiento
 from src.domain.ports.movimiento_vinculacion_repository import MovimientoVinculacionRepository
+from src.domain.services.lecturas_periodo import CacheLecturasPeriodo
 from src.infrastructure.database.postgres_movimiento_extracto_repository import PostgresMovimientoExtractoRepository
 from src.infrastructure.database.postgres_movimiento_repository import PostgresMovimientoRepository
 
@@ -18,8 +19,65 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
     definido en la capa de dominio.
     """
     
-    def __init__(self, connection):
+    _CONSULTA_POR_PERIODO = """
+        SELECT v.id, v.movimiento_sistema_id, v.movimiento_extracto_id, v.estado,
+               v.score_similitud, v.score_fecha, v.score_valor, v.score_descripcion,
+               v.confirmado_por_usuario, v.fecha_confirmacion, v.created_by, 
+               v.notas, v.created_at
+        FROM movimiento_vinculaciones v
+        INNER JOIN movimientos_extracto me ON v.movimiento_extracto_id = me.id
+        WHERE me.cuenta_id = %s AND me.year = %s AND me.month = %s
+        ORDER BY me.fecha DESC, ABS(me.valor) DESC
+    """
+
+    # Parámetros: cuenta_id, year, month, cuenta_id, fecha_inicio, fecha_fin
+    _CONSULTA_MARCA_PERIODO = """
+        WITH extracto AS (
+            SELECT me.* FROM movimientos_extracto me
+            WHERE me.cuenta_id = %s AND me.year = %s AND me.month = %s
+        ),
+        vinculadas AS (
+            -- Las del periodo y las de otros periodos sobre los mismos movimientos del sistema
+            SELECT v.* FROM movimiento_vinculaciones v
+            WHERE v.movimiento_extracto_id IN (SELECT id FROM extracto)
+               OR v.movimiento_sistema_id IN (
+                   SELECT v2.movimiento_sistema_id FROM movimiento_vinculaciones v2
+                   WHERE v2.movimiento_extracto_id IN (SELECT id FROM extracto)
+               )
+        ),
+        sistema AS (
+            SELECT m.* FROM movimientos_encabezado m
+            WHERE (m.CuentaID = %s AND m.Fecha BETWEEN %s AND %s)
+               OR m.Id IN (SELECT movimiento_sistema_id FROM vinculadas)
+        )
+        SELECT
+            (SELECT COUNT(*) FROM extracto),
+            (SELECT MAX(created_at) FROM extracto),
+            (SELECT COALESCE(SUM(hashtext(e::text)), 0) FROM extracto e),
+            (SELECT COUNT(*) FROM vinculadas),
+            (SELECT MAX(created_at) FROM vinculadas),
+            (SELECT COALESCE(SUM(hashtext(v::text)), 0) FROM vinculadas v),
+            (SELECT COUNT(*) FROM sistema),
+            (SELECT MAX(created_at) FROM sistema),
+            (SELECT COALESCE(SUM(hashtext(s::text)), 0) FROM sistema s),
+            (SELECT COUNT(*) FROM movimientos_detalle md WHERE md.movimiento_id IN (SELECT Id FROM sistema)),
+            (SELECT COALESCE(SUM(hashtext(md::text)), 0) FROM movimientos_detalle md
+             WHERE md.movimiento_id IN (SELECT Id FROM sistema))
+    """
+
+    def __init__(self, connection, lecturas_periodo: Optional[CacheLecturasPeriodo] = None):
         self.conn = connection
+        # Modelos de lectura por periodo a invalidar después de cada escritura
+        self.lecturas_periodo = lecturas_periodo
+    
+    def _invalidar_lecturas(self, mov_extracto: Optional[MovimientoExtracto] = None) -> None:
+        """Invalida el periodo del extracto vinculado, o todos si no se conoce"""
+        if not self.lecturas_periodo:
+            return
+        if mov_extracto and mov_extracto.cuenta_id and mov_extracto.year and mov_extracto.month:
+            self.lecturas_periodo.invalidar_periodo(mov_extracto.cuenta_id, mov_extracto.year, mov_extracto.month)
+        else:
+            self.lecturas_periodo.invalidar()
     
     def _row_to_movimiento_match(
         self, 
@@ -51,13 +109,41 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
             created_at=row[12] if row[12] is not None else None
         )
 
-    def _obtener_movimiento_extracto(self, id: int) -> Optional[MovimientoExtracto]:
-        repo = PostgresMovimientoExtractoRepository(self.conn)
-        return repo.obtener_por_id(id)
+    def _construir_vinculaciones(self, rows) -> List[MovimientoMatch]:
+        """
+        Arma los MovimientoMatch de un conjunto de filas de vinculación.
+        
+        Carga los movimientos relacionados en bloque, con un número fijo de
+        consultas sin importar cuántas filas haya: extractos (1), encabezados
+        del sistema (1) y sus detalles (1). Conserva el orden de las filas y
+        omite las que no tengan movimiento de extracto.
+        """
+        if not rows:
+            return []
+        
+        ids_extracto = list({row[2] for row in rows})
+        ids_sistema = list({row[1] for row in rows if row[1]})
+        
+        repo_extracto = PostgresMovimientoExtractoRepository(self.conn)
+        extractos = {m.id: m for m in repo_extracto.obtener_por_ids(ids_extracto)}
+        
+        sistemas = {}
+        if ids_sistema:
+            repo_sistema = PostgresMovimientoRepository(self.conn)
+            sistemas = {m.id: m for m in repo_sistema.obtener_por_ids(ids_sistema)}
+        
+        return self._armar_vinculaciones(rows, extractos, sistemas)
 
-    def _obtener_movimiento_sistema(self, id: int) -> Optional[Movimiento]:
-        repo = PostgresMovimientoRepository(self.conn)
-        return repo.obtener_por_id(id)
+    def _armar_vinculaciones(self, rows, extractos: dict, sistemas: dict) -> List[MovimientoMatch]:
+        """Filas de vinculación + movimientos ya cargados (por ID) → MovimientoMatch"""
+        vinculaciones = []
+        for row in rows:
+            mov_extracto = extractos.get(row[2])
+            if mov_extracto:
+                mov_sistema = sistemas.get(row[1]) if row[1] else None
+                vinculaciones.append(self._row_to_movimiento_match(row, mov_extracto, mov_sistema))
+        
+        return vinculaciones
 
     def guardar(self, vinculacion: MovimientoMatch) -> MovimientoMatch:
         """
@@ -130,6 +216,7 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
                 vinculacion.created_at = result[1]
             
             self.conn.commit()
+            self._invalidar_lecturas(vinculacion.mov_extracto)
             return vinculacion
             
         except Exception as e:
@@ -149,30 +236,11 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
         """
         cursor = self.conn.cursor()
         try:
-            query = """
-                SELECT v.id, v.movimiento_sistema_id, v.movimiento_extracto_id, v.estado,
-                       v.score_similitud, v.score_fecha, v.score_valor, v.score_descripcion,
-                       v.confirmado_por_usuario, v.fecha_confirmacion, v.created_by, 
-                       v.notas, v.created_at
-                FROM movimiento_vinculaciones v
-                INNER JOIN movimientos_extracto me ON v.movimiento_extracto_id = me.id
-                WHERE me.cuenta_id = %s AND me.year = %s AND me.month = %s
-                ORDER BY me.fecha DESC, ABS(me.valor) DESC
-            """
-            cursor.execute(query, (cuenta_id, year, month))
+            cursor.execute(self._CONSULTA_POR_PERIODO, (cuenta_id, year, month))
             rows = cursor.fetchall()
             
-            vinculaciones = []
-            for row in rows:
-                # Obtener movimientos relacionados
-                mov_extracto = self._obtener_movimiento_extracto(row[2])
-                mov_sistema = self._obtener_movimiento_sistema(row[1]) if row[1] else None
-                
-                if mov_extracto:
-                    vinculacion = self._row_to_movimiento_match(row, mov_extracto, mov_sistema)
-                    vinculaciones.append(vinculacion)
-            
-            return vinculaciones
+            # Movimientos relacionados en bloque (sin una consulta por fila)
+            return self._construir_vinculaciones(rows)
             
         finally:
             cursor.close()
@@ -200,14 +268,8 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
             if not row:
                 return None
             
-            # Obtener movimientos relacionados
-            mov_extracto = self._obtener_movimiento_extracto(row[2])
-            mov_sistema = self._obtener_movimiento_sistema(row[1]) if row[1] else None
-            
-            if not mov_extracto:
-                return None
-            
-            return self._row_to_movimiento_match(row, mov_extracto, mov_sistema)
+            vinculaciones = self._construir_vinculaciones([row])
+            return vinculaciones[0] if vinculaciones else None
             
         finally:
             cursor.close()
@@ -242,6 +304,7 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
             """
             cursor.execute(query, (movimiento_extracto_id,))
             self.conn.commit()
+            self._invalidar_lecturas()
             
         except Exception as e:
             self.conn.rollback()
@@ -255,18 +318,11 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
         nuevo_estado: MatchEstado,
         usuario: str,
         notas: Optional[str] = None
-    ) -> MovimientoMatch:
+    ) -> Optional[MovimientoMatch]:
         """Actualiza el estado de una vinculación existente."""
         cursor = self.conn.cursor()
         try:
-            cursor.execute(
-                "SELECT movimiento_extracto_id, movimiento_sistema_id FROM movimiento_vinculaciones WHERE id = %s",
-                (vinculacion_id,)
-            )
-            row = cursor.fetchone()
-            if not row:
-                raise ValueError(f"No existe vinculación con id={vinculacion_id}")
-            
+            # Actualizar y leer la fila en la misma sentencia
             query = """
                 UPDATE movimiento_vinculaciones 
                 SET estado = %s,
@@ -275,24 +331,25 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
                     created_by = %s,
                     notas = %s
                 WHERE id = %s
+                RETURNING id, movimiento_sistema_id, movimiento_extracto_id, estado,
+                          score_similitud, score_fecha, score_valor, score_descripcion,
+                          confirmado_por_usuario, fecha_confirmacion, created_by, 
+                          notas, created_at
             """
             cursor.execute(query, (nuevo_estado.value, usuario, notas, vinculacion_id))
-            self.conn.commit()
-            
-            mov_extracto = self._obtener_movimiento_extracto(row[0])
-            mov_sistema = self._obtener_movimiento_sistema(row[1]) if row[1] else None
-            
-            cursor.execute("""
-                SELECT id, movimiento_sistema_id, movimiento_extracto_id, estado,
-                       score_similitud, score_fecha, score_valor, score_descripcion,
-                       confirmado_por_usuario, fecha_confirmacion, created_by, 
-                       notas, created_at
-                FROM movimiento_vinculaciones
-                WHERE id = %s
-            """, (vinculacion_id,))
             updated_row = cursor.fetchone()
+            if not updated_row:
+                raise ValueError(f"No existe vinculación con id={vinculacion_id}")
+            self.conn.commit()
             
-            return self._row_to_movimiento_match(updated_row, mov_extracto, mov_sistema)
+            vinculaciones = self._construir_vinculaciones([updated_row])
+            if not vinculaciones:
+                # Sin extracto que construir: invalidar todo, no se conoce el periodo
+                self._invalidar_lecturas()
+                return None
+            vinculacion = vinculaciones[0]
+            self._invalidar_lecturas(vinculacion.mov_extracto)
+            return vinculacion
             
         except Exception as e:
             self.conn.rollback()
@@ -325,16 +382,8 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
             cursor.execute(query, (cuenta_id, year, month))
             rows = cursor.fetchall()
             
-            vinculaciones = []
-            for row in rows:
-                mov_extracto = self._obtener_movimiento_extracto(row[2])
-                mov_sistema = self._obtener_movimiento_sistema(row[1]) if row[1] else None
-                
-                if mov_extracto:
-                    vinculacion = self._row_to_movimiento_match(row, mov_extracto, mov_sistema)
-                    vinculaciones.append(vinculacion)
-            
-            return vinculaciones
+            # Movimientos relacionados en bloque (sin una consulta por fila)
+            return self._construir_vinculaciones(rows)
             
         finally:
             cursor.close()
@@ -365,16 +414,8 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
             cursor.execute(query, (cuenta_id, year, month, estado.value))
             rows = cursor.fetchall()
             
-            vinculaciones = []
-            for row in rows:
-                mov_extracto = self._obtener_movimiento_extracto(row[2])
-                mov_sistema = self._obtener_movimiento_sistema(row[1]) if row[1] else None
-                
-                if mov_extracto:
-                    vinculacion = self._row_to_movimiento_match(row, mov_extracto, mov_sistema)
-                    vinculaciones.append(vinculacion)
-            
-            return vinculaciones
+            # Movimientos relacionados en bloque (sin una consulta por fila)
+            return self._construir_vinculaciones(rows)
             
         finally:
             cursor.close()
@@ -388,6 +429,7 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
             query = "DELETE FROM movimiento_vinculaciones WHERE id = %s"
             cursor.execute(query, (id,))
             self.conn.commit()
+            self._invalidar_lecturas()
         except Exception as e:
             self.conn.rollback()
             raise e
@@ -415,6 +457,7 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
             """
             cursor.execute(query, (sistema_id,))
             self.conn.commit()
+            self._invalidar_lecturas()
         except Exception as e:
             self.conn.rollback()
             raise e
@@ -439,14 +482,8 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
             if not row:
                 return None
             
-            # Obtener movimientos relacionados
-            mov_extracto = self._obtener_movimiento_extracto(row[2])
-            mov_sistema = self._obtener_movimiento_sistema(row[1]) if row[1] else None
-            
-            if not mov_extracto:
-                return None
-            
-            return self._row_to_movimiento_match(row, mov_extracto, mov_sistema)
+            vinculaciones = self._construir_vinculaciones([row])
+            return vinculaciones[0] if vinculaciones else None
             
         finally:
             cursor.close()
@@ -468,9 +505,31 @@ class PostgresMovimientoVinculacionRepository(MovimientoVinculacionRepository):
             cursor.execute(query, (cuenta_id, year, month))
             count = cursor.rowcount
             self.conn.commit()
+            if self.lecturas_periodo:
+                self.lecturas_periodo.invalidar_periodo(cuenta_id, year, month)
             return count
         except Exception as e:
             self.conn.rollback()
             raise e
         finally:
             cursor.close()
+
+    def obtener_marca_periodo(
+        self,
+        cuenta_id: int,
+        year: int,
+        month: int,
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> Tuple:
+        """
+        Por tabla: COUNT(*), MAX(created_at) y la suma de hashtext de cada fila
+        completa. Las tablas no tienen updated_at; la suma de hashes detecta las
+        modificaciones y el conteo las eliminaciones.
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(self._CONSULTA_MARCA_PERIODO, (cuenta_id, year, month, cuenta_id, fecha_inicio, fecha_fin))
+            return tuple(cursor.fetchone())
+        finally:
+            cursor.close()
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from src.domain.models.tercero_descripcion import TerceroDescripcion
 from src.domain.ports.tercero_descripcion_repository import TerceroDescripcionRepository
 
@@ -133,14 +133,50 @@ class PostgresTerceroDescripcionRepository(TerceroDescripcionRepository):
             return self._map_row(row)
         return None
     
+    def buscar_por_referencias(self, referencias: List[str]) -> Dict[str, TerceroDescripcion]:
+        """
+        Igual que buscar_por_referencia para varias referencias en una sola consulta.
+        Retorna {referencia consultada: descripción}; la coincidencia exacta
+        tiene prioridad sobre la de sufijo .0.
+        """
+        referencias = list({r for r in referencias if r})
+        if not referencias:
+            return {}
+
+        cursor = self.conn.cursor()
+        query = """
+            SELECT id, terceroid, descripcion, referencia, activa, created_at 
+            FROM tercero_descripciones 
+            WHERE referencia = ANY(%s) AND activa = TRUE
+            ORDER BY id
+        """
+        cursor.execute(query, (referencias + [f"{r}.0" for r in referencias],))
+        rows = cursor.fetchall()
+        cursor.close()
+
+        exactas: Dict[str, TerceroDescripcion] = {}
+        legacy: Dict[str, TerceroDescripcion] = {}
+        for row in rows:
+            descripcion = self._map_row(row)
+            exactas.setdefault(descripcion.referencia, descripcion)
+            if descripcion.referencia.endswith('.0'):
+                legacy.setdefault(descripcion.referencia[:-2], descripcion)
+
+        resultado = {}
+        for referencia in referencias:
+            encontrada = exactas.get(referencia) or legacy.get(referencia)
+            if encontrada:
+                resultado[referencia] = encontrada
+        return resultado
+    
     def buscar_por_descripcion(self, texto: str):
         """Busca descripciones que contengan el texto dado."""
         cursor = self.conn.cursor()
-        # Buscar por coincidencia parcial, case insensitive
+        # Buscar por coincidencia parcial, case insensitive (descripcion_busqueda = UPPER(descripcion), índice trigram)
         query = """
             SELECT id, terceroid, descripcion, referencia, activa, created_at 
             FROM tercero_descripciones 
-            WHERE UPPER(descripcion) LIKE UPPER(%s) AND activa = TRUE
+            WHERE descripcion_busqueda LIKE UPPER(%s) AND activa = TRUE
             ORDER BY descripcion
             LIMIT 10
         """
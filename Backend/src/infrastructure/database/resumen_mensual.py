@@ -0,0 +1,270 @@
+"""
+Agregado mensual de movimientos (resumen_movimientos_mensual) para los
+reportes y el dashboard.
+
+La tabla guarda ingresos, egresos y conteo por (cuenta, año, mes, tercero
+del encabezado, tercero del detalle, centro de costo, concepto, signo del
+encabezado): todas las dimensiones por las que filtran o agrupan los
+reportes. No es una vista materializada (REFRESH recalcula todo): el
+repositorio recalcula solo los periodos (cuenta, año, mes) que toca cada
+escritura, dentro de la misma transacción.
+
+Los reportes leen los meses completos del rango desde el agregado y los
+meses parciales de los extremos desde movimientos_encabezado ⋈
+movimientos_detalle, con la misma forma de fila (fuente()).
+"""
+import calendar
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+TABLA = "resumen_movimientos_mensual"
+
+Periodo = Tuple[Optional[int], int, int]  # (cuenta_id, año, mes)
+
+COLUMNAS = (
+    "cuenta_id, year, month, tercero_id, tercero_detalle_id, centro_costo_id, "
+    "concepto_id, signo, ingresos, egresos, conteo"
+)
+
+# Agregado desde los datos vivos; {joins} y {where} delimitan las filas.
+# conteo cuenta cada movimiento una vez por centro de costo (la primera de
+# sus líneas en ese centro): sumado sobre las demás dimensiones da el
+# COUNT(DISTINCT m.Id) por centro de costo del dashboard.
+_SELECT_VIVO = """
+    SELECT cuenta_id, year, month, tercero_id, tercero_detalle_id, centro_costo_id,
+           concepto_id, signo,
+           SUM(CASE WHEN valor > 0 THEN valor ELSE 0 END) AS ingresos,
+           SUM(CASE WHEN valor < 0 THEN -valor ELSE 0 END) AS egresos,
+           COUNT(*) FILTER (WHERE primero) AS conteo
+    FROM (
+        SELECT m.CuentaID AS cuenta_id,
+               EXTRACT(YEAR FROM m.Fecha)::int AS year,
+               EXTRACT(MONTH FROM m.Fecha)::int AS month,
+               m.terceroid AS tercero_id,
+               md.TerceroID AS tercero_detalle_id,
+               md.centro_costo_id,
+               md.ConceptoID AS concepto_id,
+               SIGN(m.Valor)::smallint AS signo,
+               md.Valor AS valor,
+               ROW_NUMBER() OVER (PARTITION BY m.Id, md.centro_costo_id ORDER BY md.id) = 1 AS primero
+        FROM movimientos_encabezado m
+        LEFT JOIN movimientos_detalle md ON m.Id = md.movimiento_id
+        {joins}
+        WHERE {where}
+    ) d
+    GROUP BY cuenta_id, year, month, tercero_id, tercero_detalle_id, centro_costo_id, concepto_id, signo
+"""
+
+# Periodos como rangos de fecha (usa el índice por cuenta y fecha)
+_JOIN_PERIODOS = (
+    "JOIN (VALUES {valores}) AS p(cuenta_id, desde, hasta) "
+    "ON m.CuentaID IS NOT DISTINCT FROM p.cuenta_id AND m.Fecha >= p.desde AND m.Fecha < p.hasta"
+)
+
+# Los movimientos sin fecha no pertenecen a ningún periodo
+_CON_FECHA = "m.Fecha IS NOT NULL"
+
+# La tabla se crea con Sql/CreateTable_resumen_movimientos_mensual.sql; hasta
+# entonces los reportes leen los datos vivos y las escrituras no la mantienen
+_disponible = False
+
+
+def disponible(cursor) -> bool:
+    global _disponible
+    if not _disponible:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (TABLA,))
+        _disponible = bool(cursor.fetchone()[0])
+    return _disponible
+
+
+def _inicio_mes_siguiente(y: int, m: int) -> date:
+    return date(y + 1, 1, 1) if m == 12 else date(y, m + 1, 1)
+
+
+def _ordenados(periodos: Iterable[Periodo]) -> List[Periodo]:
+    return sorted(periodos, key=lambda p: (p[0] is None, p[0] or 0, p[1], p[2]))
+
+
+def _valores_periodos(periodos: Iterable[Periodo]) -> Tuple[str, list]:
+    valores, params = [], []
+    for cuenta_id, y, m in _ordenados(periodos):
+        valores.append("(%s::integer, %s::date, %s::date)")
+        params.extend([cuenta_id, date(y, m, 1), _inicio_mes_siguiente(y, m)])
+    return ", ".join(valores), params
+
+
+def periodos_de_movimientos(cursor, ids: List[int]) -> Set[Periodo]:
+    """Periodos (cuenta, año, mes) actuales de los movimientos `ids`"""
+    if not ids:
+        return set()
+    cursor.execute(
+        "SELECT DISTINCT CuentaID, EXTRACT(YEAR FROM Fecha)::int, EXTRACT(MONTH FROM Fecha)::int "
+        "FROM movimientos_encabezado WHERE Id = ANY(%s) AND Fecha IS NOT NULL",
+        (list(ids),)
+    )
+    return {(r[0], r[1], r[2]) for r in cursor.fetchall()}
+
+
+def actualizar_periodos(cursor, periodos: Iterable[Periodo]) -> None:
+    """
+    Recalcula el agregado de los periodos dados desde los datos vivos.
+    Se ejecuta en la transacción de la escritura (el llamador hace commit).
+    """
+    periodos = {p for p in periodos if p[1] and p[2]}
+    if not periodos or not disponible(cursor):
+        return
+    # DELETE + INSERT sin candado: dos transacciones READ COMMITTED sobre el
+    # mismo periodo insertarían ambas sus filas (conteo doble). Un candado
+    # por periodo, tomado en orden para no cruzarse, las serializa
+    cursor.execute(
+        "SELECT pg_advisory_xact_lock(hashtext(%s), hashtext(p.clave)) "
+        "FROM unnest(%s::text[]) WITH ORDINALITY AS p(clave, orden) ORDER BY p.orden",
+        (TABLA, [f"{c}:{y}:{m}" for c, y, m in _ordenados(periodos)])
+    )
+    valores, params = _valores_periodos(periodos)
+    cursor.execute(
+        f"""
+            DELETE FROM {TABLA} r
+            USING (VALUES {valores}) AS p(cuenta_id, desde, hasta)
+            WHERE r.cuenta_id IS NOT DISTINCT FROM p.cuenta_id
+              AND r.year = EXTRACT(YEAR FROM p.desde) AND r.month = EXTRACT(MONTH FROM p.desde)
+        """,
+        params
+    )
+    cursor.execute(
+        f"INSERT INTO {TABLA} ({COLUMNAS}) "
+        + _SELECT_VIVO.format(joins=_JOIN_PERIODOS.format(valores=valores), where="TRUE"),
+        params
+    )
+
+
+def reconstruir(cursor) -> None:
+    """Recalcula todo el agregado (tras restauraciones con SQL directo)"""
+    if not disponible(cursor):
+        return
+    # Excluye a otras reconstrucciones y a actualizar_periodos (las lecturas siguen)
+    cursor.execute(f"LOCK TABLE {TABLA} IN SHARE ROW EXCLUSIVE MODE")
+    cursor.execute(f"DELETE FROM {TABLA}")
+    cursor.execute(f"INSERT INTO {TABLA} ({COLUMNAS}) " + _SELECT_VIVO.format(joins="", where=_CON_FECHA))
+
+
+def partes_rango(
+    fecha_inicio: Optional[date], fecha_fin: Optional[date]
+) -> Tuple[Optional[Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]], List[Tuple[Optional[date], Optional[date]]]]:
+    """
+    Divide [fecha_inicio, fecha_fin] en meses completos (desde el agregado)
+    y rangos de días de los meses parciales de los extremos (datos vivos).
+
+    Returns:
+        (meses, vivos): meses es None si no hay meses completos, o
+        ((año, mes) | None, (año, mes) | None) con los extremos incluidos
+        (None = sin límite); vivos es la lista de rangos (desde, hasta)
+        inclusivos que se leen de los datos vivos.
+    """
+    if fecha_inicio and fecha_fin and fecha_inicio > fecha_fin:
+        return None, []
+
+    primero = None
+    if fecha_inicio:
+        primero = fecha_inicio if fecha_inicio.day == 1 else _inicio_mes_siguiente(fecha_inicio.year, fecha_inicio.month)
+    ultimo = None
+    if fecha_fin:
+        fin_de_mes = calendar.monthrange(fecha_fin.year, fecha_fin.month)[1]
+        ultimo = fecha_fin if fecha_fin.day == fin_de_mes else fecha_fin.replace(day=1) - timedelta(days=1)
+
+    if primero and ultimo and primero > ultimo:
+        # Sin meses completos: todo el rango es parcial
+        return None, [(fecha_inicio, fecha_fin)]
+
+    meses = (
+        (primero.year, primero.month) if primero else None,
+        (ultimo.year, ultimo.month) if ultimo else None,
+    )
+    vivos = []
+    if fecha_inicio and primero != fecha_inicio:
+        vivos.append((fecha_inicio, primero - timedelta(days=1)))
+    if fecha_fin and ultimo != fecha_fin:
+        vivos.append((ultimo + timedelta(days=1), fecha_fin))
+    return meses, vivos
+
+
+def _where_fechas(desde: Optional[date], hasta: Optional[date], params: list) -> str:
+    condiciones = ["TRUE"]
+    if desde:
+        condiciones.append("m.Fecha >= %s")
+        params.append(desde)
+    if hasta:
+        condiciones.append("m.Fecha <= %s")
+        params.append(hasta)
+    return " AND ".join(condiciones)
+
+
+def fuente(cursor, fecha_inicio: Optional[date] = None, fecha_fin: Optional[date] = None) -> Tuple[str, list]:
+    """
+    Subconsulta con las filas del agregado para el rango (columnas de
+    COLUMNAS), para usar como `FROM (...) f` en los reportes.
+    """
+    params: list = []
+    if not disponible(cursor):
+        return _SELECT_VIVO.format(joins="", where=_where_fechas(fecha_inicio, fecha_fin, params)), params
+
+    meses, vivos = partes_rango(fecha_inicio, fecha_fin)
+    partes = []
+    if meses:
+        desde, hasta = meses
+        condiciones = ["TRUE"]
+        if desde:
+            condiciones.append("(r.year, r.month) >= (%s, %s)")
+            params.extend(desde)
+        if hasta:
+            condiciones.append("(r.year, r.month) <= (%s, %s)")
+            params.extend(hasta)
+        partes.append(f"SELECT {COLUMNAS} FROM {TABLA} r WHERE {' AND '.join(condiciones)}")
+    for desde, hasta in vivos:
+        partes.append(_SELECT_VIVO.format(joins="", where=_where_fechas(desde, hasta, params)))
+    if not partes:
+        partes.append(f"SELECT {COLUMNAS} FROM {TABLA} r WHERE FALSE")
+    return " UNION ALL ".join(partes), params
+
+
+def verificar(conn, reparar: bool = False) -> Dict:
+    """
+    Recalcula el agregado completo desde los datos vivos y lo compara con
+    la tabla. Con reparar=True recalcula (y confirma) los periodos que
+    difieren.
+
+    Returns:
+        {"disponible", "periodos_con_diferencias": [{cuenta_id, year, month}], "reparados"}
+    """
+    cursor = conn.cursor()
+    try:
+        if not disponible(cursor):
+            return {"disponible": False, "periodos_con_diferencias": [], "reparados": 0}
+        vivo = _SELECT_VIVO.format(joins="", where=_CON_FECHA)
+        cursor.execute(f"""
+            WITH vivo AS ({vivo}),
+                 guardado AS (SELECT {COLUMNAS} FROM {TABLA})
+            SELECT DISTINCT cuenta_id, year, month FROM (
+                (SELECT * FROM vivo EXCEPT ALL SELECT * FROM guardado)
+                UNION ALL
+                (SELECT * FROM guardado EXCEPT ALL SELECT * FROM vivo)
+            ) diferencias
+            ORDER BY year, month, cuenta_id
+        """)
+        diferencias = [(r[0], r[1], r[2]) for r in cursor.fetchall()]
+        if reparar and diferencias:
+            actualizar_periodos(cursor, diferencias)
+            conn.commit()
+        return {
+            "disponible": True,
+            "periodos_con_diferencias": [
+                {"cuenta_id": c, "year": y, "month": m} for c, y, m in diferencias
+            ],
+            "reparados": len(diferencias) if reparar else 0,
+        }
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
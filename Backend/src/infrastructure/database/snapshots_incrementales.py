@@ -0,0 +1,325 @@
+"""
+Snapshots incrementales de tablas (base + deltas) con manifiesto y sumas
+de verificación.
+
+Cada tabla se divide en bloques de ids consecutivos (FLOOR(id / tamano_bloque))
+y PostgreSQL calcula un md5 por bloque sin enviar las filas. Un snapshot
+delta copia con COPY solo los bloques cuyo md5 cambió desde el snapshot
+anterior, así que su tamaño es proporcional al cambio y no a la base de
+datos; el primero de cada cadena (base) copia las tablas completas.
+
+manifest.json registra la cadena de snapshots, los bloques de cada delta,
+el sha256 de cada archivo y los md5 vigentes para comparar en el siguiente.
+restaurar() reconstruye cada tabla en el punto pedido tomando cada bloque
+de su versión más reciente (base o delta) y la reemplaza con COPY FROM.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+import zipfile
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from psycopg2 import sql
+
+from src.infrastructure.database.copia_tablas import (
+    _LectorLineas, _SIN_TIMEOUT, _columnas, ResultadoCopia, exportar_tabla, reemplazar_tabla
+)
+
+MANIFIESTO = "manifest.json"
+_VERSION_MANIFIESTO = 1
+# Texto acumulado por bloque al alimentar COPY FROM en la restauración
+_TAMANO_LECTURA = 64 * 1024
+
+# Un solo snapshot a la vez por proceso: cada delta depende del estado del anterior
+_candado = threading.Lock()
+
+
+def _sha256(ruta: str) -> str:
+    suma = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            suma.update(bloque)
+    return suma.hexdigest()
+
+
+def _registros(texto) -> Iterator[Tuple[List[str], str]]:
+    """
+    (campos, texto original) de cada registro CSV. Se conserva el texto
+    tal cual porque en COPY csv un campo vacío es NULL y "" es texto vacío.
+    """
+    crudo: List[str] = []
+
+    def lineas():
+        for linea in texto:
+            crudo.append(linea)
+            yield linea
+
+    for campos in csv.reader(lineas()):
+        yield campos, "".join(crudo)
+        crudo.clear()
+
+
+class SnapshotsIncrementales:
+    """
+    Snapshots de `tablas` en `directorio`. Las tablas deben tener una
+    columna entera `id` (los bloques se forman por rangos de id).
+
+    Se crea una base nueva cuando no hay cadena, cuando cambian las tablas
+    o sus columnas, cuando falta algún archivo de la cadena o cuando la
+    cadena ya tiene `max_deltas` deltas (acota el costo de restaurar).
+
+    `llaves` (tabla → columnas de un índice único) indica las tablas que se
+    restauran con upsert en lugar de DELETE + COPY (ver reemplazar_tabla).
+    """
+
+    def __init__(
+        self, directorio: str, tablas: List[str], tamano_bloque: int = 1000, max_deltas: int = 30,
+        llaves: Optional[Dict[str, Sequence[str]]] = None
+    ):
+        self.directorio = directorio
+        self.tablas = list(tablas)
+        self.llaves = dict(llaves or {})
+        self.tamano_bloque = tamano_bloque
+        self.max_deltas = max_deltas
+        os.makedirs(directorio, exist_ok=True)
+
+    # --- Manifiesto ---
+
+    def _ruta(self, archivo: str) -> str:
+        return os.path.join(self.directorio, archivo)
+
+    def _leer_manifiesto(self) -> dict:
+        try:
+            with open(self._ruta(MANIFIESTO), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"version": _VERSION_MANIFIESTO, "snapshots": [], "estado": {}}
+
+    def _guardar_manifiesto(self, manifiesto: dict) -> None:
+        # Escritura atómica: un fallo a mitad no deja el manifiesto corrupto
+        temporal = self._ruta(MANIFIESTO + ".tmp")
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(manifiesto, f, ensure_ascii=False, indent=1)
+        os.replace(temporal, self._ruta(MANIFIESTO))
+
+    def listar(self) -> List[dict]:
+        """Snapshots del manifiesto, del más antiguo al más reciente"""
+        return self._leer_manifiesto()["snapshots"]
+
+    def _cadena(self, manifiesto: dict, nombre: Optional[str] = None) -> List[dict]:
+        """Base y deltas hasta `nombre` (o hasta el último snapshot)"""
+        snapshots = manifiesto["snapshots"]
+        if nombre is None:
+            fin = len(snapshots) - 1
+        else:
+            fin = next((i for i, s in enumerate(snapshots) if s["nombre"] == nombre), None)
+            if fin is None:
+                raise ValueError(f"Snapshot no encontrado: {nombre}")
+        inicio = fin
+        while inicio >= 0 and snapshots[inicio]["tipo"] != "base":
+            inicio -= 1
+        if inicio < 0:
+            raise ValueError(f"El snapshot {nombre} no tiene una base en el manifiesto")
+        return snapshots[inicio:fin + 1]
+
+    # --- Sumas por bloque ---
+
+    def _sumas_bloques(self, cursor, tabla: str) -> Dict[str, str]:
+        cursor.execute(
+            sql.SQL(
+                "SELECT FLOOR(id / {n}::numeric)::bigint, md5(string_agg(t::text, E'\\n' ORDER BY id)) "
+                "FROM {tabla} AS t GROUP BY 1"
+            ).format(n=sql.Literal(self.tamano_bloque), tabla=sql.Identifier(tabla))
+        )
+        return {str(bloque): suma for bloque, suma in cursor.fetchall()}
+
+    def _requiere_base(self, manifiesto: dict, actuales: Dict[str, Tuple[List[str], Dict[str, str]]]) -> bool:
+        estado = manifiesto["estado"]
+        if not manifiesto["snapshots"] or set(estado) != set(self.tablas):
+            return True
+        if manifiesto.get("tamano_bloque") != self.tamano_bloque:
+            return True
+        if any(estado[t]["columnas"] != actuales[t][0] for t in self.tablas):
+            return True
+        cadena = self._cadena(manifiesto)
+        if len(cadena) - 1 >= self.max_deltas:
+            return True
+        return not all(os.path.exists(self._ruta(s["archivo"])) for s in cadena)
+
+    # --- Crear ---
+
+    def crear(self, conn, prefijo: str) -> dict:
+        """
+        Crea un snapshot (base o delta) de las tablas con la conexión dada
+        y lo registra en el manifiesto. Solo lee: no hace commit.
+
+        Las sumas se calculan antes de copiar los bloques; si una fila cambia
+        entre ambos pasos, el bloque se copia con el dato nuevo y la suma
+        guardada (la anterior) hace que el siguiente snapshot lo vuelva a copiar.
+
+        Returns:
+            La entrada del manifiesto del snapshot creado
+        """
+        with _candado:
+            manifiesto = self._leer_manifiesto()
+            cursor = conn.cursor()
+            try:
+                cursor.execute(_SIN_TIMEOUT)
+                actuales = {}
+                for tabla in self.tablas:
+                    columnas = [c for c, generada in _columnas(cursor, tabla).items() if not generada]
+                    actuales[tabla] = (columnas, self._sumas_bloques(cursor, tabla))
+            finally:
+                cursor.close()
+
+            es_base = self._requiere_base(manifiesto, actuales)
+            nombre = f"{prefijo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            existentes = {s["nombre"] for s in manifiesto["snapshots"]}
+            sufijo = 1
+            while nombre in existentes or os.path.exists(self._ruta(nombre + ".zip")):
+                sufijo += 1
+                nombre = f"{prefijo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{sufijo}"
+            archivo = nombre + ".zip"
+            ruta = self._ruta(archivo)
+
+            tablas = {}
+            try:
+                with zipfile.ZipFile(ruta, "w", zipfile.ZIP_DEFLATED) as zip_file:
+                    for tabla in self.tablas:
+                        columnas, sumas = actuales[tabla]
+                        consulta = sql.SQL("SELECT {} FROM {}").format(
+                            sql.SQL(", ").join(sql.Identifier(c) for c in columnas),
+                            sql.Identifier(tabla)
+                        )
+                        if es_base:
+                            bloques = None
+                        else:
+                            previas = manifiesto["estado"][tabla]["bloques"]
+                            bloques = sorted(
+                                int(b) for b in set(previas) | set(sumas) if previas.get(b) != sumas.get(b)
+                            )
+                            if not bloques:
+                                tablas[tabla] = {"bloques": [], "filas": 0, "bytes": 0}
+                                continue
+                            consulta = sql.SQL("{} WHERE FLOOR(id / {}::numeric)::bigint = ANY({})").format(
+                                consulta, sql.Literal(self.tamano_bloque), sql.Literal(bloques)
+                            )
+                        with zip_file.open(f"{tabla}.csv", "w", force_zip64=True) as destino:
+                            resultado = exportar_tabla(conn, tabla, destino, consulta)
+                        tablas[tabla] = {"bloques": bloques, "filas": resultado.filas, "bytes": resultado.bytes}
+            except BaseException:
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+                raise
+
+            entrada = {
+                "nombre": nombre,
+                "tipo": "base" if es_base else "delta",
+                "archivo": archivo,
+                "creado": datetime.now().isoformat(timespec="seconds"),
+                "sha256": _sha256(ruta),
+                "bytes": os.path.getsize(ruta),
+                "tablas": tablas,
+            }
+            manifiesto["version"] = _VERSION_MANIFIESTO
+            manifiesto["tamano_bloque"] = self.tamano_bloque
+            manifiesto["snapshots"].append(entrada)
+            manifiesto["estado"] = {
+                tabla: {"columnas": columnas, "bloques": sumas}
+                for tabla, (columnas, sumas) in actuales.items()
+            }
+            self._guardar_manifiesto(manifiesto)
+            return entrada
+
+    # --- Restaurar ---
+
+    def _filas_tabla(
+        self, zips: List[zipfile.ZipFile], tabla: str, fuente: Dict[int, int], tamano_bloque: int
+    ) -> Iterator[bytes]:
+        """
+        CSV (encabezado y filas) de la tabla en el punto de la cadena: cada
+        fila sale del archivo que tiene la versión más reciente de su bloque
+        (`fuente`: bloque → índice en la cadena; los que no están, de la base).
+        """
+        usados = {0} | set(fuente.values())
+        encabezado = None
+        primera_fila = True
+        pendiente: List[str] = []
+        tamano = 0
+        for indice, zip_file in enumerate(zips):
+            if indice not in usados or f"{tabla}.csv" not in zip_file.namelist():
+                continue
+            with zip_file.open(f"{tabla}.csv") as miembro:
+                registros = _registros(io.TextIOWrapper(miembro, encoding="utf-8", newline=""))
+                primero = next(registros, None)
+                if primero is None:
+                    continue
+                campos, crudo = primero
+                if encabezado is None:
+                    encabezado = campos
+                    # Encabezado y primera fila por separado: reemplazar_tabla los lee con readline
+                    yield crudo.encode("utf-8")
+                elif campos != encabezado:
+                    raise ValueError(f"Las columnas de {tabla} cambian dentro de la cadena de snapshots")
+                posicion_id = [c.lower() for c in campos].index("id")
+                for campos, crudo in registros:
+                    if fuente.get(int(campos[posicion_id]) // tamano_bloque, 0) != indice:
+                        continue
+                    if primera_fila:
+                        primera_fila = False
+                        yield crudo.encode("utf-8")
+                        continue
+                    pendiente.append(crudo)
+                    tamano += len(crudo)
+                    if tamano >= _TAMANO_LECTURA:
+                        yield "".join(pendiente).encode("utf-8")
+                        pendiente, tamano = [], 0
+        if pendiente:
+            yield "".join(pendiente).encode("utf-8")
+
+    def restaurar(self, conn, nombre: str) -> Dict[str, ResultadoCopia]:
+        """
+        Reemplaza las tablas con su contenido en el snapshot `nombre` (base
+        más deltas), dentro de la transacción de `conn` (no hace commit).
+
+        Raises:
+            ValueError: Si el snapshot no existe, falta un archivo de la
+                cadena o su sha256 no coincide con el del manifiesto
+        """
+        manifiesto = self._leer_manifiesto()
+        cadena = self._cadena(manifiesto, nombre)
+        tamano_bloque = manifiesto.get("tamano_bloque", self.tamano_bloque)
+        for snapshot in cadena:
+            ruta = self._ruta(snapshot["archivo"])
+            if not os.path.exists(ruta):
+                raise ValueError(f"Falta el archivo del snapshot {snapshot['nombre']}")
+            if _sha256(ruta) != snapshot["sha256"]:
+                raise ValueError(f"El archivo del snapshot {snapshot['nombre']} está dañado (sha256 distinto)")
+
+        resultados = {}
+        with ExitStack() as pila:
+            zips = [pila.enter_context(zipfile.ZipFile(self._ruta(s["archivo"]))) for s in cadena]
+            # Orden de la base: las tablas padre antes que las hijas
+            for tabla in cadena[0]["tablas"]:
+                fuente = {}
+                for indice, snapshot in enumerate(cadena[1:], 1):
+                    for bloque in snapshot["tablas"].get(tabla, {}).get("bloques") or []:
+                        fuente[bloque] = indice
+                origen = _LectorLineas(self._filas_tabla(zips, tabla, fuente, tamano_bloque))
+                resultado = reemplazar_tabla(conn, tabla, origen, self.llaves.get(tabla))
+                if resultado is None:
+                    # Tabla vacía en ese punto (las de upsert conservan sus filas)
+                    if tabla not in self.llaves:
+                        cursor = conn.cursor()
+                        try:
+                            cursor.execute(sql.SQL("DELETE FROM {}").format(sql.Identifier(tabla)))
+                        finally:
+                            cursor.close()
+                    resultado = ResultadoCopia(tabla, 0, 0, 0.0)
+                resultados[tabla] = resultado
+        return resultados
@@ -2,7 +2,7 @@
 Extractor de movimientos individuales para Cuenta de Ahorros Bancolombia.
 Lee PDFs de extracto bancario y extrae cada transacción.
 """
-import pdfplumber
+from ..pdf_texto import abrir_pdf
 import re
 import logging
 from typing import List, Dict, Any
@@ -23,7 +23,7 @@ def extraer_movimientos(file_obj: Any) -> List[Dict[str, Any]]:
         year_inicio = datetime.now().year
         year_fin = year_inicio
         
-        with pdfplumber.open(file_obj) as pdf:
+        with abrir_pdf(file_obj) as pdf:
             # 1. Buscar RANGO DE FECHAS en la primera página
             if len(pdf.pages) > 0:
                 first_page_text = pdf.pages[0].extract_text() or ""
@@ -3,7 +3,7 @@ Extractor de resumen mensual para FondoRenta (Cibest Capital - Bancolombia).
 Lee PDFs de extracto mensual del fondo.
 """
 
-import pdfplumber
+from ..pdf_texto import abrir_pdf
 import re
 import logging
 from typing import Dict, Any, Optional
@@ -25,7 +25,7 @@ def extraer_resumen(file_obj: Any) -> Dict[str, Any]:
         if hasattr(file_obj, 'seek'):
             file_obj.seek(0)
 
-        with pdfplumber.open(file_obj) as pdf:
+        with abrir_pdf(file_obj) as pdf:
             full_text = ""
             for page in pdf.pages:
                 t = page.extract_text()
@@ -3,7 +3,7 @@ Extractor de movimientos individuales para MasterCard USD Bancolombia (FORMATO A
 Lee PDFs de extracto y extrae cada transacción de la sección DOLARES.
 Valida estrictamente que la página contenga el encabezado "ESTADO DE CUENTA DOLARES" (sin espacios).
 """
-import pdfplumber
+from ..pdf_texto import abrir_pdf
 import re
 from typing import List, Dict, Any
 from decimal import Decimal
@@ -30,7 +30,7 @@ def extraer_movimientos(file_obj: Any) -> List[Dict[str, Any]]:
     movimientos = []
     
     try:
-        with pdfplumber.open(file_obj) as pdf:
+        with abrir_pdf(file_obj) as pdf:
             numero_linea = 0
             
             for page_num, page in enumerate(pdf.pages, 1):
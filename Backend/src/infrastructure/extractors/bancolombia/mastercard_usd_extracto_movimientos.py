@@ -2,7 +2,7 @@
 Extractor de movimientos individuales para MasterCard USD Bancolombia (Nuevo Formato).
 Lee PDFs de extracto y extrae cada transacción.
 """
-import pdfplumber
+from ..pdf_texto import abrir_pdf
 import re
 from typing import List, Dict, Any
 from decimal import Decimal
@@ -23,7 +23,7 @@ def extraer_movimientos(file_obj: Any) -> List[Dict[str, Any]]:
     movimientos = []
     
     try:
-        with pdfplumber.open(file_obj) as pdf:
+        with abrir_pdf(file_obj) as pdf:
             numero_linea = 0
             
             for page in pdf.pages:
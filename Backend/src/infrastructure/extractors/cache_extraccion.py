@@ -0,0 +1,240 @@
+"""
+Caché en disco, direccionado por contenido, del texto de los PDFs y de los
+resultados de los extractores.
+
+La clave es el SHA-256 de los bytes del archivo más el nombre y la versión
+del extractor, así el flujo analizar → confirmar → cargar y las recargas del
+mismo extracto no vuelven a parsear el PDF. Las entradas se desalojan por
+LRU (fecha de último acceso) cuando el directorio supera el tamaño máximo.
+
+Las entradas son pickle: leerlas ejecuta código, así que el directorio debe
+ser privado del usuario de la API (modo 0700, mismo dueño) y cada archivo se
+verifica (dueño y permisos) antes de cargarlo. Un directorio que no cumple
+desactiva el caché.
+
+Configuración:
+    CACHE_EXTRACCION_DIR     Directorio del caché (por defecto ~/.cache/conciliacion/extraccion)
+    CACHE_EXTRACCION_MAX_MB  Tamaño máximo en MB; 0 desactiva el caché (por defecto 200)
+"""
+import hashlib
+import inspect
+import os
+import pickle
+import stat
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.infrastructure.logging.config import logger
+
+# Se incrementa cuando cambia el formato de las entradas o algo que los
+# extractores usan fuera de este paquete: invalida todo el caché
+CACHE_VERSION = 1
+
+_PAQUETE_EXTRACTORES = __name__.rsplit('.', 1)[0]
+
+
+class CacheExtraccion:
+    """Entradas serializadas con pickle, un archivo por clave."""
+
+    EXTENSION = '.pkl'
+
+    def __init__(self, directorio: str, max_bytes: int):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directorio, mode=0o700, exist_ok=True)
+        self._verificar_directorio()
+
+    def _verificar_directorio(self) -> None:
+        """
+        El directorio debe ser del usuario del proceso y no un enlace; se
+        restringe a 0700. En sistemas sin uid (Windows) se confía en los
+        permisos del perfil del usuario.
+        """
+        if not hasattr(os, 'getuid'):
+            return
+        info = os.lstat(self.directorio)
+        if stat.S_ISLNK(info.st_mode) or not stat.S_ISDIR(info.st_mode):
+            raise PermissionError(f"{self.directorio} no es un directorio")
+        if info.st_uid != os.getuid():
+            raise PermissionError(f"{self.directorio} no pertenece al usuario del proceso")
+        if stat.S_IMODE(info.st_mode) & 0o077:
+            os.chmod(self.directorio, 0o700)
+
+    @staticmethod
+    def _archivo_confiable(f) -> bool:
+        """El archivo abierto es del usuario del proceso y nadie más puede escribirlo"""
+        if not hasattr(os, 'getuid'):
+            return True
+        info = os.fstat(f.fileno())
+        return (
+            stat.S_ISREG(info.st_mode)
+            and info.st_uid == os.getuid()
+            and not stat.S_IMODE(info.st_mode) & 0o022
+        )
+
+    @staticmethod
+    def huella(contenido: bytes) -> str:
+        """SHA-256 de los bytes del archivo"""
+        return hashlib.sha256(contenido).hexdigest()
+
+    @staticmethod
+    def clave(*partes: str) -> str:
+        return hashlib.sha256('\x1f'.join(partes).encode('utf-8')).hexdigest()
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, clave + self.EXTENSION)
+
+    def obtener(self, clave: str) -> Tuple[bool, Any]:
+        """(encontrado, valor). Cada lectura retorna una copia nueva del valor."""
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'rb') as f:
+                if not self._archivo_confiable(f):
+                    raise PermissionError(f"permisos o dueño inesperados en {ruta}")
+                valor = pickle.load(f)
+            os.utime(ruta)  # Marca de uso para el LRU
+            return True, valor
+        except FileNotFoundError:
+            return False, None
+        except Exception as e:
+            logger.warning(f"Entrada de caché de extracción ilegible, se descarta: {e}")
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+            return False, None
+
+    def guardar(self, clave: str, valor: Any) -> None:
+        try:
+            contenido = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.warning(f"No se pudo serializar el resultado para el caché de extracción: {e}")
+            return
+        if len(contenido) > self.max_bytes:
+            return
+
+        # Escritura atómica: otros procesos nunca leen un archivo a medias
+        fd, temporal = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(contenido)
+            os.replace(temporal, self._ruta(clave))
+        except OSError as e:
+            logger.warning(f"No se pudo escribir el caché de extracción: {e}")
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            return
+
+        self._desalojar()
+
+    def _desalojar(self) -> None:
+        """Elimina las entradas usadas hace más tiempo hasta respetar el tamaño máximo"""
+        with self._lock:
+            entradas = []
+            total = 0
+            for nombre in os.listdir(self.directorio):
+                if not nombre.endswith(self.EXTENSION):
+                    continue
+                try:
+                    info = os.stat(os.path.join(self.directorio, nombre))
+                except FileNotFoundError:
+                    continue
+                entradas.append((info.st_mtime, info.st_size, nombre))
+                total += info.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            for _, tamano, nombre in sorted(entradas):
+                try:
+                    os.remove(os.path.join(self.directorio, nombre))
+                except FileNotFoundError:
+                    pass
+                total -= tamano
+                if total <= self.max_bytes:
+                    break
+
+
+_cache: Optional[CacheExtraccion] = None
+_cache_configurado = False
+_cache_lock = threading.Lock()
+_versiones: Dict[str, Optional[str]] = {}
+
+
+def obtener_cache_extraccion() -> Optional[CacheExtraccion]:
+    """Caché configurado por variables de entorno; None si está desactivado"""
+    global _cache, _cache_configurado
+    with _cache_lock:
+        if not _cache_configurado:
+            _cache_configurado = True
+            max_mb = float(os.getenv('CACHE_EXTRACCION_MAX_MB', '200'))
+            directorio = os.getenv(
+                'CACHE_EXTRACCION_DIR',
+                os.path.join(os.path.expanduser('~'), '.cache', 'conciliacion', 'extraccion')
+            )
+            if max_mb > 0:
+                try:
+                    _cache = CacheExtraccion(directorio, int(max_mb * 1024 * 1024))
+                except OSError as e:
+                    logger.warning(f"Caché de extracción desactivado, no se pudo crear {directorio}: {e}")
+        return _cache
+
+
+def _modulos_auxiliares(module: Any) -> List[Any]:
+    """
+    Módulos del paquete de extractores de los que depende `module`
+    (transitivamente): utils, pdf_texto, etc.
+    """
+    encontrados: Set[str] = set()
+    pendientes = [module]
+    modulos = []
+    while pendientes:
+        actual = pendientes.pop()
+        for valor in vars(actual).values():
+            dependencia = valor if inspect.ismodule(valor) else inspect.getmodule(valor)
+            nombre = getattr(dependencia, '__name__', '')
+            if (
+                nombre.startswith(_PAQUETE_EXTRACTORES + '.')
+                and nombre != module.__name__
+                and nombre != __name__
+                and nombre not in encontrados
+            ):
+                encontrados.add(nombre)
+                modulos.append(dependencia)
+                pendientes.append(dependencia)
+    return modulos
+
+
+def _huella_fuente(module: Any) -> Optional[str]:
+    nombre = module.__name__
+    if nombre not in _versiones:
+        try:
+            with open(module.__file__, 'rb') as f:
+                _versiones[nombre] = hashlib.sha256(f.read()).hexdigest()
+        except (OSError, TypeError, AttributeError):
+            _versiones[nombre] = None
+    return _versiones[nombre]
+
+
+def version_modulo(module: Any) -> Optional[str]:
+    """
+    Versión de un extractor: su atributo VERSION si lo define; si no, el
+    SHA-256 de su código fuente. Se combina con CACHE_VERSION y el código
+    fuente de los módulos auxiliares del paquete que usa, así un cambio en
+    un helper compartido también invalida sus entradas.
+    None si no se puede determinar (el resultado no se cachea).
+    """
+    version = getattr(module, 'VERSION', None)
+    propia = str(version) if version is not None else _huella_fuente(module)
+    auxiliares = [
+        (auxiliar.__name__, _huella_fuente(auxiliar))
+        for auxiliar in sorted(_modulos_auxiliares(module), key=lambda m: m.__name__)
+    ]
+    if propia is None or any(huella is None for _, huella in auxiliares):
+        return None
+    partes = [str(CACHE_VERSION), propia] + [f"{nombre}={huella}" for nombre, huella in auxiliares]
+    return hashlib.sha256('\x1f'.join(partes).encode('utf-8')).hexdigest()
@@ -0,0 +1,200 @@
+"""
+Extracción compartida del texto de las páginas de un PDF.
+
+Los extractores solo usan `page.extract_text()` de cada página. Este módulo
+extrae ese texto una sola vez por archivo (en paralelo con un pool de
+procesos para PDFs de varias páginas) y lo entrega como DocumentoPDF, que
+se recorre igual que un PDF abierto con pdfplumber:
+
+    with abrir_pdf(file_obj) as pdf:
+        for page in pdf.pages:
+            texto = page.extract_text()
+
+`abrir_pdf` acepta el archivo o un DocumentoPDF ya extraído, así los
+servicios parsean el archivo una vez y lo pasan a todos los extractores.
+El texto y los resultados de `ejecutar_extractor` se guardan en el caché
+de extracción (cache_extraccion.py) por la huella SHA-256 del archivo.
+"""
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, List, Optional
+
+import pdfplumber
+
+from src.infrastructure.extractors.cache_extraccion import obtener_cache_extraccion, version_modulo
+from src.infrastructure.logging.config import logger
+
+
+# Por debajo de este número de páginas no compensa repartir entre procesos
+MIN_PAGINAS_PARALELO = int(os.getenv('PDF_MIN_PAGINAS_PARALELO', '4'))
+MAX_PROCESOS = int(os.getenv('PDF_MAX_PROCESOS', str(min(4, os.cpu_count() or 1))))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+class PaginaPDF:
+    """Página ya extraída: expone el mismo extract_text() y page_number de pdfplumber."""
+    __slots__ = ('page_number', 'texto')
+
+    def __init__(self, page_number: int, texto: Optional[str]):
+        self.page_number = page_number
+        self.texto = texto
+
+    def extract_text(self) -> Optional[str]:
+        return self.texto
+
+
+class DocumentoPDF:
+    """Texto de todas las páginas de un PDF, en orden, con la huella SHA-256 del archivo."""
+
+    def __init__(self, textos: List[Optional[str]], huella: Optional[str] = None):
+        self.pages = [PaginaPDF(numero, texto) for numero, texto in enumerate(textos, 1)]
+        self.huella = huella
+
+    @property
+    def textos(self) -> List[Optional[str]]:
+        return [page.texto for page in self.pages]
+
+    def __enter__(self) -> 'DocumentoPDF':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+def _leer_bytes(file_obj: Any) -> bytes:
+    if isinstance(file_obj, (bytes, bytearray)):
+        return bytes(file_obj)
+    if isinstance(file_obj, (str, os.PathLike)):
+        with open(file_obj, 'rb') as f:
+            return f.read()
+    if hasattr(file_obj, 'seek'):
+        file_obj.seek(0)
+    contenido = file_obj.read()
+    if hasattr(file_obj, 'seek'):
+        file_obj.seek(0)
+    return contenido
+
+
+def _extraer_rango(contenido: bytes, inicio: int, fin: int) -> List[Optional[str]]:
+    """Texto de las páginas [inicio, fin). Se ejecuta en los procesos del pool."""
+    with pdfplumber.open(io.BytesIO(contenido)) as pdf:
+        return [page.extract_text() for page in pdf.pages[inicio:fin]]
+
+
+def _obtener_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_PROCESOS)
+        return _pool
+
+
+def _descartar_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def extraer_textos_paginas(contenido: bytes) -> List[Optional[str]]:
+    """
+    Texto de cada página de un PDF, en orden.
+
+    Con MIN_PAGINAS_PARALELO páginas o más, las páginas se reparten en rangos
+    contiguos entre los procesos del pool y se reúnen en orden. Si el pool no
+    está disponible, se extraen en el proceso actual.
+    """
+    with pdfplumber.open(io.BytesIO(contenido)) as pdf:
+        total = len(pdf.pages)
+        if total < MIN_PAGINAS_PARALELO or MAX_PROCESOS <= 1:
+            return [page.extract_text() for page in pdf.pages]
+
+    tamano = -(-total // MAX_PROCESOS)
+    rangos = [(inicio, min(inicio + tamano, total)) for inicio in range(0, total, tamano)]
+    try:
+        pool = _obtener_pool()
+        futuros = [pool.submit(_extraer_rango, contenido, inicio, fin) for inicio, fin in rangos]
+        textos = []
+        for futuro in futuros:
+            textos.extend(futuro.result())
+        return textos
+    except (BrokenProcessPool, OSError, RuntimeError) as e:
+        logger.warning(f"Extracción paralela de PDF no disponible ({e}); se extrae en el proceso actual")
+        _descartar_pool()
+        return _extraer_rango(contenido, 0, total)
+
+
+def extraer_documento(file_obj: Any) -> DocumentoPDF:
+    """Extrae el texto de un PDF (archivo, ruta o bytes), o lo toma del caché si ya se extrajo."""
+    contenido = _leer_bytes(file_obj)
+    cache = obtener_cache_extraccion()
+    if cache is None:
+        return DocumentoPDF(extraer_textos_paginas(contenido))
+
+    huella = cache.huella(contenido)
+    clave = cache.clave('paginas', huella, pdfplumber.__version__)
+    encontrado, textos = cache.obtener(clave)
+    if not encontrado:
+        textos = extraer_textos_paginas(contenido)
+        cache.guardar(clave, textos)
+    return DocumentoPDF(textos, huella=huella)
+
+
+def abrir_pdf(file_obj: Any) -> DocumentoPDF:
+    """Equivalente a pdfplumber.open para los extractores: reutiliza un DocumentoPDF ya extraído."""
+    if isinstance(file_obj, DocumentoPDF):
+        return file_obj
+    return extraer_documento(file_obj)
+
+
+def documento_para_extractores(file_obj: Any) -> Any:
+    """
+    DocumentoPDF para pasar a todos los extractores de un mismo archivo.
+    Si el archivo no se puede leer como PDF se retorna tal cual, para que
+    cada extractor reporte su propio error como antes.
+    """
+    try:
+        return abrir_pdf(file_obj)
+    except Exception as e:
+        logger.warning(f"No se pudo extraer el texto del PDF por adelantado: {e}")
+        if hasattr(file_obj, 'seek'):
+            file_obj.seek(0)
+        return file_obj
+
+
+_FUNCIONES_EXTRACTOR = ('extraer_resumen', 'extraer_movimientos')
+
+
+def ejecutar_extractor(module: Any, funcion: str, file_obj: Any) -> Any:
+    """
+    Llama module.<funcion>(file_obj) (extraer_resumen / extraer_movimientos).
+
+    Con un DocumentoPDF, el resultado se cachea por huella del archivo,
+    nombre y versión del extractor; cada llamada recibe su propia copia.
+    Los errores no se cachean.
+    """
+    if funcion not in _FUNCIONES_EXTRACTOR:
+        raise ValueError(f"Función de extractor no soportada: {funcion}")
+    extraer = getattr(module, funcion)
+
+    huella = getattr(file_obj, 'huella', None) if isinstance(file_obj, DocumentoPDF) else None
+    version = version_modulo(module) if huella else None
+    cache = obtener_cache_extraccion() if version else None
+    if cache is None:
+        return extraer(file_obj)
+
+    clave = cache.clave('extractor', huella, module.__name__, version, funcion)
+    encontrado, resultado = cache.obtener(clave)
+    if encontrado:
+        logger.debug(f"Extracción en caché: {module.__name__}.{funcion}")
+        return resultado
+
+    resultado = extraer(file_obj)
+    cache.guardar(clave, resultado)
+    return resultado
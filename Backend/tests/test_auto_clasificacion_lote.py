@@ -0,0 +1,123 @@
+import copy
+import random
+from datetime import date
+from decimal import Decimal
+
+from src.application.services.clasificacion_service import ClasificacionService
+from src.domain.models.movimiento import Movimiento
+from src.domain.models.movimiento_detalle import MovimientoDetalle
+from src.domain.models.regla_clasificacion import ReglaClasificacion
+from src.domain.models.tercero_descripcion import TerceroDescripcion
+
+
+class _MovimientosEnMemoria:
+    """Lo mínimo del repositorio que usa auto_clasificar_pendientes"""
+
+    def __init__(self, movimientos):
+        self.bd = {m.id: m for m in movimientos}
+        self.lotes = []
+
+    def _leer(self, movs):
+        return [copy.deepcopy(m) for m in sorted(movs, key=lambda m: (m.fecha, m.id), reverse=True)]
+
+    def buscar_pendientes_clasificacion(self):
+        return [copy.deepcopy(m) for m in self.bd.values() if m.necesita_clasificacion]
+
+    def buscar_por_referencia(self, referencia):
+        ref = referencia.lstrip('0')
+        return self._leer(m for m in self.bd.values() if m.referencia.lstrip('0') == ref)
+
+    def buscar_por_referencias(self, referencias):
+        refs = {r.lstrip('0') for r in referencias}
+        resultado = {}
+        for m in self._leer(m for m in self.bd.values() if m.referencia.lstrip('0') in refs):
+            resultado.setdefault(m.referencia.lstrip('0'), []).append(m)
+        return resultado
+
+    def guardar(self, mov):
+        self.bd[mov.id] = copy.deepcopy(mov)
+        return mov
+
+    def guardar_clasificacion_lote(self, movimientos):
+        self.lotes.append([m.id for m in movimientos])
+        for mov in movimientos:
+            self.guardar(mov)
+        return movimientos
+
+
+class _CatalogoEnMemoria:
+    def __init__(self, descripciones):
+        self.descripciones = descripciones
+
+    def buscar_por_referencia(self, referencia):
+        return self.descripciones.get(referencia)
+
+    def buscar_por_referencias(self, referencias):
+        return {r: self.descripciones[r] for r in referencias if r in self.descripciones}
+
+
+class _ReglasEnMemoria:
+    def __init__(self, reglas):
+        self.reglas = reglas
+
+    def obtener_todos(self):
+        return self.reglas
+
+
+def _datos(rnd):
+    referencias = ["", "123", "0123", "987654321", "555555555", "42"]
+    movimientos = []
+    for i in range(1, 40):
+        clasificado = rnd.random() < 0.4
+        detalles = [] if rnd.random() < 0.1 else [MovimientoDetalle(
+            id=1000 + i, valor=Decimal("10"),
+            centro_costo_id=rnd.choice([1, 2]) if clasificado else None,
+            concepto_id=rnd.choice([3, 4]) if clasificado else None,
+            tercero_id=None,
+        )]
+        movimientos.append(Movimiento(
+            id=i, moneda_id=1, cuenta_id=rnd.choice([1, 2]),
+            fecha=date(2025, 1, rnd.randint(1, 28)), valor=Decimal("10"),
+            descripcion=rnd.choice(["COMPRA EXITO", "PAGO PSE", "TRANSFERENCIA"]),
+            referencia=rnd.choice(referencias),
+            tercero_id=rnd.choice([7, 8]) if clasificado else None,
+            detalles=detalles,
+        ))
+    reglas = [ReglaClasificacion(patron="EXITO", tercero_id=9, centro_costo_id=5, concepto_id=6, cuenta_id=1)]
+    catalogo = {"555555555": TerceroDescripcion(terceroid=11, referencia="555555555")}
+    return movimientos, reglas, catalogo
+
+
+def _clasificar_uno_por_uno(servicio, repo):
+    """Recorrido anterior: consultas y guardado por movimiento"""
+    resumen = {'total': 0, 'clasificados': 0, 'detalles': []}
+    pendientes = repo.buscar_pendientes_clasificacion()
+    resumen['total'] = len(pendientes)
+    for mov in pendientes:
+        exito, razon = servicio.clasificar_movimiento(mov)
+        if exito:
+            repo.guardar(mov)
+            resumen['clasificados'] += 1
+            resumen['detalles'].append(f"ID {mov.id}: {razon}")
+    return resumen
+
+
+def test_lote_equivale_a_clasificar_uno_por_uno():
+    for semilla in range(30):
+        movimientos, reglas, catalogo = _datos(random.Random(semilla))
+        resultados = []
+        for modo in ("uno_por_uno", "lote"):
+            repo = _MovimientosEnMemoria(copy.deepcopy(movimientos))
+            servicio = ClasificacionService(
+                repo, _ReglasEnMemoria(reglas), None, _CatalogoEnMemoria(catalogo)
+            )
+            if modo == "lote":
+                resumen = servicio.auto_clasificar_pendientes()
+                assert len(repo.lotes) == 1
+            else:
+                resumen = _clasificar_uno_por_uno(servicio, repo)
+            resultados.append((resumen, repo.bd))
+
+        (resumen_esperado, bd_esperada), (resumen, bd) = resultados
+        assert resumen == resumen_esperado
+        assert bd == bd_esperada
@@ -0,0 +1,129 @@
+"""
+buscar_avanzado en una sola consulta (CTE + EXISTS + json_agg).
+
+La prueba de semántica compara, en un PostgreSQL accesible con las variables
+DB_*, los filtros con EXISTS contra el LEFT JOIN con detalles de antes; sin
+base de datos se omite.
+"""
+import random
+from datetime import date, datetime
+from decimal import Decimal
+
+import psycopg2
+import pytest
+
+from src.infrastructure.database.connection import DB_CONFIG
+from src.infrastructure.database.postgres_movimiento_repository import PostgresMovimientoRepository
+
+
+class _ConexionFija:
+    """Conexión falsa: registra las consultas y devuelve filas predefinidas"""
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.consultas = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.consultas.append((query, params))
+
+    def fetchall(self):
+        return self.filas
+
+    def fetchone(self):
+        return (0,)
+
+    def close(self):
+        pass
+
+
+def test_una_consulta_con_total_y_detalles():
+    detalles = [
+        {'id': 7, 'centro_costo_id': 2, 'concepto_id': 3, 'tercero_id': 4, 'valor': '-1234.56',
+         'created_at': '2024-02-01T10:30:00.5', 'centro_costo_nombre': 'Hogar',
+         'concepto_nombre': 'Mercado', 'tercero_nombre': 'Exito'},
+    ]
+    fila = (10, date(2024, 2, 1), 'COMPRA EXITO', '', Decimal('-1234.56'), None, None,
+            1, 5, 4, None, None, 42, 'Ahorros', 'COP', 'Exito', detalles)
+    conn = _ConexionFija([fila])
+
+    movimientos, total = PostgresMovimientoRepository(conn).buscar_avanzado(cuenta_id=5, skip=20, limit=10)
+
+    assert len(conn.consultas) == 1
+    query, params = conn.consultas[0]
+    assert params == (5, 10, 20)
+    assert "COUNT(*) OVER ()" in query and "json_agg" in query
+    assert total == 42
+    mov = movimientos[0]
+    assert (mov.id, mov.cuenta_nombre, mov.moneda_nombre, mov.tercero_nombre) == (10, 'Ahorros', 'COP', 'Exito')
+    detalle = mov.detalles[0]
+    assert detalle.valor == Decimal('-1234.56')
+    assert detalle.created_at == datetime(2024, 2, 1, 10, 30, 0, 500000)
+    assert (detalle.movimiento_id, detalle.centro_costo_nombre) == (10, 'Hogar')
+
+
+@pytest.fixture(scope="module")
+def conn():
+    try:
+        conn = psycopg2.connect(connect_timeout=3, **DB_CONFIG)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL no disponible: {e}")
+
+    rnd = random.Random(5)
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TEMP TABLE movimientos_encabezado (
+            Id INT PRIMARY KEY, Fecha DATE, Descripcion TEXT, Valor NUMERIC(18, 2),
+            CuentaID INT, terceroid INT, descripcion_busqueda TEXT
+        );
+        CREATE TEMP TABLE movimientos_detalle (
+            id SERIAL PRIMARY KEY, movimiento_id INT, centro_costo_id INT, ConceptoID INT
+        );
+    """)
+    for id in range(1, 301):
+        cursor.execute(
+            "INSERT INTO movimientos_encabezado VALUES (%s, %s, '', %s, %s, %s, '')",
+            (id, date(2024, 1, 1 + id % 28), rnd.choice([-1, 1]) * rnd.randint(0, 5) * 100,
+             rnd.choice([1, 2]), rnd.choice([None, 7, 8]))
+        )
+        for _ in range(rnd.choice([0, 1, 1, 2, 3])):
+            cursor.execute(
+                "INSERT INTO movimientos_detalle (movimiento_id, centro_costo_id, ConceptoID) VALUES (%s, %s, %s)",
+                (id, rnd.choice([None, 1, 2, 3]), rnd.choice([None, 10, 11]))
+            )
+
+    yield conn
+
+    conn.rollback()
+    conn.close()
+
+
+def _ids(conn, where, params):
+    cursor = conn.cursor()
+    cursor.execute(where, tuple(params))
+    ids = sorted(fila[0] for fila in cursor.fetchall())
+    cursor.close()
+    return ids
+
+
+@pytest.mark.parametrize("filtros", [
+    {'centro_costo_id': 2},
+    {'concepto_id': 10, 'cuenta_id': 1},
+    {'centros_costos_excluidos': [1, 3]},
+    {'solo_pendientes': True},
+    {'solo_clasificados': True, 'tercero_id': 7},
+    {'solo_pendientes': True, 'centros_costos_excluidos': [2], 'tipo_movimiento': 'egresos'},
+])
+def test_exists_equivale_al_left_join(conn, filtros):
+    repo = PostgresMovimientoRepository(conn)
+
+    where_join, params_join = repo._construir_filtros(**filtros)
+    esperado = _ids(conn, """
+        SELECT DISTINCT m.Id FROM movimientos_encabezado m
+        LEFT JOIN movimientos_detalle md ON m.Id = md.movimiento_id
+        WHERE 1=1""" + where_join, params_join)
+
+    where_exists, params_exists = repo._consulta_avanzada(**filtros)
+    assert _ids(conn, "SELECT m.Id " + where_exists, params_exists) == esperado
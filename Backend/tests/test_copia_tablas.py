@@ -0,0 +1,146 @@
+"""
+Copia de tablas con COPY (copia_tablas) sobre un cursor falso que simula
+copy_expert leyendo y escribiendo por bloques.
+"""
+import csv
+import io
+import zipfile
+
+import psycopg2
+from psycopg2 import sql
+
+from src.infrastructure.database.copia_tablas import exportar_tabla, reemplazar_tabla
+
+
+def _texto(consulta):
+    """SQL compuesto → texto, sin conexión real"""
+    if isinstance(consulta, sql.Composed):
+        return "".join(_texto(parte) for parte in consulta.seq)
+    if isinstance(consulta, sql.Identifier):
+        return '"%s"' % consulta.strings[0]
+    if isinstance(consulta, sql.SQL):
+        return consulta.string
+    return consulta
+
+
+class _Cursor:
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.rowcount = -1
+        self._filas = []
+
+    def execute(self, query, params=None):
+        texto = _texto(query)
+        self.conexion.sentencias.append(texto)
+        if "DISABLE TRIGGER" in texto and not self.conexion.superusuario:
+            raise psycopg2.errors.InsufficientPrivilege("must be owner")
+        if "information_schema.columns" in texto:
+            self._filas = self.conexion.columnas
+
+    def fetchall(self):
+        return self._filas
+
+    def copy_expert(self, query, archivo, size=8192):
+        texto = _texto(query)
+        self.conexion.sentencias.append(texto)
+        if "TO STDOUT" in texto:
+            for i in range(0, len(self.conexion.datos), 5):
+                archivo.write(self.conexion.datos[i:i + 5])
+            self.rowcount = self.conexion.datos.count(b"\n") - 1
+        else:
+            recibido = b""
+            while True:
+                bloque = archivo.read(size)
+                if not bloque:
+                    break
+                recibido += bloque
+            self.conexion.recibido = recibido
+            self.rowcount = len(list(csv.reader(io.StringIO(recibido.decode("utf-8")))))
+
+    def close(self):
+        pass
+
+
+class _Conexion:
+    def __init__(self, datos=b"", columnas=(), superusuario=True):
+        self.datos = datos
+        self.columnas = list(columnas)
+        self.superusuario = superusuario
+        self.sentencias = []
+        self.recibido = None
+
+    def cursor(self):
+        return _Cursor(self)
+
+
+def test_exporta_por_bloques_a_un_miembro_del_zip():
+    conn = _Conexion(datos=b'id,descripcion\n1,"PAGO, PSE"\n2,ABONO\n')
+    destino = io.BytesIO()
+
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        with zip_file.open("terceros.csv", "w") as miembro:
+            resultado = exportar_tabla(conn, "terceros", miembro)
+
+    with zipfile.ZipFile(destino) as zip_file:
+        assert zip_file.read("terceros.csv") == conn.datos
+    assert (resultado.filas, resultado.bytes) == (2, len(conn.datos))
+    assert set(resultado.resumen()) == {"filas", "bytes", "segundos", "filas_por_segundo", "mb_por_segundo"}
+    assert conn.sentencias[-1] == 'COPY "terceros" TO STDOUT WITH (FORMAT csv, HEADER true)'
+
+
+def test_importa_sin_columnas_generadas_y_sin_permiso_de_triggers():
+    conn = _Conexion(
+        columnas=[("id", False), ("descripcion", False), ("descripcion_busqueda", True)],
+        superusuario=False
+    )
+    origen = io.BytesIO(
+        b'Id,Descripcion,descripcion_busqueda\n'
+        b'1,"PAGO, PSE",pago pse\n'
+        b'2,"LINEA\nDOBLE",linea doble\n'
+    )
+
+    resultado = reemplazar_tabla(conn, "movimientos_encabezado", origen)
+
+    assert conn.recibido == b'1,"PAGO, PSE"\r\n2,"LINEA\nDOBLE"\r\n'
+    assert resultado.filas == 2
+    assert 'COPY "movimientos_encabezado" ("id", "descripcion") FROM STDIN WITH (FORMAT csv)' in conn.sentencias
+    assert "ROLLBACK TO SAVEPOINT sin_triggers" in conn.sentencias
+    assert not any("ENABLE TRIGGER" in s for s in conn.sentencias)
+
+
+def test_importa_directo_y_archivo_sin_filas_no_toca_la_tabla():
+    conn = _Conexion(columnas=[("id", False), ("tercero", False)])
+    datos = b"id,tercero\n" + b"".join(b"%d,T%d\n" % (i, i) for i in range(1, 5001))
+
+    resultado = reemplazar_tabla(conn, "terceros", io.BytesIO(datos))
+    assert conn.recibido == datos[len(b"id,tercero\n"):]
+    assert resultado.filas == 5000 and resultado.bytes == len(datos)
+    assert 'DELETE FROM "terceros"' in conn.sentencias
+    assert 'ALTER TABLE "terceros" ENABLE TRIGGER ALL' in conn.sentencias
+
+    vacia = _Conexion(columnas=[("id", False)])
+    assert reemplazar_tabla(vacia, "terceros", io.BytesIO(b"id,tercero\n")) is None
+    assert vacia.sentencias == []
+
+
+def test_importa_con_llave_hace_upsert_sin_borrar():
+    conn = _Conexion(
+        columnas=[("id", False), ("cuenta_id", False), ("year", False), ("month", False), ("diferencia", True)],
+        superusuario=False
+    )
+    origen = io.BytesIO(b"id,cuenta_id,year,month,diferencia\n1,3,2024,1,0\n2,3,2024,2,5\n")
+
+    resultado = reemplazar_tabla(conn, "conciliaciones", origen, llave=("cuenta_id", "year", "month"))
+
+    assert resultado.filas == 2
+    assert conn.recibido == b"1,3,2024,1\r\n2,3,2024,2\r\n"
+    assert not any(s.startswith("DELETE") or "TRIGGER" in s for s in conn.sentencias)
+    assert (
+        'COPY pg_temp."_restaurar_conciliaciones" ("id", "cuenta_id", "year", "month") FROM STDIN WITH (FORMAT csv)'
+        in conn.sentencias
+    )
+    assert conn.sentencias[-1] == (
+        'INSERT INTO "conciliaciones" ("id", "cuenta_id", "year", "month") '
+        'SELECT "id", "cuenta_id", "year", "month" FROM pg_temp."_restaurar_conciliaciones" '
+        'ON CONFLICT ("cuenta_id", "year", "month") DO UPDATE SET "id" = EXCLUDED."id"'
+    )
@@ -0,0 +1,94 @@
+"""
+Escritura incremental de la exportación de movimientos (CSV, NDJSON,
+Parquet y gzip) sobre filas generadas en memoria.
+"""
+import csv
+import gzip
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from src.infrastructure.api.exportacion_streaming import TAMANO_BLOQUE, escribir_exportacion, formato_disponible
+
+
+def _filas(n, leidas=None):
+    for i in range(1, n + 1):
+        if leidas is not None:
+            leidas.append(i)
+        yield {
+            "id": i,
+            "fecha": date(2024, 1, 1 + i % 28),
+            "descripcion": f"PAGO, \"PSE\" {i}",
+            "valor": Decimal("-1500.25") * i,
+            "terceroid": None,
+            "created_at": datetime(2024, 2, 1, 8, 30),
+        }
+
+
+def test_csv_escribe_por_bloques_sin_leer_todo():
+    leidas = []
+    bloques = escribir_exportacion(_filas(20_000, leidas), "csv")
+
+    primero = next(bloques)
+    assert len(primero) >= TAMANO_BLOQUE
+    assert len(leidas) < 20_000
+
+    texto = (primero + b"".join(bloques)).decode("utf-8")
+    filas = list(csv.reader(io.StringIO(texto)))
+    assert filas[0] == ["id", "fecha", "descripcion", "valor", "terceroid", "created_at"]
+    assert filas[2] == ["2", "2024-01-03", 'PAGO, "PSE" 2', "-3000.50", "", "2024-02-01 08:30:00"]
+    assert len(filas) == 20_001
+
+
+def test_ndjson_con_gzip_equivale_al_json_de_la_exportacion():
+    comprimido = b"".join(escribir_exportacion(_filas(3), "ndjson", comprimir=True))
+    lineas = gzip.decompress(comprimido).decode("utf-8").splitlines()
+
+    assert [json.loads(l) for l in lineas][0] == {
+        "id": 1, "fecha": "2024-01-02", "descripcion": 'PAGO, "PSE" 1', "valor": -1500.25,
+        "terceroid": None, "created_at": "2024-02-01T08:30:00",
+    }
+    assert len(lineas) == 3
+
+
+def test_formatos_y_parquet():
+    assert formato_disponible("xlsx")
+    assert formato_disponible("csv") is None
+
+    pq = pytest.importorskip("pyarrow.parquet")
+    datos = b"".join(escribir_exportacion(_filas(25_000), "parquet"))
+    tabla = pq.read_table(io.BytesIO(datos))
+    assert tabla.num_rows == 25_000
+    assert tabla.column("valor")[1].as_py() == Decimal("-3000.50")
+    assert tabla.column("terceroid").null_count == 25_000
+
+
+def test_parquet_con_tipos_de_la_consulta_no_depende_del_primer_lote():
+    pq = pytest.importorskip("pyarrow.parquet")
+    # (nombre, OID): int4, numeric, date, text, int4, timestamp, jsonb
+    columnas = [("id", 23), ("valor", 1700), ("fecha", 1082), ("descripcion", 25),
+                ("terceroid", 23), ("created_at", 1114), ("extra", 3802)]
+
+    def filas():
+        for fila in _filas(25_000):
+            # Nulos en todo el primer grupo de filas, valores después
+            nulo = fila["id"] <= 12_000
+            fila["terceroid"] = None if nulo else 7
+            fila["valor"] = None if nulo else fila["valor"]
+            fila["extra"] = None if nulo else {"origen": "pse"}
+            yield fila
+
+    datos = b"".join(escribir_exportacion(filas(), "parquet", columnas=columnas))
+    tabla = pq.read_table(io.BytesIO(datos))
+    assert tabla.num_rows == 25_000
+    assert str(tabla.schema.field("terceroid").type) == "int32"
+    assert tabla.column("terceroid")[20_000].as_py() == 7
+    assert tabla.column("valor")[20_000].as_py() == Decimal("-1500.25") * 20_001
+    assert json.loads(tabla.column("extra")[20_000].as_py()) == {"origen": "pse"}
+
+    vacio = pq.read_table(io.BytesIO(b"".join(escribir_exportacion(iter(()), "parquet", columnas=columnas))))
+    assert vacio.num_rows == 0
+    assert vacio.column_names == [nombre for nombre, _ in columnas]
@@ -0,0 +1,164 @@
+import random
+from datetime import date
+from decimal import Decimal
+
+import psycopg2
+import pytest
+
+from src.domain.models.movimiento import Movimiento
+from src.domain.services.indice_descripciones import (
+    CacheIndiceDescripciones, EntradaDescripcion, IndiceDescripciones
+)
+from src.infrastructure.database.connection import DB_CONFIG
+from src.infrastructure.database.postgres_movimiento_repository import PostgresMovimientoRepository
+
+
+def _buscar_lineal(movimientos, palabra, limite):
+    """Equivalente de buscar_avanzado(descripcion_contiene=palabra) para palabras sin comodines"""
+    encontrados = [
+        m for m in movimientos.values()
+        if palabra.upper() in (m.descripcion or "").upper()
+    ]
+    encontrados.sort(key=lambda m: (m.fecha, abs(m.valor), m.id), reverse=True)
+    return [m.id for m in encontrados[:limite]]
+
+
+def _movimiento(rnd, id):
+    palabras = ["PAGO", "PSE", "Exito", "tc", "MASTER", "compra", "éxito", "NOMINA"]
+    return Movimiento(
+        id=id, moneda_id=1, cuenta_id=1,
+        fecha=date(2025, rnd.randint(1, 3), rnd.randint(1, 28)),
+        valor=Decimal(rnd.choice([-50, 50, 120, -7])),
+        descripcion=rnd.choice([None, ""]) if rnd.random() < 0.05 else
+        "  ".join(rnd.choice(palabras) for _ in range(rnd.randint(1, 4))),
+        tercero_id=rnd.choice([None, 3, 4]),
+    )
+
+
+def test_indice_incremental_equivale_a_busqueda_lineal():
+    rnd = random.Random(13)
+    movimientos = {i: _movimiento(rnd, i) for i in range(1, 80)}
+    indice = IndiceDescripciones(EntradaDescripcion.desde_movimiento(m) for m in movimientos.values())
+
+    for _ in range(200):
+        accion = rnd.random()
+        if accion < 0.4:
+            mov = _movimiento(rnd, rnd.randint(1, 100))
+            movimientos[mov.id] = mov
+            indice.actualizar([mov])
+        elif accion < 0.5:
+            id = rnd.randint(1, 100)
+            movimientos.pop(id, None)
+            indice.eliminar([id])
+
+        for palabra in ("pago", "EX", "t", "xito", "nomina", "zzz", "aste", "ÉXITO"):
+            limite = rnd.choice([1, 5, 100])
+            assert [e.id for e in indice.buscar(palabra, limite)] == _buscar_lineal(movimientos, palabra, limite)
+
+
+def test_cobertura_cuenta_palabras_por_candidato():
+    indice = IndiceDescripciones([
+        EntradaDescripcion(1, "PAGO TC MASTER", date(2025, 1, 1), Decimal(10), 5),
+        EntradaDescripcion(2, "PAGO PSE", date(2025, 1, 2), Decimal(10), 5),
+    ])
+    candidatos = indice.candidatos_por_palabras(["PAGO", "MASTER", "TC"], 100)
+    assert {id: cobertura for id, (_, cobertura) in candidatos.items()} == {1: 3, 2: 1}
+
+
+def test_limite_por_palabra_antes_de_descartar_sin_tercero():
+    # Como buscar_avanzado(limit=100) y luego el filtro por tercero: el
+    # movimiento sin tercero más reciente ocupa el único cupo
+    indice = IndiceDescripciones([
+        EntradaDescripcion(1, "PAGO EXITO", date(2025, 1, 3), Decimal(10), None),
+        EntradaDescripcion(2, "PAGO EXITO", date(2025, 1, 2), Decimal(10), 5),
+        EntradaDescripcion(3, "PAGO PSE", date(2025, 1, 1), Decimal(10), 5),
+    ])
+    assert indice.candidatos_por_palabras(["EXITO"], 1) == {}
+    assert set(indice.candidatos_por_palabras(["PAGO"], 2)) == {2}
+    assert set(indice.candidatos_por_palabras(["PAGO"], 3)) == {2, 3}
+
+
+def test_comodines_like_y_nulos_primero():
+    indice = IndiceDescripciones([
+        EntradaDescripcion(1, "COMPRA EXITO", date(2025, 1, 1), Decimal(5), 7),
+        EntradaDescripcion(2, "EX TO 50%", date(2025, 1, 2), Decimal(5), 7),
+        EntradaDescripcion(3, "EXITO", None, Decimal(5), 7),
+        EntradaDescripcion(4, None, date(2025, 1, 3), Decimal(5), 7),
+        EntradaDescripcion(5, "PAGO_TC", date(2025, 1, 1), None, 7),
+        EntradaDescripcion(6, "PAGOXTC", date(2025, 1, 1), Decimal(9), 7),
+    ])
+    # % cruza espacios, _ es un carácter (también un espacio); Fecha/Valor NULL van primero (DESC)
+    assert [e.id for e in indice.buscar("ex%to")] == [3, 2, 1]
+    assert [e.id for e in indice.buscar("x_t")] == [3, 2, 1]
+    assert [e.id for e in indice.buscar("i_o")] == [3, 1]
+    assert [e.id for e in indice.buscar("ex_to")] == [3, 2, 1]
+    assert [e.id for e in indice.buscar("pago_tc")] == [5, 6]
+    assert [e.id for e in indice.buscar("pago\\_tc")] == [5]
+    assert [e.id for e in indice.buscar("50\\%")] == [2]
+
+
+def test_cache_aplica_escrituras_y_reconstruye_al_invalidar():
+    cargas = []
+
+    def cargar():
+        cargas.append(1)
+        return IndiceDescripciones([EntradaDescripcion(1, "COMPRA EXITO", date(2025, 1, 1), Decimal(5), 7)])
+
+    cache = CacheIndiceDescripciones(max_edad_segundos=None)
+    indice = cache.obtener(cargar)
+    cache.actualizar([Movimiento(id=2, moneda_id=1, cuenta_id=1, fecha=date(2025, 1, 2),
+                                 valor=Decimal(5), descripcion="EXITO CALLE", tercero_id=7)])
+    cache.eliminar([1])
+
+    assert cache.obtener(cargar) is indice
+    assert [e.id for e in indice.buscar("exito")] == [2]
+    assert len(cargas) == 1
+
+    cache.invalidar()
+    assert cache.obtener(cargar) is not indice
+    assert len(cargas) == 2
+
+
+def test_cache_reconstruye_por_edad():
+    cache = CacheIndiceDescripciones(max_edad_segundos=0)
+    primero = cache.obtener(IndiceDescripciones)
+    assert cache.obtener(IndiceDescripciones) is not primero
+
+
+@pytest.fixture
+def conn():
+    try:
+        conn = psycopg2.connect(connect_timeout=3, **DB_CONFIG)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL no disponible: {e}")
+    yield conn
+    conn.rollback()
+    conn.close()
+
+
+def test_buscar_igual_a_la_consulta_de_buscar_avanzado(conn):
+    rnd = random.Random(21)
+    movimientos = [_movimiento(rnd, i) for i in range(1, 400)]
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TEMP TABLE movimientos_encabezado (
+            Id INT PRIMARY KEY, Fecha DATE, Descripcion TEXT, Valor NUMERIC(18, 2), terceroid INT,
+            descripcion_busqueda TEXT GENERATED ALWAYS AS (UPPER(Descripcion)) STORED
+        )
+    """)
+    cursor.executemany(
+        "INSERT INTO movimientos_encabezado VALUES (%s, %s, %s, %s, %s)",
+        [(m.id, m.fecha, m.descripcion, m.valor, m.tercero_id) for m in movimientos]
+    )
+    repo = PostgresMovimientoRepository(conn)
+    indice = repo.obtener_indice_descripciones()
+
+    for palabra in ("pago", "EX", "t", "xito", "MAST", "zzz", "p%e", "t_", "o%c", "a  e"):
+        for limite in (1, 7, 100):
+            filtros, params = repo._construir_filtros(descripcion_contiene=palabra)
+            cursor.execute(
+                f"SELECT m.Id FROM movimientos_encabezado m WHERE 1=1 {filtros}"
+                f"{repo._ORDEN_AVANZADO} LIMIT %s",
+                params + [limite]
+            )
+            assert [e.id for e in indice.buscar(palabra, limite)] == [r[0] for r in cursor.fetchall()], palabra
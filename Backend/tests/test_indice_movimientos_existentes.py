@@ -0,0 +1,73 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from src.domain.services.indice_movimientos_existentes import (
+    IndiceMovimientosExistentes,
+    MovimientoExistente,
+)
+
+
+FECHA = date(2025, 6, 10)
+
+
+def _indice(cuenta_id=1):
+    return IndiceMovimientosExistentes(cuenta_id, date(2025, 6, 1), date(2025, 6, 30), [
+        MovimientoExistente(10, FECHA, "Pago Pse Empresa 50%", "", Decimal('-50000.00'), None),
+        MovimientoExistente(11, FECHA, "Compra Exito", "REF-77", Decimal('-12000.00'), None),
+        MovimientoExistente(12, FECHA, "Avance", None, Decimal('0.00'), Decimal('15.50')),
+        MovimientoExistente(9, FECHA, "Otra", "", Decimal('-50000.00'), None),
+    ])
+
+
+def test_referencia_tiene_prioridad_y_valida_usd():
+    indice = _indice()
+    assert indice.existe_movimiento(FECHA, Decimal('1'), "REF-77", descripcion="Nada")
+    assert not indice.existe_movimiento(FECHA, Decimal('1'), "REF-77", usd=Decimal('1'))
+    assert not indice.existe_movimiento(date(2025, 6, 11), Decimal('-12000'), "REF-77")
+
+
+def test_descripcion_se_compara_como_ilike():
+    indice = _indice()
+    # Sin distinguir mayúsculas; el float se interpreta como lo envía psycopg2
+    assert indice.existe_movimiento(FECHA, -50000.0, "", descripcion="PAGO PSE EMPRESA 50%")
+    # % y _ son comodines; \ escapa
+    assert indice.existe_movimiento(FECHA, Decimal('-50000'), "", descripcion="pago%")
+    assert indice.existe_movimiento(FECHA, Decimal('-50000'), "  ", descripcion="Otr_")
+    assert indice.existe_movimiento(FECHA, Decimal('-50000'), "", descripcion="Pago Pse Empresa 50\\%")
+    assert not indice.existe_movimiento(FECHA, Decimal('-50000'), "", descripcion="Pago Pse Empresa 50\\_")
+    # Sin descripción basta fecha + valor; con USD se compara la columna USD
+    assert indice.existe_movimiento(FECHA, Decimal('-50000.00'), None)
+    assert indice.existe_movimiento(FECHA, 0, "", descripcion="avance", usd=15.5)
+    assert not indice.existe_movimiento(FECHA, 0, "", descripcion="avance", usd=Decimal('15.49'))
+
+    with pytest.raises(ValueError):
+        indice.existe_movimiento(FECHA, Decimal('-50000'), "", descripcion="Pago\\")
+
+
+def test_soft_match_y_registro_de_movimientos_guardados():
+    indice = _indice()
+    assert indice.obtener_exacto(FECHA, Decimal('-50000')).id == 9
+
+    # Un movimiento guardado durante la carga es visible para las filas siguientes
+    nueva = date(2025, 6, 20)
+    assert not indice.existe_movimiento(nueva, Decimal('100.004'), "", descripcion="Abono")
+    indice.registrar(50, nueva, "Abono", "", Decimal('100.004'))
+    assert indice.existe_movimiento(nueva, Decimal('100.00'), "", descripcion="abono")
+
+    # Actualizar reemplaza la entrada anterior
+    indice.registrar(9, FECHA, "Otra Editada", "", Decimal('-50000'))
+    assert not indice.existe_movimiento(FECHA, Decimal('-50000'), "", descripcion="Otra")
+    assert indice.existe_movimiento(FECHA, Decimal('-50000'), "", descripcion="otra editada")
+
+
+def test_cobertura_y_cuenta_nula():
+    indice = _indice()
+    assert indice.cubre("2025-06-15") == date(2025, 6, 15)
+    assert indice.cubre("2025-07-01") is None
+    assert indice.cubre("15/06/2025") is None
+
+    sin_cuenta = _indice(cuenta_id=None)
+    assert not sin_cuenta.existe_movimiento(FECHA, Decimal('-50000'), "")
+    assert sin_cuenta.obtener_exacto(FECHA, Decimal('-50000')) is None
@@ -0,0 +1,62 @@
+import random
+
+from src.domain.models.regla_clasificacion import ReglaClasificacion
+from src.domain.services.indice_reglas import CacheIndiceReglas, IndiceReglas
+
+
+def _coincidentes_lineal(reglas, descripcion, cuenta_id):
+    """Recorrido original de clasificar_movimiento"""
+    ordenadas = sorted(reglas, key=lambda x: x.cuenta_id is not None, reverse=True)
+    texto = (descripcion or "").upper()
+    resultado = []
+    for regla in ordenadas:
+        if regla.cuenta_id is not None and cuenta_id != regla.cuenta_id:
+            continue
+        patron = regla.patron.upper()
+        if regla.tipo_match == 'contiene' and patron in texto:
+            resultado.append(regla)
+        elif regla.tipo_match == 'inicio' and texto.startswith(patron):
+            resultado.append(regla)
+        elif regla.tipo_match == 'exacto' and texto == patron:
+            resultado.append(regla)
+    return resultado
+
+
+def test_indice_equivale_al_recorrido_lineal():
+    rnd = random.Random(11)
+    alfabeto = "abAB ß1"
+    for _ in range(300):
+        reglas = [
+            ReglaClasificacion(
+                id=i,
+                patron="".join(rnd.choice(alfabeto) for _ in range(rnd.randint(0, 3))),
+                tipo_match=rnd.choice(['contiene', 'inicio', 'exacto', 'otro']),
+                cuenta_id=rnd.choice([None, None, 1, 2]),
+            )
+            for i in range(rnd.randint(0, 12))
+        ]
+        indice = IndiceReglas(reglas)
+        for _ in range(10):
+            descripcion = rnd.choice([None, ""]) if rnd.random() < 0.1 else \
+                "".join(rnd.choice(alfabeto) for _ in range(rnd.randint(0, 8)))
+            cuenta_id = rnd.choice([None, 1, 2, 3])
+            esperado = _coincidentes_lineal(reglas, descripcion, cuenta_id)
+            assert indice.reglas_coincidentes(descripcion, cuenta_id) == esperado
+
+
+def test_cache_recompila_solo_al_invalidar():
+    cargas = []
+
+    def cargar():
+        cargas.append(1)
+        return [ReglaClasificacion(patron="EXITO", tercero_id=7)]
+
+    cache = CacheIndiceReglas()
+    primero = cache.obtener(cargar)
+    assert cache.obtener(cargar) is primero
+    assert len(cargas) == 1
+
+    cache.invalidar()
+    assert cache.obtener(cargar) is not primero
+    assert len(cargas) == 2
+    assert [r.tercero_id for r in primero.reglas_coincidentes("Compra Exito", 5)] == [7]
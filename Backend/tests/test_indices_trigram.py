@@ -0,0 +1,150 @@
+"""
+Verifica con EXPLAIN que las búsquedas por descripción usan los índices de
+Sql/AlterTable_indices_trigram_descripcion.sql.
+
+Necesita un PostgreSQL accesible con las variables DB_* y la extensión
+pg_trgm; si no, se omite. Las tablas se crean como temporales (ocultan a
+las reales dentro de la sesión) y se siembran con 500.000 movimientos.
+"""
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import psycopg2
+import pytest
+
+from src.infrastructure.database.connection import DB_CONFIG
+from src.infrastructure.database.postgres_movimiento_repository import PostgresMovimientoRepository
+from src.infrastructure.database.postgres_tercero_descripcion_repository import PostgresTerceroDescripcionRepository
+
+FILAS = 500_000
+MIGRACION = Path(__file__).resolve().parents[2] / "Sql" / "AlterTable_indices_trigram_descripcion.sql"
+
+
+class _CapturaConsultas:
+    """Conexión falsa: registra las consultas de un repositorio sin ejecutarlas"""
+
+    def __init__(self):
+        self.consultas = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.consultas.append((query, params))
+
+    def fetchone(self):
+        return (0,)
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture(scope="module")
+def conn():
+    try:
+        conn = psycopg2.connect(connect_timeout=3, **DB_CONFIG)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL no disponible: {e}")
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except psycopg2.Error as e:
+        conn.close()
+        pytest.skip(f"pg_trgm no disponible: {e}")
+
+    migracion = MIGRACION.read_text(encoding="utf-8")
+
+    cursor.execute("""
+        CREATE TEMP TABLE cuentas (cuentaid INT PRIMARY KEY, cuenta TEXT);
+        CREATE TEMP TABLE monedas (monedaid INT PRIMARY KEY, moneda TEXT);
+        CREATE TEMP TABLE terceros (terceroid INT PRIMARY KEY, tercero TEXT);
+        CREATE TEMP TABLE centro_costos (centro_costo_id INT PRIMARY KEY, centro_costo TEXT);
+        CREATE TEMP TABLE conceptos (conceptoid INT PRIMARY KEY, concepto TEXT);
+        CREATE TEMP TABLE movimientos_encabezado (
+            Id SERIAL PRIMARY KEY, Fecha DATE, Descripcion TEXT, Referencia TEXT,
+            Valor NUMERIC(18, 2), USD NUMERIC(18, 2), TRM NUMERIC(18, 4),
+            MonedaID INT, CuentaID INT, terceroid INT, Detalle TEXT,
+            created_at TIMESTAMP DEFAULT now()
+        );
+        CREATE TEMP TABLE movimientos_detalle (
+            id SERIAL PRIMARY KEY, movimiento_id INT, centro_costo_id INT,
+            ConceptoID INT, TerceroID INT, Valor NUMERIC(18, 2)
+        );
+        CREATE INDEX ON movimientos_detalle (movimiento_id);
+        CREATE TEMP TABLE tercero_descripciones (
+            id SERIAL PRIMARY KEY, terceroid INT, descripcion TEXT, referencia TEXT,
+            activa BOOLEAN DEFAULT TRUE, created_at TIMESTAMP DEFAULT now()
+        );
+    """)
+    cursor.execute("""
+        INSERT INTO movimientos_encabezado (Fecha, Descripcion, Referencia, Valor, MonedaID, CuentaID, terceroid)
+        SELECT DATE '2020-01-01' + (i % 2000),
+               'COMPRA ' || md5(i::text) || CASE WHEN i % 1000 = 0 THEN ' EXITO' ELSE '' END,
+               '', (i % 977) * 1000, 1, 1 + i % 5, NULLIF(i % 50, 0)
+        FROM generate_series(1, %s) AS i
+    """, (FILAS,))
+    cursor.execute("""
+        INSERT INTO movimientos_detalle (movimiento_id, Valor)
+        SELECT Id, Valor FROM movimientos_encabezado
+    """)
+    cursor.execute("""
+        INSERT INTO tercero_descripciones (terceroid, descripcion)
+        SELECT i % 500, 'ALIAS ' || md5(i::text)
+        FROM generate_series(1, %s) AS i
+    """, (FILAS,))
+    # La migración se aplica sobre las tablas temporales (mismo nombre, se resuelven primero)
+    cursor.execute(migracion.replace("CREATE EXTENSION IF NOT EXISTS pg_trgm;", ""))
+
+    yield conn
+
+    conn.rollback()
+    conn.close()
+
+
+def _plan(conn, query, params):
+    cursor = conn.cursor()
+    cursor.execute("EXPLAIN " + query, params)
+    plan = "\n".join(row[0] for row in cursor.fetchall())
+    cursor.close()
+    return plan
+
+
+def test_filtro_descripcion_contiene_usa_indice_trigram(conn):
+    captura = _CapturaConsultas()
+    PostgresMovimientoRepository(captura).buscar_avanzado(descripcion_contiene="exito", limit=50)
+
+    for query, params in captura.consultas:
+        plan = _plan(conn, query, params)
+        assert "idx_mov_encabezado_descripcion_trgm" in plan, plan
+        assert "Seq Scan on movimientos_encabezado" not in plan, plan
+
+
+def test_duplicados_por_descripcion_usan_indices(conn):
+    captura = _CapturaConsultas()
+    repo = PostgresMovimientoRepository(captura)
+    repo.existe_movimiento(date(2021, 3, 1), Decimal("5000"), "", 2, descripcion="compra abc")
+    repo.contar_movimientos_similares(date(2021, 3, 1), Decimal("5000"), "", 2, descripcion="compra abc")
+
+    for query, params in captura.consultas:
+        plan = _plan(conn, query, params)
+        assert "Seq Scan on movimientos_encabezado" not in plan, plan
+
+
+def test_buscar_tercero_por_descripcion_usa_indice_trigram(conn):
+    captura = _CapturaConsultas()
+    PostgresTerceroDescripcionRepository(captura).buscar_por_descripcion("e4da3b7f")
+
+    query, params = captura.consultas[0]
+    plan = _plan(conn, query, params)
+    assert "idx_tercero_descripciones_descripcion_trgm" in plan, plan
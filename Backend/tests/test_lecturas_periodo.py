@@ -0,0 +1,135 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+from starlette.requests import Request
+
+from src.domain.models.movimiento_extracto import MovimientoExtracto
+from src.domain.services.lecturas_periodo import CacheLecturasPeriodo
+from src.infrastructure.api.routers.conciliaciones import obtener_movimientos_extracto
+from src.infrastructure.database.postgres_movimiento_extracto_repository import PostgresMovimientoExtractoRepository
+
+
+def _request(**cabeceras):
+    return Request({
+        "type": "http",
+        "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in cabeceras.items()],
+    })
+
+
+class _RepoExtracto:
+    """Repositorio async en memoria que cuenta las lecturas del periodo"""
+
+    def __init__(self):
+        self.movimientos = [
+            MovimientoExtracto(id=1, cuenta_id=1, year=2025, month=3, fecha=date(2025, 3, 4),
+                               descripcion="PAGO PSE", referencia=None, valor=Decimal("-1500.00")),
+        ]
+        self.lecturas = 0
+
+    async def obtener_por_periodo(self, cuenta_id, year, month):
+        self.lecturas += 1
+        return list(self.movimientos)
+
+
+def _leer(request, repo, cache):
+    return asyncio.run(obtener_movimientos_extracto(1, 2025, 3, request, repo, cache))
+
+
+class _ConexionEscritura:
+    """Conexión falsa para las escrituras del repositorio de extracto"""
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchone(self):
+        return (99, None)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_version_por_periodo_cuenta_y_global():
+    cache = CacheLecturasPeriodo()
+    calculos = []
+
+    def calcular():
+        calculos.append(1)
+        return len(calculos)
+
+    assert cache.obtener(1, 2025, 3, "x", calcular).valor == 1
+    assert cache.obtener(1, 2025, 3, "x", calcular).valor == 1
+
+    # Otro periodo u otra cuenta no afectan
+    cache.invalidar_periodo(1, 2025, 4)
+    cache.invalidar_cuenta(2)
+    assert cache.obtener(1, 2025, 3, "x", calcular).valor == 1
+
+    cache.invalidar_periodo(1, 2025, 3)
+    assert cache.obtener(1, 2025, 3, "x", calcular).valor == 2
+    cache.invalidar_cuenta(1)
+    assert cache.obtener(1, 2025, 3, "x", calcular).valor == 3
+    cache.invalidar()
+    assert cache.obtener(1, 2025, 3, "x", calcular).valor == 4
+
+
+def test_escritura_durante_el_calculo_no_deja_resultado_vigente():
+    cache = CacheLecturasPeriodo()
+    calculos = []
+
+    def calcular():
+        calculos.append(1)
+        if len(calculos) == 1:
+            cache.invalidar_periodo(1, 2025, 3)
+        return len(calculos)
+
+    assert cache.obtener(1, 2025, 3, "x", calcular).valor == 1
+    assert cache.obtener(1, 2025, 3, "x", calcular).valor == 2
+    assert cache.obtener(1, 2025, 3, "x", calcular).valor == 2
+
+
+def test_etag_y_304_en_refresco_sin_cambios():
+    cache = CacheLecturasPeriodo()
+    repo = _RepoExtracto()
+
+    respuesta = _leer(_request(), repo, cache)
+    assert respuesta.status_code == 200
+    etag = respuesta.headers["etag"]
+    assert respuesta.headers["last-modified"].endswith("GMT")
+    assert b'"descripcion":"PAGO PSE"' in respuesta.body
+
+    respuesta = _leer(_request(if_none_match=etag), repo, cache)
+    assert respuesta.status_code == 304 and respuesta.body == b""
+    assert repo.lecturas == 1
+
+    respuesta = _leer(
+        _request(if_modified_since=respuesta.headers["last-modified"]), repo, cache
+    )
+    assert respuesta.status_code == 304
+
+    # Invalidado pero con el mismo contenido: se recalcula y el ETag se mantiene
+    cache.invalidar_periodo(1, 2025, 3)
+    respuesta = _leer(_request(if_none_match=f'W/{etag}'), repo, cache)
+    assert respuesta.status_code == 304
+    assert repo.lecturas == 2
+
+    # Una escritura por el repositorio invalida el periodo y cambia el ETag
+    escritor = PostgresMovimientoExtractoRepository(_ConexionEscritura(), lecturas_periodo=cache)
+    nuevo = MovimientoExtracto(id=None, cuenta_id=1, year=2025, month=3, fecha=date(2025, 3, 5),
+                               descripcion="ABONO", referencia=None, valor=Decimal("200.00"))
+    escritor.guardar(nuevo)
+    repo.movimientos.append(nuevo)
+
+    respuesta = _leer(_request(if_none_match=etag), repo, cache)
+    assert respuesta.status_code == 200
+    assert respuesta.headers["etag"] != etag
+    assert repo.lecturas == 3
@@ -0,0 +1,218 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from src.domain.models.configuracion_matching import ConfiguracionMatching, ModoAsignacion
+from src.domain.models.movimiento import Movimiento
+from src.domain.models.movimiento_extracto import MovimientoExtracto
+from src.domain.models.movimiento_match import MatchEstado
+from src.domain.services.matching_incremental import CacheMatchingPeriodos, InstantaneaMatching, MatchingIncremental
+from src.domain.services.matching_service import MatchingService
+
+
+DESCRIPCIONES = [
+    "PAGO PSE EMPRESA ABC",
+    "TRANSFERENCIA CTA SUC VIRTUAL",
+    "COMPRA EN SUPERMERCADO",
+    "ABONO INTERESES AHORROS",
+    "RETIRO CAJERO",
+]
+INICIO = date(2025, 3, 1)
+
+
+class _Periodo:
+    """Estado en memoria de un periodo: lo que el endpoint lee de la BD en cada ejecución"""
+
+    def __init__(self, rnd):
+        self.rnd = rnd
+        self.valores = [Decimal(rnd.choice([-1, 1]) * rnd.randint(1, 300) * 1000) for _ in range(15)]
+        self.extracto = {}
+        self.sistema = {}
+        self.vinculados = {}  # extracto_id -> sistema_id
+        self.sugeridos = {}  # extracto_id -> sistema_id de la última ejecución, sin vincular
+        self.siguiente_id = 1
+        for _ in range(60):
+            self.agregar_extracto()
+        for _ in range(70):
+            self.agregar_sistema()
+
+    def _id(self):
+        self.siguiente_id += 1
+        return self.siguiente_id
+
+    def _fecha(self):
+        return INICIO + timedelta(days=self.rnd.randint(0, 9))
+
+    def agregar_extracto(self):
+        id = self._id()
+        self.extracto[id] = MovimientoExtracto(
+            id=id, cuenta_id=1, year=2025, month=3, fecha=self._fecha(),
+            descripcion=self.rnd.choice(DESCRIPCIONES), referencia=None,
+            valor=self.rnd.choice(self.valores) + Decimal(self.rnd.choice([0, 0, 50])),
+        )
+
+    def agregar_sistema(self):
+        id = self._id()
+        self.sistema[id] = Movimiento(
+            id=id, moneda_id=1, cuenta_id=1, fecha=self._fecha(),
+            valor=self.rnd.choice(self.valores), descripcion=self.rnd.choice(DESCRIPCIONES),
+        )
+
+    def mutar(self):
+        """Un cambio aleatorio, como los que hacen otros endpoints entre ejecuciones"""
+        accion = self.rnd.randrange(8)
+        libres = [id for id in self.sistema if id not in self.vinculados.values()]
+        if accion == 0:
+            self.agregar_sistema()
+        elif accion == 1 and libres:
+            del self.sistema[self.rnd.choice(libres)]
+        elif accion == 2 and libres:
+            mov = self.sistema[self.rnd.choice(libres)]
+            mov.valor = self.rnd.choice(self.valores)
+            mov.fecha = self._fecha()
+        elif accion == 3:
+            self.agregar_extracto()
+        elif accion == 4:
+            pendientes = [id for id in self.extracto if id not in self.vinculados]
+            if pendientes:
+                mov = self.extracto[self.rnd.choice(pendientes)]
+                mov.descripcion = self.rnd.choice(DESCRIPCIONES)
+                mov.valor = self.rnd.choice(self.valores)
+        elif accion == 5 and self.vinculados:
+            del self.vinculados[self.rnd.choice(sorted(self.vinculados))]
+        elif accion == 6 and self.sugeridos and libres:
+            # Vincular a mano una fila sugerida con otro movimiento: su candidato queda libre
+            id = self.rnd.choice(sorted(self.sugeridos))
+            otros = [s for s in libres if s != self.sugeridos[id]]
+            if otros:
+                self.vinculados[id] = self.rnd.choice(otros)
+        elif accion == 7 and self.sugeridos:
+            # Eliminar (o recargar) una fila sugerida del extracto
+            del self.extracto[self.rnd.choice(sorted(self.sugeridos))]
+
+    def leer(self):
+        """Pendientes y disponibles como los arma el endpoint, con objetos nuevos en cada lectura"""
+        pendientes = [
+            MovimientoExtracto(**vars(m)) for m in sorted(self.extracto.values(), key=lambda m: (m.fecha, m.id))
+            if m.id not in self.vinculados
+        ]
+        ocupados = set(self.vinculados.values())
+        disponibles = [
+            Movimiento(id=m.id, moneda_id=1, cuenta_id=1, fecha=m.fecha, valor=m.valor, descripcion=m.descripcion)
+            for m in sorted(self.sistema.values(), key=lambda m: (m.fecha, abs(m.valor), m.id), reverse=True)
+            if m.id not in ocupados
+        ]
+        return pendientes, disponibles
+
+    def guardar(self, matches):
+        """Se confirma una parte de las sugerencias; las demás quedan pendientes"""
+        self.sugeridos = {}
+        for m in matches:
+            if m.estado in (MatchEstado.OK, MatchEstado.PROBABLE):
+                if self.rnd.random() < 0.5:
+                    self.vinculados[m.mov_extracto.id] = m.mov_sistema.id
+                else:
+                    self.sugeridos[m.mov_extracto.id] = m.mov_sistema.id
+
+
+def _firma(matches):
+    return [
+        (m.mov_extracto.id, m.mov_sistema.id if m.mov_sistema else None, m.estado,
+         m.score_total, m.score_fecha, m.score_valor, m.score_descripcion)
+        for m in matches
+    ]
+
+
+class _ServicioContador(MatchingService):
+    def __init__(self):
+        super().__init__()
+        self.filas_evaluadas = 0
+
+    def ejecutar_matching(self, movs_extracto, movs_sistema, config, todas_cuentas=None, aliases=None):
+        self.filas_evaluadas += len(movs_extracto)
+        return super().ejecutar_matching(movs_extracto, movs_sistema, config, todas_cuentas, aliases)
+
+
+def test_incremental_equivale_a_ejecucion_completa():
+    config = ConfiguracionMatching.crear_configuracion_default()
+    completo = MatchingService()
+
+    for semilla in range(20):
+        periodo = _Periodo(random.Random(semilla))
+        servicio = _ServicioContador()
+        incremental = MatchingIncremental(servicio)
+        previa = None
+        filas_totales = 0
+
+        for _ in range(12):
+            pendientes, disponibles = periodo.leer()
+            esperado = completo.ejecutar_matching(pendientes, disponibles, config)
+            resultado = incremental.ejecutar(previa, pendientes, disponibles, config)
+            assert _firma(resultado) == _firma(esperado)
+
+            filas_totales += len(pendientes)
+            previa = InstantaneaMatching(None, config, None, None, resultado, pendientes, disponibles)
+            periodo.guardar(resultado)
+            periodo.mutar()
+
+        # Las ejecuciones posteriores a la primera solo evalúan las filas afectadas
+        assert servicio.filas_evaluadas < filas_totales
+
+
+def test_candidato_liberado_se_reevalua():
+    # A y B iguales compiten por X: A lo toma y B queda SIN_MATCH
+    config = ConfiguracionMatching.crear_configuracion_default()
+    fila_a, fila_b = (
+        MovimientoExtracto(id=id, cuenta_id=1, year=2025, month=3, fecha=INICIO,
+                           descripcion="PAGO PSE EMPRESA ABC", referencia=None, valor=Decimal(5000))
+        for id in (1, 2)
+    )
+    x = Movimiento(id=10, moneda_id=1, cuenta_id=1, fecha=INICIO, valor=Decimal(5000),
+                   descripcion="PAGO PSE EMPRESA ABC")
+    servicio = MatchingService()
+    primera = servicio.ejecutar_matching([fila_a, fila_b], [x], config)
+    assert [m.estado for m in primera] == [MatchEstado.OK, MatchEstado.SIN_MATCH]
+    previa = InstantaneaMatching(None, config, None, None, primera, [fila_a, fila_b], [x])
+
+    # A se vincula a otro movimiento (o se elimina): X vuelve a estar libre para B
+    resultado = MatchingIncremental(servicio).ejecutar(previa, [fila_b], [x], config)
+    assert _firma(resultado) == _firma(servicio.ejecutar_matching([fila_b], [x], config))
+    assert resultado[0].estado == MatchEstado.OK and resultado[0].mov_sistema.id == 10
+
+
+def test_sin_instantanea_compatible_ejecuta_completo():
+    config = ConfiguracionMatching.crear_configuracion_default()
+    periodo = _Periodo(random.Random(3))
+    pendientes, disponibles = periodo.leer()
+    servicio = _ServicioContador()
+    previa = InstantaneaMatching(None, config, None, None, servicio.ejecutar_matching(pendientes, disponibles, config),
+                                 pendientes, disponibles)
+
+    otra = ConfiguracionMatching.crear_configuracion_default()
+    otra.score_minimo_probable = Decimal('0.50')
+    servicio.filas_evaluadas = 0
+    MatchingIncremental(servicio).ejecutar(previa, pendientes, disponibles, otra)
+    assert servicio.filas_evaluadas == len(pendientes)
+
+    otra = ConfiguracionMatching.crear_configuracion_default()
+    otra.modo_asignacion = ModoAsignacion.OPTIMO
+    servicio.filas_evaluadas = 0
+    MatchingIncremental(servicio).ejecutar(previa, pendientes, disponibles, otra)
+    assert servicio.filas_evaluadas == len(pendientes)
+
+
+def test_cache_por_periodo_expira_y_descarta_antiguos():
+    config = ConfiguracionMatching.crear_configuracion_default()
+    instantanea = InstantaneaMatching(("marca",), config, None, "resultado", [], [], [])
+
+    cache = CacheMatchingPeriodos(max_periodos=2)
+    cache.guardar(1, 2025, 1, instantanea)
+    cache.guardar(1, 2025, 2, instantanea)
+    cache.guardar(1, 2025, 3, instantanea)
+    assert cache.obtener(1, 2025, 1) is None
+    assert cache.obtener(1, 2025, 3).vigente(("marca",), config, None)
+    assert not cache.obtener(1, 2025, 3).vigente(("otra",), config, None)
+
+    cache.max_edad_segundos = 0
+    instantanea.creado -= 1
+    assert cache.obtener(1, 2025, 3) is None
@@ -0,0 +1,341 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from src.domain.models.movimiento import Movimiento
+from src.domain.models.movimiento_extracto import MovimientoExtracto
+from src.domain.models.movimiento_match import MatchEstado
+from src.domain.models.configuracion_matching import ConfiguracionMatching, ModoAsignacion
+from src.domain.services.matching_service import MatchingService
+from src.domain.services.indice_candidatos import IndiceCandidatos
+from src.domain.services.evaluador_candidatos import EvaluadorVectorizado
+from src.domain.services.similitud_texto import MotorSequenceMatcher, MotorSimilitudRapido
+from src.domain.services.proyector_alias import ProyectorAlias, CacheProyectoresAlias
+from src.domain.models.matching_alias import MatchingAlias
+
+
+DESCRIPCIONES = [
+    "PAGO PSE EMPRESA ABC",
+    "TRANSFERENCIA CTA SUC VIRTUAL",
+    "COMPRA EN SUPERMERCADO",
+    "ABONO INTERESES AHORROS",
+    "CUOTA MANEJO TARJETA",
+    "RETIRO CAJERO",
+]
+
+
+def _generar_periodo(semilla: int, n_extracto: int = 120, n_sistema: int = 130):
+    rnd = random.Random(semilla)
+    inicio = date(2025, 3, 1)
+    valores = [Decimal(rnd.choice([-1, 1]) * rnd.randint(1, 500) * 1000) for _ in range(25)]
+
+    extracto = []
+    for i in range(n_extracto):
+        extracto.append(MovimientoExtracto(
+            id=i + 1,
+            cuenta_id=1,
+            year=2025,
+            month=3,
+            fecha=inicio + timedelta(days=rnd.randint(0, 30)),
+            descripcion=rnd.choice(DESCRIPCIONES),
+            referencia=None,
+            valor=rnd.choice(valores) + Decimal(rnd.choice([0, 0, 0, 50])),
+        ))
+
+    sistema = []
+    for i in range(n_sistema):
+        sistema.append(Movimiento(
+            id=1000 + i,
+            moneda_id=1,
+            cuenta_id=1,
+            fecha=inicio + timedelta(days=rnd.randint(0, 30)),
+            valor=rnd.choice(valores),
+            descripcion=rnd.choice(DESCRIPCIONES),
+        ))
+
+    return extracto, sistema
+
+
+def _firma(matches):
+    return [
+        (
+            m.mov_extracto.id,
+            m.mov_sistema.id if m.mov_sistema else None,
+            m.estado,
+            m.score_total,
+            m.score_fecha,
+            m.score_valor,
+            m.score_descripcion,
+        )
+        for m in matches
+    ]
+
+
+def test_indice_candidatos_equivale_a_recorrido_completo():
+    _, sistema = _generar_periodo(7)
+    indice = IndiceCandidatos(sistema)
+
+    fecha = date(2025, 3, 15)
+    esperados = [m for m in sistema if abs((fecha - m.fecha).days) <= 1]
+    assert indice.candidatos(fecha) == esperados
+
+    # Retirar conserva el orden de los restantes
+    indice.retirar(esperados[0])
+    assert indice.candidatos(fecha) == esperados[1:]
+    assert len(indice) == len(sistema) - 1
+
+
+def test_matching_con_indice_produce_mismo_resultado_que_busqueda_lineal():
+    config = ConfiguracionMatching.crear_configuracion_default()
+    service = MatchingService()
+
+    for semilla in range(5):
+        extracto, sistema = _generar_periodo(semilla)
+        resultado = service.ejecutar_matching(extracto, sistema, config)
+
+        # Referencia: algoritmo greedy con recorrido lineal de la lista
+        disponibles = list(sistema)
+        esperado = []
+        for mov_e in extracto:
+            mejor, mejor_score = None, Decimal('0.00')
+            for mov_s in disponibles:
+                if abs((mov_e.fecha - mov_s.fecha).days) > 1:
+                    continue
+                sf = service.calcular_score_fecha(mov_e.fecha, mov_s.fecha)
+                sv = service.calcular_score_valor(mov_e.valor, mov_s.valor, config.tolerancia_valor)
+                sd = service.calcular_score_descripcion(mov_e.descripcion, mov_s.descripcion)
+                st = config.calcular_score_ponderado(sf, sv, sd)
+                if sf == Decimal('1.00') and sv == Decimal('1.00') and st < Decimal('0.85'):
+                    st = Decimal('0.85')
+                if st > mejor_score:
+                    mejor_score, mejor = st, (mov_s, sf, sv, sd)
+            if mejor and mejor_score >= config.similitud_descripcion_minima:
+                estado = service._determinar_estado_match(mejor_score, config)
+                if estado in [MatchEstado.OK, MatchEstado.PROBABLE]:
+                    disponibles.remove(mejor[0])
+                esperado.append((mov_e.id, mejor[0].id, estado, mejor_score, mejor[1], mejor[2], mejor[3]))
+            else:
+                z = Decimal('0.00')
+                esperado.append((mov_e.id, None, MatchEstado.SIN_MATCH, z, z, z, z))
+
+        assert _firma(resultado) == esperado
+
+
+def test_asignacion_maxima_equivale_a_fuerza_bruta():
+    from itertools import permutations
+    from src.domain.services.asignacion_optima import resolver_asignacion_maxima
+
+    rnd = random.Random(3)
+    for _ in range(30):
+        n, m = rnd.randint(1, 5), rnd.randint(1, 5)
+        pesos = [[rnd.choice([0, 0, rnd.randint(1, 100)]) for _ in range(m)] for _ in range(n)]
+
+        solucion = resolver_asignacion_maxima([[(j, p) for j, p in enumerate(fila) if p] for fila in pesos])
+        total = sum(pesos[i][j] for i, j in enumerate(solucion) if j >= 0)
+        columnas = [j for j in solucion if j >= 0]
+        assert len(columnas) == len(set(columnas))
+
+        if n <= m:
+            mejor = max(sum(pesos[i][p[i]] for i in range(n)) for p in permutations(range(m), n))
+        else:
+            mejor = max(sum(pesos[p[j]][j] for j in range(m)) for p in permutations(range(n), m))
+        assert total == mejor
+
+
+def test_componente_dispersa_grande_optima_dentro_del_presupuesto():
+    # Banda de 11 aristas por fila con potenciales u, v: las aristas (i, i)
+    # pesan u[i] + v[i] y las demás menos, así la identidad es la única
+    # asignación óptima (dualidad), aunque muchas filas tengan una arista
+    # individual más pesada que la suya
+    rnd = random.Random(17)
+    n = 5000
+    u = [rnd.randint(2000, 4000) for _ in range(n)]
+    v = [rnd.randint(2000, 4000) for _ in range(n)]
+    movs = [object() for _ in range(n)]
+    aristas = []
+    for i in range(n):
+        fila = [
+            (movs[j], (Decimal(u[i] + v[j] - (0 if j == i else rnd.randint(1, 1500))) / 10000,) + (None,) * 3)
+            for j in range(max(0, i - 5), min(n, i + 6))
+        ]
+        rnd.shuffle(fila)
+        aristas.append(fila)
+
+    service = MatchingService()
+    inicio = time.monotonic()
+    # Sin respaldo GREEDY: _resolver_componente lanzaría TiempoAsignacionAgotado
+    asignacion = service._resolver_componente(
+        list(range(n)), aristas, inicio + service.presupuesto_asignacion_segundos
+    )
+    assert time.monotonic() - inicio < service.presupuesto_asignacion_segundos
+    assert all(asignacion[i][0] is movs[i] for i in range(n))
+
+
+def test_modo_optimo_no_depende_del_orden_del_extracto():
+    config = ConfiguracionMatching.crear_configuracion_default()
+    config.modo_asignacion = ModoAsignacion.OPTIMO
+    service = MatchingService()
+
+    extracto, sistema = _generar_periodo(11)
+    directo = service.ejecutar_matching(extracto, sistema, config)
+    invertido = service.ejecutar_matching(list(reversed(extracto)), sistema, config)
+
+    def suma(matches):
+        return sum(m.score_total for m in matches if m.mov_sistema)
+
+    assert suma(directo) == suma(invertido)
+
+    # Nunca peor que greedy y sin reutilizar movimientos del sistema
+    config_greedy = ConfiguracionMatching.crear_configuracion_default()
+    greedy = service.ejecutar_matching(extracto, sistema, config_greedy)
+    assert suma(directo) >= suma(greedy)
+    usados = [m.mov_sistema.id for m in directo if m.mov_sistema]
+    assert len(usados) == len(set(usados))
+
+
+def test_modo_optimo_sin_presupuesto_usa_greedy():
+    config = ConfiguracionMatching.crear_configuracion_default()
+    config.modo_asignacion = ModoAsignacion.OPTIMO
+
+    extracto, sistema = _generar_periodo(5)
+    sin_tiempo = MatchingService(presupuesto_asignacion_segundos=0).ejecutar_matching(extracto, sistema, config)
+
+    config_greedy = ConfiguracionMatching.crear_configuracion_default()
+    greedy = MatchingService().ejecutar_matching(extracto, sistema, config_greedy)
+
+    asignados = lambda ms: [(m.mov_extracto.id, m.mov_sistema.id) for m in ms if m.mov_sistema]
+    assert asignados(sin_tiempo) == asignados(greedy)
+
+
+def test_scoring_vectorizado_identico_al_escalar():
+    configs = [
+        ConfiguracionMatching.crear_configuracion_default(),
+        # Tolerancia con score_valor no exacto en decimal (1/3) y pesos distintos
+        ConfiguracionMatching(
+            tolerancia_valor=Decimal('300.00'),
+            similitud_descripcion_minima=Decimal('0.50'),
+            peso_fecha=Decimal('0.25'),
+            peso_valor=Decimal('0.45'),
+            peso_descripcion=Decimal('0.30'),
+            score_minimo_exacto=Decimal('0.90'),
+            score_minimo_probable=Decimal('0.50'),
+        ),
+    ]
+
+    for config in configs:
+        for modo in ModoAsignacion:
+            config.modo_asignacion = modo
+            for semilla in range(3):
+                extracto, sistema = _generar_periodo(semilla)
+                # Algunas filas en USD y descripciones vacías
+                for mov in extracto[::7] + sistema[::9]:
+                    mov.usd = (abs(mov.valor) / Decimal('4000')).quantize(Decimal('0.01'))
+                extracto[3].descripcion = ""
+                assert EvaluadorVectorizado.es_aplicable(extracto, sistema, config)
+
+                escalar = MatchingService(usar_vectorizado=False).ejecutar_matching(extracto, sistema, config)
+                vectorizado = MatchingService(usar_vectorizado=True).ejecutar_matching(extracto, sistema, config)
+                assert _firma(vectorizado) == _firma(escalar)
+
+
+def test_motor_similitud_rapido_equivale_a_sequence_matcher():
+    rnd = random.Random(17)
+    rapido, referencia = MotorSimilitudRapido(), MotorSequenceMatcher()
+
+    textos = DESCRIPCIONES + ["", "A", "PAGO PSE", "PSE PAGO", "AAAA BBBB AAAA"]
+    for _ in range(2000):
+        alfabeto = rnd.choice(["AB", "ABC ", "ABCDEFGHIJ KLMN"])
+        textos.append("".join(rnd.choice(alfabeto) for _ in range(rnd.randint(0, 30))))
+    # Textos largos: heurística autojunk de difflib
+    textos.append("AB " * 80)
+    textos.append("BA " * 90)
+
+    for _ in range(5000):
+        a, b = rnd.choice(textos), rnd.choice(textos)
+        assert rapido.ratio(a, b) == referencia.ratio(a, b)
+
+
+def test_matching_con_motor_rapido_identico_al_de_referencia():
+    config = ConfiguracionMatching.crear_configuracion_default()
+    for semilla in range(3):
+        extracto, sistema = _generar_periodo(semilla)
+        for mov in extracto[::5]:
+            mov.descripcion = mov.descripcion.lower() + " 123"
+
+        for vectorizado in (False, True):
+            referencia = MatchingService(usar_vectorizado=vectorizado, motor_similitud=MotorSequenceMatcher())
+            rapido = MatchingService(usar_vectorizado=vectorizado)
+            assert _firma(rapido.ejecutar_matching(extracto, sistema, config)) == \
+                _firma(referencia.ejecutar_matching(extracto, sistema, config))
+
+
+def _proyectar_lineal(texto, aliases):
+    """Proyección original: recorrer todos los alias con `in` y str.replace"""
+    esperado = texto
+    for alias in aliases:
+        if alias.patron in texto:
+            esperado = texto.replace(alias.patron, alias.reemplazo)
+    return esperado
+
+
+def test_proyector_alias_equivale_a_recorrido_lineal():
+    rnd = random.Random(23)
+    for _ in range(200):
+        aliases = [
+            MatchingAlias(
+                cuenta_id=1,
+                patron="".join(rnd.choice("ABC") for _ in range(rnd.randint(1, 4))),
+                reemplazo=rnd.choice(["X", "YY", "TRASLADO"]),
+            )
+            for _ in range(rnd.randint(0, 8))
+        ]
+        proyector = ProyectorAlias(aliases)
+        for _ in range(20):
+            texto = "".join(rnd.choice("ABC D") for _ in range(rnd.randint(0, 20)))
+            assert proyector.proyectar(texto) == _proyectar_lineal(texto, aliases)
+
+
+def test_matching_con_alias_compilados_identico_a_lista():
+    config = ConfiguracionMatching.crear_configuracion_default()
+    aliases = [
+        MatchingAlias(cuenta_id=1, patron="PSE", reemplazo="PAGO ELECTRONICO"),
+        MatchingAlias(cuenta_id=1, patron="CTA SUC", reemplazo="CUENTA SUCURSAL"),
+        MatchingAlias(cuenta_id=1, patron="PAGO", reemplazo="ABONO"),
+    ]
+    extracto, sistema = _generar_periodo(4)
+    service = MatchingService()
+
+    por_lista = service.ejecutar_matching(extracto, sistema, config, aliases=aliases)
+    compilado = service.ejecutar_matching(extracto, sistema, config, aliases=ProyectorAlias(aliases))
+    assert _firma(compilado) == _firma(por_lista)
+
+    for mov_e in extracto[:20]:
+        for mov_s in sistema[:20]:
+            esperado = service.calcular_score_descripcion(mov_e.descripcion, mov_s.descripcion, aliases)
+            proyectado = _proyectar_lineal(mov_e.descripcion.upper().strip(), aliases)
+            assert esperado == service.score_descripcion_normalizada(proyectado, mov_s.descripcion.upper().strip())
+
+
+def test_cache_proyectores_alias_recompila_al_invalidar():
+    cargas = []
+    aliases = {1: [MatchingAlias(cuenta_id=1, patron="PSE", reemplazo="PAGO")]}
+
+    def cargar(cuenta_id):
+        cargas.append(cuenta_id)
+        return aliases.get(cuenta_id, [])
+
+    cache = CacheProyectoresAlias()
+    primero = cache.obtener(1, cargar)
+    assert cache.obtener(1, cargar) is primero
+    assert cargas == [1]
+
+    aliases[1] = [MatchingAlias(cuenta_id=1, patron="PSE", reemplazo="TRASLADO")]
+    cache.invalidar(1)
+    assert cache.obtener(1, cargar).proyectar("PAGO PSE") == "PAGO TRASLADO"
+
+    cache.obtener(2, cargar)
+    cache.invalidar_todo()
+    cache.obtener(1, cargar)
+    cache.obtener(2, cargar)
+    assert cargas == [1, 1, 2, 1, 2]
@@ -0,0 +1,84 @@
+"""
+Paginación por cursor de GET /api/movimientos sobre un repositorio en memoria
+que replica el orden y la condición de llave de buscar_avanzado.
+"""
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from src.domain.models.movimiento import Movimiento
+from src.infrastructure.api.routers.movimientos import listar_movimientos
+
+
+class _RepoMemoria:
+    def __init__(self, movimientos):
+        self.movimientos = sorted(movimientos, key=self._llave, reverse=True)
+
+    @staticmethod
+    def _llave(m):
+        return (m.fecha, abs(m.valor), m.id)
+
+    async def resumir_busqueda_avanzada(self, **filtros):
+        return {
+            'total': len(self.movimientos),
+            'ingresos': sum(m.valor for m in self.movimientos if m.valor > 0),
+            'egresos': sum(-m.valor for m in self.movimientos if m.valor < 0),
+        }
+
+    async def buscar_avanzado(self, skip=0, limit=None, despues_de=None, **filtros):
+        resultado = [m for m in self.movimientos if despues_de is None or self._llave(m) < despues_de]
+        return (resultado if limit is None else resultado[:limit]), len(self.movimientos)
+
+
+def _listar(repo, limite=None, cursor=None):
+    return asyncio.run(listar_movimientos(
+        desde=None, hasta=None, cuenta_id=None, tercero_id=None, centro_costo_id=None,
+        concepto_id=None, centros_costos_excluidos=None, pendiente=None, tipo_movimiento=None,
+        limite=limite, cursor=cursor, formato=None, repo=repo
+    ))
+
+
+def _movimientos():
+    # Fechas y valores absolutos repetidos para ejercitar el desempate por ID
+    return [
+        Movimiento(id=i, fecha=date(2024, 1, 1 + i % 3), descripcion=f"MOV {i}",
+                   referencia="", valor=Decimal((i % 4) * 1000) * (1 if i % 2 else -1),
+                   moneda_id=1, cuenta_id=1)
+        for i in range(1, 24)
+    ]
+
+
+def test_paginas_por_cursor_recorren_todo_sin_repetir():
+    repo = _RepoMemoria(_movimientos())
+
+    ids, cursor, paginas = [], None, []
+    while True:
+        respuesta = _listar(repo, limite=5, cursor=cursor)
+        ids.extend(item.id for item in respuesta.items)
+        paginas.append(respuesta.page)
+        cursor = respuesta.siguiente_cursor
+        if not cursor:
+            break
+
+    assert ids == [m.id for m in repo.movimientos]
+    assert paginas == [1, 2, 3, 4, 5]
+    assert respuesta.total_pages == 5
+    assert respuesta.totales['saldo'] == respuesta.totales['ingresos'] - respuesta.totales['egresos']
+
+
+def test_sin_limite_conserva_respuesta_completa():
+    repo = _RepoMemoria(_movimientos())
+    respuesta = _listar(repo)
+
+    assert len(respuesta.items) == respuesta.total == 23
+    assert respuesta.total_pages == 1
+    assert respuesta.siguiente_cursor is None
+
+
+def test_cursor_invalido_responde_400():
+    with pytest.raises(HTTPException) as error:
+        _listar(_RepoMemoria([]), cursor='no-es-un-cursor')
+    assert error.value.status_code == 400
@@ -0,0 +1,129 @@
+import io
+import os
+from pathlib import Path
+
+import pdfplumber
+import pytest
+
+from src.infrastructure.extractors import cache_extraccion, pdf_texto
+from src.infrastructure.extractors.cache_extraccion import CacheExtraccion
+from src.infrastructure.extractors.bancolombia import ahorros_extracto, ahorros_extracto_movimientos
+
+
+EXTRACTO = Path(__file__).resolve().parents[2] / "Bancolombia" / "Extractos" / "2025" / "2025-10 6377.pdf"
+
+pytestmark = pytest.mark.skipif(not EXTRACTO.exists(), reason="PDF de ejemplo no disponible")
+
+
+def _textos_pdfplumber(contenido: bytes):
+    with pdfplumber.open(io.BytesIO(contenido)) as pdf:
+        return [page.extract_text() for page in pdf.pages]
+
+
+def test_extraccion_en_paralelo_conserva_el_orden(monkeypatch):
+    contenido = EXTRACTO.read_bytes()
+    monkeypatch.setattr(cache_extraccion, "_cache", None)
+    monkeypatch.setattr(cache_extraccion, "_cache_configurado", True)
+    monkeypatch.setattr(pdf_texto, "MIN_PAGINAS_PARALELO", 1)
+    monkeypatch.setattr(pdf_texto, "MAX_PROCESOS", 2)
+    try:
+        documento = pdf_texto.extraer_documento(io.BytesIO(contenido))
+    finally:
+        pdf_texto._descartar_pool()
+
+    assert documento.textos == _textos_pdfplumber(contenido)
+    assert [page.page_number for page in documento.pages] == list(range(1, len(documento.pages) + 1))
+
+
+def test_extractores_aceptan_el_texto_ya_extraido():
+    contenido = EXTRACTO.read_bytes()
+    documento = pdf_texto.documento_para_extractores(io.BytesIO(contenido))
+
+    assert pdf_texto.abrir_pdf(documento) is documento
+    resumen = ahorros_extracto.extraer_resumen(documento)
+    assert resumen.get('saldo_final') is not None
+    assert resumen == ahorros_extracto.extraer_resumen(io.BytesIO(contenido))
+    assert (
+        ahorros_extracto_movimientos.extraer_movimientos(documento)
+        == ahorros_extracto_movimientos.extraer_movimientos(io.BytesIO(contenido))
+    )
+
+
+def test_cache_extraccion_lru_con_tamano_maximo(tmp_path):
+    cache = CacheExtraccion(str(tmp_path), max_bytes=2500)
+    for nombre in ("a", "b", "c"):
+        cache.guardar(cache.clave(nombre), "x" * 1000)
+        # mtime distinto por entrada para que el orden LRU sea determinista
+        ruta = tmp_path / (cache.clave(nombre) + CacheExtraccion.EXTENSION)
+        os.utime(ruta, (ord(nombre), ord(nombre)))
+
+    # "a" es la más antigua y fue desalojada al escribir "c"
+    assert cache.obtener(cache.clave("a")) == (False, None)
+    assert cache.obtener(cache.clave("b"))[0]
+    assert cache.obtener(cache.clave("c")) == (True, "x" * 1000)
+
+
+def test_resultados_de_extractor_se_cachean_por_contenido(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_extraccion, "_cache", CacheExtraccion(str(tmp_path), 10 * 1024 * 1024))
+    monkeypatch.setattr(cache_extraccion, "_cache_configurado", True)
+    contenido = EXTRACTO.read_bytes()
+
+    llamadas = []
+    original = ahorros_extracto.extraer_resumen
+
+    def contar(file_obj):
+        llamadas.append(file_obj)
+        return original(file_obj)
+
+    monkeypatch.setattr(ahorros_extracto, "extraer_resumen", contar)
+
+    primero = pdf_texto.ejecutar_extractor(
+        ahorros_extracto, "extraer_resumen", pdf_texto.extraer_documento(io.BytesIO(contenido))
+    )
+    primero["modificado"] = True
+    segundo = pdf_texto.ejecutar_extractor(
+        ahorros_extracto, "extraer_resumen", pdf_texto.extraer_documento(io.BytesIO(contenido))
+    )
+
+    assert len(llamadas) == 1
+    assert "modificado" not in segundo
+    assert segundo["saldo_final"] == primero["saldo_final"]
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="permisos POSIX")
+def test_cache_extraccion_privado_descarta_entradas_escribibles_por_otros(tmp_path):
+    directorio = tmp_path / "cache"
+    directorio.mkdir(mode=0o777)
+    os.chmod(directorio, 0o777)
+    cache = CacheExtraccion(str(directorio), 10 * 1024)
+    assert (directorio.stat().st_mode & 0o777) == 0o700
+
+    cache.guardar(cache.clave("a"), {"saldo": 1})
+    ruta = directorio / (cache.clave("a") + CacheExtraccion.EXTENSION)
+    assert (ruta.stat().st_mode & 0o077) == 0
+    assert cache.obtener(cache.clave("a")) == (True, {"saldo": 1})
+
+    # Un archivo que otro usuario podría reescribir no se deserializa
+    os.chmod(ruta, 0o666)
+    assert cache.obtener(cache.clave("a")) == (False, None)
+    assert not ruta.exists()
+
+    enlace = tmp_path / "enlace"
+    enlace.symlink_to(directorio)
+    with pytest.raises(PermissionError):
+        CacheExtraccion(str(enlace), 10 * 1024)
+
+
+def test_version_del_extractor_incluye_sus_modulos_auxiliares(monkeypatch):
+    from src.infrastructure.extractors import utils
+    from src.infrastructure.extractors.bancolombia import ahorros_movimientos
+
+    antes = cache_extraccion.version_modulo(ahorros_movimientos)
+    assert antes is not None
+    monkeypatch.setitem(cache_extraccion._versiones, utils.__name__, "otra")
+    assert cache_extraccion.version_modulo(ahorros_movimientos) != antes
+
+    # CACHE_VERSION invalida todos los extractores
+    version = cache_extraccion.version_modulo(ahorros_extracto)
+    monkeypatch.setattr(cache_extraccion, "CACHE_VERSION", cache_extraccion.CACHE_VERSION + 1)
+    assert cache_extraccion.version_modulo(ahorros_extracto) != version
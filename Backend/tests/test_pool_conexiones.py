@@ -0,0 +1,103 @@
+"""
+PoolConexiones con conexiones falsas: espera acotada, verificación y
+reciclaje al prestar, y métricas.
+"""
+import threading
+import time
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+from src.infrastructure.database.pool_conexiones import PoolAgotadoError, PoolConexiones
+
+
+class _Conexion:
+    def __init__(self, numero):
+        self.numero = numero
+        self.closed = 0
+        self.rota = False
+        self.estado = extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        if self.rota:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.estado = extensions.TRANSACTION_STATUS_INTRANS
+
+    def close(self):
+        self.closed = 1
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.estado = extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.estado
+
+
+def _pool(**opciones):
+    creadas = []
+
+    def conectar():
+        creadas.append(_Conexion(len(creadas) + 1))
+        return creadas[-1]
+
+    opciones.setdefault('verificar_inactiva_segundos', 3600)
+    return PoolConexiones(conectar, **opciones), creadas
+
+
+def test_espera_una_conexion_devuelta_y_agota_con_timeout():
+    pool, _ = _pool(minimo=0, maximo=1)
+    conn = pool.getconn()
+
+    with pytest.raises(PoolAgotadoError):
+        pool.getconn(timeout=0.01)
+
+    threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+    assert pool.getconn(timeout=5) is conn
+
+    metricas = pool.metricas()
+    assert metricas['agotados'] == 1
+    assert metricas['en_uso'] == 1 and metricas['abiertas'] == 1
+    assert metricas['espera_max_ms'] >= 40
+    assert metricas['prestamos_con_espera'] == 1
+
+
+def test_recicla_por_edad_y_descarta_las_que_fallan_la_verificacion():
+    pool, creadas = _pool(minimo=1, maximo=2, max_edad_segundos=0.01)
+    time.sleep(0.02)
+    conn = pool.getconn()
+    assert conn.numero == 2 and creadas[0].closed
+    pool.putconn(conn)
+
+    pool.max_edad_segundos = None
+    pool.verificar_inactiva_segundos = 0
+    conn.rota = True
+    nueva = pool.getconn()
+    assert nueva.numero == 3 and conn.closed
+
+    metricas = pool.metricas()
+    assert metricas['recicladas'] == 1 and metricas['descartadas'] == 2
+    assert metricas['abiertas'] == 1
+
+
+def test_devolver_deshace_la_transaccion_y_mide_el_prestamo():
+    pool, _ = _pool(minimo=0, maximo=2)
+    conn = pool.getconn()
+    conn.execute("UPDATE t SET x = 1")
+    time.sleep(0.01)
+    pool.putconn(conn)
+
+    assert conn.rollbacks == 1 and not conn.closed
+    metricas = pool.metricas()
+    assert metricas['en_uso'] == 0 and metricas['libres'] == 1
+    assert metricas['uso_max_ms'] >= 10
+
+    pool.closeall()
+    assert conn.closed
+    with pytest.raises(psycopg2.pool.PoolError):
+        pool.getconn()
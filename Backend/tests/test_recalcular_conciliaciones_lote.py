@@ -0,0 +1,154 @@
+"""
+Recálculo en lote de conciliaciones (recalcular_sistema_lote): mismo
+resultado que sincronizar el extracto y recalcular_sistema periodo a
+periodo, incluida la regla de estado CUADRADO/PENDIENTE y sin tocar los
+periodos CONCILIADO.
+
+La parte con base de datos necesita un PostgreSQL accesible con las
+variables DB_*; si no, se omite. Las tablas se crean como temporales.
+"""
+import psycopg2
+import pytest
+
+from src.infrastructure.database.connection import DB_CONFIG
+from src.infrastructure.database.postgres_conciliacion_repository import PostgresConciliacionRepository
+
+
+class _SinConsultas:
+    def cursor(self):
+        return self
+
+    def execute(self, *args):
+        raise AssertionError("no debería consultar la base de datos")
+
+    def close(self):
+        pass
+
+
+def test_sin_periodos_no_consulta():
+    repo = PostgresConciliacionRepository(_SinConsultas())
+    assert repo.recalcular_sistema_lote([]) == 0
+    assert repo.recalcular_sistema_lote([(None, 2024, 1)]) == 0
+
+
+@pytest.fixture
+def conn():
+    try:
+        conn = psycopg2.connect(connect_timeout=3, **DB_CONFIG)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL no disponible: {e}")
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TEMP TABLE cuentas (cuentaid INT PRIMARY KEY, cuenta TEXT);
+        CREATE TEMP TABLE movimientos_encabezado (Id SERIAL PRIMARY KEY, Fecha DATE, Valor NUMERIC(18, 2), CuentaID INT);
+        CREATE TEMP TABLE movimientos_extracto (cuenta_id INT, year INT, month INT, valor NUMERIC(16, 2), usd NUMERIC(16, 2));
+        CREATE TEMP TABLE conciliaciones (
+            id SERIAL PRIMARY KEY, cuenta_id INTEGER NOT NULL, year INTEGER NOT NULL, month INTEGER NOT NULL,
+            fecha_corte DATE NOT NULL,
+            extracto_saldo_anterior NUMERIC(16, 2) NOT NULL DEFAULT 0,
+            extracto_entradas NUMERIC(16, 2) NOT NULL DEFAULT 0,
+            extracto_salidas NUMERIC(16, 2) NOT NULL DEFAULT 0,
+            extracto_saldo_final NUMERIC(16, 2) NOT NULL DEFAULT 0,
+            sistema_entradas NUMERIC(16, 2) DEFAULT 0,
+            sistema_salidas NUMERIC(16, 2) DEFAULT 0,
+            sistema_saldo_final NUMERIC(16, 2) DEFAULT 0,
+            diferencia_saldo NUMERIC(16, 2) GENERATED ALWAYS AS (sistema_saldo_final - extracto_saldo_final) STORED,
+            datos_extra JSONB DEFAULT '{}', estado VARCHAR(20) DEFAULT 'PENDIENTE',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE UNIQUE INDEX ON conciliaciones (cuenta_id, year, month);
+        INSERT INTO cuentas VALUES (1, 'Ahorros'), (2, 'Tarjeta');
+        INSERT INTO movimientos_encabezado (Fecha, Valor, CuentaID)
+        SELECT DATE '2024-01-01' + (i * 3 % 200), CASE WHEN i % 3 = 0 THEN 50 * i ELSE -20 * i END, 1 + i % 2
+        FROM generate_series(1, 400) AS i;
+    """)
+    # Extractos: el de (1, 2024, 3) coincide con el sistema (CUADRADO); (2, 2024, 2) ya está CONCILIADO
+    cursor.execute("""
+        INSERT INTO movimientos_extracto (cuenta_id, year, month, valor)
+        SELECT CuentaID, EXTRACT(YEAR FROM Fecha)::int, EXTRACT(MONTH FROM Fecha)::int, Valor
+        FROM movimientos_encabezado
+        WHERE (CuentaID, EXTRACT(MONTH FROM Fecha)::int) IN ((1, 3), (2, 2));
+        INSERT INTO movimientos_extracto VALUES (1, 2024, 4, 1000, NULL), (2, 2024, 5, -300, NULL);
+
+        INSERT INTO conciliaciones (cuenta_id, year, month, fecha_corte, extracto_saldo_anterior,
+                                    extracto_entradas, extracto_salidas, extracto_saldo_final, estado)
+        SELECT c, 2024, m, make_date(2024, m, 1), 100, 0, 0, 100,
+               CASE WHEN (c, m) = (2, 2) THEN 'CONCILIADO' ELSE 'PENDIENTE' END
+        FROM generate_series(1, 2) AS c, generate_series(1, 8) AS m;
+
+        UPDATE conciliaciones c
+        SET extracto_entradas = e.entradas, extracto_salidas = e.salidas,
+            extracto_saldo_final = 100 + e.entradas - e.salidas
+        FROM (
+            SELECT cuenta_id, year, month,
+                   SUM(CASE WHEN valor > 0 THEN valor ELSE 0 END) AS entradas,
+                   SUM(CASE WHEN valor < 0 THEN -valor ELSE 0 END) AS salidas
+            FROM movimientos_extracto GROUP BY cuenta_id, year, month
+        ) e
+        WHERE (c.cuenta_id, c.year, c.month) = (e.cuenta_id, e.year, e.month);
+    """)
+    conn.commit()
+
+    yield conn
+
+    conn.rollback()
+    conn.close()
+
+
+def _estado(cursor):
+    cursor.execute("""
+        SELECT cuenta_id, year, month, extracto_saldo_anterior, extracto_entradas, extracto_salidas,
+               extracto_saldo_final, sistema_entradas, sistema_salidas, sistema_saldo_final, estado
+        FROM conciliaciones ORDER BY cuenta_id, year, month
+    """)
+    return cursor.fetchall()
+
+
+def _volver_al_inicio(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE conciliaciones c
+        SET extracto_saldo_anterior = i.extracto_saldo_anterior, extracto_entradas = i.extracto_entradas,
+            extracto_salidas = i.extracto_salidas, extracto_saldo_final = i.extracto_saldo_final,
+            sistema_entradas = 0, sistema_salidas = 0, sistema_saldo_final = 0, estado = i.estado
+        FROM iniciales i
+        WHERE c.id = i.id
+    """)
+    conn.commit()
+
+
+def test_lote_igual_a_recalcular_por_periodo(conn):
+    repo = PostgresConciliacionRepository(conn)
+    cursor = conn.cursor()
+    # Extracto desactualizado: entradas guardadas distintas de movimientos_extracto
+    cursor.execute("UPDATE conciliaciones SET extracto_entradas = 0 WHERE (cuenta_id, month) = (1, 4)")
+    cursor.execute("CREATE TEMP TABLE iniciales AS SELECT * FROM conciliaciones")
+    cursor.execute("SELECT cuenta_id, year, month FROM conciliaciones")
+    periodos = cursor.fetchall()
+    conn.commit()
+
+    # Camino periodo a periodo: obtener_por_periodo sincroniza el extracto
+    for c, y, m in periodos:
+        repo.obtener_por_periodo(c, y, m)
+        repo.recalcular_sistema(c, y, m)
+    esperado = _estado(cursor)
+
+    # El lote parte de los extractos desactualizados e incluye un periodo
+    # sin conciliación (se ignora)
+    _volver_al_inicio(conn)
+    assert repo.recalcular_sistema_lote(periodos + [(1, 2030, 1)]) == len(periodos)
+    assert _estado(cursor) == esperado
+
+    filas = {(r[0], r[1], r[2]): r for r in esperado}
+    assert filas[(1, 2024, 3)][-1] == "CUADRADO"
+    assert filas[(2, 2024, 2)][-1] == "CONCILIADO"
+    assert filas[(1, 2024, 4)][-1] == "PENDIENTE"
+    assert filas[(1, 2024, 4)][4] == 1000
+    # Sin movimientos de extracto el saldo anterior queda en 0
+    assert filas[(1, 2024, 8)][3] == 0
+
+    # Sin periodos: todas las conciliaciones
+    _volver_al_inicio(conn)
+    assert repo.recalcular_sistema_lote() == len(periodos)
+    assert _estado(cursor) == esperado
@@ -0,0 +1,82 @@
+"""
+Lecturas async (asyncpg): traducción de las consultas de los repositorios
+síncronos y repositorios sobre una conexión falsa con la API de asyncpg.
+"""
+import asyncio
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from src.infrastructure.database.async_connection import traducir_consulta
+from src.infrastructure.database.async_postgres_movimiento_extracto_repository import AsyncPostgresMovimientoExtractoRepository
+from src.infrastructure.database.async_postgres_movimiento_repository import AsyncPostgresMovimientoRepository
+
+
+class _ConexionAsync:
+    """Registra las consultas y responde filas fijas, como asyncpg.Connection"""
+
+    def __init__(self, filas=(), valor=None):
+        self.filas = list(filas)
+        self.valor = valor
+        self.consultas = []
+
+    async def fetch(self, query, *args):
+        self.consultas.append((query, args))
+        return self.filas
+
+    async def fetchrow(self, query, *args):
+        self.consultas.append((query, args))
+        return self.filas[0]
+
+    async def fetchval(self, query, *args):
+        self.consultas.append((query, args))
+        return self.valor
+
+
+def test_traduce_marcadores_tuplas_in_y_porcentajes():
+    sql, args = traducir_consulta(
+        "SELECT 1 FROM t WHERE a = %s AND b IN %s AND (c IS NULL OR c NOT IN %s) "
+        "AND d ILIKE '%%x%%' AND e = ANY(%s)",
+        (1, (2, 3), (4,), [5, 6])
+    )
+    assert sql == (
+        "SELECT 1 FROM t WHERE a = $1 AND b = ANY($2) AND (c IS NULL OR c <> ALL($3)) "
+        "AND d ILIKE '%x%' AND e = ANY($4)"
+    )
+    assert args == [1, [2, 3], [4], [5, 6]]
+
+
+def test_traduccion_rechaza_parametros_que_no_cuadran():
+    with pytest.raises(ValueError):
+        traducir_consulta("SELECT %s, %s", (1,))
+    with pytest.raises(ValueError):
+        traducir_consulta("SELECT %s", ((1, 2),))
+
+
+def test_extracto_por_periodo_reutiliza_consulta_y_conversion():
+    fila = (7, 1, 2025, 3, date(2025, 3, 4), "PAGO PSE", None, Decimal("-1500.00"),
+            None, None, 2, "raw", datetime(2025, 3, 5), "Ahorros")
+    conn = _ConexionAsync([fila])
+
+    movimientos = asyncio.run(AsyncPostgresMovimientoExtractoRepository(conn).obtener_por_periodo(1, 2025, 3))
+
+    assert [(m.id, m.descripcion, m.valor, m.cuenta) for m in movimientos] == [(7, "PAGO PSE", Decimal("-1500.00"), "Ahorros")]
+    query, args = conn.consultas[0]
+    assert "%s" not in query and "me.month = $3" in query
+    assert args == (1, 2025, 3)
+
+
+def test_buscar_avanzado_fuera_de_rango_cuenta_aparte():
+    conn = _ConexionAsync([], valor=42)
+
+    movimientos, total = asyncio.run(AsyncPostgresMovimientoRepository(conn).buscar_avanzado(
+        cuenta_id=1, centros_costos_excluidos=[3, 4], skip=100, limit=50
+    ))
+
+    assert movimientos == [] and total == 42
+    listado, conteo = conn.consultas
+    assert "<> ALL(" in listado[0] and "%s" not in listado[0]
+    assert listado[1][-2:] == (50, 100)
+    assert conteo[0].startswith("SELECT COUNT(*) ")
+    assert [3, 4] in conteo[1]
@@ -0,0 +1,196 @@
+"""
+Agregado mensual de los reportes (resumen_mensual): división del rango en
+meses completos y parciales, y, con PostgreSQL, que los reportes leídos del
+agregado coinciden con los calculados sobre los datos vivos antes y después
+de escribir por el repositorio.
+
+La parte con base de datos necesita un PostgreSQL accesible con las
+variables DB_*; si no, se omite. Las tablas se crean como temporales.
+"""
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import psycopg2
+import pytest
+
+from src.domain.models.movimiento import Movimiento
+from src.domain.models.movimiento_detalle import MovimientoDetalle
+from src.infrastructure.database import resumen_mensual
+from src.infrastructure.database.connection import DB_CONFIG
+from src.infrastructure.database.postgres_movimiento_repository import PostgresMovimientoRepository
+
+MIGRACION = Path(__file__).resolve().parents[2] / "Sql" / "CreateTable_resumen_movimientos_mensual.sql"
+
+
+def test_rango_en_meses_completos_y_extremos_parciales():
+    assert resumen_mensual.partes_rango(date(2024, 1, 1), date(2024, 3, 31)) == (((2024, 1), (2024, 3)), [])
+    assert resumen_mensual.partes_rango(date(2024, 1, 15), date(2024, 4, 10)) == (
+        ((2024, 2), (2024, 3)),
+        [(date(2024, 1, 15), date(2024, 1, 31)), (date(2024, 4, 1), date(2024, 4, 10))]
+    )
+    # Año a la fecha: el mes en curso sale de los datos vivos
+    assert resumen_mensual.partes_rango(date(2024, 1, 1), date(2024, 2, 29)) == (((2024, 1), (2024, 2)), [])
+    assert resumen_mensual.partes_rango(None, date(2024, 12, 5)) == (
+        (None, (2024, 11)), [(date(2024, 12, 1), date(2024, 12, 5))]
+    )
+    assert resumen_mensual.partes_rango(None, None) == ((None, None), [])
+    # Sin meses completos: todo el rango es vivo
+    assert resumen_mensual.partes_rango(date(2024, 1, 10), date(2024, 2, 20)) == (
+        None, [(date(2024, 1, 10), date(2024, 2, 20))]
+    )
+    assert resumen_mensual.partes_rango(date(2024, 12, 10), date(2024, 12, 31)) == (
+        None, [(date(2024, 12, 10), date(2024, 12, 31))]
+    )
+
+
+class _Cursor:
+    def __init__(self):
+        self.sentencias = []
+
+    def execute(self, query, params=None):
+        self.sentencias.append((" ".join(query.split()), params))
+
+
+def test_actualizar_periodos_bloquea_cada_periodo_en_orden(monkeypatch):
+    monkeypatch.setattr(resumen_mensual, "_disponible", True)
+    cursor = _Cursor()
+
+    resumen_mensual.actualizar_periodos(cursor, [(2, 2024, 1), (None, 2024, 3), (1, 2024, 12), (1, 2024, 2)])
+
+    # El candado va antes del DELETE, con las claves en el orden de los VALUES
+    candado, params = cursor.sentencias[0]
+    assert candado.startswith("SELECT pg_advisory_xact_lock")
+    assert params == (resumen_mensual.TABLA, ["1:2024:2", "1:2024:12", "2:2024:1", "None:2024:3"])
+    assert cursor.sentencias[1][0].startswith("DELETE FROM")
+
+
+@pytest.fixture(scope="module")
+def conn():
+    try:
+        conn = psycopg2.connect(connect_timeout=3, **DB_CONFIG)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL no disponible: {e}")
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TEMP TABLE cuentas (cuentaid INT PRIMARY KEY, cuenta TEXT);
+        CREATE TEMP TABLE terceros (terceroid INT PRIMARY KEY, tercero TEXT);
+        CREATE TEMP TABLE centro_costos (centro_costo_id INT PRIMARY KEY, centro_costo TEXT);
+        CREATE TEMP TABLE conceptos (conceptoid INT PRIMARY KEY, concepto TEXT);
+        CREATE TEMP TABLE movimientos_encabezado (
+            Id SERIAL PRIMARY KEY, Fecha DATE, Descripcion TEXT, Referencia TEXT,
+            Valor NUMERIC(18, 2), USD NUMERIC(18, 2), TRM NUMERIC(18, 4),
+            MonedaID INT, CuentaID INT, terceroid INT, Detalle TEXT,
+            descripcion_busqueda TEXT GENERATED ALWAYS AS (UPPER(Descripcion)) STORED,
+            created_at TIMESTAMP DEFAULT now()
+        );
+        CREATE TEMP TABLE movimientos_detalle (
+            id SERIAL PRIMARY KEY, movimiento_id INT, centro_costo_id INT,
+            ConceptoID INT, TerceroID INT, Valor NUMERIC(18, 2),
+            created_at TIMESTAMP DEFAULT now()
+        );
+        CREATE TEMP TABLE movimiento_vinculaciones (id SERIAL PRIMARY KEY, movimiento_sistema_id INT);
+        CREATE TEMP TABLE conciliaciones (
+            id SERIAL PRIMARY KEY, cuenta_id INT, year INT, month INT, estado TEXT,
+            extracto_saldo_anterior NUMERIC, extracto_entradas NUMERIC, extracto_salidas NUMERIC,
+            extracto_saldo_final NUMERIC, sistema_entradas NUMERIC, sistema_salidas NUMERIC,
+            sistema_saldo_final NUMERIC, updated_at TIMESTAMP
+        );
+        INSERT INTO cuentas VALUES (1, 'Ahorros'), (2, 'Tarjeta');
+        INSERT INTO terceros SELECT i, 'Tercero ' || i FROM generate_series(1, 5) AS i;
+        INSERT INTO centro_costos SELECT i, 'Centro ' || i FROM generate_series(1, 4) AS i;
+        INSERT INTO conceptos SELECT i, 'Concepto ' || i FROM generate_series(1, 6) AS i;
+    """)
+    cursor.execute("""
+        INSERT INTO movimientos_encabezado (Fecha, Descripcion, Referencia, Valor, MonedaID, CuentaID, terceroid)
+        SELECT DATE '2024-01-01' + (i * 7 % 400), 'COMPRA ' || i, '',
+               CASE WHEN i % 4 = 0 THEN 1000 * i ELSE -100 * i END, 1, 1 + i % 2, NULLIF(i % 6, 0)
+        FROM generate_series(1, 3000) AS i
+    """)
+    # Dos líneas por movimiento (split en centros o conceptos distintos) y algunos sin detalle
+    cursor.execute("""
+        INSERT INTO movimientos_detalle (movimiento_id, centro_costo_id, ConceptoID, TerceroID, Valor)
+        SELECT Id, NULLIF(Id % 5, 0), NULLIF(Id % 7, 0), terceroid, Valor - TRUNC(Valor / 3)
+        FROM movimientos_encabezado WHERE Id % 11 <> 0
+        UNION ALL
+        SELECT Id, NULLIF((Id + 1) % 5, 0), NULLIF(Id % 3, 0), terceroid, TRUNC(Valor / 3)
+        FROM movimientos_encabezado WHERE Id % 11 <> 0
+    """)
+    cursor.execute(MIGRACION.read_text(encoding="utf-8"))
+    conn.commit()
+
+    yield conn
+
+    conn.rollback()
+    conn.close()
+    resumen_mensual._disponible = False
+
+
+def _reportes(repo):
+    return [
+        repo.obtener_estadisticas_dashboard(date(2024, 1, 10), date(2024, 11, 20)),
+        repo.obtener_estadisticas_dashboard(),
+        repo.resumir_ingresos_gastos_por_mes(date(2024, 2, 1), date(2024, 12, 5), centros_costos_excluidos=[2]),
+        repo.resumir_por_clasificacion('tercero', date(2024, 3, 3), date(2024, 9, 30), tipo_movimiento='egresos'),
+        repo.resumir_por_clasificacion('centro_costo', cuenta_id=2),
+        repo.obtener_desglose_gastos('tercero', date(2024, 1, 1), date(2024, 6, 30), centro_costo_id=3),
+        repo.obtener_desglose_gastos('concepto', date(2024, 5, 1), date(2025, 1, 31), tercero_id=4),
+    ]
+
+
+def _en_vivo(repo, monkeypatch):
+    with monkeypatch.context() as m:
+        m.setattr(resumen_mensual, "disponible", lambda cursor: False)
+        return _reportes(repo)
+
+
+def _ordenados(reportes):
+    return [sorted(r, key=repr) for r in reportes]
+
+
+def test_reportes_del_agregado_igual_a_datos_vivos_tras_escrituras(conn, monkeypatch):
+    repo = PostgresMovimientoRepository(conn)
+    assert _ordenados(_reportes(repo)) == _ordenados(_en_vivo(repo, monkeypatch))
+
+    nuevo = Movimiento(
+        fecha=date(2024, 4, 10), descripcion="SUPERMERCADO", referencia="", valor=Decimal("-900"),
+        moneda_id=1, cuenta_id=1, tercero_id=2,
+        detalles=[
+            MovimientoDetalle(valor=Decimal("-600"), centro_costo_id=1, concepto_id=1, tercero_id=2),
+            MovimientoDetalle(valor=Decimal("-300"), centro_costo_id=1, concepto_id=2, tercero_id=2),
+        ]
+    )
+    repo.guardar(nuevo)
+    # Cambia de mes y cuenta: se recalculan el periodo anterior y el nuevo
+    nuevo.fecha, nuevo.cuenta_id = date(2024, 7, 2), 2
+    repo.guardar(nuevo)
+    repo.actualizar_clasificacion_lote("COMPRA 1", 5, 4, 6)
+    repo.desvincular_por_ids([20, 21, 22])
+    repo.eliminar(30)
+    repo.eliminar_rango(date(2024, 8, 1), date(2024, 8, 15), cuenta_id=1)
+
+    assert resumen_mensual.verificar(conn)["periodos_con_diferencias"] == []
+    assert _ordenados(_reportes(repo)) == _ordenados(_en_vivo(repo, monkeypatch))
+
+
+def test_verificar_detecta_y_repara_diferencias(conn):
+    cursor = conn.cursor()
+    cursor.execute("UPDATE resumen_movimientos_mensual SET ingresos = ingresos + 1 WHERE year = 2024 AND month = 5 AND cuenta_id = 1")
+    cursor.execute("DELETE FROM resumen_movimientos_mensual WHERE year = 2024 AND month = 9 AND cuenta_id = 2")
+    conn.commit()
+
+    resultado = resumen_mensual.verificar(conn, reparar=True)
+    assert resultado["periodos_con_diferencias"] == [
+        {"cuenta_id": 1, "year": 2024, "month": 5}, {"cuenta_id": 2, "year": 2024, "month": 9}
+    ]
+    assert resultado["reparados"] == 2
+    assert resumen_mensual.verificar(conn)["periodos_con_diferencias"] == []
+
+
+def test_actualizar_periodos_toma_un_candado_por_periodo(conn):
+    cursor = conn.cursor()
+    resumen_mensual.actualizar_periodos(cursor, [(1, 2024, 3), (2, 2024, 3), (1, 2024, 3)])
+    cursor.execute("SELECT COUNT(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()")
+    assert cursor.fetchone()[0] == 2
+    conn.rollback()
@@ -0,0 +1,201 @@
+"""
+Snapshots incrementales (base + deltas por bloques de ids) y restauración,
+sobre una conexión falsa que guarda las tablas en memoria.
+"""
+import hashlib
+import re
+
+import pytest
+from psycopg2 import sql
+
+from src.infrastructure.database.snapshots_incrementales import SnapshotsIncrementales
+
+
+def _texto(consulta):
+    """SQL compuesto → texto, sin conexión real"""
+    if isinstance(consulta, sql.Composed):
+        return "".join(_texto(parte) for parte in consulta.seq)
+    if isinstance(consulta, sql.Identifier):
+        return '"%s"' % consulta.strings[0]
+    if isinstance(consulta, sql.Literal):
+        return str(consulta.wrapped)
+    if isinstance(consulta, sql.SQL):
+        return consulta.string
+    return consulta
+
+
+def _campo(valor):
+    # Como COPY csv: NULL sin comillas, texto vacío entre comillas
+    if valor is None:
+        return ""
+    return '""' if valor == "" else valor
+
+
+class _Cursor:
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.rowcount = -1
+        self._filas = []
+
+    def _bloque(self, id_):
+        return id_ // self.conexion.tamano
+
+    def execute(self, query, params=None):
+        texto = _texto(query)
+        tablas = self.conexion.tablas
+        if "information_schema.columns" in texto:
+            self._filas = [("id", False), ("descripcion", False)]
+            if params[0] == "conciliaciones":
+                self._filas.append(("diferencia", True))
+        elif texto.startswith("SELECT FLOOR"):
+            tabla = re.search(r'FROM "(\w+)"', texto).group(1)
+            bloques = {}
+            for id_, descripcion in sorted(tablas[tabla].items()):
+                bloques.setdefault(self._bloque(id_), []).append(f"{id_}|{descripcion!r}")
+            self._filas = [(b, hashlib.md5("\n".join(f).encode()).hexdigest()) for b, f in bloques.items()]
+        elif texto.startswith("DELETE FROM"):
+            tablas[re.search(r'"(\w+)"', texto).group(1)].clear()
+        elif texto.startswith("CREATE TEMP TABLE"):
+            tablas[re.search(r'"(\w+)"', texto).group(1)] = {}
+        elif texto.startswith("INSERT INTO"):
+            # Upsert por id desde la tabla temporal
+            destino, temporal = re.findall(r'(?:INTO|FROM) (?:pg_temp\.)?"(\w+)"', texto)
+            tablas[destino].update(tablas.pop(temporal))
+
+    def fetchall(self):
+        return self._filas
+
+    def copy_expert(self, query, archivo, size=8192):
+        texto = _texto(query)
+        tabla = re.search(r'FROM "(\w+)"|COPY (?:pg_temp\.)?"(\w+)"', texto)
+        tabla = tabla.group(1) or tabla.group(2)
+        filas = self.conexion.tablas[tabla]
+        if "TO STDOUT" in texto:
+            bloques = re.search(r"ANY\(\[([\d, ]+)\]\)", texto)
+            elegidos = {int(b) for b in bloques.group(1).split(",")} if bloques else None
+            lineas = ["id,descripcion\n"]
+            for id_, descripcion in sorted(filas.items()):
+                if elegidos is None or self._bloque(id_) in elegidos:
+                    lineas.append(f"{id_},{_campo(descripcion)}\n")
+            archivo.write("".join(lineas).encode())
+            self.rowcount = len(lineas) - 1
+            self.conexion.copiadas[tabla] = self.rowcount
+        else:
+            recibido = b"".join(iter(lambda: archivo.read(size), b"")).decode()
+            for linea in recibido.splitlines():
+                id_, descripcion = linea.split(",")
+                filas[int(id_)] = None if descripcion == "" else descripcion.strip('"')
+            self.rowcount = len(recibido.splitlines())
+
+    def close(self):
+        pass
+
+
+class _Conexion:
+    def __init__(self, tamano):
+        self.tamano = tamano
+        self.tablas = {"movimientos_encabezado": {}, "conciliaciones": {}}
+        self.copiadas = {}
+
+    def cursor(self):
+        return _Cursor(self)
+
+
+@pytest.fixture
+def escenario(tmp_path):
+    conn = _Conexion(tamano=100)
+    conn.tablas["movimientos_encabezado"].update({i: f"MOV {i}" for i in range(1, 251)})
+    conn.tablas["movimientos_encabezado"][7] = ""
+    conn.tablas["movimientos_encabezado"][8] = None
+    conn.tablas["conciliaciones"].update({1: "PENDIENTE", 2: "CONCILIADO"})
+    snapshots = SnapshotsIncrementales(
+        str(tmp_path), ["movimientos_encabezado", "conciliaciones"], tamano_bloque=100, max_deltas=2
+    )
+    return conn, snapshots
+
+
+def test_deltas_copian_solo_los_bloques_cambiados(escenario):
+    conn, snapshots = escenario
+    base = snapshots.crear(conn, "autosave")
+    assert base["tipo"] == "base"
+    assert base["tablas"]["movimientos_encabezado"]["filas"] == 250
+
+    conn.tablas["movimientos_encabezado"][150] = "EDITADO"
+    conn.copiadas.clear()
+    delta = snapshots.crear(conn, "autosave")
+    assert delta["tipo"] == "delta"
+    assert delta["tablas"]["movimientos_encabezado"]["bloques"] == [1]
+    assert conn.copiadas == {"movimientos_encabezado": 100}
+    assert delta["tablas"]["conciliaciones"]["bloques"] == []
+
+    for i in range(200, 251):
+        del conn.tablas["movimientos_encabezado"][i]
+    conn.tablas["movimientos_encabezado"][900] = "NUEVO"
+    delta = snapshots.crear(conn, "autosave")
+    assert delta["tablas"]["movimientos_encabezado"]["bloques"] == [2, 9]
+    assert delta["tablas"]["movimientos_encabezado"]["filas"] == 1
+
+    # max_deltas=2: la siguiente cadena empieza con una base
+    assert snapshots.crear(conn, "autosave")["tipo"] == "base"
+    assert [s["tipo"] for s in snapshots.listar()] == ["base", "delta", "delta", "base"]
+
+
+def test_restaura_base_mas_deltas_en_cualquier_punto(escenario):
+    conn, snapshots = escenario
+    original = dict(conn.tablas["movimientos_encabezado"])
+    snapshots.crear(conn, "autosave")
+
+    conn.tablas["movimientos_encabezado"][150] = "EDITADO"
+    conn.tablas["conciliaciones"][2] = "PENDIENTE"
+    intermedio = {t: dict(filas) for t, filas in conn.tablas.items()}
+    segundo = snapshots.crear(conn, "autosave")
+
+    del conn.tablas["movimientos_encabezado"][5]
+    conn.tablas["movimientos_encabezado"][900] = "NUEVO"
+    conn.tablas["conciliaciones"].clear()
+    final = {t: dict(filas) for t, filas in conn.tablas.items()}
+    tercero = snapshots.crear(conn, "autosave")
+
+    conn.tablas["movimientos_encabezado"].clear()
+    resultados = snapshots.restaurar(conn, segundo["nombre"])
+    assert conn.tablas == intermedio
+    assert conn.tablas["movimientos_encabezado"][7] == "" and conn.tablas["movimientos_encabezado"][8] is None
+    assert resultados["movimientos_encabezado"].filas == len(original)
+    assert resultados["conciliaciones"].filas == 2
+
+    snapshots.restaurar(conn, tercero["nombre"])
+    assert conn.tablas == final
+
+
+def test_rechaza_snapshot_danado_o_inexistente(escenario, tmp_path):
+    conn, snapshots = escenario
+    base = snapshots.crear(conn, "autosave")
+
+    with pytest.raises(ValueError, match="no encontrado"):
+        snapshots.restaurar(conn, "otro")
+
+    with open(tmp_path / base["archivo"], "ab") as f:
+        f.write(b"x")
+    with pytest.raises(ValueError, match="sha256"):
+        snapshots.restaurar(conn, base["nombre"])
+    # Si falta un archivo de la cadena, el siguiente snapshot es una base
+    (tmp_path / base["archivo"]).unlink()
+    assert snapshots.crear(conn, "autosave")["tipo"] == "base"
+
+
+def test_tablas_con_llave_se_restauran_sin_borrar(escenario, tmp_path):
+    conn, _ = escenario
+    snapshots = SnapshotsIncrementales(
+        str(tmp_path), ["conciliaciones", "movimientos_encabezado"], tamano_bloque=100,
+        llaves={"conciliaciones": ("id",)}
+    )
+    base = snapshots.crear(conn, "autosave")
+
+    conn.tablas["conciliaciones"][2] = "PENDIENTE"
+    conn.tablas["conciliaciones"][3] = "NUEVA"
+    resultados = snapshots.restaurar(conn, base["nombre"])
+
+    # Las filas del snapshot vuelven a su estado; las posteriores se conservan
+    assert conn.tablas["conciliaciones"] == {1: "PENDIENTE", 2: "CONCILIADO", 3: "NUEVA"}
+    assert resultados["conciliaciones"].filas == 2
+    assert not any(t.startswith("_restaurar") for t in conn.tablas)
@@ -67,37 +67,35 @@ def actualizar_conciliaciones(cuenta_id=None, year=None, month=None):
         
         print(f"Found {len(rows)} periods to process.")
         
-        results = []
-        
-        for row in rows:
-            c_id, y, m = row
-            
-            existing = repo.obtener_por_periodo(c_id, y, m)
-            
-            if not existing:
-                new_rec = Conciliacion(
+        # Crear las conciliaciones que faltan
+        cursor.execute("SELECT cuenta_id, year, month FROM conciliaciones")
+        existentes = set(cursor.fetchall())
+        for c_id, y, m in rows:
+            if (c_id, y, m) not in existentes:
+                repo.guardar(Conciliacion(
                     id=None,
                     cuenta_id=c_id,
                     year=y,
                     month=m,
-                    fecha_corte=date(y, m, 1), 
+                    fecha_corte=date(y, m, 1),
                     extracto_saldo_anterior=0,
                     extracto_entradas=0,
                     extracto_salidas=0,
                     extracto_saldo_final=0,
                     datos_extra={},
                     estado='PENDIENTE'
-                )
-                repo.guardar(new_rec)
-                existing = repo.obtener_por_periodo(c_id, y, m)
-            
+                ))
+
+        # Sincronizar el extracto y recalcular todos los periodos en una sola operación
+        actualizadas = repo.recalcular_sistema_lote(rows)
+        print(f"Recalculated {actualizadas} conciliaciones.")
+
+        results = []
+        for c_id, y, m in rows:
+            existing = repo.obtener_por_periodo(c_id, y, m)
             if existing:
-                 updated_conciliacion = repo.recalcular_sistema(c_id, y, m)
-                 if updated_conciliacion:
-                     existing = updated_conciliacion
-                 
-                 results.append(existing)
-            
+                results.append(existing)
+
         # Print Results
         print("\n=== Resultados de Actualización ===")
         
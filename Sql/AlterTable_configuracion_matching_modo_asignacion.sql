@@ -0,0 +1,17 @@
+-- =====================================================
+-- Modo de asignación del algoritmo de matching
+-- =====================================================
+-- GREEDY: cada movimiento del extracto, en orden, toma su mejor candidato
+-- OPTIMO: asignación global (Húngaro) por ventana de días, con respaldo GREEDY
+-- =====================================================
+
+ALTER TABLE configuracion_matching
+    ADD COLUMN IF NOT EXISTS modo_asignacion VARCHAR(20) NOT NULL DEFAULT 'GREEDY';
+
+ALTER TABLE configuracion_matching
+    DROP CONSTRAINT IF EXISTS check_modo_asignacion;
+
+ALTER TABLE configuracion_matching
+    ADD CONSTRAINT check_modo_asignacion CHECK (modo_asignacion IN ('GREEDY', 'OPTIMO'));
+
+COMMENT ON COLUMN configuracion_matching.modo_asignacion IS 'Estrategia de asignación: GREEDY (fila por fila) u OPTIMO (asignación global por ventana de días)';
@@ -0,0 +1,44 @@
+-- =====================================================
+-- Búsqueda por descripción con índices trigram (pg_trgm)
+-- =====================================================
+-- Las búsquedas '%texto%' sobre la descripción no pueden usar un índice
+-- btree. Se agrega una columna almacenada con la descripción en mayúsculas
+-- (descripcion_busqueda) y un índice GIN trigram sobre ella; los
+-- repositorios comparan `descripcion_busqueda LIKE UPPER(patrón)`, que el
+-- planificador resuelve con el índice (Bitmap Index Scan).
+--
+-- Requiere PostgreSQL 12+ (columnas generadas).
+-- =====================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- -----------------------------------------------------
+-- movimientos_encabezado
+-- -----------------------------------------------------
+ALTER TABLE movimientos_encabezado
+    ADD COLUMN IF NOT EXISTS descripcion_busqueda TEXT
+    GENERATED ALWAYS AS (UPPER(Descripcion)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_mov_encabezado_descripcion_trgm
+    ON movimientos_encabezado USING GIN (descripcion_busqueda gin_trgm_ops);
+
+-- Detección de duplicados (existe_movimiento / obtener_exacto): cuenta + fecha
+CREATE INDEX IF NOT EXISTS idx_mov_encabezado_cuenta_fecha
+    ON movimientos_encabezado (CuentaID, Fecha);
+
+COMMENT ON COLUMN movimientos_encabezado.descripcion_busqueda IS 'UPPER(Descripcion), indexada con pg_trgm para búsquedas LIKE';
+
+-- -----------------------------------------------------
+-- tercero_descripciones
+-- -----------------------------------------------------
+ALTER TABLE tercero_descripciones
+    ADD COLUMN IF NOT EXISTS descripcion_busqueda TEXT
+    GENERATED ALWAYS AS (UPPER(descripcion)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_tercero_descripciones_descripcion_trgm
+    ON tercero_descripciones USING GIN (descripcion_busqueda gin_trgm_ops);
+
+COMMENT ON COLUMN tercero_descripciones.descripcion_busqueda IS 'UPPER(descripcion), indexada con pg_trgm para búsquedas LIKE';
+
+ANALYZE movimientos_encabezado;
+ANALYZE tercero_descripciones;
@@ -21,6 +21,9 @@ CREATE TABLE configuracion_matching (
     score_minimo_exacto NUMERIC(3, 2) NOT NULL DEFAULT 0.95,  -- 95% para considerar EXACTO
     score_minimo_probable NUMERIC(3, 2) NOT NULL DEFAULT 0.70,  -- 70% para considerar PROBABLE
     
+    -- Estrategia de Asignación (GREEDY u OPTIMO)
+    modo_asignacion VARCHAR(20) NOT NULL DEFAULT 'GREEDY',
+    
     -- Configuración de Traslados
     palabras_clave_traslado TEXT[] DEFAULT ARRAY[
         'TRANSFERENCIA', 
@@ -44,6 +47,9 @@ CREATE TABLE configuracion_matching (
         score_minimo_exacto >= score_minimo_probable AND
         score_minimo_exacto <= 1.00 AND
         score_minimo_probable >= 0.00
+    ),
+    CONSTRAINT check_modo_asignacion CHECK (
+        modo_asignacion IN ('GREEDY', 'OPTIMO')
     )
 );
 
@@ -58,6 +64,7 @@ COMMENT ON COLUMN configuracion_matching.tolerancia_valor IS 'Margen de error ac
 COMMENT ON COLUMN configuracion_matching.similitud_descripcion_minima IS 'Porcentaje mínimo de similitud en descripción (0.00 a 1.00)';
 COMMENT ON COLUMN configuracion_matching.score_minimo_exacto IS 'Score mínimo para considerar un match como OK';
 COMMENT ON COLUMN configuracion_matching.score_minimo_probable IS 'Score mínimo para considerar un match como PROBABLE';
+COMMENT ON COLUMN configuracion_matching.modo_asignacion IS 'Estrategia de asignación: GREEDY (fila por fila) u OPTIMO (asignación global por ventana de días)';
 
 -- Insertar configuración inicial
 INSERT INTO configuracion_matching (
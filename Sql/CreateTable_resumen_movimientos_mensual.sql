@@ -0,0 +1,65 @@
+-- =====================================================
+-- Agregado mensual de movimientos para reportes y dashboard
+-- =====================================================
+-- Ingresos, egresos y conteo de los detalles por cuenta, mes y
+-- clasificación. Lo mantiene el repositorio de movimientos: cada escritura
+-- recalcula, en su misma transacción, los periodos (cuenta, año, mes) que
+-- toca (src/infrastructure/database/resumen_mensual.py). No es una vista
+-- materializada porque REFRESH MATERIALIZED VIEW recalcula todo y nadie lo
+-- ejecutaría (como pasa con vista_resumen_matching).
+--
+-- Los reportes leen de aquí los meses completos del rango y los meses
+-- parciales de los datos vivos. La consistencia se revisa (y repara) con
+-- GET /api/admin/resumen-mensual/verificar.
+--
+-- Las columnas de clasificación admiten NULL (movimientos sin clasificar o
+-- sin detalles), por eso no hay llave primaria.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS resumen_movimientos_mensual (
+    cuenta_id INTEGER,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    tercero_id INTEGER,           -- tercero del encabezado (filtro tercero_id)
+    tercero_detalle_id INTEGER,   -- tercero del detalle (desglose por tercero)
+    centro_costo_id INTEGER,
+    concepto_id INTEGER,
+    signo SMALLINT,               -- SIGN(valor del encabezado) (filtro ingresos/egresos)
+    ingresos NUMERIC(18, 2) NOT NULL DEFAULT 0,
+    egresos NUMERIC(18, 2) NOT NULL DEFAULT 0,
+    conteo INTEGER NOT NULL DEFAULT 0  -- movimientos distintos por centro de costo
+);
+
+CREATE INDEX IF NOT EXISTS idx_resumen_mensual_periodo
+    ON resumen_movimientos_mensual (year, month, cuenta_id);
+
+-- Carga inicial (misma consulta que resumen_mensual._SELECT_VIVO)
+DELETE FROM resumen_movimientos_mensual;
+
+INSERT INTO resumen_movimientos_mensual (
+    cuenta_id, year, month, tercero_id, tercero_detalle_id, centro_costo_id,
+    concepto_id, signo, ingresos, egresos, conteo
+)
+SELECT cuenta_id, year, month, tercero_id, tercero_detalle_id, centro_costo_id,
+       concepto_id, signo,
+       SUM(CASE WHEN valor > 0 THEN valor ELSE 0 END),
+       SUM(CASE WHEN valor < 0 THEN -valor ELSE 0 END),
+       COUNT(*) FILTER (WHERE primero)
+FROM (
+    SELECT m.CuentaID AS cuenta_id,
+           EXTRACT(YEAR FROM m.Fecha)::int AS year,
+           EXTRACT(MONTH FROM m.Fecha)::int AS month,
+           m.terceroid AS tercero_id,
+           md.TerceroID AS tercero_detalle_id,
+           md.centro_costo_id,
+           md.ConceptoID AS concepto_id,
+           SIGN(m.Valor)::smallint AS signo,
+           md.Valor AS valor,
+           ROW_NUMBER() OVER (PARTITION BY m.Id, md.centro_costo_id ORDER BY md.id) = 1 AS primero
+    FROM movimientos_encabezado m
+    LEFT JOIN movimientos_detalle md ON m.Id = md.movimiento_id
+    WHERE m.Fecha IS NOT NULL
+) d
+GROUP BY cuenta_id, year, month, tercero_id, tercero_detalle_id, centro_costo_id, concepto_id, signo;
+
+COMMENT ON TABLE resumen_movimientos_mensual IS 'Agregado mensual de detalles de movimientos, mantenido por periodo desde el repositorio';
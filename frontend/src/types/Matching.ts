@@ -127,6 +127,11 @@ export interface MatchingResult {
 // Configuración
 // ============================================================================
 
+/**
+ * Estrategia de asignación del algoritmo de matching
+ */
+export type ModoAsignacion = 'GREEDY' | 'OPTIMO'
+
 /**
  * Configuración del algoritmo de matching
  */
@@ -139,6 +144,7 @@ export interface ConfiguracionMatching {
     peso_descripcion: number
     score_minimo_exacto: number
     score_minimo_probable: number
+    modo_asignacion: ModoAsignacion
     activo: boolean
     created_at: string | null
     updated_at: string | null
@@ -155,6 +161,7 @@ export interface ConfiguracionMatchingUpdate {
     peso_descripcion: number
     score_minimo_exacto: number
     score_minimo_probable: number
+    modo_asignacion?: ModoAsignacion
 }
 
 // ============================================================================